@@ -12,6 +12,8 @@ __all__ = [
     'GoogleClient',
     'IdAnalyzerClient',
     'JumioClient',
+    'KinesisClient',
+    'LocalKinesisClient',
     'MediaConvertClient',
     'PinpointClient',
     'PostVerificationClient',
@@ -34,6 +36,7 @@ from .facebook import FacebookClient
 from .google import GoogleClient
 from .id_analyzer import IdAnalyzerClient
 from .jumio import JumioClient
+from .kinesis import KinesisClient, LocalKinesisClient
 from .mediaconvert import MediaConvertClient
 from .pinpoint import PinpointClient
 from .post_verification import PostVerificationClient
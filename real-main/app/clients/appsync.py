@@ -1,9 +1,14 @@
 import logging
 import os
+import threading
 
 import boto3
-import gql.transport.requests
+import gql
+import requests
 import requests_aws4auth
+from graphql.language.printer import print_ast
+
+from app.utils import map_concurrently
 
 APPSYNC_GRAPHQL_URL = os.environ.get('APPSYNC_GRAPHQL_URL')
 
@@ -11,28 +16,69 @@ logger = logging.getLogger()
 
 
 class AppSyncClient:
+    """
+    Sends mutations to appsync, normally to trigger subscription notifications. Parsed and
+    printed documents are cached, and one keep-alive http session is shared by all sends,
+    so the per-notification cost is a signed POST on an already-open connection.
+    """
 
     service_name = 'appsync'
     headers = {
         'Accept': 'application/json',
         'Content-Type': 'application/json',
     }
+    max_workers = 10
+    timeout = 10
 
     def __init__(self, appsync_graphql_url=APPSYNC_GRAPHQL_URL):
         self.appsync_graphql_url = appsync_graphql_url
+        self.documents = {}  # (mutation name, selected fields) -> parsed document
+        self.query_strs = {}  # parsed document -> printed query
+        self.lock = threading.Lock()
 
-    def fire_notification(self, user_id, notification_type, **extra):
-        mutation = gql.gql(
-            f'''
-            mutation TriggerNotification ($input: NotificationInput!) {{
-                triggerNotification (input: $input) {{
-                    userId
-                    type
-                    {' '.join(extra.keys())}
+        # keep-alive session shared across threads, with a connection pool big enough for `send_many`
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(self.headers)
+
+    @property
+    def auth(self):
+        "SigV4 auth, rebuilt only when the underlying credentials have been refreshed"
+        with self.lock:
+            if not hasattr(self, '_aws_session'):
+                self._aws_session = boto3.session.Session()
+            creds = self._aws_session.get_credentials().get_frozen_credentials()
+            if getattr(self, '_auth_creds', None) != creds:
+                self._auth = requests_aws4auth.AWS4Auth(
+                    creds.access_key,
+                    creds.secret_key,
+                    self._aws_session.region_name,
+                    self.service_name,
+                    session_token=creds.token,
+                )
+                self._auth_creds = creds
+            return self._auth
+
+    def get_notification_document(self, fields):
+        key = ('TriggerNotification', tuple(fields))
+        if key not in self.documents:
+            self.documents[key] = gql.gql(
+                f'''
+                mutation TriggerNotification ($input: NotificationInput!) {{
+                    triggerNotification (input: $input) {{
+                        userId
+                        type
+                        {' '.join(fields)}
+                    }}
                 }}
-            }}
-        '''
-        )
+            '''
+            )
+        return self.documents[key]
+
+    def fire_notification(self, user_id, notification_type, **extra):
+        mutation = self.get_notification_document(extra.keys())
         input_obj = {
             'userId': user_id,
             'type': notification_type,
@@ -40,22 +86,30 @@ class AppSyncClient:
         }
         self.send(mutation, {'input': input_obj})
 
-    def send(self, query, variables):
-        aws_session = boto3.session.Session()
-        creds = aws_session.get_credentials().get_frozen_credentials()
-        auth = requests_aws4auth.AWS4Auth(
-            creds.access_key,
-            creds.secret_key,
-            aws_session.region_name,
-            self.service_name,
-            session_token=creds.token,
+    def fire_notifications(self, user_ids, notification_type, **extra):
+        "Fire the same notification to each of the users, sending the mutations concurrently"
+        mutation = self.get_notification_document(extra.keys())
+        variables_list = [
+            {'input': {'userId': user_id, 'type': notification_type, **extra}} for user_id in user_ids
+        ]
+        self.send_many(mutation, variables_list)
+
+    def send_many(self, query, variables_list):
+        "Send the query once for each set of variables, concurrently. Errors are raised once all are sent"
+        map_concurrently(
+            lambda variables: self.send(query, variables), variables_list, max_workers=self.max_workers
         )
-        transport = gql.transport.requests.RequestsHTTPTransport(
-            url=self.appsync_graphql_url,
-            use_json=True,
-            headers=self.headers,
-            auth=auth,
+
+    def send(self, query, variables):
+        if query not in self.query_strs:
+            self.query_strs[query] = print_ast(query)
+        resp = self.session.post(
+            self.appsync_graphql_url,
+            json={'query': self.query_strs[query], 'variables': variables},
+            auth=self.auth,
+            timeout=self.timeout,
         )
-        resp = transport.execute(query, variables)
-        if resp.errors:
-            raise Exception(f'Appsync resp error: `{resp.errors}` from query `{query}`, variables `{variables}`')
+        resp.raise_for_status()
+        errors = resp.json().get('errors')
+        if errors:
+            raise Exception(f'Appsync resp error: `{errors}` from query `{query}`, variables `{variables}`')
@@ -5,12 +5,20 @@ import os
 import re
 
 import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from app.utils import map_concurrently
 
 DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
 logger = logging.getLogger()
 
 
 class DynamoClient:
+
+    # dynamo limits a single BatchGetItem call to 100 keys, and a single BatchWriteItem call to 25 writes
+    batch_get_max_keys = 100
+    batch_write_max_items = 25
+
     def __init__(self, table_name=DYNAMO_TABLE, create_table_schema=None):
         """
         If create_table_schema is not None, then the table will be created
@@ -28,6 +36,8 @@ class DynamoClient:
 
         self.boto3_client = boto3.client('dynamodb')
         self.exceptions = self.boto3_client.exceptions
+        self.serialize = TypeSerializer().serialize
+        self.deserialize = TypeDeserializer().deserialize
 
     def add_item(self, query_kwargs):
         "Put an item and return what was putted"
@@ -62,6 +72,69 @@ class DynamoClient:
             kwargs['RequestItems'][self.table_name]['ProjectionExpression'] = projection_expression
         return self.boto3_client.batch_get_item(**kwargs)['Responses'][self.table_name]
 
+    def generate_batch_get_items(self, keys, projection_expression=None):
+        """
+        Get the items for the given keys in as few batch requests as possible.
+        Both the input `keys` and the yielded items are in the simple format, without types.
+        Order *not* maintained, keys that don't match an item are skipped.
+        """
+        # dynamo can't handle duplicates
+        typed_keys = list({tuple(sorted(k.items())): self.serialize_item(k) for k in keys}.values())
+        for i in range(0, len(typed_keys), self.batch_get_max_keys):
+            request = {self.table_name: {'Keys': typed_keys[i : i + self.batch_get_max_keys]}}
+            if projection_expression:
+                request[self.table_name]['ProjectionExpression'] = projection_expression
+            while request:
+                resp = self.boto3_client.batch_get_item(RequestItems=request)
+                for typed_item in resp['Responses'].get(self.table_name, []):
+                    yield self.deserialize_item(typed_item)
+                request = resp.get('UnprocessedKeys')
+
+    def serialize_item(self, item):
+        return {k: self.serialize(v) for k, v in item.items()}
+
+    def deserialize_item(self, typed_item):
+        return {k: self.deserialize(v) for k, v in typed_item.items()}
+
+    def upsert_item(self, query_kwargs):
+        """
+        Update an item, creating it if needed, and return the old values of the updated attributes.
+        An empty return value means the item did not exist before. Unlike the other methods here,
+        this goes through the low-level boto3 client and so is safe to call from multiple threads.
+        """
+        kwargs = {
+            **query_kwargs,
+            'TableName': self.table_name,
+            'Key': self.serialize_item(query_kwargs['Key']),
+            'ReturnValues': 'UPDATED_OLD',
+        }
+        if 'ExpressionAttributeValues' in query_kwargs:
+            kwargs['ExpressionAttributeValues'] = self.serialize_item(query_kwargs['ExpressionAttributeValues'])
+        return self.deserialize_item(self.boto3_client.update_item(**kwargs).get('Attributes', {}))
+
+    def set_if_greater(self, key, attribute_name, value, other_attributes=None):
+        """
+        Set a numeric attribute to `value` unless it is already at least that, creating the item if
+        needed. Any `other_attributes` are set along with it. Returns True if anything was written.
+        Safe to call from multiple threads.
+        """
+        kwargs = {
+            'Key': key,
+            'UpdateExpression': 'SET #attr = :value',
+            'ConditionExpression': 'attribute_not_exists(#attr) OR #attr < :value',
+            'ExpressionAttributeNames': {'#attr': attribute_name},
+            'ExpressionAttributeValues': {':value': value},
+        }
+        for i, (name, other_value) in enumerate((other_attributes or {}).items()):
+            kwargs['UpdateExpression'] += f', #other{i} = :other{i}'
+            kwargs['ExpressionAttributeNames'][f'#other{i}'] = name
+            kwargs['ExpressionAttributeValues'][f':other{i}'] = other_value
+        try:
+            self.upsert_item(kwargs)
+        except self.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
     def update_item(self, query_kwargs, failure_warning=None):
         """
         Update an item and return the new item.
@@ -147,6 +220,27 @@ class DynamoClient:
                 cnt += 1
         return cnt
 
+    def batch_delete_concurrently(self, key_generator, max_workers=10):
+        """
+        Batch delete items by keys yielded by `generator`, running the batch requests concurrently.
+        Goes through the low-level boto3 client, so unlike `batch_delete` is safe to call from multiple
+        threads. Returns count of how many deletes requested.
+        """
+        # dynamo can't handle duplicates
+        typed_keys = list({tuple(sorted(k.items())): self.serialize_item(k) for k in key_generator}.values())
+
+        def delete_batch(batch):
+            request = {self.table_name: [{'DeleteRequest': {'Key': typed_key}} for typed_key in batch]}
+            while request:
+                request = self.boto3_client.batch_write_item(RequestItems=request).get('UnprocessedItems')
+
+        batches = [
+            typed_keys[i : i + self.batch_write_max_items]
+            for i in range(0, len(typed_keys), self.batch_write_max_items)
+        ]
+        map_concurrently(delete_batch, batches, max_workers=max_workers)
+        return len(typed_keys)
+
     def encode_pagination_token(self, last_evaluated_key):
         "From a LastEvaluatedKey to a obfucated string"
         # https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/Query.html#Query.Pagination
@@ -188,6 +282,20 @@ class DynamoClient:
                 yield item
             last_key = resp.get('LastEvaluatedKey')
 
+    def query_all(self, query_kwargs):
+        """
+        Return a list of all results of the query, in the simple format. Like `upsert_item`, this
+        goes through the low-level boto3 client and so is safe to call from multiple threads.
+        """
+        kwargs = {**query_kwargs, 'TableName': self.table_name}
+        if 'ExpressionAttributeValues' in query_kwargs:
+            kwargs['ExpressionAttributeValues'] = self.serialize_item(query_kwargs['ExpressionAttributeValues'])
+        return [
+            self.deserialize_item(typed_item)
+            for page in self.boto3_client.get_paginator('query').paginate(**kwargs)
+            for typed_item in page['Items']
+        ]
+
     def generate_all_scan(self, scan_kwargs):
         "Return a generator that iterates over all results of the scan"
         last_key = False
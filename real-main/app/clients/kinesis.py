@@ -0,0 +1,114 @@
+import base64
+import collections
+import itertools
+import json
+import logging
+import os
+import random
+import time
+
+import boto3
+
+VIEWS_STREAM_NAME = os.environ.get('VIEWS_STREAM_NAME')
+
+logger = logging.getLogger()
+
+
+class PutRecordsFailed(Exception):
+    def __init__(self, stream_name, records):
+        self.stream_name = stream_name
+        self.records = records
+
+    def __str__(self):
+        return f'Kinesis stream `{self.stream_name}`: failed to put `{len(self.records)}` records'
+
+
+class KinesisClient:
+    "Append-only buffered log backed by a kinesis data stream"
+
+    max_records_per_put = 500
+    max_put_attempts = 3
+    put_backoff_base = 0.05  # seconds
+
+    def __init__(self, stream_name=VIEWS_STREAM_NAME):
+        self.stream_name = stream_name
+        self.client = boto3.client('kinesis')
+
+    def put_records(self, records):
+        """
+        Append records to the stream. `records` is an iterable of (partition_key, data) tuples,
+        `data` being json-serializable. Records the stream throttles are retried a limited number
+        of times with exponential backoff, after which PutRecordsFailed is raised listing the
+        records that did not make it into the stream.
+        """
+        # pair each entry with the record it came from, to be able to report the ones that failed
+        pairs = [
+            ((partition_key, data), {'PartitionKey': partition_key, 'Data': json.dumps(data).encode()})
+            for partition_key, data in records
+        ]
+        failed_records = []
+        for i in range(0, len(pairs), self.max_records_per_put):
+            chunk = pairs[i : i + self.max_records_per_put]
+            for attempt in range(self.max_put_attempts):
+                if attempt:
+                    # full jitter, so clients throttled together don't retry together
+                    time.sleep(random.uniform(0, self.put_backoff_base * 2 ** attempt))
+                resp = self.client.put_records(StreamName=self.stream_name, Records=[e for _, e in chunk])
+                if not resp.get('FailedRecordCount'):
+                    break
+                chunk = [pair for pair, result in zip(chunk, resp['Records']) if result.get('ErrorCode')]
+            else:
+                failed_records.extend(record for record, _ in chunk)
+        if failed_records:
+            raise PutRecordsFailed(self.stream_name, failed_records)
+
+
+class LocalKinesisClient:
+    """
+    Stand-in for KinesisClient that buffers records in memory, or appends them to a
+    json-lines file if a path is given. Drain it into lambda-style kinesis events with
+    get_records_event(), for feeding to a stream consumer.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.queue = collections.deque()
+        self.sequence_numbers = itertools.count()
+
+    def put_records(self, records):
+        records = [{'partitionKey': partition_key, 'data': data} for partition_key, data in records]
+        if not self.path:
+            self.queue.extend(records)
+            return
+        with open(self.path, 'a') as fh:
+            fh.writelines(json.dumps(record) + '\n' for record in records)
+
+    def get_records_event(self, max_records=None):
+        "Remove up to `max_records` of the oldest buffered records, returning them as a lambda event"
+        if self.path:
+            self.load_file()
+        count = len(self.queue) if max_records is None else min(max_records, len(self.queue))
+        records = [self.queue.popleft() for _ in range(count)]
+        return {
+            'Records': [
+                {
+                    'eventSource': 'aws:kinesis',
+                    'eventID': f'shardId-000000000000:{sequence_number}',
+                    'kinesis': {
+                        'partitionKey': record['partitionKey'],
+                        'sequenceNumber': sequence_number,
+                        'data': base64.b64encode(json.dumps(record['data']).encode()).decode(),
+                    },
+                }
+                for record, sequence_number in zip(records, map(str, self.sequence_numbers))
+            ]
+        }
+
+    def load_file(self):
+        "Move records appended to the file into the in-memory queue"
+        try:
+            with open(self.path, 'r+') as fh:
+                self.queue.extend(json.loads(line) for line in fh if line.strip())
+                fh.truncate(0)
+        except FileNotFoundError:
+            pass
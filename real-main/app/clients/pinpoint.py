@@ -10,6 +10,9 @@ logger = logging.getLogger()
 
 
 class PinpointClient:
+
+    max_users_per_request = 100
+
     def __init__(self, app_id=PINPOINT_APPLICATION_ID):
         self.app_id = app_id
         self.client = boto3.client('pinpoint')
@@ -29,6 +32,30 @@ class PinpointClient:
         result = self.client.send_users_messages(**kwargs)['SendUsersMessageResponse']['Result'][user_id]
         return 'SUCCESSFUL' in (v['DeliveryStatus'] for k, v in result.items())
 
+    def send_users_apns(self, url, user_titles, body=None):
+        """
+        Send an APNS to each of the users in a single request, with a per-user title.
+        `user_titles` is a dict of user_id to title, of at most `max_users_per_request` users.
+        Returns the set of user_ids for which the APNS was successfully sent.
+        """
+        assert len(user_titles) <= self.max_users_per_request, f'Too many users: {len(user_titles)}'
+        apns_msg = {'Action': 'URL', 'Title': next(iter(user_titles.values())), 'Url': url}
+        if body:
+            apns_msg['Body'] = body
+        kwargs = {
+            'ApplicationId': self.app_id,
+            'SendUsersMessageRequest': {
+                'MessageConfiguration': {'APNSMessage': apns_msg},
+                'Users': {user_id: {'TitleOverride': title} for user_id, title in user_titles.items()},
+            },
+        }
+        results = self.client.send_users_messages(**kwargs)['SendUsersMessageResponse']['Result']
+        return {
+            user_id
+            for user_id, result in results.items()
+            if 'SUCCESSFUL' in (v['DeliveryStatus'] for k, v in result.items())
+        }
+
     def update_user_endpoint(self, user_id, channel_type, address):
         """
         Set the user's endpoint of type `channel_type` to `address`.
@@ -1,8 +1,19 @@
+import logging
+
 import boto3
 import botocore
 
+from app.utils import map_concurrently
+
+logger = logging.getLogger()
+
 
 class S3Client:
+
+    # S3 limits a single DeleteObjects call to 1000 keys
+    delete_objects_max_keys = 1000
+    max_concurrent_requests = 10
+
     def __init__(self, bucket_name, create_bucket=False):
         """
         The create_bucket kwarg is intended for use with moto in the test suite.
@@ -38,21 +49,54 @@ class S3Client:
         self.bucket.Object(path).delete()
 
     def delete_objects(self, paths):
-        "Delete mutliple objects in one call to S3"
-        kwargs = {'Delete': {'Objects': [{'Key': p} for p in paths]}}
-        self.bucket.delete_objects(**kwargs)
+        "Delete mutliple objects in as few calls to S3 as possible, calls made concurrently"
+        paths = list(paths)
+        chunks = [
+            paths[i : i + self.delete_objects_max_keys]
+            for i in range(0, len(paths), self.delete_objects_max_keys)
+        ]
+        self.map_concurrently(self._delete_objects_chunk, chunks)
+
+    def _delete_objects_chunk(self, paths):
+        kwargs = {'Bucket': self.bucket_name, 'Delete': {'Objects': [{'Key': p} for p in paths], 'Quiet': True}}
+        resp = self.boto_client.delete_objects(**kwargs)
+        for error in resp.get('Errors', []):
+            logger.warning(
+                f'Failed to delete S3 object `{error.get("Key")}`: {error.get("Code")}: {error.get("Message")}'
+            )
 
     def delete_objects_with_prefix(self, path_prefix):
-        "Delete mutliple objects with the same prefix in one call to S3"
-        self.bucket.objects.filter(Prefix=path_prefix).delete()
+        "Delete mutliple objects with the same prefix, using one list and one delete call per 1000 objects"
+        paginator = self.boto_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=path_prefix):
+            self.delete_objects(obj['Key'] for obj in page.get('Contents', []))
 
     def copy_object(self, old_path, new_path):
         new_obj = self.bucket.Object(new_path)
         new_obj.copy({'Bucket': self.bucket.name, 'Key': old_path})
 
+    def copy_objects(self, path_pairs):
+        "Server-side copy of each (old_path, new_path) pair, calls made concurrently"
+        self.map_concurrently(lambda pair: self._copy_object(*pair), path_pairs)
+
+    def _copy_object(self, old_path, new_path):
+        # one server-side CopyObject call, as opposed to the managed transfer used by copy_object()
+        copy_source = {'Bucket': self.bucket_name, 'Key': old_path}
+        self.boto_client.copy_object(Bucket=self.bucket_name, Key=new_path, CopySource=copy_source)
+
     def put_object(self, path, body, content_type):
         self.bucket.put_object(Key=path, Body=body, ContentType=content_type)
 
+    def put_objects(self, objects):
+        "Put each (path, body, content_type) triple, calls made concurrently"
+        self.map_concurrently(lambda obj: self._put_object(*obj), objects)
+
+    def _put_object(self, path, body, content_type):
+        self.boto_client.put_object(Bucket=self.bucket_name, Key=path, Body=body, ContentType=content_type)
+
+    def map_concurrently(self, func, iterable):
+        return map_concurrently(func, iterable, max_workers=self.max_concurrent_requests)
+
     def exists(self, path):
         # https://stackoverflow.com/a/33843019
         try:
@@ -1,4 +1,5 @@
 "AppSync GraphQL data source"
+import collections
 import logging
 import os
 
@@ -36,6 +37,9 @@ def get_gql_details(event):
 
 
 def event_to_extras(event):
+    if isinstance(event, list):  # BatchInvoke
+        extras = event_to_extras(event[0]) if event else {}
+        return {**extras, 'batchSize': len(event)}
     client = get_client_details(event)
     gql = get_gql_details(event)
     return {'gql': gql, 'client': client}
@@ -44,6 +48,9 @@ def event_to_extras(event):
 @handler_logging(event_to_extras=event_to_extras)
 def dispatch(event, context):
     "Top-level dispatch of appsync event to the correct handler"
+    if isinstance(event, list):
+        return batch_dispatch(event, context)
+
     # it is a sin that python has no dictionary destructing asignment
     client = get_client_details(event)
     gql = get_gql_details(event)
@@ -74,3 +81,51 @@ def dispatch(event, context):
         return {'error': err.serialize()}
 
     return {'data': data}
+
+
+def batch_dispatch(events, context):
+    """
+    Dispatch of a list of appsync events, as sent by resolvers using the BatchInvoke operation,
+    to the batch handler of their field. Results are returned in the same order as the events.
+    """
+    if not events:
+        return []
+    client = get_client_details(events[0])
+    gqls = [get_gql_details(event) for event in events]
+
+    # appsync only batches resolutions of the same field
+    field = gqls[0]['field']
+    handler = routes.get_batch_handler(field)
+    if not handler:
+        # should not be able to get here
+        msg = f'No batch handler for field `{field}` found'
+        logger.exception(msg)
+        raise Exception(msg)
+
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Handling AppSync GQL batch resolution of `{field}` of size `{len(events)}`')
+
+    indexes_by_caller = collections.defaultdict(list)
+    for index, gql in enumerate(gqls):
+        indexes_by_caller[gql['callerUserId']].append(index)
+
+    results = [None] * len(events)
+    for caller_user_id, indexes in indexes_by_caller.items():
+        try:
+            datas = handler(
+                caller_user_id,
+                [gqls[index]['arguments'] for index in indexes],
+                sources=[gqls[index]['source'] for index in indexes],
+                context=context,
+                events=[events[index] for index in indexes],
+                client=client,
+            )
+        except ClientException as err:
+            logger.warning(str(err))
+            caller_results = [{'error': err.serialize()}] * len(indexes)
+        else:
+            caller_results = [{'data': data} for data in datas]
+        for index, result in zip(indexes, caller_results):
+            results[index] = result
+
+    return results
@@ -6,7 +6,7 @@ import pendulum
 from app import clients, models
 from app.mixins.flag.enums import FlagStatus
 from app.mixins.flag.exceptions import FlagException
-from app.mixins.view.enums import ViewType
+from app.mixins.view.enums import ViewedStatus, ViewType
 from app.models.album.exceptions import AlbumException
 from app.models.appstore.exceptions import AppStoreException
 from app.models.block.enums import BlockStatus
@@ -37,10 +37,12 @@ from .validation import (
     validate_location,
     validate_match_genders,
     validate_match_location_radius,
+    validate_view_count_days,
 )
 
 S3_UPLOADS_BUCKET = os.environ.get('S3_UPLOADS_BUCKET')
 S3_PLACEHOLDER_PHOTOS_BUCKET = os.environ.get('S3_PLACEHOLDER_PHOTOS_BUCKET')
+VIEWS_INGESTION_MODE = os.environ.get('VIEWS_INGESTION_MODE')
 
 logger = logging.getLogger()
 xray.patch_all()
@@ -62,6 +64,7 @@ clients = {
     'post_verification': clients.PostVerificationClient(secrets_manager_client.get_post_verification_api_creds),
     's3_uploads': clients.S3Client(S3_UPLOADS_BUCKET),
     's3_placeholder_photos': clients.S3Client(S3_PLACEHOLDER_PHOTOS_BUCKET),
+    'views_stream': clients.KinesisClient() if VIEWS_INGESTION_MODE == 'buffered' else None,
 }
 
 # shared hash table of all managers, enables inter-manager communication
@@ -80,6 +83,13 @@ screen_manager = managers.get('screen') or models.ScreenManager(clients, manager
 user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
 
+def viewed_status_since(view, since):
+    "Viewed if the view record has been viewed at or after `since`, both iso8601 strings in utc"
+    if view and view['lastViewedAt'] >= since:
+        return ViewedStatus.VIEWED
+    return ViewedStatus.NOT_VIEWED
+
+
 def validate_caller(*args, allowed_statuses=None):
     """
     Decorator that inits a caller_user model and verifies the caller has the correct status.
@@ -537,7 +547,7 @@ def report_screen_views(caller_user, arguments, **kwargs):
         raise ClientException('A max of 100 screens may be reported at a time')
 
     viewed_at = pendulum.now('utc')
-    screen_manager.record_views(screens, caller_user.id, viewed_at=viewed_at)
+    screen_manager.report_views(screens, caller_user.id, viewed_at=viewed_at)
     return True
 
 
@@ -594,6 +604,44 @@ def user_photo(caller_user_id, arguments, source=None, **kwargs):
     }
 
 
+@routes.register('User.chatsWithUnviewedMessagesCount')
+def user_chats_with_unviewed_messages_count(caller_user_id, arguments, source=None, **kwargs):
+    # private to user themselves. Only resolved here when using read watermarks, otherwise
+    # the count kept on the user item is returned directly by appsync
+    if caller_user_id != source['userId']:
+        return None
+    return chat_manager.get_chats_with_unviewed_messages_count(caller_user_id)
+
+
+@routes.register('User.postViewedByCountApprox')
+def user_post_viewed_by_count_approx(caller_user_id, arguments, source=None, **kwargs):
+    # same visibility as User.postViewedByCount
+    if caller_user_id != source['userId'] or source.get('viewCountsHidden'):
+        return None
+    days = arguments.get('days')
+    if days is not None:
+        validate_view_count_days(days)
+    return user_manager.get_post_viewed_by_count_approx(source['userId'], days=days)
+
+
+@routes.register('User.followedUsersWithStories')
+def user_followed_users_with_stories(caller_user_id, arguments, source=None, **kwargs):
+    # private to user themselves. Only resolved here when pulling followed stories, otherwise
+    # appsync queries the caller's firstStory items directly
+    if caller_user_id != source['userId']:
+        return None
+    limit = arguments.get('limit')
+    limit = 20 if limit is None else limit
+    if limit < 1 or limit > 100:
+        raise ClientException('Limit cannot be less than 1 or greater than 100')
+    try:
+        return follower_manager.get_followed_users_with_stories(
+            caller_user_id, limit=limit, next_token=arguments.get('nextToken')
+        )
+    except ValueError as err:
+        raise ClientException('Invalid nextToken') from err
+
+
 @routes.register('Mutation.followUser')
 @validate_caller
 @update_last_client
@@ -828,6 +876,35 @@ def post_image_upload_url(caller_user_id, arguments, source=None, **kwargs):
     return post.get_image_writeonly_url()
 
 
+@routes.register('Post.viewedByCountApprox')
+def post_viewed_by_count_approx(caller_user_id, arguments, source=None, **kwargs):
+    # same visibility as Post.viewedByCount
+    if caller_user_id != source['postedByUserId']:
+        return None
+    user = user_manager.get_user(caller_user_id)
+    if not user or user.item.get('viewCountsHidden'):
+        return None
+    days = arguments.get('days')
+    if days is not None:
+        validate_view_count_days(days)
+    return post_manager.get_viewed_by_count_approx(source['postId'], days=days)
+
+
+@routes.register_batch('Post.viewedStatus')
+def post_viewed_status(caller_user_id, arguments_list, sources=None, **kwargs):
+    # author has always viewed the post, and all posts by the REAL user are considered viewed
+    viewed_user_ids = (caller_user_id, user_manager.real_user_id)
+    post_ids = [
+        source['postId']
+        for source in sources
+        if not source.get('viewedStatus') and source['postedByUserId'] not in viewed_user_ids
+    ]
+    statuses = post_manager.get_viewed_statuses(post_ids, caller_user_id)
+    return [
+        source.get('viewedStatus') or statuses.get(source['postId'], ViewedStatus.VIEWED) for source in sources
+    ]
+
+
 @routes.register('Post.video')
 def post_video(caller_user_id, arguments, source=None, **kwargs):
     post = post_manager.get_post(source['postId'])
@@ -1124,7 +1201,7 @@ def report_post_views(caller_user, arguments, **kwargs):
         raise ClientException('A max of 100 post ids may be reported at a time')
 
     viewed_at = pendulum.now('utc')
-    post_manager.record_views(post_ids, caller_user.id, viewed_at=viewed_at, view_type=view_type)
+    post_manager.report_views(post_ids, caller_user.id, viewed_at=viewed_at, view_type=view_type)
     return True
 
 
@@ -1185,6 +1262,19 @@ def flag_comment(caller_user, arguments, **kwargs):
     return resp
 
 
+@routes.register_batch('Comment.viewedStatus')
+def comment_viewed_status(caller_user_id, arguments_list, sources=None, **kwargs):
+    # Comment.viewedStatus is post-wide: viewed if the post was viewed since the comment was added
+    post_ids = {source['postId'] for source in sources if source['userId'] != caller_user_id}
+    views = post_manager.get_views(post_ids, caller_user_id)
+    return [
+        source.get('viewedStatus')
+        or (ViewedStatus.VIEWED if source['userId'] == caller_user_id else None)
+        or viewed_status_since(views.get(source['postId']), source['commentedAt'])
+        for source in sources
+    ]
+
+
 @routes.register('Mutation.deleteCard')
 @validate_caller(allowed_statuses=(UserStatus.ACTIVE, UserStatus.ANONYMOUS))
 @update_last_client
@@ -1413,7 +1503,7 @@ def report_chat_views(caller_user, arguments, **kwargs):
         raise ClientException('A max of 100 chat ids may be reported at a time')
 
     viewed_at = pendulum.now('utc')
-    chat_manager.record_views(chat_ids, caller_user.id, viewed_at=viewed_at)
+    chat_manager.report_views(chat_ids, caller_user.id, viewed_at=viewed_at)
     return True
 
 
@@ -1519,6 +1609,34 @@ def flag_chat_message(caller_user, arguments, **kwargs):
     return resp
 
 
+@routes.register('Chat.messages')
+def chat_messages(caller_user_id, arguments, source=None, **kwargs):
+    limit = arguments.get('limit')
+    limit = 20 if limit is None else limit
+    if limit < 1 or limit > 100:
+        raise ClientException('Limit cannot be less than 1 or greater than 100')
+    return chat_message_manager.get_chat_messages_page(
+        source['chatId'],
+        caller_user_id,
+        limit=limit,
+        next_token=arguments.get('nextToken'),
+        reverse=bool(arguments.get('reverse')),
+    )
+
+
+@routes.register_batch('ChatMessage.viewedStatus')
+def chat_message_viewed_status(caller_user_id, arguments_list, sources=None, **kwargs):
+    # ChatMessage.viewedStatus is chat-wide: viewed if the chat was viewed since the message was added
+    chat_ids = {source['chatId'] for source in sources if source.get('userId') != caller_user_id}
+    views = chat_manager.get_views(chat_ids, caller_user_id)
+    return [
+        source.get('viewedStatus')
+        or (ViewedStatus.VIEWED if source.get('userId') == caller_user_id else None)
+        or viewed_status_since(views.get(source['chatId']), source['createdAt'])
+        for source in sources
+    ]
+
+
 @routes.register('Mutation.verifyIdentity')
 @validate_caller
 @update_last_client
@@ -4,9 +4,13 @@ import importlib
 # graphql field -> python handler
 cache = {}
 
+# graphql field -> python handler of a list of resolutions, for BatchInvoke resolvers
+batch_cache = {}
+
 
 def clear():
     cache.clear()
+    batch_cache.clear()
 
 
 def register(field):
@@ -19,12 +23,26 @@ def register(field):
     return inner
 
 
+def register_batch(field):
+    "Decorator to register a handler for a batch of resolutions of an appsync graphql field"
+
+    def inner(func):
+        batch_cache[field] = func
+        return func
+
+    return inner
+
+
 def get_handler(field):
     return cache.get(field)
 
 
+def get_batch_handler(field):
+    return batch_cache.get(field)
+
+
 def discover(path):
-    cache.clear()
+    clear()
     # registers handlers in the routing table as a side effect of importing
     # add more imports here as handlers are spread across files
     importlib.import_module(path)
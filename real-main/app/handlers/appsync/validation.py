@@ -63,3 +63,9 @@ def validate_height_range(match_height_range):
     if minHeight > maxHeight or minHeight < 0 or maxHeight > 117:
         raise ClientException('Invalid matchHeightRange')
     return True
+
+
+def validate_view_count_days(days):
+    if days < 1 or days > 30:
+        raise ClientException('days should be in [1, 30]')
+    return True
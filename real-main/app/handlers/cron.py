@@ -1,5 +1,6 @@
 import logging
 import os
+import time
 
 import pendulum
 
@@ -31,6 +32,7 @@ album_manager = managers.get('album') or models.AlbumManager(clients, managers=m
 card_manager = managers.get('card') or models.CardManager(clients, managers=managers)
 post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
 user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+user_deletion_manager = managers.get('user_deletion') or models.UserDeletionManager(clients, managers=managers)
 comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
 chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(clients, managers=managers)
 
@@ -98,9 +100,28 @@ def send_user_notifications(event, context):
     with LogLevelContext(logger, logging.INFO):
         logger.info(f'Preparing to send notifications as needed to users: {only_usernames or "all"}')
     now = pendulum.now('utc')
+    start = time.perf_counter()
     total_cnt, success_cnt = card_manager.notify_users(now=now, only_usernames=only_usernames)
+    elapsed = time.perf_counter() - start
     with LogLevelContext(logger, logging.INFO):
-        logger.info(f'User notifications sent successfully: {success_cnt} out of {total_cnt}')
+        logger.info(
+            f'User notifications sent successfully: {success_cnt} out of {total_cnt}, '
+            f'in {elapsed:.1f}s at {total_cnt / elapsed if elapsed else 0:.1f} sends/sec'
+        )
+
+
+@handler_logging
+def flush_pending_card_titles(event, context):
+    total_cnt, flushed_cnt = card_manager.flush_pending_titles()
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Pending card titles flushed: {flushed_cnt} out of {total_cnt}')
+
+
+@handler_logging
+def resume_stalled_user_deletions(event, context):
+    cnt = user_deletion_manager.resume_stalled()
+    with LogLevelContext(logger, logging.INFO):
+        logger.info(f'Stalled user deletions resumed: {cnt}')
 
 
 @handler_logging
@@ -12,6 +12,7 @@ class DynamoDispatch:
 
     def __init__(self):
         self.listeners = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.batch_listeners = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
 
     def register(self, pk_prefix, sk_prefix, event_names, handler, attributes=None):
         """
@@ -26,6 +27,18 @@ class DynamoDispatch:
                 {'handler': handler, 'attributes': attributes}
             )
 
+    def register_batch(self, pk_prefix, sk_prefix, event_names, handler):
+        """
+        Register a handler to be called once per batch of stream records, rather than once per record.
+        It is passed a list of the (item_id, item_kwargs) its matching records would have been called with.
+        """
+        for event_name in event_names:
+            self.batch_listeners[pk_prefix][sk_prefix][event_name].append(handler)
+
+    def search_batch(self, pk_prefix, sk_prefix, event_name):
+        "Returns a list of matching batch listener functions"
+        return list(self.batch_listeners[pk_prefix][sk_prefix][event_name])
+
     def search(self, pk_prefix, sk_prefix, event_name, old_item, new_item):
         "Returns a set of matching listener functions"
         matches = []
@@ -1,3 +1,4 @@
+import collections
 import logging
 import os
 
@@ -43,14 +44,17 @@ feed_manager = managers.get('feed') or models.FeedManager(clients, managers=mana
 follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
 like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
 post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+relationship_manager = managers.get('relationship') or models.RelationshipManager(clients, managers=managers)
 screen_manager = managers.get('screen') or models.ScreenManager(clients, managers=managers)
 user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+user_deletion_manager = managers.get('user_deletion') or models.UserDeletionManager(clients, managers=managers)
 
 # https://stackoverflow.com/a/46738251
 deserialize = TypeDeserializer().deserialize
 
 dispatch = DynamoDispatch()
 register = dispatch.register
+register_batch = dispatch.register_batch
 
 register('album', '-', ['INSERT'], user_manager.on_album_add_update_album_count)
 register('album', '-', ['INSERT', 'MODIFY'], album_manager.on_album_add_edit_sync_delete_at)
@@ -72,9 +76,10 @@ register(
     {'status': None},
 )
 register('transaction', '-', ['INSERT'], user_manager.on_appstore_transaction_add)
+register('transaction', '-', ['INSERT'], appstore_manager.on_transaction_add_update_daily_totals)
 register('card', '-', ['INSERT'], card_manager.on_card_add)
 register('card', '-', ['INSERT'], user_manager.on_card_add_increment_count)
-register('card', '-', ['MODIFY'], card_manager.on_card_edit)
+register('card', '-', ['MODIFY'], card_manager.on_card_edit, {'title': None, 'subTitle': None, 'action': None})
 register('card', '-', ['REMOVE'], card_manager.on_card_delete)
 register('card', '-', ['REMOVE'], user_manager.on_card_delete_decrement_count)
 register('chat', '-', ['REMOVE'], chat_manager.on_chat_delete_delete_memberships)
@@ -84,6 +89,7 @@ register('chat', '-', ['REMOVE'], chat_message_manager.on_chat_delete_delete_mes
 register('chat', 'flag', ['INSERT'], chat_manager.on_flag_add)
 register('chat', 'flag', ['REMOVE'], chat_manager.on_flag_delete)
 register('chat', 'member', ['INSERT'], user_manager.on_chat_member_add_update_chat_count)
+register('chat', 'member', ['INSERT'], chat_manager.on_chat_member_add_init_read_sequence)
 register(
     'chat',
     'member',
@@ -171,6 +177,7 @@ register('post', '-', ['MODIFY'], user_manager.on_post_status_change_sync_counts
 register('post', '-', ['REMOVE'], card_manager.on_post_delete_delete_cards)
 register('post', '-', ['REMOVE'], post_manager.on_item_delete_delete_flags)
 register('post', '-', ['REMOVE'], post_manager.on_item_delete_delete_views)
+register('post', '-', ['REMOVE'], post_manager.on_post_delete_delete_viewer_sketches)
 register('post', '-', ['REMOVE'], post_manager.on_post_delete)
 register(
     'post',
@@ -183,7 +190,7 @@ register('post', '-', ['INSERT', 'MODIFY'], post_manager.sync_elasticsearch, {'k
 register('post', 'flag', ['INSERT'], post_manager.on_flag_add)
 register('post', 'flag', ['REMOVE'], post_manager.on_flag_delete)
 register('post', 'like', ['INSERT'], post_manager.on_like_add)
-register('post', 'like', ['REMOVE'], post_manager.on_like_delete)
+register_batch('post', 'like', ['REMOVE'], post_manager.on_likes_delete)
 register(
     'post',
     'view',
@@ -200,8 +207,20 @@ register(
 )
 register('post', 'view', ['INSERT', 'REMOVE'], post_manager.on_post_view_add_delete_sync_viewed_by_counts)
 register('post', 'view', ['INSERT', 'MODIFY'], post_manager.on_post_view_change_update_trending)
+register(
+    'post',
+    'view',
+    ['INSERT', 'MODIFY', 'REMOVE'],
+    post_manager.on_post_view_change_update_daily_totals,
+    {'viewCount': 0, 'royaltyFee': 0},
+)
 register('post', 'view', ['INSERT'], post_manager.on_post_view_calculate_royalty_fee)
+register('user', 'acceptedFollowers', ['INSERT'], feed_manager.on_followers_accepted_sync_feeds)
+register('user', 'acceptedFollowers', ['INSERT'], follower_manager.on_followers_accepted_sync_first_story)
+register('user', 'acceptedFollowers', ['INSERT'], user_manager.on_followers_accepted_sync_followed_counts)
+register('user', 'acceptedFollowers', ['INSERT'], follower_manager.on_followers_accepted_delete)
 register('user', 'blocker', ['INSERT'], block_manager.on_user_blocked_sync_user_status)
+register('user', 'blocker', ['INSERT', 'REMOVE'], relationship_manager.on_user_relationship_change_invalidate)
 register(
     'user',
     'follower',
@@ -223,6 +242,13 @@ register(
     follower_manager.on_user_follow_status_change_sync_first_story,
     {'followStatus': FollowStatus.NOT_FOLLOWING},
 )
+register(
+    'user',
+    'follower',
+    ['INSERT', 'MODIFY', 'REMOVE'],
+    relationship_manager.on_user_relationship_change_invalidate,
+    {'followStatus': FollowStatus.NOT_FOLLOWING},
+)
 register(
     'user',
     'follower',
@@ -355,29 +381,14 @@ register(
     {'idAnalyzerResult': None},
 )
 register('user', 'profile', ['INSERT', 'MODIFY'], user_manager.on_user_change_log_amplitude_event)
-register('user', 'profile', ['REMOVE'], album_manager.on_user_delete_delete_all_by_user)
-register('user', 'profile', ['REMOVE'], appstore_manager.on_user_delete_delete_all_by_user)
-register('user', 'profile', ['REMOVE'], block_manager.on_user_delete_unblock_all_blocks)
-register('user', 'profile', ['REMOVE'], card_manager.on_user_delete_delete_cards)
-register('user', 'profile', ['REMOVE'], chat_manager.on_user_delete_delete_flags)
-register('user', 'profile', ['REMOVE'], chat_manager.on_user_delete_delete_views)
-register('user', 'profile', ['REMOVE'], chat_manager.on_user_delete_leave_all_chats)
-register('user', 'profile', ['REMOVE'], chat_message_manager.on_user_delete_delete_flags)
-register('user', 'profile', ['REMOVE'], comment_manager.on_user_delete_delete_all_by_user)
-register('user', 'profile', ['REMOVE'], comment_manager.on_user_delete_delete_flags)
-register('user', 'profile', ['REMOVE'], follower_manager.on_user_delete_delete_follower_items)
-register('user', 'profile', ['REMOVE'], like_manager.on_user_delete_dislike_all_by_user)
-register('user', 'profile', ['REMOVE'], post_manager.on_user_delete_delete_all_by_user)
-register('user', 'profile', ['REMOVE'], post_manager.on_user_delete_delete_flags)
-register('user', 'profile', ['REMOVE'], post_manager.on_user_delete_delete_views)
-register('user', 'profile', ['REMOVE'], screen_manager.on_user_delete_delete_views)
-register('user', 'profile', ['REMOVE'], user_manager.on_user_delete)
-register('user', 'profile', ['REMOVE'], user_manager.on_user_delete_delete_cognito)
+register('user', 'profile', ['REMOVE'], user_deletion_manager.on_user_delete_start_deletion)
+register('user', 'deletion', ['INSERT', 'MODIFY'], user_deletion_manager.on_deletion_change_run_chunk)
 register('screen', 'view', ['INSERT', 'MODIFY'], screen_manager.on_view_log_amplitude_event)
 
 
 @handler_logging
 def process_records(event, context):
+    batch_calls = collections.defaultdict(list)
     for record in event['Records']:
 
         name = record['eventName']
@@ -400,3 +411,13 @@ def process_records(event, context):
                 func(item_id, **item_kwargs)
             except Exception as err:
                 logger.exception(str(err))
+        for func in dispatch.search_batch(pk_prefix, sk_prefix, name):
+            batch_calls[func].append((item_id, item_kwargs))
+
+    for func, calls in batch_calls.items():
+        with LogLevelContext(logger, logging.INFO):
+            logger.info(f'Running on `{len(calls)}` records: {func}')
+        try:
+            func(calls)
+        except Exception as err:
+            logger.exception(str(err))
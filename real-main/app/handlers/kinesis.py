@@ -0,0 +1,47 @@
+import base64
+import collections
+import json
+import logging
+
+from app import clients, models
+from app.handlers import xray
+from app.logging import LogLevelContext, handler_logging
+from app.mixins.view.exceptions import ViewEventsNotRecorded
+
+logger = logging.getLogger()
+xray.patch_all()
+
+clients = {
+    'dynamo': clients.DynamoClient(),
+}
+
+managers = {}
+chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
+post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+screen_manager = managers.get('screen') or models.ScreenManager(clients, managers=managers)
+user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+
+
+@handler_logging
+def process_view_records(event, context):
+    "Consume a window of view events appended to the views stream by the appsync handlers"
+    events_by_item_type = collections.defaultdict(list)
+    for record in event['Records']:
+        view_event = json.loads(base64.b64decode(record['kinesis']['data']))
+        # identifies the record across retries of the window
+        view_event['eventId'] = record['eventID']
+        events_by_item_type[view_event['itemType']].append(view_event)
+
+    errors = []
+    for item_type, view_events in events_by_item_type.items():
+        with LogLevelContext(logger, logging.INFO):
+            logger.info(f'Recording `{len(view_events)}` `{item_type}` view events')
+        try:
+            managers[item_type].record_view_events(view_events)
+        except ViewEventsNotRecorded as err:
+            errors.append(err)
+
+    # failing the invocation makes the stream retry the window rather than drop the views,
+    # the events already recorded being skipped on retry
+    if errors:
+        raise errors[0]
@@ -41,7 +41,7 @@ def image_post_uploaded(event, context):
     with LogLevelContext(logger, logging.INFO):
         logger.info('Handling S3 Object Created (image post uploaded) event')
 
-    # Avoid firing on creation of other images (profile photo, album art)
+    # Avoid firing on creation of other images (profile photo, album art, shared image blobs)
     # Once images are moved to their new path at {userId}/post/{postId}/image/{size}.jpg,
     # the s3 object created event suffix filter should be expaneded to '/image/native.jpg'
     # and this check removed (currently set to '/native.jpg').
@@ -6,18 +6,24 @@ logger = logging.getLogger()
 
 
 class FlagModelMixin:
-    def __init__(self, flag_dynamo=None, **kwargs):
+    def __init__(self, flag_dynamo=None, relationship_manager=None, **kwargs):
         super().__init__(**kwargs)
         if flag_dynamo:
             self.flag_dynamo = flag_dynamo
+        if relationship_manager:
+            self.relationship_manager = relationship_manager
+
+    def flag(self, user, relationship_memo=None):
+        relationship = self.relationship_manager.get_relationship(
+            user.id, self.user_id, memo=relationship_memo, use_cache=False
+        )
 
-    def flag(self, user):
         # can't flag a model of a user that has blocked us
-        if self.block_manager.is_blocked(self.user_id, user.id):
+        if relationship.blocked:
             raise FlagException(f'User has been blocked by owner of {self.item_type} `{self.id}`')
 
         # can't flag a model of a user we have blocked
-        if self.block_manager.is_blocked(user.id, self.user_id):
+        if relationship.blocking:
             raise FlagException(f'User has blocked owner of {self.item_type} `{self.id}`')
 
         # cant flag our own model
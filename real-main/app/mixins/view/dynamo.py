@@ -10,6 +10,9 @@ logger = logging.getLogger()
 
 
 class ViewDynamo:
+    # outlasts the views stream's 24 hour retention, past which no record can be retried
+    recorded_event_lifetime = pendulum.duration(days=2)
+
     def __init__(self, item_type, dynamo_client):
         self.item_type = item_type
         self.client = dynamo_client
@@ -23,6 +26,16 @@ class ViewDynamo:
     def get_view(self, item_id, user_id, strongly_consistent=False):
         return self.client.get_item(self.key(item_id, user_id), ConsistentRead=strongly_consistent)
 
+    def get_views(self, item_ids, user_id):
+        """
+        Get the user's views of many items at once, with as few batch gets as possible.
+        Returns a dict of item_id to view. Items the user has not viewed are left out.
+        """
+        keys = [self.key(item_id, user_id) for item_id in item_ids]
+        return {
+            view['partitionKey'].split('/', 1)[1]: view for view in self.client.generate_batch_get_items(keys)
+        }
+
     def generate_keys_by_item(self, item_id):
         query_kwargs = {
             'KeyConditionExpression': 'partitionKey = :pk AND begins_with(sortKey, :sk_prefix)',
@@ -102,6 +115,63 @@ class ViewDynamo:
         except self.client.exceptions.ConditionalCheckFailedException as err:
             raise exceptions.ViewDoesNotExist(self.item_type, item_id, user_id) from err
 
+    def upsert_view(self, item_id, user_id, view_count, viewed_at, view_type=None):
+        """
+        Add the view or record more views on the existing one, in a single write with no read first.
+        Returns the view's lastViewedAt from before the write, or None if this was the user's first view
+        of the item. Safe to call concurrently.
+        """
+        viewed_at_str = viewed_at.to_iso8601_string()
+        counters = ['viewCount']
+        if view_type == ViewType.THUMBNAIL:
+            counters.append('thumbnailViewCount')
+        if view_type == ViewType.FOCUS:
+            counters.append('focusViewCount')
+        sets = [
+            'gsiA1PartitionKey = if_not_exists(gsiA1PartitionKey, :ga1pk)',
+            'gsiA1SortKey = if_not_exists(gsiA1SortKey, :va)',
+            'gsiA2PartitionKey = if_not_exists(gsiA2PartitionKey, :ga2pk)',
+            'gsiA2SortKey = if_not_exists(gsiA2SortKey, :va)',
+            'schemaVersion = if_not_exists(schemaVersion, :sv)',
+            'firstViewedAt = if_not_exists(firstViewedAt, :va)',
+            'lastViewedAt = :va',
+        ]
+        query_kwargs = {
+            'Key': self.key(item_id, user_id),
+            'UpdateExpression': 'ADD ' + ', '.join(f'{c} :vc' for c in counters) + ' SET ' + ', '.join(sets),
+            'ExpressionAttributeValues': {
+                ':ga1pk': f'{self.item_type}View/{item_id}',
+                ':ga2pk': f'{self.item_type}View/{user_id}',
+                ':sv': 0,
+                ':va': viewed_at_str,
+                ':vc': view_count,
+            },
+        }
+        # nothing to return as old values means the view was just created
+        old_item = self.client.upsert_item(query_kwargs)
+        if not old_item:
+            return None
+        # an attribute set to the value it already had may be left out of the old values
+        return old_item.get('lastViewedAt', viewed_at_str)
+
+    def recorded_event_key(self, event_id):
+        return {'partitionKey': f'{self.item_type}ViewEvent/{event_id}', 'sortKey': '-'}
+
+    def get_recorded_event_ids(self, event_ids):
+        "Of the given views stream event ids, those that add_recorded_event_ids() has been called with"
+        keys = [self.recorded_event_key(event_id) for event_id in event_ids]
+        items = self.client.generate_batch_get_items(keys, projection_expression='partitionKey')
+        return {item['partitionKey'].split('/', 1)[1] for item in items}
+
+    def add_recorded_event_ids(self, event_ids, now=None):
+        "Mark views stream events as recorded, the marks expiring through dynamo's TTL"
+        now = now or pendulum.now('utc')
+        expires_at_epoch = int((now + self.recorded_event_lifetime).timestamp())
+        self.client.batch_put_items(
+            {**self.recorded_event_key(event_id), 'schemaVersion': 0, 'expiresAtEpoch': expires_at_epoch}
+            for event_id in event_ids
+        )
+
     def set_royalty_fee(self, item_id, user_id, royalty_fee):
         assert isinstance(royalty_fee, Decimal), 'royalty_fee should be Decimal type'
         query_kwargs = {
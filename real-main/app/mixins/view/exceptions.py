@@ -20,3 +20,12 @@ class ViewDoesNotExist(ViewException):
 
     def __str__(self):
         return f'View for `{self.item_type}: {self.item_id}` by user `{self.user_id}` does not exist'
+
+
+class ViewEventsNotRecorded(ViewException):
+    def __init__(self, item_type, user_ids):
+        self.item_type = item_type
+        self.user_ids = user_ids
+
+    def __str__(self):
+        return f'Failed to record `{self.item_type}` view events for `{len(self.user_ids)}` users'
@@ -1,6 +1,14 @@
+import collections
 import logging
 
+import pendulum
+
+from app.clients.kinesis import PutRecordsFailed
+from app.utils import map_concurrently
+
+from . import exceptions
 from .dynamo import ViewDynamo
+from .enums import ViewedStatus
 
 logger = logging.getLogger()
 
@@ -10,10 +18,106 @@ class ViewManagerMixin:
         super().__init__(clients, managers=managers)
         if 'dynamo' in clients:
             self.view_dynamo = ViewDynamo(self.item_type, clients['dynamo'])
+        self.views_stream = clients.get('views_stream')
 
     def record_views(self, item_ids, user_id, viewed_at=None):
         raise NotImplementedError  # subclasses must implement
 
+    def get_views(self, item_ids, user_id):
+        return self.view_dynamo.get_views(item_ids, user_id)
+
+    def get_viewed_statuses(self, item_ids, user_id):
+        """
+        ViewedStatus of many items at once, based only on view records, as a dict of item_id to status.
+        See ViewModelMixin.get_viewed_status() for the single-item version.
+        """
+        views = self.get_views(item_ids, user_id)
+        return {
+            item_id: ViewedStatus.VIEWED if item_id in views else ViewedStatus.NOT_VIEWED for item_id in item_ids
+        }
+
+    def report_views(self, item_ids, user_id, viewed_at=None, **kwargs):
+        """
+        Record views, unless a views stream is configured. In that case the views are just appended
+        to the stream, to be recorded in bulk later by record_view_events(), falling back to
+        recording them right away if the stream won't take them.
+        """
+        viewed_at = viewed_at or pendulum.now('utc')
+        if not self.views_stream:
+            return self.record_views(item_ids, user_id, viewed_at=viewed_at, **kwargs)
+        event = {
+            'itemType': self.item_type,
+            'itemIds': list(item_ids),
+            'userId': user_id,
+            'viewedAt': viewed_at.to_iso8601_string(),
+        }
+        event_kwargs = {k: v for k, v in kwargs.items() if v is not None}
+        if event_kwargs:
+            event['kwargs'] = event_kwargs
+        try:
+            self.views_stream.put_records([(user_id, event)])
+        except PutRecordsFailed as err:
+            logger.warning(f'{err}, recording `{self.item_type}` views for user `{user_id}` directly')
+            self.record_views(item_ids, user_id, viewed_at=viewed_at, **kwargs)
+
+    def record_view_events(self, events):
+        """
+        Record a window of events appended by report_views(), aggregating view counts per
+        (item, user) so each is written once. Each user's views are recorded as of the earliest
+        event in the window, keeping firstViewedAt accurate at the cost of lastViewedAt lagging
+        by at most the window length.
+
+        A failure for one user doesn't stop the others from being recorded, but is raised once they
+        have been, so the stream retries the window. Events carrying the `eventId` of their stream
+        record are marked once recorded and skipped on retries, so the users that went through
+        aren't counted twice.
+        """
+        event_ids = [event['eventId'] for event in events if 'eventId' in event]
+        recorded_event_ids = self.view_dynamo.get_recorded_event_ids(event_ids) if event_ids else set()
+
+        grouped = collections.defaultdict(
+            lambda: {'counts': collections.Counter(), 'viewed_at': None, 'event_ids': []}
+        )
+        for event in events:
+            if event.get('eventId') in recorded_event_ids:
+                continue
+            kwargs = tuple(sorted(event.get('kwargs', {}).items()))
+            group = grouped[(event['userId'], kwargs)]
+            group['counts'].update(event['itemIds'])
+            if 'eventId' in event:
+                group['event_ids'].append(event['eventId'])
+            viewed_at = pendulum.parse(event['viewedAt'])
+            if group['viewed_at'] is None or viewed_at < group['viewed_at']:
+                group['viewed_at'] = viewed_at
+
+        failed_user_ids = []
+        for (user_id, kwargs), group in grouped.items():
+            item_ids = list(group['counts'].elements())
+            try:
+                self.record_views(item_ids, user_id, viewed_at=group['viewed_at'], **dict(kwargs))
+            except Exception as err:
+                logger.exception(f'Failed to record `{self.item_type}` views for user `{user_id}`: {err}')
+                failed_user_ids.append(user_id)
+                continue
+            if group['event_ids']:
+                self.view_dynamo.add_recorded_event_ids(group['event_ids'])
+        if failed_user_ids:
+            raise exceptions.ViewEventsNotRecorded(self.item_type, failed_user_ids)
+
+    def record_view_counts(self, view_counts, user_id, viewed_at=None, view_type=None):
+        """
+        Record views by one user on many items, `view_counts` mapping item id to view count.
+        The writes are issued concurrently. Returns a dict of item id to the user's previous
+        lastViewedAt of the item, None for items the user viewed for the first time.
+        """
+        viewed_at = viewed_at or pendulum.now('utc')
+        view_counts = list(view_counts.items())
+        last_viewed_ats = map_concurrently(
+            lambda vc: self.view_dynamo.upsert_view(vc[0], user_id, vc[1], viewed_at, view_type=view_type),
+            view_counts,
+        )
+        return {item_id: last_viewed_at for (item_id, _), last_viewed_at in zip(view_counts, last_viewed_ats)}
+
     def on_item_delete_delete_views(self, item_id, old_item):
         key_gen = self.view_dynamo.generate_keys_by_item(item_id)
         self.view_dynamo.client.batch_delete_items(key_gen)
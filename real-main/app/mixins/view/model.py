@@ -3,7 +3,6 @@ import logging
 import pendulum
 
 from .enums import ViewedStatus
-from .exceptions import ViewAlreadyExists
 
 logger = logging.getLogger()
 
@@ -33,19 +32,6 @@ class ViewModelMixin:
             return ViewedStatus.NOT_VIEWED
 
     def record_view_count(self, user_id, view_count, viewed_at=None, view_type=None):
+        "Returns True if this was the user's first view of this item"
         viewed_at = viewed_at or pendulum.now('utc')
-        is_first_view_for_user = False
-        view_item = self.view_dynamo.get_view(self.id, user_id)
-        if view_item:
-            self.view_dynamo.increment_view_count(self.id, user_id, view_count, viewed_at, view_type=view_type)
-        else:
-            try:
-                self.view_dynamo.add_view(self.id, user_id, view_count, viewed_at, view_type=view_type)
-            except ViewAlreadyExists:
-                # we lost a race condition to add the view, so still need to record our data
-                self.view_dynamo.increment_view_count(
-                    self.id, user_id, view_count, viewed_at, view_type=view_type
-                )
-            else:
-                is_first_view_for_user = True
-        return is_first_view_for_user
+        return self.view_dynamo.upsert_view(self.id, user_id, view_count, viewed_at, view_type=view_type) is None
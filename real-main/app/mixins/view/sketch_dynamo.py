@@ -0,0 +1,70 @@
+import re
+
+import pendulum
+
+from app.utils import HyperLogLog
+
+
+class ViewerSketchDynamo:
+    """
+    HyperLogLog sketches of the distinct users that have viewed something, one over all
+    time and one per day. Each register is stored as its own attribute so that adding to a
+    sketch is a blind conditional write on a single attribute. The daily sketches expire
+    through dynamo's TTL once past the longest window they are read over.
+    """
+
+    register_attribute_re = re.compile(r'^r(\d+)$')
+    # the longest window read is 30 days, today included, and a day of slack
+    daily_sketch_lifetime = pendulum.duration(days=31)
+
+    def __init__(self, item_type, dynamo_client, sort_key_prefix='viewerSketch'):
+        self.item_type = item_type
+        self.client = dynamo_client
+        self.sort_key_prefix = sort_key_prefix
+
+    def key(self, item_id, date=None):
+        sort_key = self.sort_key_prefix if date is None else f'{self.sort_key_prefix}/{date.to_date_string()}'
+        return {'partitionKey': f'{self.item_type}/{item_id}', 'sortKey': sort_key}
+
+    def add_register(self, item_id, index, rank, date=None):
+        "Raise a register of the sketch to `rank`. Safe to call concurrently"
+        other_attributes = None
+        if date is not None:
+            expires_at = pendulum.datetime(date.year, date.month, date.day) + self.daily_sketch_lifetime
+            other_attributes = {'expiresAtEpoch': int(expires_at.timestamp())}
+        return self.client.set_if_greater(
+            self.key(item_id, date=date), f'r{index}', rank, other_attributes=other_attributes
+        )
+
+    def init_sketch(self, item):
+        registers = {}
+        for name, rank in (item or {}).items():
+            match = self.register_attribute_re.match(name)
+            if match:
+                registers[int(match.group(1))] = int(rank)
+        return HyperLogLog(registers)
+
+    def get_sketch(self, item_id, days=None, now=None):
+        """
+        Get the sketch of all viewers, or if `days` is given, the sketch of the viewers over
+        that many days up to and including today merged from the per-day sketches.
+        """
+        if days is None:
+            return self.init_sketch(self.client.get_item(self.key(item_id)))
+        today = (now or pendulum.now('utc')).date()
+        keys = [self.key(item_id, date=today.subtract(days=i)) for i in range(days)]
+        sketch = HyperLogLog()
+        for item in self.client.generate_batch_get_items(keys):
+            sketch.merge(self.init_sketch(item))
+        return sketch
+
+    def generate_keys(self, item_id):
+        query_kwargs = {
+            'KeyConditionExpression': 'partitionKey = :pk AND begins_with(sortKey, :sk_prefix)',
+            'ExpressionAttributeValues': {
+                ':pk': f'{self.item_type}/{item_id}',
+                ':sk_prefix': self.sort_key_prefix,
+            },
+            'ProjectionExpression': 'partitionKey, sortKey',
+        }
+        return self.client.generate_all_query(query_kwargs)
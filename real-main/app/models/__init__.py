@@ -10,7 +10,9 @@ __all__ = [
     'FollowerManager',
     'LikeManager',
     'PostManager',
+    'RelationshipManager',
     'ScreenManager',
+    'UserDeletionManager',
     'UserManager',
 ]
 
@@ -25,5 +27,7 @@ from .feed.manager import FeedManager
 from .follower.manager import FollowerManager
 from .like.manager import LikeManager
 from .post.manager import PostManager
+from .relationship.manager import RelationshipManager
 from .screen.manager import ScreenManager
 from .user.manager import UserManager
+from .user_deletion.manager import UserDeletionManager
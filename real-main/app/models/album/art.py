@@ -2,6 +2,8 @@ import math
 
 import PIL.Image
 
+OUTPUT_WIDTH, OUTPUT_HEIGHT = 3840, 2160
+
 
 def generate_basic_grid(pil_images):
     """
@@ -40,41 +42,61 @@ def generate_zoomed_grid(pil_images):
     """
     assert len(pil_images) in (4, 9, 16), f'Unexpected number of inputs: `{len(pil_images)}`'
 
-    output_width, output_height = 3840, 2160
     stride = int(math.sqrt(len(pil_images)))
-    cell_width, cell_height = output_width // stride, output_height // stride
-
-    # collect and resize (zoom in or out as needed so each image fills its cell)
-    images = []
-    for image in pil_images:
-        image_width, image_height = image.size
-
-        # comparing aspect ratios without rounding errors
-        if image_width * cell_height > image_height * cell_width:
-            # image is wider than cell
-            new_image_width = image_height * cell_width / cell_height
-            margin = (image_width - new_image_width) / 2
-            box = (margin, 0, image_width - margin, image_height)
-        elif image_width * cell_height < image_height * cell_width:
-            # image is taller than cell
-            new_image_height = image_width * cell_height / cell_width
-            margin = (image_height - new_image_height) / 2
-            box = (0, margin, image_width, image_height - margin)
-        else:
-            # aspect ratios equal
-            box = None
-
-        if image_width != cell_width or image_height != cell_height:
-            image = image.resize((cell_width, cell_height), box=box, resample=PIL.Image.LANCZOS)
-
-        images.append(image)
+    cell_width, cell_height = OUTPUT_WIDTH // stride, OUTPUT_HEIGHT // stride
 
     # paste those thumbs together as a grid
-    # Min size will be 4k since max_width and max_height come from 1080p thumbs
-    target_image = PIL.Image.new('RGB', (output_width, output_height))
-    for row in range(0, stride):
-        for column in range(0, stride):
-            image = images[row * stride + column]
-            loc = (column * cell_width, row * cell_height)
-            target_image.paste(image, loc)
+    target_image = PIL.Image.new('RGB', (OUTPUT_WIDTH, OUTPUT_HEIGHT))
+    for index, image in enumerate(pil_images):
+        target_image.paste(fit_to_cell(image, cell_width, cell_height), get_cell_box(index, stride))
+    return target_image
+
+
+def update_zoomed_grid(native_image, changed_pil_images, cnt):
+    """
+    Given a grid previously generated by generate_zoomed_grid() with `cnt` cells, and a dict
+    of cell index -> image for cells whose image has changed, return a new grid with just
+    those cells repainted. The input grid is not modified.
+    """
+    assert cnt in (4, 9, 16), f'Unexpected number of cells: `{cnt}`'
+    assert native_image.size == (OUTPUT_WIDTH, OUTPUT_HEIGHT), f'Unexpected grid size: `{native_image.size}`'
+    assert all(0 <= index < cnt for index in changed_pil_images), 'Cell index out of range'
+
+    stride = int(math.sqrt(cnt))
+    cell_width, cell_height = OUTPUT_WIDTH // stride, OUTPUT_HEIGHT // stride
+
+    target_image = native_image.convert('RGB')  # always a copy
+    for index, image in changed_pil_images.items():
+        target_image.paste(fit_to_cell(image, cell_width, cell_height), get_cell_box(index, stride))
     return target_image
+
+
+def get_cell_box(index, stride):
+    "The (left, upper, right, lower) box of the cell at `index` in a zoomed grid"
+    cell_width, cell_height = OUTPUT_WIDTH // stride, OUTPUT_HEIGHT // stride
+    row, column = divmod(index, stride)
+    return (column * cell_width, row * cell_height, (column + 1) * cell_width, (row + 1) * cell_height)
+
+
+def fit_to_cell(image, cell_width, cell_height):
+    "Zoom in or out and crop the image as needed so that it fills the cell perfectly"
+    image_width, image_height = image.size
+
+    # comparing aspect ratios without rounding errors
+    if image_width * cell_height > image_height * cell_width:
+        # image is wider than cell
+        new_image_width = image_height * cell_width / cell_height
+        margin = (image_width - new_image_width) / 2
+        box = (margin, 0, image_width - margin, image_height)
+    elif image_width * cell_height < image_height * cell_width:
+        # image is taller than cell
+        new_image_height = image_width * cell_height / cell_width
+        margin = (image_height - new_image_height) / 2
+        box = (0, margin, image_width, image_height - margin)
+    else:
+        # aspect ratios equal
+        box = None
+
+    if image_width != cell_width or image_height != cell_height:
+        image = image.resize((cell_width, cell_height), box=box, resample=PIL.Image.LANCZOS)
+    return image
@@ -75,7 +75,11 @@ class AlbumDynamo:
             update_query_kwargs['ExpressionAttributeValues'] = exp_values
         return self.client.update_item(update_query_kwargs)
 
-    def set_album_art_hash(self, album_id, art_hash):
+    def set_album_art_hash(self, album_id, art_hash, art_post_ids=None, art_blob_checksum=None):
+        """
+        `art_post_ids` records which post occupies which cell of the art, for incremental updates.
+        `art_blob_checksum` is the image blob the art is served from, if it isn't stored under the album.
+        """
         update_query_kwargs = {
             'Key': self.pk(album_id),
         }
@@ -83,8 +87,19 @@ class AlbumDynamo:
         if art_hash:
             update_query_kwargs['UpdateExpression'] = 'SET artHash = :ah'
             update_query_kwargs['ExpressionAttributeValues'] = {':ah': art_hash}
+            if art_post_ids:
+                update_query_kwargs['UpdateExpression'] += ', artPostIds = :apids'
+                update_query_kwargs['ExpressionAttributeValues'][':apids'] = art_post_ids
+            if art_blob_checksum:
+                update_query_kwargs['UpdateExpression'] += ', artBlobChecksum = :abc'
+                update_query_kwargs['ExpressionAttributeValues'][':abc'] = art_blob_checksum
+            removes = [
+                k for k, v in (('artPostIds', art_post_ids), ('artBlobChecksum', art_blob_checksum)) if not v
+            ]
+            if removes:
+                update_query_kwargs['UpdateExpression'] += ' REMOVE ' + ', '.join(removes)
         else:
-            update_query_kwargs['UpdateExpression'] = 'REMOVE artHash'
+            update_query_kwargs['UpdateExpression'] = 'REMOVE artHash, artPostIds, artBlobChecksum'
 
         return self.client.update_item(update_query_kwargs)
 
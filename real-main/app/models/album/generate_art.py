@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 
 import argparse
+import io
+import statistics
+import time
 
 import PIL.Image
 
 # relative imports don't work from scripts, so depending on 'art' to be globally unique
 # https://stackoverflow.com/a/16985066
-from art import generate_basic_grid, generate_zoomed_grid
+from art import generate_basic_grid, generate_zoomed_grid, update_zoomed_grid
 
 algorithims = {
     'basic': generate_basic_grid,
@@ -27,6 +30,14 @@ def parse_args():
         required=True,
         help='file to write output image to',
     )
+    parser.add_argument(
+        '-b',
+        dest='benchmark_rounds',
+        metavar='rounds',
+        type=int,
+        default=0,
+        help='time generation and jpeg encoding over this many rounds and report timings',
+    )
     parser.add_argument(
         'input_files',
         metavar='inputfile',
@@ -35,13 +46,59 @@ def parse_args():
         help='file to read input image from',
     )
     args = parser.parse_args()
-    return args.output_file, args.input_files, args.algorithim
+    return args.output_file, args.input_files, args.algorithim, args.benchmark_rounds
 
 
-def main():
-    output_file, input_files, algorithim_id = parse_args()
+def time_it(func, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(
+        f'{label:>16}: min {min(timings):8.1f}ms, median {statistics.median(timings):8.1f}ms, '
+        + f'max {max(timings):8.1f}ms over {len(timings)} rounds'
+    )
+
+
+def encode_jpeg(image):
+    image.save(io.BytesIO(), format='JPEG', quality=100)
+
+
+def encode_png(image):
+    image.save(io.BytesIO(), format='PNG', compress_level=1)
+
+
+def benchmark(algorithim_id, input_images, rounds):
+    # force decoding up front so it isn't counted against generation
+    for image in input_images:
+        image.load()
     algo = algorithims[algorithim_id]
-    output_image = algo([PIL.Image.open(fh) for fh in input_files])
+    output_image = algo(input_images)
+    report(f'{algorithim_id} generate', time_it(lambda: algo(input_images), rounds))
+    report('jpeg encode', time_it(lambda: encode_jpeg(output_image), rounds))
+    if algorithim_id == 'zoomed':
+        # lossless copy kept of album art grids, to repaint later
+        report('png encode', time_it(lambda: encode_png(output_image), rounds))
+        # repaint of a single cell, as done when one post in an album's art changes
+        changed = {len(input_images) - 1: input_images[0]}
+        report(
+            'zoomed update', time_it(lambda: update_zoomed_grid(output_image, changed, len(input_images)), rounds)
+        )
+    return output_image
+
+
+def main():
+    output_file, input_files, algorithim_id, benchmark_rounds = parse_args()
+    input_images = [PIL.Image.open(fh) for fh in input_files]
+    if benchmark_rounds:
+        output_image = benchmark(algorithim_id, input_images, benchmark_rounds)
+    else:
+        output_image = algorithims[algorithim_id](input_images)
     output_image.save(output_file, format='JPEG', quality=100)
 
 
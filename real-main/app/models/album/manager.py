@@ -57,6 +57,8 @@ class AlbumManager:
         album = self.init_album(old_item)
         prefix = album.get_art_image_path_prefix()
         album.s3_uploads_client.delete_objects_with_prefix(prefix)
+        if checksum := old_item.get('artBlobChecksum'):
+            self.post_manager.release_image_blob(checksum)
 
     def on_album_add_edit_sync_delete_at(self, album_id, new_item, old_item=None):
         new_count = new_item.get('postCount', 0)
@@ -1,7 +1,9 @@
+import concurrent.futures
 import hashlib
 import io
 import itertools
 import logging
+import math
 import os
 
 import PIL.Image
@@ -90,6 +92,9 @@ class Album:
         art_hash = art_hash or self.item.get('artHash')
         if not art_hash:
             return None
+        checksum = self.item.get('artBlobChecksum')
+        if checksum and art_hash == self.item.get('artHash'):
+            return self.post_manager.get_image_blob_path(checksum, size)
         return '/'.join([self.get_art_image_path_prefix(), art_hash, size.filename])
 
     def get_post_ids_for_art(self):
@@ -119,48 +124,125 @@ class Album:
         old_art_hash = self.item.get('artHash')
         if new_art_hash == old_art_hash:
             return self  # no changes
+        old_blob_checksum = self.item.get('artBlobChecksum')
 
-        posts = [self.post_manager.get_post(post_id) for post_id in post_ids]
-        if len(posts) == 0:
+        blob_checksum = None
+        if len(post_ids) == 0:
             new_native_image = None
-        elif len(posts) == 1:
-            new_native_image = posts[0].k4_jpeg_cache.readonly_image
+        elif len(post_ids) == 1:
+            # art of a single post is just that post's image, so share its image blob when possible
+            post = self.post_manager.get_post(post_ids[0])
+            blob_checksum = post.item.get('imageBlobChecksum')
+            if blob_checksum and self.post_manager.acquire_image_blob(blob_checksum):
+                new_native_image = None
+            else:
+                blob_checksum = None
+                new_native_image = post.k4_jpeg_cache.readonly_image
         else:
-            images = [post.p1080_jpeg_cache.readonly_image for post in posts]
-            new_native_image = art.generate_zoomed_grid(images)
+            new_native_image = self.get_updated_art_image(post_ids, old_art_hash)
+            if new_native_image is None:
+                images = [
+                    self.post_manager.get_post(post_id).p1080_jpeg_cache.readonly_image for post_id in post_ids
+                ]
+                new_native_image = art.generate_zoomed_grid(images)
 
         if new_native_image:
             # convert to jpeg
             buf_out = io.BytesIO()
             new_native_image.save(buf_out, format='JPEG', quality=100)
             buf_out.seek(0)
-            self.save_art_images(new_art_hash, buf_out)
+            # keep a lossless copy of grids to repaint later, so unchanged cells don't degrade
+            grid_image = new_native_image if len(post_ids) > 1 else None
+            self.save_art_images(new_art_hash, buf_out, grid_image=grid_image)
 
-        self.item = self.dynamo.set_album_art_hash(self.id, new_art_hash)
+        self.item = self.dynamo.set_album_art_hash(
+            self.id, new_art_hash, art_post_ids=post_ids, art_blob_checksum=blob_checksum
+        )
 
-        if old_art_hash:
+        if old_blob_checksum:
+            self.post_manager.release_image_blob(old_blob_checksum)
+        elif old_art_hash:
             self.delete_art_images(old_art_hash)
 
         return self
 
+    def get_updated_art_image(self, post_ids, old_art_hash):
+        """
+        Build the art for `post_ids` by repainting only the cells of the existing art that changed.
+        Cells whose post just moved within the grid are copied from the lossless copy of the existing
+        art, so only posts new to the grid have their images read. Returns None if the existing art
+        can't be reused.
+        """
+        old_post_ids = self.item.get('artPostIds') or []
+        if not old_art_hash or len(old_post_ids) != len(post_ids):
+            return None
+        changed_indexes = [i for i, (old, new) in enumerate(zip(old_post_ids, post_ids)) if old != new]
+        if len(changed_indexes) == len(post_ids):
+            return None
+
+        path = self.get_art_image_path(image_size.NATIVE_PNG, art_hash=old_art_hash)
+        try:
+            old_native_image = PIL.Image.open(
+                io.BytesIO(self.s3_uploads_client.get_object_data_stream(path).read())
+            )
+        except self.s3_uploads_client.exceptions.ClientError as err:
+            logger.warning(f'Unable to read existing art for album `{self.id}`, regenerating: {err}')
+            return None
+
+        if old_native_image.size != (art.OUTPUT_WIDTH, art.OUTPUT_HEIGHT):
+            return None
+
+        stride = int(math.sqrt(len(post_ids)))
+        changed_images = {}
+        for index in changed_indexes:
+            post_id = post_ids[index]
+            if post_id in old_post_ids:
+                box = art.get_cell_box(old_post_ids.index(post_id), stride)
+                changed_images[index] = old_native_image.crop(box)
+            else:
+                changed_images[index] = self.post_manager.get_post(post_id).p1080_jpeg_cache.readonly_image
+        return art.update_zoomed_grid(old_native_image, changed_images, len(post_ids))
+
     def delete_art_images(self, art_hash):
         # remove the images from s3
-        for size in image_size.JPEGS:
-            path = self.get_art_image_path(size, art_hash=art_hash)
-            self.s3_uploads_client.delete_object(path)
+        sizes = image_size.JPEGS + (image_size.NATIVE_PNG,)
+        paths = [self.get_art_image_path(size, art_hash=art_hash) for size in sizes]
+        self.s3_uploads_client.delete_objects(paths)
 
-    def save_art_images(self, art_hash, native_image_buf):
-        # save the native size to S3
-        path = self.get_art_image_path(image_size.NATIVE, art_hash=art_hash)
-        self.s3_uploads_client.put_object(path, native_image_buf.read(), self.jpeg_content_type)
+    def save_art_images(self, art_hash, native_image_buf, grid_image=None):
+        "If `grid_image` is given, it is also saved losslessly, for get_updated_art_image() to build on"
+        native_path = self.get_art_image_path(image_size.NATIVE, art_hash=art_hash)
+        objects = [(native_path, native_image_buf.read(), self.jpeg_content_type)]
 
-        # generate and save thumbnails
+        # generate thumbnails, each from the last as they're ordered by decreasing size
         native_image_buf.seek(0)
         image = PIL.Image.open(native_image_buf)
-        for size in image_size.THUMBNAILS:  # ordered by decreasing size
+        thumbnails = []
+        for size in image_size.THUMBNAILS:
             image.thumbnail(size.max_dimensions, resample=PIL.Image.LANCZOS)
-            in_mem_file = io.BytesIO()
-            image.save(in_mem_file, format='JPEG', quality=100, icc_profile=image.info.get('icc_profile'))
-            in_mem_file.seek(0)
-            path = self.get_art_image_path(size, art_hash=art_hash)
-            self.s3_uploads_client.put_object(path, in_mem_file.read(), self.jpeg_content_type)
+            thumbnails.append((size, image.copy()))
+
+        # encoding releases the GIL, so encode the thumbnails and the lossless copy concurrently
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(thumbnails) + 1) as executor:
+            if grid_image:
+                png_future = executor.submit(self.encode_png, grid_image)
+            encoded = executor.map(lambda thumbnail: self.encode_jpeg(thumbnail[1]), thumbnails)
+            for (size, _), data in zip(thumbnails, encoded):
+                objects.append((self.get_art_image_path(size, art_hash=art_hash), data, self.jpeg_content_type))
+            if grid_image:
+                png_path = self.get_art_image_path(image_size.NATIVE_PNG, art_hash=art_hash)
+                objects.append((png_path, png_future.result(), image_size.NATIVE_PNG.content_type))
+
+        # save all sizes to S3
+        self.s3_uploads_client.put_objects(objects)
+
+    def encode_jpeg(self, image):
+        in_mem_file = io.BytesIO()
+        image.save(in_mem_file, format='JPEG', quality=100, icc_profile=image.info.get('icc_profile'))
+        return in_mem_file.getvalue()
+
+    def encode_png(self, image):
+        in_mem_file = io.BytesIO()
+        # it's only read back by the backend, so favor encoding speed over size
+        image.save(in_mem_file, format='PNG', compress_level=1)
+        return in_mem_file.getvalue()
@@ -3,6 +3,8 @@ from decimal import Decimal
 
 import pendulum
 
+from app.models.user.dynamo import UserDailyTotalsDynamo
+
 from .dynamo import AppStoreSubDynamo
 from .enums import AppStoreSubscriptionStatus, PlanMappedPrice
 from .exceptions import AppStoreException
@@ -23,6 +25,7 @@ class AppStoreManager:
             self.appstore_client = self.clients['appstore']
         if 'dynamo' in clients:
             self.sub_dynamo = AppStoreSubDynamo(clients['dynamo'])
+            self.user_daily_totals_dynamo = UserDailyTotalsDynamo(clients['dynamo'])
 
     def add_receipt(self, receipt, user_id):
         now = pendulum.now('utc')
@@ -114,10 +117,9 @@ class AppStoreManager:
         self.sub_dynamo.client.batch_delete_items(key_generator)
 
     def get_paid_real_past_30_days(self, user_id, now=None):
-        now = now or pendulum.now('utc')
-        paid_real_past_30_days = Decimal('0')
-        for key in self.sub_dynamo.generate_transaction_keys_past_30_days(user_id, now=now):
-            price = self.sub_dynamo.client.get_item(key).get('price', Decimal('0'))
-            paid_real_past_30_days += price
+        return self.user_daily_totals_dynamo.get_past_days_totals(user_id, days=30, now=now)['paidReal']
 
-        return paid_real_past_30_days
+    def on_transaction_add_update_daily_totals(self, transaction_id, new_item):
+        created_at = pendulum.parse(new_item['createdAt'])
+        price = new_item.get('price', Decimal('0'))
+        self.user_daily_totals_dynamo.add(new_item['userId'], created_at.date(), paidReal=price)
@@ -17,6 +17,9 @@ class BlockManager:
         self.chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
         self.like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
+        self.relationship_manager = managers.get('relationship') or models.RelationshipManager(
+            clients, managers=managers
+        )
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
         self.clients = clients
@@ -35,6 +38,7 @@ class BlockManager:
 
     def block(self, blocker_user, blocked_user):
         block_item = self.dynamo.add_block(blocker_user.id, blocked_user.id)
+        self.relationship_manager.invalidate(blocker_user.id, blocked_user.id)
 
         if blocked_user.status != UserStatus.ACTIVE:
             raise BlockException(f'Cannot block user with status `{blocked_user.status}`')
@@ -62,6 +66,7 @@ class BlockManager:
 
     def unblock(self, blocker_user, blocked_user):
         deleted_item = self.dynamo.delete_block(blocker_user.id, blocked_user.id)
+        self.relationship_manager.invalidate(blocker_user.id, blocked_user.id)
         if not deleted_item:
             raise NotBlocked(blocker_user.id, blocked_user.id)
         return deleted_item
@@ -4,28 +4,30 @@ import gql
 
 logger = logging.getLogger()
 
+# parsing is relatively expensive, so only do it once per process
+TRIGGER_CARD_NOTIFICATION = gql.gql(
+    '''
+    mutation TriggerCardNotification ($input: CardNotificationInput!) {
+        triggerCardNotification (input: $input) {
+            userId
+            type
+            card {
+                cardId
+                title
+                subTitle
+                action
+            }
+        }
+    }
+'''
+)
+
 
 class CardAppSync:
     def __init__(self, appsync_client):
         self.client = appsync_client
 
     def trigger_notification(self, notification_type, user_id, card_id, title, action, sub_title=None):
-        mutation = gql.gql(
-            '''
-            mutation TriggerCardNotification ($input: CardNotificationInput!) {
-                triggerCardNotification (input: $input) {
-                    userId
-                    type
-                    card {
-                        cardId
-                        title
-                        subTitle
-                        action
-                    }
-                }
-            }
-        '''
-        )
         input_obj = {
             'userId': user_id,
             'type': notification_type,
@@ -34,4 +36,4 @@ class CardAppSync:
             'subTitle': sub_title,
             'action': action,
         }
-        self.client.send(mutation, {'input': input_obj})
+        self.client.send(TRIGGER_CARD_NOTIFICATION, {'input': input_obj})
@@ -1,13 +1,34 @@
 import logging
+import zlib
 
 import pendulum
 
+from app.utils import map_concurrently
+
 from .exceptions import CardAlreadyExists
 
 logger = logging.getLogger()
 
 
 class CardDynamo:
+    """
+    Cards due a notification are indexed twice:
+      - in GSI-K1 by hour of `notifyUserAt`, each hour spread over `notify_shard_count` partitions,
+        so the dispatcher reads only the buckets that are due, in parallel, and no single
+        partition takes every card write
+      - in GSI-K2 by user, so notifying only some users is a key condition rather than a scan
+
+    The first hour bucket the dispatcher has not yet finished with is kept as a watermark, so each
+    run reads just the buckets that came due since the last one. Cards left behind by missed runs
+    are still found, so long as they were due within `notify_lookback`.
+    """
+
+    transact_chunk_size = 25
+    notify_shard_count = 4
+    # the furthest back the dispatcher looks for buckets that have cards due
+    notify_lookback = pendulum.duration(days=1)
+    notify_watermark_pk = {'partitionKey': 'cardNotifyWatermark', 'sortKey': '-'}
+
     def __init__(self, dynamo_client):
         self.client = dynamo_client
 
@@ -17,10 +38,34 @@ class CardDynamo:
             'sortKey': '-',
         }
 
+    def typed_pk(self, card_id):
+        return {
+            'partitionKey': {'S': f'card/{card_id}'},
+            'sortKey': {'S': '-'},
+        }
+
+    def notify_bucket(self, at):
+        return at.in_tz('utc').format('YYYY-MM-DDTHH')
+
+    def parse_notify_bucket(self, bucket):
+        return pendulum.from_format(bucket, 'YYYY-MM-DDTHH', tz='utc')
+
+    def notify_shard(self, card_id):
+        return zlib.crc32(card_id.encode()) % self.notify_shard_count
+
+    def notify_keys(self, card_id, user_id, notify_user_at):
+        notify_user_at_str = notify_user_at.to_iso8601_string()
+        return {
+            'gsiK1PartitionKey': f'card/{self.notify_bucket(notify_user_at)}/{self.notify_shard(card_id)}',
+            'gsiK1SortKey': f'{notify_user_at_str}/{user_id}',
+            'gsiK2PartitionKey': f'card/{user_id}',
+            'gsiK2SortKey': notify_user_at_str,
+        }
+
     def get_card(self, card_id, strongly_consistent=False):
         return self.client.get_item(self.pk(card_id), ConsistentRead=strongly_consistent)
 
-    def add_card(
+    def new_card_item(
         self,
         card_id,
         user_id,
@@ -33,34 +78,128 @@ class CardDynamo:
         comment_id=None,
     ):
         created_at = created_at or pendulum.now('utc')
-        query_kwargs = {
-            'Item': {
-                **self.pk(card_id),
-                'schemaVersion': 1,
-                'gsiA1PartitionKey': f'user/{user_id}',
-                'gsiA1SortKey': f'card/{created_at.to_iso8601_string()}',
-                'title': title,
-                'action': action,
-            },
+        item = {
+            **self.pk(card_id),
+            'schemaVersion': 1,
+            'gsiA1PartitionKey': f'user/{user_id}',
+            'gsiA1SortKey': f'card/{created_at.to_iso8601_string()}',
+            'title': title,
+            'action': action,
         }
         if sub_title:
-            query_kwargs['Item']['subTitle'] = sub_title
+            item['subTitle'] = sub_title
         if notify_user_at:
-            query_kwargs['Item']['gsiK1PartitionKey'] = 'card'
-            query_kwargs['Item']['gsiK1SortKey'] = notify_user_at.to_iso8601_string() + '/' + user_id
+            item.update(self.notify_keys(card_id, user_id, notify_user_at))
         if post_id:
-            query_kwargs['Item']['postId'] = post_id
-            query_kwargs['Item']['gsiA2PartitionKey'] = f'card/{post_id}'
-            query_kwargs['Item']['gsiA2SortKey'] = user_id
+            item['postId'] = post_id
+            item['gsiA2PartitionKey'] = f'card/{post_id}'
+            item['gsiA2SortKey'] = user_id
         if comment_id:
-            query_kwargs['Item']['commentId'] = comment_id
-            query_kwargs['Item']['gsiA3PartitionKey'] = f'card/{comment_id}'
-            query_kwargs['Item']['gsiA3SortKey'] = '-'
+            item['commentId'] = comment_id
+            item['gsiA3PartitionKey'] = f'card/{comment_id}'
+            item['gsiA3SortKey'] = '-'
+        return item
+
+    def add_card(self, card_id, *args, **kwargs):
+        query_kwargs = {'Item': self.new_card_item(card_id, *args, **kwargs)}
         try:
             return self.client.add_item(query_kwargs)
         except self.client.exceptions.ConditionalCheckFailedException as err:
             raise CardAlreadyExists(card_id) from err
 
+    def upsert_card(self, card_id, *args, debounce_window=None, **kwargs):
+        """
+        Add the card, or set the title of the existing card, skipping the write if the title is unchanged.
+        Returns the new card item, or None if nothing was written.
+
+        Creation fields are written with `if_not_exists`, so adding a card and updating a card still
+        due a notification take one request. A card already notified must not be made due again, and
+        an update can't leave an attribute unset only if it was removed, so those cards take a second,
+        title-only, request.
+
+        With `debounce_window`, the title of an existing card is set at most once per window. Titles
+        that come in during the window are kept as `pendingTitle`, to be set by `flush_pending_title`
+        once the window is over.
+        """
+        now = kwargs['created_at'] = kwargs.get('created_at') or pendulum.now('utc')
+        item = self.new_card_item(card_id, *args, **kwargs)
+        sets = ['#title = :title']
+        removes = []
+        names = {'#title': 'title'}
+        values = {':title': item['title']}
+        for i, (name, value) in enumerate(item.items()):
+            if name in ('partitionKey', 'sortKey', 'title'):
+                continue
+            sets.append(f'#a{i} = if_not_exists(#a{i}, :a{i})')
+            names[f'#a{i}'] = name
+            values[f':a{i}'] = value
+        changed = '#title <> :title'
+        conditions = []
+        if debounce_window:
+            sets.append('renderedAt = :now')
+            removes = ['pendingTitle', 'gsiK3PartitionKey', 'gsiK3SortKey']
+            values[':now'] = now.to_iso8601_string()
+            values[':cutoff'] = (now - debounce_window).to_iso8601_string()
+            # a pending title must be replaced, even by the title the card already has
+            changed = '(#title <> :title OR attribute_exists(pendingTitle))'
+            conditions.append('(attribute_not_exists(renderedAt) OR renderedAt < :cutoff)')
+        if 'gsiK1PartitionKey' in item:
+            conditions.append('attribute_exists(gsiK1PartitionKey)')
+        update_exp = 'SET ' + ', '.join(sets) + (' REMOVE ' + ', '.join(removes) if removes else '')
+        query_kwargs = {
+            'Key': self.pk(card_id),
+            'UpdateExpression': update_exp,
+            'ConditionExpression': f'attribute_not_exists(partitionKey) OR ({" AND ".join([changed, *conditions])})',
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+            'ReturnValues': 'ALL_NEW',
+        }
+        try:
+            return self.client.table.update_item(**query_kwargs)['Attributes']
+        except self.client.exceptions.ConditionalCheckFailedException:
+            pass
+
+        if debounce_window:
+            flush_at = int((now + debounce_window).timestamp())
+            query_kwargs = {
+                'Key': self.pk(card_id),
+                'UpdateExpression': (
+                    'SET pendingTitle = :title, gsiK3PartitionKey = :k3pk, '
+                    'gsiK3SortKey = if_not_exists(gsiK3SortKey, :flush_at)'
+                ),
+                'ConditionExpression': f'renderedAt >= :cutoff AND {changed}',
+                'ExpressionAttributeNames': {'#title': 'title'},
+                'ExpressionAttributeValues': {
+                    ':title': item['title'],
+                    ':cutoff': values[':cutoff'],
+                    ':k3pk': f'cardPending/{self.notify_shard(card_id)}',
+                    ':flush_at': flush_at,
+                },
+            }
+            try:
+                self.client.update_item(query_kwargs)
+                return None  # deferred
+            except self.client.exceptions.ConditionalCheckFailedException:
+                pass
+
+        if 'gsiK1PartitionKey' not in item:
+            return None  # title unchanged
+        query_kwargs = {
+            'Key': self.pk(card_id),
+            'UpdateExpression': 'SET #title = :title'
+            + (', renderedAt = :now REMOVE ' + ', '.join(removes) if removes else ''),
+            'ConditionExpression': changed,
+            'ExpressionAttributeNames': {'#title': 'title'},
+            'ExpressionAttributeValues': {
+                ':title': item['title'],
+                **({':now': values[':now']} if removes else {}),
+            },
+        }
+        try:
+            return self.client.update_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return None  # title unchanged
+
     def update_title(self, card_id, title):
         query_kwargs = {
             'Key': self.pk(card_id),
@@ -69,16 +208,67 @@ class CardDynamo:
         }
         return self.client.update_item(query_kwargs)
 
+    def flush_pending_title(self, card_item, now=None):
+        """
+        Set the card's title to its pending title, starting a new debounce window. Returns True if
+        written, False if the card was deleted or its pending title changed since it was read.
+        Safe to call from multiple threads.
+        """
+        now = now or pendulum.now('utc')
+        query_kwargs = {
+            'Key': {k: card_item[k] for k in ('partitionKey', 'sortKey')},
+            'UpdateExpression': (
+                'SET title = pendingTitle, renderedAt = :now REMOVE pendingTitle, gsiK3PartitionKey, gsiK3SortKey'
+            ),
+            'ConditionExpression': 'pendingTitle = :pending',
+            'ExpressionAttributeValues': {':pending': card_item['pendingTitle'], ':now': now.to_iso8601_string()},
+        }
+        try:
+            self.client.upsert_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
     def delete_card(self, card_id):
         return self.client.delete_item(self.pk(card_id))
 
     def clear_notify_user_at(self, card_id):
         query_kwargs = {
             'Key': self.pk(card_id),
-            'UpdateExpression': 'REMOVE gsiK1PartitionKey, gsiK1SortKey',
+            'UpdateExpression': 'REMOVE gsiK1PartitionKey, gsiK1SortKey, gsiK2PartitionKey, gsiK2SortKey',
         }
         return self.client.update_item(query_kwargs)
 
+    def clear_notify_user_ats(self, card_items):
+        """
+        Clear notify user at for the cards, in transactions of up to `transact_chunk_size` run
+        concurrently. Cards deleted or re-scheduled since they were read are left as they are.
+        """
+
+        def transact_clear(item):
+            return {
+                'Update': {
+                    'Key': self.typed_pk(item['partitionKey'][len('card/') :]),
+                    'UpdateExpression': 'REMOVE gsiK1PartitionKey, gsiK1SortKey, gsiK2PartitionKey, gsiK2SortKey',
+                    'ConditionExpression': 'gsiK1SortKey = :sk',
+                    'ExpressionAttributeValues': {':sk': {'S': item['gsiK1SortKey']}},
+                }
+            }
+
+        def clear_chunk(items):
+            try:
+                self.client.transact_write_items([transact_clear(item) for item in items])
+            except self.client.exceptions.TransactionCanceledException:
+                if len(items) > 1:
+                    for item in items:
+                        clear_chunk([item])
+
+        chunks = [
+            card_items[i : i + self.transact_chunk_size]
+            for i in range(0, len(card_items), self.transact_chunk_size)
+        ]
+        map_concurrently(clear_chunk, chunks)
+
     def generate_cards_by_user(self, user_id, pks_only=False):
         query_kwargs = {
             'KeyConditionExpression': 'gsiA1PartitionKey = :pk AND begins_with(gsiA1SortKey, :sk_prefix)',
@@ -111,16 +301,115 @@ class CardDynamo:
         }
         return self.client.generate_all_query(query_kwargs)
 
-    def generate_card_ids_by_notify_user_at(self, cutoff_at, only_user_ids=None):
+    def get_notify_watermark(self):
+        "The first hour bucket the dispatcher has not yet finished with, or None if it has never been set"
+        item = self.client.get_item(self.notify_watermark_pk)
+        return item['notifyUserAtHour'] if item else None
+
+    def set_notify_watermark(self, bucket, expected_bucket=None):
+        """
+        Move the watermark to `bucket`, so long as it is still at `expected_bucket` (None meaning unset).
+        Returns True if anything was written.
+        """
         query_kwargs = {
-            'KeyConditionExpression': 'gsiK1PartitionKey = :c AND gsiK1SortKey < :at_trailing',
-            'ExpressionAttributeValues': {':c': 'card', ':at_trailing': cutoff_at.to_iso8601_string() + '/~'},
-            'IndexName': 'GSI-K1',
+            'Key': self.notify_watermark_pk,
+            'UpdateExpression': 'SET notifyUserAtHour = :bucket',
+            'ExpressionAttributeValues': {':bucket': bucket},
         }
-        gen = self.client.generate_all_query(query_kwargs)
-        # Note dynamo does not let you apply a FilterExpression to the index/key used in a query
-        # 'Filter Expression can only contain non-primary key attributes'
+        if expected_bucket is None:
+            query_kwargs['ConditionExpression'] = 'attribute_not_exists(notifyUserAtHour)'
+        else:
+            query_kwargs['ConditionExpression'] = 'notifyUserAtHour = :expected'
+            query_kwargs['ExpressionAttributeValues'][':expected'] = expected_bucket
+        try:
+            self.client.upsert_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def lower_notify_watermark(self, bucket):
+        "Move the watermark back to `bucket` if it is unset or later. Returns True if anything was written"
+        query_kwargs = {
+            'Key': self.notify_watermark_pk,
+            'UpdateExpression': 'SET notifyUserAtHour = :bucket',
+            'ConditionExpression': 'attribute_not_exists(notifyUserAtHour) OR notifyUserAtHour > :bucket',
+            'ExpressionAttributeValues': {':bucket': bucket},
+        }
+        try:
+            self.client.upsert_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def generate_card_keys_by_notify_user_at(self, cutoff_at, only_user_ids=None):
+        """
+        Keys of the cards due at or before `cutoff_at`, in no particular order. Without `only_user_ids`,
+        reads the hour buckets from the watermark up to the cutoff, all shards concurrently, but never
+        those from before `notify_lookback`. The watermark is then advanced to the cutoff's bucket, as
+        cards may still come due in it: the buckets before are done with, whether or not all the
+        notifications of their cards went through.
+        """
         if only_user_ids:
-            gen = (item for item in gen if item['gsiK1SortKey'].split('/')[-1] in only_user_ids)
-        gen = (item['partitionKey'].split('/')[1] for item in gen)
-        return gen
+            query_kwargs_list = [
+                {
+                    'KeyConditionExpression': 'gsiK2PartitionKey = :pk AND gsiK2SortKey <= :at',
+                    'ExpressionAttributeValues': {':pk': f'card/{user_id}', ':at': cutoff_at.to_iso8601_string()},
+                    'IndexName': 'GSI-K2',
+                }
+                for user_id in set(only_user_ids)
+            ]
+            results = map_concurrently(self.client.query_all, query_kwargs_list)
+        else:
+            watermark = self.get_notify_watermark()
+            cutoff_bucket = self.notify_bucket(cutoff_at)
+            start_at = (cutoff_at - self.notify_lookback).in_tz('utc').start_of('hour')
+            if watermark is not None:
+                start_at = max(start_at, self.parse_notify_bucket(min(watermark, cutoff_bucket)))
+            buckets = [self.notify_bucket(at) for at in (cutoff_at - start_at).range('hours')]
+            query_kwargs_list = [
+                {
+                    'KeyConditionExpression': 'gsiK1PartitionKey = :pk AND gsiK1SortKey < :at_trailing',
+                    'ExpressionAttributeValues': {
+                        ':pk': f'card/{bucket}/{shard}',
+                        ':at_trailing': cutoff_at.to_iso8601_string() + '/~',
+                    },
+                    'IndexName': 'GSI-K1',
+                }
+                for bucket in buckets
+                for shard in range(self.notify_shard_count)
+            ]
+            results = map_concurrently(self.client.query_all, query_kwargs_list)
+            if watermark is None or watermark < cutoff_bucket:
+                self.set_notify_watermark(cutoff_bucket, expected_bucket=watermark)
+        return (
+            {'partitionKey': item['partitionKey'], 'sortKey': item['sortKey']}
+            for items in results
+            for item in items
+        )
+
+    def generate_cards_pending_flush(self, cutoff_at):
+        "Full items of the cards with a pending title whose debounce window is over by `cutoff_at`"
+        query_kwargs_list = [
+            {
+                'KeyConditionExpression': 'gsiK3PartitionKey = :pk AND gsiK3SortKey <= :at',
+                'ExpressionAttributeValues': {':pk': f'cardPending/{shard}', ':at': int(cutoff_at.timestamp())},
+                'IndexName': 'GSI-K3',
+            }
+            for shard in range(self.notify_shard_count)
+        ]
+        results = map_concurrently(self.client.query_all, query_kwargs_list)
+        keys = [
+            {'partitionKey': item['partitionKey'], 'sortKey': item['sortKey']}
+            for items in results
+            for item in items
+        ]
+        return self.client.generate_batch_get_items(keys)
+
+    def generate_card_ids_by_notify_user_at(self, cutoff_at, only_user_ids=None):
+        gen = self.generate_card_keys_by_notify_user_at(cutoff_at, only_user_ids=only_user_ids)
+        return (key['partitionKey'].split('/')[1] for key in gen)
+
+    def generate_cards_by_notify_user_at(self, cutoff_at, only_user_ids=None):
+        "Full items of the cards due, batch read as the index only projects keys. In no particular order"
+        keys = list(self.generate_card_keys_by_notify_user_at(cutoff_at, only_user_ids=only_user_ids))
+        return self.client.generate_batch_get_items(keys)
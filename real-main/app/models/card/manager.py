@@ -1,25 +1,34 @@
+import collections
 import logging
 from functools import partialmethod
 
 import pendulum
 
 from app import models
+from app.clients import PinpointClient
 from app.models.user.enums import UserStatus, UserSubscriptionLevel
+from app.utils import RateLimiter, TTLCache, map_concurrently
 
 from . import templates
 from .appsync import CardAppSync
 from .dynamo import CardDynamo
 from .enums import CardNotificationType
-from .exceptions import CardAlreadyExists
 from .model import Card
 
 logger = logging.getLogger()
 
 
 class CardManager:
+
+    # push requests are sent concurrently, each to up to PinpointClient.max_users_per_request users
+    notify_max_workers = 10
+    notify_requests_per_second = 20
+
     def __init__(self, clients, managers=None):
         managers = managers or {}
         managers['card'] = self
+        # usernames of users checked against the allow-list of a template, kept across invocations
+        self.usernames = TTLCache(ttl=300)
         self.comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
@@ -46,31 +55,39 @@ class CardManager:
         return Card(item, **kwargs)
 
     def add_or_update_card(self, template, now=None):
+        """
+        Add the card, or update the title of the existing card. Returns the card, or None if nothing
+        was written because the title was unchanged or the user is not in the template's allow-list.
+        """
         if template.only_usernames:
-            user = self.user_manager.get_user(template.user_id)
-            if not (user and user.username in template.only_usernames):
+            username = self.usernames.get_or_load(template.user_id, self.get_username)
+            if username not in template.only_usernames:
                 return None
 
         created_at = now or pendulum.now('utc')
         notify_user_at = (
             created_at + template.notify_user_after if template.notify_user_after is not None else None
         )
+        card_item = self.dynamo.upsert_card(
+            template.card_id,
+            template.user_id,
+            template.title,
+            template.action,
+            created_at=created_at,
+            notify_user_at=notify_user_at,
+            sub_title=template.sub_title,
+            post_id=template.post_id,
+            comment_id=template.comment_id,
+            debounce_window=template.debounce_window,
+        )
+        # the notification dispatcher may be done with the hour bucket of a card already overdue
+        if card_item and notify_user_at and notify_user_at < pendulum.now('utc').start_of('hour'):
+            self.dynamo.lower_notify_watermark(self.dynamo.notify_bucket(notify_user_at))
+        return self.init_card(card_item) if card_item else None
 
-        try:
-            card_item = self.dynamo.add_card(
-                template.card_id,
-                template.user_id,
-                template.title,
-                template.action,
-                created_at=created_at,
-                notify_user_at=notify_user_at,
-                sub_title=template.sub_title,
-                post_id=template.post_id,
-                comment_id=template.comment_id,
-            )
-        except CardAlreadyExists:
-            card_item = self.dynamo.update_title(template.card_id, template.title)
-        return self.init_card(card_item)
+    def get_username(self, user_id):
+        user = self.user_manager.get_user(user_id)
+        return user.username if user else None
 
     def delete_by_post(self, post_id, user_id=None):
         key_generator = self.dynamo.generate_card_keys_by_post(post_id, user_id=user_id)
@@ -94,16 +111,65 @@ class CardManager:
             only_users = [self.user_manager.get_user_by_username(username) for username in only_usernames]
             only_user_ids = [user.id for user in only_users if user]
 
-        # send on notifcations for cards for those users
-        now = pendulum.now('utc')
-        total_count, success_count = 0, 0
-        for card_id in self.dynamo.generate_card_ids_by_notify_user_at(now, only_user_ids=only_user_ids):
-            card = self.get_card(card_id)
-            success_count += card.notify_user()
-            total_count += 1
-            card.clear_notify_user_at()
+        # send on notifcations for cards for those users, oldest first
+        now = now or pendulum.now('utc')
+        cards = sorted(
+            (self.init_card(item) for item in self.dynamo.generate_cards_by_notify_user_at(now, only_user_ids)),
+            key=lambda card: card.item['gsiK1SortKey'],
+        )
+        rate_limiter = RateLimiter(self.notify_requests_per_second)
+
+        def send(user_cards):
+            rate_limiter.wait()
+            card = next(iter(user_cards.values()))
+            user_titles = {user_id: c.title for user_id, c in user_cards.items()}
+            try:
+                sent_user_ids = self.pinpoint_client.send_users_apns(
+                    card.action, user_titles, body=card.sub_title
+                )
+            except Exception as err:
+                # leave the cards due, for runs later in the hour or notifying just their users to retry
+                logger.exception(f'Failed to send notifications for {len(user_cards)} cards: {err}')
+                return list(user_cards.values()), None
+            return list(user_cards.values()), sent_user_ids
+
+        results = map_concurrently(send, self.group_notifications(cards), max_workers=self.notify_max_workers)
+        self.dynamo.clear_notify_user_ats(
+            [card.item for batch, sent_user_ids in results if sent_user_ids is not None for card in batch]
+        )
+        total_count = len(cards)
+        success_count = sum(len(sent_user_ids or ()) for _, sent_user_ids in results)
         return total_count, success_count
 
+    def flush_pending_titles(self, now=None):
+        "Set the titles held back by debouncing of the cards whose window is over. Returns (total, flushed)"
+        now = now or pendulum.now('utc')
+        items = list(self.dynamo.generate_cards_pending_flush(now))
+        flushed = map_concurrently(lambda item: self.dynamo.flush_pending_title(item, now=now), items)
+        return len(items), sum(flushed)
+
+    def group_notifications(self, cards):
+        """
+        Group the cards into the user_id-to-card dicts sent as one push request each. Cards in a
+        request share their action and sub title, and have distinct users.
+        """
+        batches = collections.defaultdict(list)
+        for card in cards:
+            key_batches = batches[(card.action, card.sub_title)]
+            batch = next(
+                (
+                    b
+                    for b in key_batches
+                    if card.user_id not in b and len(b) < PinpointClient.max_users_per_request
+                ),
+                None,
+            )
+            if batch is None:
+                batch = {}
+                key_batches.append(batch)
+            batch[card.user_id] = card
+        return [batch for key_batches in batches.values() for batch in key_batches]
+
     def on_card_add(self, card_id, new_item):
         self.init_card(new_item).trigger_notification(CardNotificationType.ADDED)
 
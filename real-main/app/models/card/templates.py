@@ -11,6 +11,8 @@ class CardTemplate:
     post_id = None
     comment_id = None
     only_usernames = ()
+    # for titles that follow a counter, the title is set at most once per window
+    debounce_window = None
 
     def __init__(self, user_id):
         self.user_id = user_id
@@ -20,6 +22,7 @@ class ChatCardTemplate(CardTemplate):
 
     action = 'https://real.app/chat/'
     notify_user_after = pendulum.duration(minutes=5)
+    debounce_window = pendulum.duration(minutes=1)
 
     @staticmethod
     def get_card_id(user_id):
@@ -35,6 +38,7 @@ class ChatCardTemplate(CardTemplate):
 class CommentCardTemplate(CardTemplate):
 
     notify_user_after = pendulum.duration(hours=24)
+    debounce_window = pendulum.duration(minutes=1)
 
     @staticmethod
     def get_card_id(user_id, post_id):
@@ -134,6 +138,7 @@ class RequestedFollowersCardTemplate(CardTemplate):
 
     action = 'https://real.app/chat/'
     notify_user_after = pendulum.duration(hours=24)
+    debounce_window = pendulum.duration(minutes=1)
 
     @staticmethod
     def get_card_id(user_id):
@@ -100,7 +100,17 @@ class ChatDynamo:
         return self.client.decrement_count(self.pk(chat_id), 'flagCount')
 
     def increment_messages_count(self, chat_id):
-        return self.client.increment_count(self.pk(chat_id), 'messagesCount')
+        """
+        Best-effort attempt to increment messagesCount. Also advances messageSequence, which unlike
+        messagesCount is never decremented. Logs a WARNING upon failure.
+        """
+        query_kwargs = {
+            'Key': self.pk(chat_id),
+            'UpdateExpression': 'ADD messagesCount :one, messageSequence :one',
+            'ExpressionAttributeValues': {':one': 1},
+        }
+        failure_warning = f'Failed to increment messagesCount for key `{self.pk(chat_id)}`'
+        return self.client.update_item(query_kwargs, failure_warning=failure_warning)
 
     def decrement_messages_count(self, chat_id):
         return self.client.decrement_count(self.pk(chat_id), 'messagesCount')
@@ -109,21 +119,22 @@ class ChatDynamo:
         return self.client.delete_item(self.pk(chat_id))
 
     def transact_increment_user_count(self, chat_id):
-        return {
-            'Update': {
-                'Key': self.typed_pk(chat_id),
-                'UpdateExpression': 'ADD userCount :one',
-                'ExpressionAttributeValues': {':one': {'N': '1'}},
-                'ConditionExpression': 'attribute_exists(partitionKey)',
-            }
-        }
+        return self.transact_update_user_count(chat_id, 1)
 
     def transact_decrement_user_count(self, chat_id):
-        return {
+        return self.transact_update_user_count(chat_id, -1)
+
+    def transact_update_user_count(self, chat_id, delta):
+        "Add `delta` to the userCount. Decrements that would take the count below zero are refused"
+        query_kwargs = {
             'Update': {
                 'Key': self.typed_pk(chat_id),
-                'UpdateExpression': 'ADD userCount :negOne',
-                'ExpressionAttributeValues': {':negOne': {'N': '-1'}, ':zero': {'N': '0'}},
-                'ConditionExpression': 'attribute_exists(partitionKey) AND userCount > :zero',
+                'UpdateExpression': 'ADD userCount :delta',
+                'ExpressionAttributeValues': {':delta': {'N': str(delta)}},
+                'ConditionExpression': 'attribute_exists(partitionKey)',
             }
         }
+        if delta < 0:
+            query_kwargs['Update']['ExpressionAttributeValues'][':negDelta'] = {'N': str(-delta)}
+            query_kwargs['Update']['ConditionExpression'] += ' AND userCount >= :negDelta'
+        return query_kwargs
@@ -1,12 +1,19 @@
+import itertools
 import logging
 
 import pendulum
 from boto3.dynamodb.conditions import Key
 
+from app.utils import map_concurrently
+
 logger = logging.getLogger()
 
 
 class ChatMemberDynamo:
+
+    # dynamo allows 25 writes per transaction, one is kept for the chat's userCount update
+    transact_chunk_size = 24
+
     def __init__(self, dynamo_client):
         self.client = dynamo_client
 
@@ -54,6 +61,76 @@ class ChatMemberDynamo:
     def delete(self, chat_id, user_id):
         return self.client.delete_item(self.pk(chat_id, user_id))
 
+    def delete_all_by_chat(self, chat_id):
+        "Batch delete all memberships of the chat, without touching its userCount. Returns count deleted."
+        keys = (self.pk(chat_id, user_id) for user_id in self.generate_user_ids_by_chat(chat_id))
+        return self.client.batch_delete(keys)
+
+    def get_memberships(self, memberships):
+        "Of the given (chat_id, user_id) pairs, return the set of those that exist, with one batch read"
+        keys = [self.pk(chat_id, user_id) for chat_id, user_id in memberships]
+        items = self.client.generate_batch_get_items(keys, projection_expression='partitionKey, sortKey')
+        return {(item['partitionKey'][len('chat/') :], item['sortKey'][len('member/') :]) for item in items}
+
+    def add_memberships(self, memberships, transact_update_user_count, now=None):
+        """
+        Bulk add (chat_id, user_id) memberships, skipping those that already exist. Each chat's userCount
+        is updated by one delta per transaction, from `transact_update_user_count(chat_id, delta)`.
+        Returns the memberships added.
+        """
+        now = now or pendulum.now('utc')
+        memberships = list(dict.fromkeys(memberships))
+        existing = self.get_memberships(memberships)
+        memberships = [membership for membership in memberships if membership not in existing]
+        return self.write_memberships(
+            memberships,
+            lambda chat_id, user_id: self.transact_add(chat_id, user_id, now=now),
+            transact_update_user_count,
+        )
+
+    def delete_memberships(self, memberships, transact_update_user_count):
+        """
+        Bulk delete (chat_id, user_id) memberships, skipping those that don't exist. Each chat's userCount
+        is updated by one delta per transaction, from `transact_update_user_count(chat_id, delta)`.
+        Returns the memberships deleted.
+        """
+        memberships = list(dict.fromkeys(memberships))
+        existing = self.get_memberships(memberships)
+        memberships = [membership for membership in memberships if membership in existing]
+        return self.write_memberships(
+            memberships,
+            self.transact_delete,
+            lambda chat_id, count: transact_update_user_count(chat_id, -count),
+        )
+
+    def write_memberships(self, memberships, transact_member, transact_count):
+        """
+        Write the memberships in transactions of up to `transact_chunk_size` members of the same chat
+        alongside a single update of that chat's userCount, running the transactions concurrently.
+        If a transaction is cancelled, for ex because another request changed one of the memberships
+        first, its memberships are retried one per transaction. Returns the memberships written.
+        """
+        chunks = []
+        for chat_id, group in itertools.groupby(sorted(memberships, key=lambda m: m[0]), key=lambda m: m[0]):
+            user_ids = [user_id for _, user_id in group]
+            for i in range(0, len(user_ids), self.transact_chunk_size):
+                chunks.append((chat_id, user_ids[i : i + self.transact_chunk_size]))
+
+        def write_chunk(chunk):
+            chat_id, user_ids = chunk
+            transacts = [transact_member(chat_id, user_id) for user_id in user_ids]
+            transacts.append(transact_count(chat_id, len(user_ids)))
+            try:
+                self.client.transact_write_items(transacts)
+                return [(chat_id, user_id) for user_id in user_ids]
+            except self.client.exceptions.TransactionCanceledException:
+                if len(user_ids) == 1:
+                    logger.warning(f'Unable to write chat membership of user `{user_ids[0]}` in chat `{chat_id}`')
+                    return []
+            return [membership for user_id in user_ids for membership in write_chunk((chat_id, [user_id]))]
+
+        return [membership for written in map_concurrently(write_chunk, chunks) for membership in written]
+
     def update_last_message_activity_at(self, chat_id, user_id, now):
         "Best effort to update last message activity at. Logs WARNING on failure."
         now_str = now.to_iso8601_string()
@@ -66,6 +143,63 @@ class ChatMemberDynamo:
         msg = f'Failed to update last message activity for chat `{chat_id}` and member `{user_id}` to `{now_str}`'
         return self.client.update_item(query_kwargs, failure_warning=msg)
 
+    def add_message_activity(self, chat_id, user_id, now, increment_messages_unviewed_count=True):
+        """
+        Record a new message for the member in a single write: update last message activity at and,
+        optionally, increment the member's messagesUnviewedCount. Safe to call concurrently.
+        Best effort, logs WARNING on failure.
+        """
+        now_str = now.to_iso8601_string()
+        query_kwargs = {
+            'Key': self.pk(chat_id, user_id),
+            'UpdateExpression': 'SET gsiK2SortKey = :gsik2sk',
+            'ExpressionAttributeValues': {':gsik2sk': 'chat/' + now_str},
+            'ConditionExpression': 'attribute_exists(partitionKey) AND NOT :gsik2sk < gsiK2SortKey',
+        }
+        if increment_messages_unviewed_count:
+            query_kwargs['UpdateExpression'] += ' ADD messagesUnviewedCount :one'
+            query_kwargs['ExpressionAttributeValues'][':one'] = 1
+        try:
+            return self.client.upsert_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            logger.warning(
+                f'Failed to update last message activity for chat `{chat_id}` and member `{user_id}` to `{now_str}`'
+            )
+
+        # there may have been more recent activity, in which case the message should still be counted
+        if increment_messages_unviewed_count:
+            query_kwargs = {
+                'Key': self.pk(chat_id, user_id),
+                'UpdateExpression': 'ADD messagesUnviewedCount :one',
+                'ExpressionAttributeValues': {':one': 1},
+                'ConditionExpression': 'attribute_exists(partitionKey)',
+            }
+            try:
+                return self.client.upsert_item(query_kwargs)
+            except self.client.exceptions.ConditionalCheckFailedException:
+                logger.warning(
+                    f'Failed to increment messagesUnviewedCount for chat `{chat_id}` and member `{user_id}`'
+                )
+
+    def set_read_sequence(self, chat_id, user_id, read_sequence):
+        """
+        Advance the member's read watermark to `read_sequence`, a chat messageSequence. Never moves
+        the watermark backwards. Returns True if anything was written. Safe to call concurrently.
+        """
+        query_kwargs = {
+            'Key': self.pk(chat_id, user_id),
+            'UpdateExpression': 'SET readSequence = :rs',
+            'ExpressionAttributeValues': {':rs': read_sequence},
+            'ConditionExpression': (
+                'attribute_exists(partitionKey) AND (attribute_not_exists(readSequence) OR readSequence < :rs)'
+            ),
+        }
+        try:
+            self.client.upsert_item(query_kwargs)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
     def increment_messages_unviewed_count(self, chat_id, user_id):
         return self.client.increment_count(self.pk(chat_id, user_id), 'messagesUnviewedCount')
 
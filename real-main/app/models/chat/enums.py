@@ -3,3 +3,12 @@ class ChatType:
     GROUP = 'GROUP'
 
     _ALL = (DIRECT, GROUP)
+
+
+class ChatUnreadMode:
+    # per-member messagesUnviewedCount, incremented per message & cleared on view
+    COUNTER = 'counter'
+    # per-member readSequence watermark compared against the chat's messageSequence
+    WATERMARK = 'watermark'
+
+    _ALL = (COUNTER, WATERMARK)
@@ -1,6 +1,7 @@
 import collections
 import json
 import logging
+import os
 
 import pendulum
 
@@ -10,18 +11,22 @@ from app.mixins.base import ManagerBase
 from app.mixins.flag.manager import FlagManagerMixin
 from app.mixins.view.manager import ViewManagerMixin
 from app.models.user.enums import UserStatus
+from app.utils import map_concurrently
 
 from .dynamo import ChatDynamo, ChatMemberDynamo
-from .enums import ChatType
+from .enums import ChatType, ChatUnreadMode
 from .exceptions import ChatException
 from .model import Chat
 
 logger = logging.getLogger()
 
+CHAT_UNREAD_MODE = os.environ.get('CHAT_UNREAD_MODE', ChatUnreadMode.COUNTER)
+
 
 class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
 
     item_type = 'chat'
+    unread_mode = CHAT_UNREAD_MODE
 
     def __init__(self, clients, managers=None):
         super().__init__(clients, managers=managers)
@@ -31,6 +36,9 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
         self.chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(
             clients, managers=managers
         )
+        self.relationship_manager = managers.get('relationship') or models.RelationshipManager(
+            clients, managers=managers
+        )
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
         self.clients = clients
@@ -59,6 +67,7 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
             'block_manager': self.block_manager,
             'chat_manager': self,
             'chat_message_manager': self.chat_message_manager,
+            'relationship_manager': self.relationship_manager,
             'user_manager': self.user_manager,
         }
         return Chat(chat_item, **kwargs) if chat_item else None
@@ -130,47 +139,87 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
 
     def on_user_delete_leave_all_chats(self, user_id, old_item):
         user = self.user_manager.init_user(old_item)
-        for chat_id in self.member_dynamo.generate_chat_ids_by_user(user_id):
-            chat = self.get_chat(chat_id)
-            if not chat:
-                logger.warning(f'Unable to find chat `{chat_id}` that user `{user_id}` is member of, ignoring')
-                continue
+        chat_ids = list(self.member_dynamo.generate_chat_ids_by_user(user_id))
+        chats = [
+            self.init_chat(item)
+            for item in self.dynamo.client.generate_batch_get_items([self.dynamo.pk(c) for c in chat_ids])
+        ]
+        for chat_id in set(chat_ids) - {chat.id for chat in chats}:
+            logger.warning(f'Unable to find chat `{chat_id}` that user `{user_id}` is member of, ignoring')
+
+        # direct chats are deleted outright, their memberships are cleaned up when the chat delete is processed
+        for chat in chats:
             if chat.type == ChatType.DIRECT:
                 chat.delete()
+
+        # leave all the group chats in bulk, then clean up or post the system message chat by chat
+        group_chats = {chat.id: chat for chat in chats if chat.type == ChatType.GROUP}
+        left = self.member_dynamo.delete_memberships(
+            [(chat_id, user_id) for chat_id in group_chats], self.dynamo.transact_update_user_count
+        )
+        for chat_id, _ in left:
+            chat = group_chats[chat_id]
+            chat.item['userCount'] -= 1
+            if chat.item['userCount'] <= 0:
+                chat.delete()
             else:
-                chat.leave(user)
+                self.chat_message_manager.add_system_message_left_group(chat_id, user)
 
     def record_views(self, chat_ids, user_id, viewed_at=None):
-        for chat_id, view_count in dict(collections.Counter(chat_ids)).items():
-            chat = self.get_chat(chat_id)
-            if not chat:
+        grouped_chat_ids = dict(collections.Counter(chat_ids))
+
+        # check existence of the chats and of the user's memberships with one batch read
+        keys = [self.dynamo.pk(chat_id) for chat_id in grouped_chat_ids]
+        keys += [self.member_dynamo.pk(chat_id, user_id) for chat_id in grouped_chat_ids]
+        items = self.dynamo.client.generate_batch_get_items(keys, projection_expression='partitionKey, sortKey')
+        found_keys = {(item['partitionKey'], item['sortKey']) for item in items}
+
+        view_counts = {}
+        for chat_id, view_count in grouped_chat_ids.items():
+            if tuple(self.dynamo.pk(chat_id).values()) not in found_keys:
                 logger.warning(f'Cannot record view(s) by user `{user_id}` on DNE chat `{chat_id}`')
-            elif not chat.is_member(user_id):
+            elif tuple(self.member_dynamo.pk(chat_id, user_id).values()) not in found_keys:
                 logger.warning(f'Cannot record view(s) by non-member user `{user_id}` on chat `{chat_id}`')
             else:
-                chat.record_view_count(user_id, view_count, viewed_at=viewed_at)
+                view_counts[chat_id] = view_count
+        self.record_view_counts(view_counts, user_id, viewed_at=viewed_at)
 
     def on_chat_message_add(self, message_id, new_item):
         message = self.chat_message_manager.init_chat_message(new_item)
         self.dynamo.update_last_message_activity_at(message.chat_id, message.created_at)
-        self.dynamo.increment_messages_count(message.chat_id)
+        chat_item = self.dynamo.increment_messages_count(message.chat_id)
+        count_unviewed = self.unread_mode == ChatUnreadMode.COUNTER
 
-        # for each memeber of the chat
+        # for each memeber of the chat, in a single write per member
         #   - update the last message activity timestamp (controls chat ordering)
-        #   - for everyone except the author, increment their 'messagesUnviewedCount'
-        for user_id in self.member_dynamo.generate_user_ids_by_chat(message.chat_id):
-            self.member_dynamo.update_last_message_activity_at(message.chat_id, user_id, message.created_at)
-            if user_id != message.user_id:
-                # Note that dynamo has no support for batch updates.
-                self.member_dynamo.increment_messages_unviewed_count(message.chat_id, user_id)
-                # TODO
-                # we can be in a state where the user manually dismissed a card, and this view does not
-                # change the user's overall count of chats with unread messages, but should still create a card
+        #   - for everyone except the author, increment their 'messagesUnviewedCount' (if counting)
+        # Note that dynamo has no support for batch updates, so the writes are done concurrently.
+        # TODO
+        # we can be in a state where the user manually dismissed a card, and this view does not
+        # change the user's overall count of chats with unread messages, but should still create a card
+        def add_message_activity(user_id):
+            self.member_dynamo.add_message_activity(
+                message.chat_id,
+                user_id,
+                message.created_at,
+                increment_messages_unviewed_count=(count_unviewed and user_id != message.user_id),
+            )
+
+        map_concurrently(add_message_activity, self.member_dynamo.generate_user_ids_by_chat(message.chat_id))
+
+        # the author has read everything up to their own message. Watermarks are maintained in
+        # both unread modes, so that the mode can be switched without a backfill
+        if message.user_id and chat_item:
+            self.member_dynamo.set_read_sequence(message.chat_id, message.user_id, chat_item['messageSequence'])
 
     def on_chat_message_delete(self, message_id, old_item):
         message = self.chat_message_manager.init_chat_message(old_item)
         self.dynamo.decrement_messages_count(message.chat_id)
 
+        # with watermarks, unviewed counts are bounded by messagesCount so there's nothing more to do
+        if self.unread_mode == ChatUnreadMode.WATERMARK:
+            return
+
         # for each memeber of the chat other than the author
         #   - delete any view record that exists directly on the message
         #   - determine if the message had status 'unviewed', and if so, then decrement the unviewed message counter
@@ -185,7 +234,45 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
     def sync_member_messages_unviewed_count(self, chat_id, new_item, old_item=None):
         if new_item.get('viewCount', 0) > (old_item or {}).get('viewCount', 0):
             user_id = new_item['sortKey'].split('/')[1]
-            self.member_dynamo.clear_messages_unviewed_count(chat_id, user_id)
+            if self.unread_mode == ChatUnreadMode.COUNTER:
+                self.member_dynamo.clear_messages_unviewed_count(chat_id, user_id)
+            chat_item = self.dynamo.get(chat_id)
+            if chat_item:
+                self.member_dynamo.set_read_sequence(chat_id, user_id, chat_item.get('messageSequence', 0))
+
+    def on_chat_member_add_init_read_sequence(self, chat_id, new_item):
+        "New members start with everything already in the chat as read, matching the unviewed counter"
+        user_id = new_item['sortKey'].split('/')[1]
+        chat_item = self.dynamo.get(chat_id)
+        if chat_item:
+            self.member_dynamo.set_read_sequence(chat_id, user_id, chat_item.get('messageSequence', 0))
+
+    def get_messages_unviewed_count(self, chat_item, member_item):
+        "Count of messages in the chat the member has not viewed, according to the unread mode"
+        if self.unread_mode == ChatUnreadMode.COUNTER:
+            return member_item.get('messagesUnviewedCount', 0)
+        # deleted messages past the watermark can't be told apart, so bound by what's left in the chat
+        unviewed_count = chat_item.get('messageSequence', 0) - member_item.get('readSequence', 0)
+        return max(0, min(unviewed_count, chat_item.get('messagesCount', 0)))
+
+    def get_chats_with_unviewed_messages_count(self, user_id):
+        """
+        Count the user's chats that have messages they have not viewed, from the chat and member items.
+        In COUNTER mode this is kept up to date on the user item as chatsWithUnviewedMessagesCount.
+        """
+        chat_ids = list(self.member_dynamo.generate_chat_ids_by_user(user_id))
+        keys = [self.dynamo.pk(chat_id) for chat_id in chat_ids] + [
+            self.member_dynamo.pk(chat_id, user_id) for chat_id in chat_ids
+        ]
+        chat_items, member_items = {}, {}
+        for item in self.dynamo.client.generate_batch_get_items(keys):
+            items = chat_items if item['sortKey'] == '-' else member_items
+            items[item['partitionKey']] = item
+        return sum(
+            1
+            for pk, member_item in member_items.items()
+            if pk in chat_items and self.get_messages_unviewed_count(chat_items[pk], member_item) > 0
+        )
 
     def on_flag_add(self, chat_id, new_item):
         chat_item = self.dynamo.increment_flag_count(chat_id)
@@ -197,8 +284,7 @@ class ChatManager(FlagManagerMixin, ViewManagerMixin, ManagerBase):
             chat.delete()
 
     def on_chat_delete_delete_memberships(self, chat_id, old_item):
-        for user_id in self.member_dynamo.generate_user_ids_by_chat(chat_id):
-            self.member_dynamo.delete(chat_id, user_id)
+        self.member_dynamo.delete_all_by_chat(chat_id)
 
     def validate_dating_match_chat(self, user_id, match_user_id):
         response_1 = json.loads(
@@ -71,7 +71,7 @@ class Chat(ViewModelMixin, FlagModelMixin):
         if self.type != ChatType.GROUP:
             raise ChatException(f'Cannot add users to non-GROUP chat `{self.id}`')
 
-        users = []
+        users = {}
         for user_id in set(user_ids):
 
             # make sure the user exists, is ACTIVE
@@ -98,25 +98,18 @@ class Chat(ViewModelMixin, FlagModelMixin):
                 if not self.chat_manager.validate_dating_match_chat(user_id, added_by_user.id):
                     continue
 
-            transacts = [
-                self.member_dynamo.transact_add(self.id, user_id, now=now),
-                self.dynamo.transact_increment_user_count(self.id),
-            ]
-            transact_exceptions = [
-                ChatException(f'Unable to add chat membership of user `{user_id} in chat `{self.id}`'),
-                Exception(f'Unable to increment Chat.userCount for chat `{self.id}`'),
-            ]
-            try:
-                self.dynamo.client.transact_write_items(transacts, transact_exceptions)
-            except ChatException:
-                # user is already in the chat, nothing to do
-                pass
-            else:
-                self.item['userCount'] = self.item.get('userCount', 0) + 1
-                users.append(user)
-
-        if users:
-            self.chat_message_manager.add_system_message_added_to_group(self.id, added_by_user, users, now=now)
+            users[user_id] = user
+
+        # users already in the chat are skipped
+        added = self.member_dynamo.add_memberships(
+            [(self.id, user_id) for user_id in users], self.dynamo.transact_update_user_count, now=now
+        )
+        if added:
+            self.item['userCount'] = self.item.get('userCount', 0) + len(added)
+            added_users = [users[user_id] for _, user_id in added]
+            self.chat_message_manager.add_system_message_added_to_group(
+                self.id, added_by_user, added_users, now=now
+            )
             self.item['messagesCount'] = self.item.get('messagesCount', 0) + 1
 
     def leave(self, user):
@@ -2,57 +2,72 @@ import logging
 
 import gql
 
+from app.utils import map_concurrently
+
 logger = logging.getLogger()
 
+# parsing is relatively expensive, so only do it once per process
+TRIGGER_CHAT_MESSAGE_NOTIFICATION = gql.gql(
+    '''
+    mutation TriggerChatMessageNotification ($input: ChatMessageNotificationInput!) {
+        triggerChatMessageNotification (input: $input) {
+            userId
+            type
+            message {
+                messageId
+                chat {
+                    chatId
+                }
+                authorUserId
+                author {
+                    userId
+                    username
+                    photo {
+                        url64p
+                    }
+                }
+                text
+                textTaggedUsers {
+                    tag
+                    user {
+                        userId
+                    }
+                }
+                createdAt
+                lastEditedAt
+            }
+        }
+    }
+'''
+)
+
 
 class ChatMessageAppSync:
     def __init__(self, appsync_client):
         self.client = appsync_client
 
     def trigger_notification(self, notification_type, user_id, message):
-        mutation = gql.gql(
-            '''
-            mutation TriggerChatMessageNotification ($input: ChatMessageNotificationInput!) {
-                triggerChatMessageNotification (input: $input) {
-                    userId
-                    type
-                    message {
-                        messageId
-                        chat {
-                            chatId
-                        }
-                        authorUserId
-                        author {
-                            userId
-                            username
-                            photo {
-                                url64p
-                            }
-                        }
-                        text
-                        textTaggedUsers {
-                            tag
-                            user {
-                                userId
-                            }
-                        }
-                        createdAt
-                        lastEditedAt
-                    }
-                }
+        self.trigger_notifications(notification_type, [user_id], message)
+
+    def trigger_notifications(self, notification_type, user_ids, message):
+        "Trigger the notification for each of the users, sending the mutations concurrently"
+        # inputs are built serially as they do dynamo reads through non-thread-safe clients
+        author_cache = {}
+        inputs = [
+            {
+                'userId': user_id,
+                'messageId': message.id,
+                'chatId': message.chat_id,
+                'authorUserId': message.user_id,
+                'authorEncoded': message.get_author_encoded(user_id, author_cache=author_cache),
+                'type': notification_type,
+                'text': message.item['text'],
+                'textTaggedUserIds': message.item.get('textTags', []),
+                'createdAt': message.item['createdAt'],
+                'lastEditedAt': message.item.get('lastEditedAt'),
             }
-        '''
+            for user_id in user_ids
+        ]
+        map_concurrently(
+            lambda input_obj: self.client.send(TRIGGER_CHAT_MESSAGE_NOTIFICATION, {'input': input_obj}), inputs
         )
-        input_obj = {
-            'userId': user_id,
-            'messageId': message.id,
-            'chatId': message.chat_id,
-            'authorUserId': message.user_id,
-            'authorEncoded': message.get_author_encoded(user_id),
-            'type': notification_type,
-            'text': message.item['text'],
-            'textTaggedUserIds': message.item.get('textTags', []),
-            'createdAt': message.item['createdAt'],
-            'lastEditedAt': message.item.get('lastEditedAt'),
-        }
-        self.client.send(mutation, {'input': input_obj})
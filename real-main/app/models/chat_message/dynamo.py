@@ -58,6 +58,15 @@ class ChatMessageDynamo:
     def delete_chat_message(self, message_id):
         return self.client.delete_item(self.pk(message_id))
 
+    def query_chat_messages_by_chat(self, chat_id, limit=None, next_token=None, reverse=False):
+        "Return a page of the chat's messages, ordered by creation, and a token for the next page"
+        query_kwargs = {
+            'KeyConditionExpression': Key('gsiA1PartitionKey').eq(f'chatMessage/{chat_id}'),
+            'IndexName': 'GSI-A1',
+            'ScanIndexForward': not reverse,
+        }
+        return self.client.query(query_kwargs, limit=limit, next_token=next_token)
+
     def generate_chat_messages_by_chat(self, chat_id, pks_only=False):
         query_kwargs = {
             'KeyConditionExpression': Key('gsiA1PartitionKey').eq(f'chatMessage/{chat_id}'),
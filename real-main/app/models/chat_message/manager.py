@@ -8,7 +8,6 @@ from app.clients import BadWordsClient
 from app.mixins.base import ManagerBase
 from app.mixins.flag.manager import FlagManagerMixin
 from app.models.chat.enums import ChatType
-from app.models.follower.enums import FollowStatus
 
 from .appsync import ChatMessageAppSync
 from .dynamo import ChatMessageDynamo
@@ -28,6 +27,9 @@ class ChatMessageManager(FlagManagerMixin, ManagerBase):
         managers['chat_message'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
+        self.relationship_manager = managers.get('relationship') or models.RelationshipManager(
+            clients, managers=managers
+        )
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
 
@@ -51,11 +53,41 @@ class ChatMessageManager(FlagManagerMixin, ManagerBase):
             'flag_dynamo': getattr(self, 'flag_dynamo', None),
             'block_manager': self.block_manager,
             'chat_manager': self.chat_manager,
+            'relationship_manager': self.relationship_manager,
             'user_manager': self.user_manager,
             'follower_manager': self.follower_manager,
         }
         return ChatMessage(item, **kwargs)
 
+    def get_chat_messages_page(self, chat_id, caller_user_id, limit=None, next_token=None, reverse=False):
+        """
+        Return a page of the chat's messages in the compact form served by Chat.messages. All distinct
+        authors on the page, and their relationships with the caller, are prefetched with batch gets,
+        skipping the relationship cache as the relationships decide which authors are hidden. Each
+        author is serialized once per page.
+        """
+        paginated = self.dynamo.query_chat_messages_by_chat(
+            chat_id, limit=limit, next_token=next_token, reverse=reverse
+        )
+        messages = [self.init_chat_message(item) for item in paginated['items']]
+        authors = self.user_manager.get_users(message.user_id for message in messages if message.user_id)
+        for message in messages:
+            message._author = authors.get(message.user_id)
+        relationship_memo = {}
+        self.relationship_manager.get_relationships(
+            caller_user_id, authors.keys(), memo=relationship_memo, use_cache=False
+        )
+        author_cache = {}
+        return {
+            'items': [
+                message.serialize_compact(
+                    caller_user_id, author_cache=author_cache, relationship_memo=relationship_memo
+                )
+                for message in messages
+            ],
+            'nextToken': paginated['nextToken'],
+        }
+
     def add_chat_message(self, message_id, text, chat_id, user_id, now=None):
         now = now or pendulum.now('utc')
         text_tags = self.user_manager.get_text_tags(text)
@@ -136,23 +168,16 @@ class ChatMessageManager(FlagManagerMixin, ManagerBase):
     def should_process_bad_words_detection(self, chat_type, chat_message_creator_id, user_ids):
         # if direct chat and they are 2 way follow, skip
         # if group chat and all users in the chat follow the user creating the message with the bad word, skip
-        for user_id in user_ids:
+        relationships = self.relationship_manager.get_relationships(chat_message_creator_id, user_ids)
+        for user_id, relationship in relationships.items():
             if user_id == chat_message_creator_id:
                 continue
 
-            follow = self.follower_manager.get_follow(user_id, chat_message_creator_id)
-            follow_back = self.follower_manager.get_follow(chat_message_creator_id, user_id)
-
             if chat_type == ChatType.DIRECT:
-                if (
-                    follow
-                    and follow_back
-                    and follow.status == FollowStatus.FOLLOWING
-                    and follow_back.status == FollowStatus.FOLLOWING
-                ):
+                if relationship.following and relationship.followed_by:
                     return False
             else:
-                if not follow or follow.status != FollowStatus.FOLLOWING:
+                if not relationship.followed_by:
                     return True
 
         return True if chat_type == ChatType.DIRECT else False
@@ -15,6 +15,7 @@ logger = logging.getLogger()
 class ChatMessage(FlagModelMixin):
 
     item_type = 'chatMessage'
+    compact_attributes = ('messageId', 'chatId', 'userId', 'text', 'textTags', 'createdAt', 'lastEditedAt')
 
     def __init__(
         self,
@@ -91,34 +92,79 @@ class ChatMessage(FlagModelMixin):
         This is useful when members of the chat have just been added and thus
         dynamo may not have converged yet.
         """
-        user_ids = user_ids or []
-        already_notified_user_ids = set([self.user_id])  # don't notify the msg author
-
-        for user_id in user_ids:
-            if user_id in already_notified_user_ids:
-                continue
-            self.appsync.trigger_notification(notification_type, user_id, self)
-            already_notified_user_ids.add(user_id)
-
-        for user_id in self.chat_manager.member_dynamo.generate_user_ids_by_chat(self.chat_id):
-            if user_id in already_notified_user_ids:
-                continue
-            self.appsync.trigger_notification(notification_type, user_id, self)
-
-    def get_author_encoded(self, user_id):
+        user_ids = [
+            *(user_ids or []),
+            *self.chat_manager.member_dynamo.generate_user_ids_by_chat(self.chat_id),
+        ]
+        # dedupe, maintaining order, and don't notify the msg author
+        user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id != self.user_id]
+        if user_ids:
+            self.appsync.trigger_notifications(notification_type, user_ids, self)
+
+    def get_author_cache_entry(self, user_id, author_cache=None, relationship_memo=None):
         """
-        Return the author in a serialized, stringified form if they exist and there is no
-        blocking relationship between the given user and the author.
+        Return the cache entry for the author as seen by the given user, or None if there is no author
+        or there is a blocking relationship between the two. Pass the same `author_cache` across calls
+        that make up one operation, ex a notification fan-out or a page of messages, so each author is
+        serialized once per relationship to the users seeing them. A `relationship_memo` prefetched
+        with RelationshipManager.get_relationships() saves looking up the relationships one by one.
         """
         if not self.author:
             return None
-        serialized = self.author.serialize(user_id)
-        if serialized['blockerStatus'] == BlockStatus.BLOCKING:
+        cache = {} if author_cache is None else author_cache
+
+        # block & follow statuses of a (author, user) pair are looked up once per cache, and never
+        # taken from the cross-invocation relationship cache, as they decide if the author is hidden
+        pair = (self.author.id, user_id)
+        if pair not in cache:
+            cache[pair] = None
+            relationship = self.relationship_manager.get_relationship(
+                user_id, self.author.id, memo=relationship_memo, use_cache=False
+            )
+            if not relationship.either_blocking:
+                block_status = BlockStatus.SELF if user_id == self.author.id else BlockStatus.NOT_BLOCKING
+                cache[pair] = (self.author.id, block_status, block_status, relationship.followed_status)
+        relationship = cache[pair]
+        if relationship is None:
             return None
-        serialized['blockedStatus'] = self.block_manager.get_block_status(user_id, self.author.id)
-        if serialized['blockedStatus'] == BlockStatus.BLOCKING:
+
+        if relationship not in cache:
+            _, blocker_status, blocked_status, followed_status = relationship
+            serialized = {
+                **self.author.item,
+                'blockerStatus': blocker_status,
+                'blockedStatus': blocked_status,
+                'followedStatus': followed_status,
+            }
+            cache[relationship] = {'serialized': serialized}
+        return cache[relationship]
+
+    def get_author_serialized(self, user_id, author_cache=None, relationship_memo=None):
+        "The author as seen by the given user, or None if hidden. Shared through the cache, do not mutate"
+        entry = self.get_author_cache_entry(
+            user_id, author_cache=author_cache, relationship_memo=relationship_memo
+        )
+        return entry['serialized'] if entry else None
+
+    def get_author_encoded(self, user_id, author_cache=None):
+        """
+        Return the author in a serialized, stringified form if they exist and there is no
+        blocking relationship between the given user and the author.
+        """
+        entry = self.get_author_cache_entry(user_id, author_cache=author_cache)
+        if not entry:
             return None
-        return json.dumps(serialized, cls=DecimalJsonEncoder)
+        if 'encoded' not in entry:
+            entry['encoded'] = json.dumps(entry['serialized'], cls=DecimalJsonEncoder)
+        return entry['encoded']
+
+    def serialize_compact(self, caller_user_id, author_cache=None, relationship_memo=None):
+        "Serialize to just the attributes of the ChatMessage graphql type, with the author filled in"
+        resp = {k: self.item[k] for k in self.compact_attributes if k in self.item}
+        resp['author'] = self.get_author_serialized(
+            caller_user_id, author_cache=author_cache, relationship_memo=relationship_memo
+        )
+        return resp
 
     def is_crowdsourced_forced_removal_criteria_met(self):
         # force-delete the chat message if at least 10% of the members of the chat have flagged it
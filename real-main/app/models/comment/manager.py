@@ -7,7 +7,6 @@ from app import models
 from app.clients import BadWordsClient, RealDatingClient
 from app.mixins.base import ManagerBase
 from app.mixins.flag.manager import FlagManagerMixin
-from app.models.follower.enums import FollowStatus
 from app.models.post.enums import PostType
 from app.models.user.enums import UserPrivacyStatus
 
@@ -29,6 +28,9 @@ class CommentManager(FlagManagerMixin, ManagerBase):
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+        self.relationship_manager = managers.get('relationship') or models.RelationshipManager(
+            clients, managers=managers
+        )
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
         self.real_dating_client = RealDatingClient()
@@ -50,6 +52,7 @@ class CommentManager(FlagManagerMixin, ManagerBase):
             'block_manager': self.block_manager,
             'follower_manager': self.follower_manager,
             'post_manager': self.post_manager,
+            'relationship_manager': self.relationship_manager,
             'user_manager': self.user_manager,
         }
         return Comment(comment_item, **kwargs)
@@ -65,18 +68,18 @@ class CommentManager(FlagManagerMixin, ManagerBase):
             raise CommentException(f'Comments are disabled on post `{post_id}`')
 
         if user_id != post.user_id:
+            relationship = self.relationship_manager.get_relationship(user_id, post.user_id, use_cache=False)
 
             # can't comment if there's a blocking relationship, either direction
-            if self.block_manager.is_blocked(post.user_id, user_id):
+            if relationship.blocked:
                 raise CommentException(f'Post owner `{post.user_id}` has blocked user `{user_id}`')
-            if self.block_manager.is_blocked(user_id, post.user_id):
+            if relationship.blocking:
                 raise CommentException(f'User `{user_id}` has blocked post owner `{post.user_id}`')
 
             # if post owner is private, must be a follower to comment
             poster = self.user_manager.get_user(post.user_id)
             if poster.item['privacyStatus'] == UserPrivacyStatus.PRIVATE:
-                follow = self.follower_manager.get_follow(user_id, post.user_id)
-                if not follow or follow.status != FollowStatus.FOLLOWING:
+                if not relationship.following:
                     msg = f'Post owner `{post.user_id}` is private and user `{user_id}` is not a follower'
                     raise CommentException(msg)
 
@@ -125,15 +128,8 @@ class CommentManager(FlagManagerMixin, ManagerBase):
         # if they are 2 way follow, skip bad words detection
         post = self.post_manager.get_post(comment.post_id)
         if comment.user_id != post.user_id:
-            follow = self.follower_manager.get_follow(comment.user_id, post.user_id)
-            follow_back = self.follower_manager.get_follow(post.user_id, comment.user_id)
-
-            if (
-                follow
-                and follow_back
-                and follow.status == FollowStatus.FOLLOWING
-                and follow_back.status == FollowStatus.FOLLOWING
-            ):
+            relationship = self.relationship_manager.get_relationship(comment.user_id, post.user_id)
+            if relationship.following and relationship.followed_by:
                 return
 
         # if detects bad words, force delete the comment
@@ -19,6 +19,13 @@ class FeedDynamo:
         item_generator = (self.item(feed_user_id, post_item) for post_item in post_item_generator)
         self.feed_client.batch_put_items(item_generator)
 
+    def add_posts_to_feeds(self, feed_user_ids, post_items):
+        "Add all the posts to all the feeds of the user_ids"
+        item_generator = (
+            self.item(feed_user_id, post_item) for feed_user_id in feed_user_ids for post_item in post_items
+        )
+        self.feed_client.batch_put_items(item_generator)
+
     def add_post_to_feeds(self, feed_user_id_generator, post_item):
         "Add the post to all the feeds of the generated user_ids, return a list of those user_ids"
         feed_user_ids = list(feed_user_id_generator)
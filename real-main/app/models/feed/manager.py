@@ -28,6 +28,10 @@ class FeedManager:
         post_item_generator = self.post_manager.dynamo.generate_posts_by_user(posted_by_user_id, completed=True)
         self.dynamo.add_posts_to_feed(feed_user_id, post_item_generator)
 
+    def add_users_posts_to_feeds(self, feed_user_ids, posted_by_user_id):
+        post_items = list(self.post_manager.dynamo.generate_posts_by_user(posted_by_user_id, completed=True))
+        self.dynamo.add_posts_to_feeds(feed_user_ids, post_items)
+
     def add_post_to_followers_feeds(self, followed_user_id, post_item):
         user_id_gen = itertools.chain(
             [followed_user_id], self.follower_manager.generate_follower_user_ids(followed_user_id)
@@ -35,14 +39,24 @@ class FeedManager:
         return self.dynamo.add_post_to_feeds(user_id_gen, post_item)
 
     def on_user_follow_status_change_sync_feed(self, followed_user_id, new_item=None, old_item=None):
+        if (new_item or {}).get('bulkSynced'):
+            return  # taken care of by on_followers_accepted_sync_feeds
         follower_user_id = (new_item or old_item)['followerUserId']
+        old_status = (old_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
         new_status = (new_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
+        if FollowStatus.FOLLOWING not in (old_status, new_status):
+            return  # their posts were never in the feed, nor should be now
         if new_status == FollowStatus.FOLLOWING:
             self.add_users_posts_to_feed(follower_user_id, followed_user_id)
         else:
             self.dynamo.delete_by_post_owner(follower_user_id, followed_user_id)
         self.appsync_client.fire_notification(follower_user_id, GqlNotificationType.USER_FEED_CHANGED)
 
+    def on_followers_accepted_sync_feeds(self, followed_user_id, new_item):
+        follower_user_ids = new_item['followerUserIds']
+        self.add_users_posts_to_feeds(follower_user_ids, followed_user_id)
+        self.appsync_client.fire_notifications(follower_user_ids, GqlNotificationType.USER_FEED_CHANGED)
+
     def on_post_status_change_sync_feed(self, post_id, new_item=None, old_item=None):
         posted_by_user_id = (new_item or old_item)['postedByUserId']
         new_status = (new_item or {}).get('postStatus')
@@ -50,5 +64,4 @@ class FeedManager:
             feed_user_ids = self.add_post_to_followers_feeds(posted_by_user_id, new_item)
         else:
             feed_user_ids = self.dynamo.delete_by_post(post_id)
-        for user_id in feed_user_ids:
-            self.appsync_client.fire_notification(user_id, GqlNotificationType.USER_FEED_CHANGED)
+        self.appsync_client.fire_notifications(feed_user_ids, GqlNotificationType.USER_FEED_CHANGED)
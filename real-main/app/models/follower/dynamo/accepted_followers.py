@@ -0,0 +1,41 @@
+import logging
+
+import pendulum
+
+logger = logging.getLogger()
+
+
+class AcceptedFollowersDynamo:
+    "Chunks of follow requests accepted in bulk, queued up for the stream handlers to finish processing"
+
+    chunk_size = 50
+
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def key(self, followed_user_id, accepted_at_str, chunk_index):
+        return {
+            'partitionKey': f'user/{followed_user_id}',
+            'sortKey': f'acceptedFollowers/{accepted_at_str}/{chunk_index}',
+        }
+
+    def add_all(self, followed_user_id, follower_user_ids, now=None):
+        "Add items covering the given followers in chunks of up to `chunk_size`. Returns count of items added."
+        now = now or pendulum.now('utc')
+        accepted_at_str = now.to_iso8601_string()
+        follower_user_ids = list(follower_user_ids)
+        item_generator = (
+            {
+                **self.key(followed_user_id, accepted_at_str, chunk_index),
+                'schemaVersion': 0,
+                'followedUserId': followed_user_id,
+                'followerUserIds': follower_user_ids[i : i + self.chunk_size],
+                'acceptedAt': accepted_at_str,
+            }
+            for chunk_index, i in enumerate(range(0, len(follower_user_ids), self.chunk_size))
+        )
+        return self.client.batch_put_items(item_generator)
+
+    def delete(self, item):
+        key = {k: item[k] for k in ('partitionKey', 'sortKey')}
+        return self.client.delete_item(key)
@@ -4,12 +4,17 @@ import logging
 import pendulum
 from boto3.dynamodb.conditions import Key
 
+from app.utils import map_concurrently
+
 from ..exceptions import FollowerAlreadyHasStatus
 
 logger = logging.getLogger()
 
 
 class FollowerDynamo:
+
+    transact_chunk_size = 25
+
     def __init__(self, dynamo_client):
         self.client = dynamo_client
 
@@ -19,6 +24,9 @@ class FollowerDynamo:
             'sortKey': f'follower/{follower_user_id}',
         }
 
+    def typed_pk(self, follower_user_id, followed_user_id):
+        return {k: {'S': v} for k, v in self.pk(follower_user_id, followed_user_id).items()}
+
     def get_following(self, follower_user_id, followed_user_id, strongly_consistent=False):
         pk = self.pk(follower_user_id, followed_user_id)
         return self.client.get_item(pk, ConsistentRead=strongly_consistent)
@@ -48,7 +56,9 @@ class FollowerDynamo:
         key = {k: follow_item[k] for k in ('partitionKey', 'sortKey')}
         query_kwargs = {
             'Key': key,
-            'UpdateExpression': 'SET followStatus = :status, gsiA1SortKey = :sk, gsiA2SortKey = :sk',
+            'UpdateExpression': (
+                'SET followStatus = :status, gsiA1SortKey = :sk, gsiA2SortKey = :sk REMOVE bulkSynced'
+            ),
             'ExpressionAttributeValues': {
                 ':status': follow_status,
                 ':sk': f'{follow_status}/{follow_item["followedAt"]}',
@@ -56,10 +66,69 @@ class FollowerDynamo:
         }
         return self.client.update_item(query_kwargs)
 
+    def update_following_statuses(self, follow_items, follow_status):
+        """
+        Update the status of the follows in transactions of up to `transact_chunk_size` run concurrently.
+        The follows are marked as `bulkSynced`, which tells the stream handlers that the side effects of the
+        status change are being taken care of in bulk. Follows whose status changed since they were read
+        are left as they are. Returns the updated follow items.
+        """
+
+        def transact_update(item):
+            return {
+                'Update': {
+                    'Key': self.typed_pk(item['followerUserId'], item['followedUserId']),
+                    'UpdateExpression': (
+                        'SET followStatus = :status, gsiA1SortKey = :sk, gsiA2SortKey = :sk, bulkSynced = :true'
+                    ),
+                    'ConditionExpression': 'followStatus = :old_status',
+                    'ExpressionAttributeValues': {
+                        ':status': {'S': follow_status},
+                        ':sk': {'S': f'{follow_status}/{item["followedAt"]}'},
+                        ':true': {'BOOL': True},
+                        ':old_status': {'S': item['followStatus']},
+                    },
+                }
+            }
+
+        def updated_item(item):
+            sort_key = f'{follow_status}/{item["followedAt"]}'
+            return {
+                **item,
+                'followStatus': follow_status,
+                'gsiA1SortKey': sort_key,
+                'gsiA2SortKey': sort_key,
+                'bulkSynced': True,
+            }
+
+        def update_chunk(items):
+            try:
+                self.client.transact_write_items([transact_update(item) for item in items])
+                return [updated_item(item) for item in items]
+            except self.client.exceptions.TransactionCanceledException:
+                if len(items) == 1:
+                    logger.warning(
+                        f'Unable to update status of follow of `{items[0]["followedUserId"]}` '
+                        + f'by `{items[0]["followerUserId"]}`'
+                    )
+                    return []
+            return [updated for item in items for updated in update_chunk([item])]
+
+        follow_items = list(follow_items)
+        chunks = [
+            follow_items[i : i + self.transact_chunk_size]
+            for i in range(0, len(follow_items), self.transact_chunk_size)
+        ]
+        return [updated for chunk in map_concurrently(update_chunk, chunks) for updated in chunk]
+
     def delete_following(self, follow_item):
         key = {k: follow_item[k] for k in ('partitionKey', 'sortKey')}
         return self.client.delete_item(key)
 
+    def delete_followings(self, follow_items):
+        "Batch delete the follows. Returns count of how many deletes requested."
+        return self.client.batch_delete_items(follow_items)
+
     def generate_followed_items(self, user_id, follow_status=None, keys_only=False):
         "Generate items that represent a followed of the given user (that the given user is the follower)"
         key_conditions = [Key('gsiA1PartitionKey').eq(f'follower/{user_id}')]
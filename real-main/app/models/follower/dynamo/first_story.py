@@ -39,3 +39,25 @@ class FirstStoryDynamo:
             self.key(posted_by_user_id, follower_user_id) for follower_user_id in follower_user_ids_generator
         )
         self.client.batch_delete_items(keys_generator)
+
+    def next_story_key(self, user_id):
+        return {'partitionKey': f'user/{user_id}', 'sortKey': 'nextStory'}
+
+    def set_next_story(self, post_item):
+        "Set the given post as the user's next story to expire"
+        item = {
+            **self.next_story_key(post_item['postedByUserId']),
+            'schemaVersion': 0,
+            'postId': post_item['postId'],
+            'expiresAt': post_item['expiresAt'],
+        }
+        self.client.table.put_item(Item=item)
+        return item
+
+    def delete_next_story(self, user_id):
+        return self.client.delete_item(self.next_story_key(user_id))
+
+    def generate_next_story_items(self, user_ids):
+        "Batch get the nextStory items of the given users. Order not maintained, users without one skipped"
+        keys = (self.next_story_key(user_id) for user_id in user_ids)
+        return self.client.generate_batch_get_items(keys, projection_expression='partitionKey, postId, expiresAt')
@@ -6,3 +6,11 @@ class FollowStatus:
     DENIED = 'DENIED'
 
     _ALL = (NOT_FOLLOWING, FOLLOWING, SELF, REQUESTED, DENIED)
+
+
+class FollowedStoriesMode:
+    # per-follower firstStory items, fanned out on every change to an author's first story
+    PUSH = 'push'
+    # computed at read time from each followed author's nextStory item. Fan out then skipped
+    # for authors with many followers, kept for the rest so their realtime notifications still fire
+    PULL = 'pull'
@@ -1,31 +1,50 @@
 import logging
+import os
 from itertools import chain
 
+import pendulum
+
 from app import models
 from app.models.user.enums import UserPrivacyStatus, UserStatus
-from app.utils import GqlNotificationType
+from app.utils import GqlNotificationType, TTLCache
 
+from .dynamo.accepted_followers import AcceptedFollowersDynamo
 from .dynamo.base import FollowerDynamo
 from .dynamo.first_story import FirstStoryDynamo
-from .enums import FollowStatus
+from .enums import FollowedStoriesMode, FollowStatus
 from .exceptions import FollowerAlreadyExists, FollowerException
 from .model import Follower
 
 logger = logging.getLogger()
 
+FOLLOWED_STORIES_MODE = os.environ.get('FOLLOWED_STORIES_MODE', FollowedStoriesMode.PUSH)
+
 
 class FollowerManager:
+
+    followed_stories_mode = FOLLOWED_STORIES_MODE
+    # in pull mode, authors with more followers than this don't fan out their first story
+    fan_out_max_follower_count = 1000
+
     def __init__(self, clients, managers=None):
         managers = managers or {}
         managers['follower'] = self
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+        self.relationship_manager = managers.get('relationship') or models.RelationshipManager(
+            clients, managers=managers
+        )
+        self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
         self.clients = clients
+        # user id -> expiresAt of their next story to expire, or None if they have no story. Stories are
+        # refreshed by the stream processor, not the process reading them, so the ttl bounds staleness
+        self.next_story_expires_ats = TTLCache(ttl=60, maxsize=100000)
         if 'appsync' in clients:
             self.appsync_client = clients['appsync']
         if 'dynamo' in clients:
             self.dynamo = FollowerDynamo(clients['dynamo'])
+            self.accepted_followers_dynamo = AcceptedFollowersDynamo(clients['dynamo'])
             self.first_story_dynamo = FirstStoryDynamo(clients['dynamo'])
 
     def get_follow(self, follower_user_id, followed_user_id, strongly_consistent=False):
@@ -35,7 +54,9 @@ class FollowerManager:
         return self.init_follow(item) if item else None
 
     def init_follow(self, follow_item):
-        return Follower(follow_item, self.dynamo, self.first_story_dynamo)
+        return Follower(
+            follow_item, self.dynamo, self.first_story_dynamo, relationship_manager=self.relationship_manager
+        )
 
     def get_follow_status(self, follower_user_id, followed_user_id):
         if follower_user_id == followed_user_id:
@@ -79,17 +100,31 @@ class FollowerManager:
             else FollowStatus.FOLLOWING
         )
         follow_item = self.dynamo.add_following(follower_user.id, followed_user.id, follow_status)
+        self.relationship_manager.invalidate(follower_user.id, followed_user.id)
         return self.init_follow(follow_item)
 
     def accept_all_requested_follow_requests(self, followed_user_id):
-        for item in self.dynamo.generate_follower_items(followed_user_id, FollowStatus.REQUESTED):
-            # can't batch this: dynamo doesn't support batch updates
-            self.init_follow(item).accept()
+        """
+        Accept all the follow requests to the user in bulk. The follows are updated in batched transactions
+        and the followed user's counts are updated once. The rest of the work that follows from each
+        acceptance - feed backfill, first story and followedCount - is queued up in chunks to be done in
+        the background by the stream handlers.
+        """
+        follow_items = self.dynamo.generate_follower_items(followed_user_id, FollowStatus.REQUESTED)
+        accepted_items = self.dynamo.update_following_statuses(follow_items, FollowStatus.FOLLOWING)
+        if not accepted_items:
+            return
+        follower_user_ids = [item['followerUserId'] for item in accepted_items]
+        for follower_user_id in follower_user_ids:
+            self.relationship_manager.invalidate(follower_user_id, followed_user_id)
+        self.user_manager.dynamo.move_followers_requested_to_follower_count(followed_user_id, len(accepted_items))
+        self.accepted_followers_dynamo.add_all(followed_user_id, follower_user_ids)
 
     def delete_all_denied_follow_requests(self, followed_user_id):
-        for item in self.dynamo.generate_follower_items(followed_user_id, FollowStatus.DENIED):
-            # TODO: do as batch write
-            self.dynamo.delete_following(item)
+        keys = list(self.dynamo.generate_follower_items(followed_user_id, FollowStatus.DENIED, keys_only=True))
+        self.dynamo.delete_followings(keys)
+        for key in keys:
+            self.relationship_manager.invalidate(key['sortKey'].split('/')[1], followed_user_id)
 
     def refresh_first_story(self, story_prev=None, story_now=None):
         "Refresh the firstStory items, if needed, after the a story has changed."
@@ -117,6 +152,15 @@ class FollowerManager:
             None,
         )
 
+        if ffs_prev != ffs_now:
+            if ffs_now:
+                self.first_story_dynamo.set_next_story(ffs_now)
+            else:
+                self.first_story_dynamo.delete_next_story(user_id)
+
+        if not self.fans_out_first_story(user_id):
+            return
+
         follower_uids_generator = self.generate_follower_user_ids(user_id, follow_status=FollowStatus.FOLLOWING)
         if ffs_prev and not ffs_now:
             # a story was deleted, and there are no more stories to take its place as ffs
@@ -134,6 +178,55 @@ class FollowerManager:
         if not ffs_prev and not ffs_now:
             raise AssertionError('Should be unreachable condition')
 
+    def fans_out_first_story(self, user_id):
+        "Should changes to the user's first story be written out to each of their followers?"
+        if self.followed_stories_mode != FollowedStoriesMode.PULL:
+            return True
+        user = self.user_manager.get_user(user_id)
+        return bool(user) and user.item.get('followerCount', 0) <= self.fan_out_max_follower_count
+
+    def get_next_story_expires_ats(self, user_ids):
+        "Return a dict of user id to the expiresAt of their next story to expire, for those that have one"
+        expires_ats, missed_user_ids = {}, []
+        for user_id in user_ids:
+            expires_at = self.next_story_expires_ats.get(user_id, TTLCache.missing)
+            if expires_at is TTLCache.missing:
+                missed_user_ids.append(user_id)
+            elif expires_at:
+                expires_ats[user_id] = expires_at
+
+        fetched = {
+            item['partitionKey'].split('/')[1]: item['expiresAt']
+            for item in self.first_story_dynamo.generate_next_story_items(missed_user_ids)
+        }
+        for user_id in missed_user_ids:
+            self.next_story_expires_ats.set(user_id, fetched.get(user_id))
+        return {**expires_ats, **fetched}
+
+    def get_followed_users_with_stories(self, follower_user_id, limit=20, next_token=None, now=None):
+        """
+        Page through the users the given user follows that have a story expiring within the next day,
+        ordered by when their next story expires. Computed at read time from each followed user's
+        nextStory item, rather than from our firstStory items.
+        """
+        now = now or pendulum.now('utc')
+        min_expires_at = now.to_iso8601_string()
+        max_expires_at = (now + pendulum.duration(days=1)).to_iso8601_string()
+        followed_user_ids = self.generate_followed_user_ids(
+            follower_user_id, follow_status=FollowStatus.FOLLOWING
+        )
+        expires_ats = {
+            user_id: expires_at
+            for user_id, expires_at in self.get_next_story_expires_ats(followed_user_ids).items()
+            if min_expires_at < expires_at < max_expires_at
+        }
+        user_ids = sorted(expires_ats, key=lambda user_id: (expires_ats[user_id], user_id))
+        offset = int(next_token or 0)
+        return {
+            'items': user_ids[offset : offset + limit],
+            'nextToken': str(offset + limit) if offset + limit < len(user_ids) else None,
+        }
+
     def on_first_story_post_id_change_fire_gql_notifications(self, user_id, new_item=None, old_item=None):
         followed_user_id, follower_user_id = self.first_story_dynamo.parse_key(new_item or old_item)
         kwargs = {'followedUserId': followed_user_id}
@@ -146,17 +239,33 @@ class FollowerManager:
         )
 
     def on_user_follow_status_change_sync_first_story(self, user_id, new_item=None, old_item=None):
+        if (new_item or {}).get('bulkSynced'):
+            return  # taken care of by on_followers_accepted_sync_first_story
+        old_status = (old_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
         new_status = (new_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
+        if FollowStatus.FOLLOWING not in (old_status, new_status):
+            return  # never had our first story, nor should now
         followed_user_id = user_id
         follower_user_id = (new_item or old_item)['sortKey'].split('/')[1]
 
-        if new_status == FollowStatus.FOLLOWING:
+        if new_status == FollowStatus.FOLLOWING and self.fans_out_first_story(followed_user_id):
             post = self.post_manager.dynamo.get_next_completed_post_to_expire(followed_user_id)
             if post:
                 self.first_story_dynamo.set_all([follower_user_id], post)
         else:
             self.first_story_dynamo.delete_all([follower_user_id], followed_user_id)
 
+    def on_followers_accepted_sync_first_story(self, user_id, new_item):
+        if not self.fans_out_first_story(user_id):
+            return
+        post = self.post_manager.dynamo.get_next_completed_post_to_expire(user_id)
+        if post:
+            self.first_story_dynamo.set_all(new_item['followerUserIds'], post)
+
+    def on_followers_accepted_delete(self, user_id, new_item):
+        "Registered after all other handlers of the chunk, which is then done with"
+        self.accepted_followers_dynamo.delete(new_item)
+
     def on_user_delete_delete_follower_items(self, user_id, old_item):
         key_generator = chain(
             self.dynamo.generate_follower_items(user_id, keys_only=True),
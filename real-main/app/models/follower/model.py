@@ -7,9 +7,10 @@ logger = logging.getLogger()
 
 
 class Follower:
-    def __init__(self, follow_item, follow_dynamo, first_story_dynamo):
+    def __init__(self, follow_item, follow_dynamo, first_story_dynamo, relationship_manager=None):
         self.dynamo = follow_dynamo
         self.first_story_dynamo = first_story_dynamo
+        self.relationship_manager = relationship_manager
         self.followed_user_id = follow_item['followedUserId']
         self.follower_user_id = follow_item['followerUserId']
         self.item = follow_item
@@ -28,6 +29,7 @@ class Follower:
             raise FollowerAlreadyHasStatus(self.follower_user_id, self.followed_user_id, FollowStatus.DENIED)
         self.dynamo.delete_following(self.item)
         self.item['followStatus'] = FollowStatus.NOT_FOLLOWING
+        self.invalidate_relationship()
         return self
 
     def accept(self):
@@ -35,6 +37,7 @@ class Follower:
         if self.status == FollowStatus.FOLLOWING:
             raise FollowerAlreadyHasStatus(self.follower_user_id, self.followed_user_id, FollowStatus.FOLLOWING)
         self.item = self.dynamo.update_following_status(self.item, FollowStatus.FOLLOWING)
+        self.invalidate_relationship()
         return self
 
     def deny(self):
@@ -42,4 +45,9 @@ class Follower:
         if self.status == FollowStatus.DENIED:
             raise FollowerAlreadyHasStatus(self.follower_user_id, self.followed_user_id, FollowStatus.DENIED)
         self.item = self.dynamo.update_following_status(self.item, FollowStatus.DENIED)
+        self.invalidate_relationship()
         return self
+
+    def invalidate_relationship(self):
+        if self.relationship_manager:
+            self.relationship_manager.invalidate(self.follower_user_id, self.followed_user_id)
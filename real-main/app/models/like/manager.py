@@ -20,6 +20,9 @@ class LikeManager:
         self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+        self.relationship_manager = managers.get('relationship') or models.RelationshipManager(
+            clients, managers=managers
+        )
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
 
         self.clients = clients
@@ -34,20 +37,21 @@ class LikeManager:
         return Like(like_item, self.dynamo, post_manager=self.post_manager)
 
     def like_post(self, user, post, like_status, now=None):
+        relationship = self.relationship_manager.get_relationship(user.id, post.user_id, use_cache=False)
+
         # can't like a post of a user that has blocked us
-        if self.block_manager.is_blocked(post.user_id, user.id):
+        if relationship.blocked:
             raise LikeException(f'User has been blocked by owner of post `{post.id}`')
 
         # can't like a post of a user we have blocked
-        if self.block_manager.is_blocked(user.id, post.user_id):
+        if relationship.blocking:
             raise LikeException(f'User has blocked owner of post `{post.id}`')
 
         # if the post is from a private user (other than ourselves) then we must be a follower to like the post
         posted_by_user = self.user_manager.get_user(post.user_id)
         if user.id != posted_by_user.id:
             if posted_by_user.item['privacyStatus'] != UserPrivacyStatus.PUBLIC:
-                follow = self.follower_manager.get_follow(user.id, posted_by_user.id)
-                if not follow or follow.status != FollowStatus.FOLLOWING:
+                if not relationship.following:
                     raise LikeException(f'User does not have access to post `{post.id}`')
 
         if post.status != PostStatus.COMPLETED:
@@ -67,25 +71,35 @@ class LikeManager:
         attr = 'onymousLikeCount' if like_status == LikeStatus.ONYMOUSLY_LIKED else 'anonymousLikeCount'
         post.item[attr] = post.item.get(attr, 0) + 1
 
+    def dislike_all(self, like_items):
+        """
+        Dislike the likes, or just their keys, in bulk with concurrent batch deletes. The posts' like
+        counts are decremented from the stream, by the likes actually removed, with one write per post
+        per batch of stream records. Returns the number of likes disliked.
+        """
+        like_items = list(like_items)
+        self.dynamo.delete_likes(like_items)
+        return len(like_items)
+
     def dislike_all_of_post(self, post_id):
         "Dislike all likes of a post"
-        for like_item in self.dynamo.generate_of_post(post_id):
-            self.init_like(like_item).dislike()
+        self.dislike_all(self.dynamo.generate_of_post(post_id))
 
     def dislike_all_by_user_from_user(self, liked_by_user_id, posted_by_user_id):
         "Dislike all likes by one user on posts from another user"
-        for like_pk in self.dynamo.generate_pks_by_liked_by_for_posted_by(liked_by_user_id, posted_by_user_id):
-            liked_by_user_id, post_id = self.dynamo.parse_pk(like_pk)
-            self.get_like(liked_by_user_id, post_id).dislike()
+        like_pks = self.dynamo.generate_pks_by_liked_by_for_posted_by(liked_by_user_id, posted_by_user_id)
+        self.dislike_all(like_pks)
 
     def on_user_delete_dislike_all_by_user(self, user_id, old_item):
         "Dislike all likes by a user"
-        for like_item in self.dynamo.generate_by_liked_by(user_id):
-            self.init_like(like_item).dislike()
+        self.dislike_all(self.dynamo.generate_by_liked_by(user_id))
 
     def on_user_follow_status_change_sync_likes(self, user_id, new_item=None, old_item=None):
         "For consistency, delete likes of posts of private users by non-followers"
+        old_status = (old_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
         new_status = (new_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
+        if old_status == FollowStatus.DENIED:
+            return  # likes were already deleted when denied, and can't have been added since
         followed_user_id = user_id
         follower_user_id = (new_item or old_item)['sortKey'].split('/')[1]
 
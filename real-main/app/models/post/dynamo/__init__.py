@@ -1,5 +1,6 @@
-__all__ = ['PostDynamo', 'PostImageDynamo', 'PostOriginalMetadataDynamo']
+__all__ = ['PostDynamo', 'PostImageBlobDynamo', 'PostImageDynamo', 'PostOriginalMetadataDynamo']
 
 from .base import PostDynamo
 from .image import PostImageDynamo
+from .image_blob import PostImageBlobDynamo
 from .original_metadata import PostOriginalMetadataDynamo
@@ -25,6 +25,11 @@ class PostDynamo:
     def get_post(self, post_id, strongly_consistent=False):
         return self.client.get_item(self.pk(post_id), ConsistentRead=strongly_consistent)
 
+    def batch_get_posts(self, post_ids):
+        "Order *not* maintained, post ids that don't match a post are skipped"
+        keys = [self.pk(post_id) for post_id in post_ids]
+        return list(self.client.generate_batch_get_items(keys))
+
     def delete_post(self, post_id):
         return self.client.delete_item(self.pk(post_id))
 
@@ -280,6 +285,16 @@ class PostDynamo:
         }
         return self.client.update_item(query_kwargs)
 
+    def set_image_blob_checksum(self, post_id, checksum):
+        "Set to None to point the post back at its own image renditions"
+        query_kwargs = {'Key': self.pk(post_id)}
+        if checksum:
+            query_kwargs['UpdateExpression'] = 'SET imageBlobChecksum = :ibc'
+            query_kwargs['ExpressionAttributeValues'] = {':ibc': checksum}
+        else:
+            query_kwargs['UpdateExpression'] = 'REMOVE imageBlobChecksum'
+        return self.client.update_item(query_kwargs)
+
     def set_is_verified(self, post_id, is_verified, hidden=False):
         query_kwargs = {
             'Key': self.pk(post_id),
@@ -366,6 +381,24 @@ class PostDynamo:
     def decrement_anonymous_like_count(self, post_id):
         return self.client.decrement_count(self.pk(post_id), 'anonymousLikeCount')
 
+    def decrement_like_counts(self, post_id, onymous_count=0, anonymous_count=0):
+        "Best-effort decrement of the like counts in one write. Logs a WARNING, decrementing neither, on underflow"
+        counts = {'onymousLikeCount': onymous_count, 'anonymousLikeCount': anonymous_count}
+        counts = {attr: count for attr, count in counts.items() if count}
+        if not counts:
+            return None
+        query_kwargs = {
+            'Key': self.pk(post_id),
+            'UpdateExpression': 'ADD ' + ', '.join(f'{attr} :neg_{attr}' for attr in counts),
+            'ExpressionAttributeValues': {
+                **{f':{attr}': count for attr, count in counts.items()},
+                **{f':neg_{attr}': -count for attr, count in counts.items()},
+            },
+            'ConditionExpression': ' AND '.join(f'{attr} >= :{attr}' for attr in counts),
+        }
+        msg = f'Failed to decrement {", ".join(counts)} for post `{post_id}`'
+        return self.client.update_item(query_kwargs, failure_warning=msg)
+
     def increment_comment_count(self, post_id, viewed=False):
         query_kwargs = {
             'Key': self.pk(post_id),
@@ -0,0 +1,64 @@
+import logging
+
+logger = logging.getLogger()
+
+
+class PostImageBlobDynamo:
+    """
+    Content-addressed image storage. One item per distinct image checksum, counting
+    the references held on the renditions stored under that checksum in S3.
+    """
+
+    schema_version = 0
+
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def pk(self, checksum):
+        return {'partitionKey': f'imageBlob/{checksum}', 'sortKey': '-'}
+
+    def get(self, checksum, strongly_consistent=False):
+        return self.client.get_item(self.pk(checksum), ConsistentRead=strongly_consistent)
+
+    def delete(self, checksum):
+        return self.client.delete_item(self.pk(checksum))
+
+    def acquire(self, checksum):
+        """
+        Add a reference to the blob, creating it if needed. Returns the blob item as it was
+        before the reference was added ({} if it was just created), or None if the blob is
+        in the middle of being deleted and so can not be referenced.
+        """
+        kwargs = {
+            'Key': self.pk(checksum),
+            'UpdateExpression': 'ADD refCount :one SET schemaVersion = if_not_exists(schemaVersion, :sv)',
+            'ConditionExpression': 'attribute_not_exists(deleting)',
+            'ExpressionAttributeValues': {':one': 1, ':sv': self.schema_version},
+            'ReturnValues': 'ALL_OLD',
+        }
+        try:
+            return self.client.table.update_item(**kwargs).get('Attributes') or {}
+        except self.client.exceptions.ConditionalCheckFailedException:
+            logger.warning(f'Image blob `{checksum}` is being deleted, refusing new reference')
+            return None
+
+    def release(self, checksum):
+        "Remove a reference to the blob. Best effort, logs WARNING on failure"
+        return self.client.decrement_count(self.pk(checksum), 'refCount')
+
+    def set_renditions(self, checksum, height, width, colors=None):
+        "Mark the renditions of the blob as complete in S3"
+        attributes = {'height': height, 'width': width}
+        if colors:
+            attributes['colors'] = colors
+        return self.client.set_attributes(self.pk(checksum), **attributes)
+
+    def set_deleting(self, checksum):
+        "Claim an unreferenced blob for deletion. Returns None if it is referenced or already claimed"
+        query_kwargs = {
+            'Key': self.pk(checksum),
+            'UpdateExpression': 'SET deleting = :true',
+            'ConditionExpression': 'refCount = :zero AND attribute_not_exists(deleting)',
+            'ExpressionAttributeValues': {':true': True, ':zero': 0},
+        }
+        return self.client.update_item(query_kwargs, failure_warning=f'Image blob `{checksum}` not deletable')
@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 
 import argparse
+import itertools
 import logging
+import statistics
 import sys
+import time
 
 # relative imports don't work from scripts, so depending on 'text_image' to be globally unique
 # https://stackoverflow.com/a/16985066
@@ -21,17 +24,56 @@ def parse_args():
         help='file to write output image to',
     )
     parser.add_argument('-d', dest='debug', action='store_true', help='turn extra logging on')
+    parser.add_argument(
+        '-b',
+        dest='benchmark_rounds',
+        metavar='rounds',
+        type=int,
+        default=0,
+        help='time text layout and rendering of captions of 10 to 2000 words built from the text',
+    )
     args = parser.parse_args()
-    return args.output_file, args.text, args.debug
+    return args.output_file, args.text, args.debug, args.benchmark_rounds
+
+
+def time_it(func, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def benchmark(text, rounds):
+    token_spacing, line_spacing, line_height = text_image.get_reference_spacing()
+    words = text.split()
+    for word_cnt in (10, 100, 500, 1000, 2000):
+        tokens = list(itertools.islice(itertools.cycle(words), word_cnt))
+        token_widths = [text_image.measure_text_width(token) for token in tokens]
+        caption = ' '.join(tokens)
+        wrap_timings = time_it(
+            lambda: text_image.rectangle_wrap(
+                tokens, token_widths, token_spacing, line_spacing, line_height, 16 / 9
+            ),
+            rounds,
+        )
+        draw_timings = time_it(lambda: text_image.draw_text_image(caption, text_image.K4_DIMENSIONS), rounds)
+        print(
+            f'{word_cnt:>5} words: rectangle_wrap median {statistics.median(wrap_timings):8.2f}ms, '
+            + f'4k render median {statistics.median(draw_timings):8.2f}ms over {rounds} rounds'
+        )
 
 
 def main():
-    output_file, text, debug = parse_args()
+    output_file, text, debug, benchmark_rounds = parse_args()
     dimensions_480p = (854, 480)
     if debug:
         logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
-    output_buf = text_image.generate_text_image(text, dimensions_480p)
-    output_file.write(output_buf.read())
+    if benchmark_rounds:
+        benchmark(text, benchmark_rounds)
+    output_image = text_image.generate_text_image(text, dimensions_480p)
+    output_image.save(output_file, format='JPEG', quality=100)
 
 
 if __name__ == '__main__':
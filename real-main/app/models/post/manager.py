@@ -11,14 +11,15 @@ from app.mixins.flag.manager import FlagManagerMixin
 from app.mixins.trending.manager import TrendingManagerMixin
 from app.mixins.view.enums import ViewType
 from app.mixins.view.manager import ViewManagerMixin
+from app.mixins.view.sketch_dynamo import ViewerSketchDynamo
 from app.models.like.enums import LikeStatus
 from app.models.user.enums import SubscriptionGrantCode, UserPrivacyStatus, UserSubscriptionLevel
-from app.utils import GqlNotificationType
+from app.utils import GqlNotificationType, HyperLogLog, image_size, map_concurrently
 
-from .dynamo import PostDynamo, PostImageDynamo, PostOriginalMetadataDynamo
+from .dynamo import PostDynamo, PostImageBlobDynamo, PostImageDynamo, PostOriginalMetadataDynamo
 from .enums import PostStatus, PostType
 from .exceptions import PostException
-from .model import Post
+from .model import Post, get_image_blob_path
 
 logger = logging.getLogger()
 
@@ -38,6 +39,9 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         self.comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
         self.like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
+        self.relationship_manager = managers.get('relationship') or models.RelationshipManager(
+            clients, managers=managers
+        )
         self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
         self.appstore_manager = managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
 
@@ -49,7 +53,9 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         if 'dynamo' in clients:
             self.dynamo = PostDynamo(clients['dynamo'])
             self.image_dynamo = PostImageDynamo(clients['dynamo'])
+            self.image_blob_dynamo = PostImageBlobDynamo(clients['dynamo'])
             self.original_metadata_dynamo = PostOriginalMetadataDynamo(clients['dynamo'])
+            self.viewer_sketch_dynamo = ViewerSketchDynamo(self.item_type, clients['dynamo'])
 
     def get_model(self, item_id, strongly_consistent=False):
         return self.get_post(item_id, strongly_consistent=strongly_consistent)
@@ -62,6 +68,7 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         kwargs = {
             'post_dynamo': getattr(self, 'dynamo', None),
             'post_image_dynamo': getattr(self, 'image_dynamo', None),
+            'post_image_blob_dynamo': getattr(self, 'image_blob_dynamo', None),
             'post_original_metadata_dynamo': getattr(self, 'original_metadata_dynamo', None),
             'flag_dynamo': getattr(self, 'flag_dynamo', None),
             'trending_dynamo': getattr(self, 'trending_dynamo', None),
@@ -76,6 +83,7 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
             'follower_manager': self.follower_manager,
             'like_manager': self.like_manager,
             'post_manager': self,
+            'relationship_manager': self.relationship_manager,
             'user_manager': self.user_manager,
         }
         return Post(post_item, **kwargs) if post_item else None
@@ -205,22 +213,98 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
 
         return post
 
+    def get_image_blob_path(self, checksum, size):
+        return get_image_blob_path(checksum, size)
+
+    def acquire_image_blob(self, checksum):
+        "Take an additional reference on an existing image blob. Returns False if the blob can't be referenced"
+        blob_item = self.image_blob_dynamo.acquire(checksum)
+        if blob_item is not None and 'height' not in blob_item:
+            # blob didn't exist or isn't finished, so referencing it is no use
+            self.release_image_blob(checksum)
+            return False
+        return blob_item is not None
+
+    def release_image_blob(self, checksum):
+        "Drop a reference to an image blob, deleting its renditions once nothing references it"
+        blob_item = self.image_blob_dynamo.release(checksum)
+        if not blob_item or blob_item.get('refCount', 0) > 0:
+            return
+        if not self.image_blob_dynamo.set_deleting(checksum):
+            return
+        paths = [get_image_blob_path(checksum, size) for size in image_size.JPEGS]
+        self.clients['s3_uploads'].delete_objects(paths)
+        self.image_blob_dynamo.delete(checksum)
+
     def record_views(self, post_ids, user_id, viewed_at=None, view_type=None):
         grouped_post_ids = dict(collections.Counter(post_ids))
         if not grouped_post_ids:
             return
 
-        results = []
+        # read all the posts, then all the original posts they point to, in batches
+        post_items = {item['postId']: item for item in self.dynamo.batch_get_posts(grouped_post_ids)}
+        original_post_ids = {item['originalPostId'] for item in post_items.values() if 'originalPostId' in item}
+        original_post_ids -= post_items.keys()
+        post_items.update((item['postId'], item) for item in self.dynamo.batch_get_posts(original_post_ids))
+
+        view_counts = collections.Counter()
         for post_id, view_count in grouped_post_ids.items():
-            post = self.get_post(post_id)
-            if not post:
+            if post_id not in post_items:
                 logger.warning(f'Cannot record view(s) by user `{user_id}` on DNE post `{post_id}`')
                 continue
-            results.append(post.record_view_count(user_id, view_count, viewed_at=viewed_at, view_type=view_type))
 
-        if any(results):
+            # record user's views of their own posts, but don't increment any counters about it
+            # their view will be filtered out when looking at Post.viewedBy
+            viewed_post_ids = [post_id]
+
+            # If this is a non-original post, count this like a view of the original post as well
+            original_post_id = post_items[post_id].get('originalPostId')
+            if original_post_id and original_post_id in post_items:
+                viewed_post_ids.append(original_post_id)
+
+            for viewed_post_id in viewed_post_ids:
+                if post_items[viewed_post_id]['postStatus'] != PostStatus.COMPLETED:
+                    msg = f'Cannot record views by user `{user_id}` on non-COMPLETED post `{viewed_post_id}`'
+                    logger.warning(msg)
+                    break
+                view_counts[viewed_post_id] += view_count
+
+        # the writes are blind upserts, issued concurrently
+        viewed_at = viewed_at or pendulum.now('utc')
+        last_viewed_ats = self.record_view_counts(view_counts, user_id, viewed_at=viewed_at, view_type=view_type)
+        viewed_post_items = [post_items[post_id] for post_id in view_counts]
+        self.record_viewer_sketches(viewed_post_items, last_viewed_ats, user_id, viewed_at)
+
+        if view_counts:
             self.user_manager.dynamo.update_last_post_view_at(user_id, now=viewed_at, view_type=view_type)
 
+    def record_viewer_sketches(self, post_items, last_viewed_ats, user_id, viewed_at):
+        """
+        Add the user to the distinct-viewer sketches of the posts and of their posters: the
+        all-time sketches only for first views, the daily sketches only for the first view of
+        the day, `last_viewed_ats` mapping post id to the user's previous lastViewedAt of the
+        post. As with the exact counters, views of one's own posts are not counted.
+        """
+        index, rank = HyperLogLog().hash(user_id)
+        date = viewed_at.date()
+        posts_sketch = self.viewer_sketch_dynamo
+        users_sketch = self.user_manager.post_viewer_sketch_dynamo
+        writes = set()
+        for post_item in post_items:
+            post_id, posted_by_user_id = post_item['postId'], post_item['postedByUserId']
+            if posted_by_user_id == user_id:
+                continue
+            last_viewed_at = last_viewed_ats.get(post_id)
+            if last_viewed_at is None:
+                writes.update([(posts_sketch, post_id, None), (users_sketch, posted_by_user_id, None)])
+            if last_viewed_at is None or pendulum.parse(last_viewed_at).date() != date:
+                writes.update([(posts_sketch, post_id, date), (users_sketch, posted_by_user_id, date)])
+        map_concurrently(lambda w: w[0].add_register(w[1], index, rank, date=w[2]), writes)
+
+    def get_viewed_by_count_approx(self, post_id, days=None, now=None):
+        "Approximate count of distinct viewers of the post, over all time or over the last `days` days"
+        return self.viewer_sketch_dynamo.get_sketch(post_id, days=days, now=now).count()
+
     def delete_recently_expired_posts(self, now=None):
         "Delete posts that expired yesterday or today"
         now = now or pendulum.now('utc')
@@ -366,15 +450,21 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
             raise Exception(f'Unrecognized like status `{like_status}`')
         incrementor(post_id)
 
-    def on_like_delete(self, post_id, old_item):
-        like_status = old_item['likeStatus']
-        if like_status == LikeStatus.ONYMOUSLY_LIKED:
-            decrementor = self.dynamo.decrement_onymous_like_count
-        elif like_status == LikeStatus.ANONYMOUSLY_LIKED:
-            decrementor = self.dynamo.decrement_anonymous_like_count
-        else:
-            raise Exception(f'Unrecognized like status `{like_status}`')
-        decrementor(post_id)
+    def on_likes_delete(self, calls):
+        "Decrement the like counts of a batch of deleted likes, with one write per post"
+        counts = collections.defaultdict(collections.Counter)
+        for post_id, item_kwargs in calls:
+            like_status = item_kwargs['old_item']['likeStatus']
+            if like_status not in (LikeStatus.ONYMOUSLY_LIKED, LikeStatus.ANONYMOUSLY_LIKED):
+                logger.warning(f'Unrecognized like status `{like_status}` of deleted like on post `{post_id}`')
+                continue
+            counts[post_id][like_status] += 1
+        for post_id, counter in counts.items():
+            self.dynamo.decrement_like_counts(
+                post_id,
+                onymous_count=counter[LikeStatus.ONYMOUSLY_LIKED],
+                anonymous_count=counter[LikeStatus.ANONYMOUSLY_LIKED],
+            )
 
     def on_post_view_count_change_update_counts(self, post_id, new_item, old_item=None):
         if new_item.get('viewCount', 0) <= (old_item or {}).get('viewCount', 0):
@@ -424,6 +514,10 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         if is_verif is not None:
             self.dynamo.set_is_verified(post_id, is_verif, hidden=new_verif_hidden)
 
+    def on_post_delete_delete_viewer_sketches(self, post_id, old_item):
+        key_gen = self.viewer_sketch_dynamo.generate_keys(post_id)
+        self.viewer_sketch_dynamo.client.batch_delete_items(key_gen)
+
     def on_post_view_add_delete_sync_viewed_by_counts(self, post_id, new_item=None, old_item=None):
         assert not (new_item and old_item), 'Should only be called for INSERT and REMOVE'
         user_id = (new_item or old_item)['sortKey'].split('/')[1]
@@ -493,19 +587,23 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         for k in keywords:
             self.elasticsearch_client.put_keyword(post_id, k)
 
-    def get_royalty_paid_and_posts_viewed_past_30_days(self, user_id):
-        now = pendulum.now('utc')
-        royalty_paid = Decimal('0')
-        posts_viewed_count = 0
-
-        for key in self.view_dynamo.generate_keys_by_user_past_30_days(user_id, now=now):
-            item_id = key['partitionKey'].split('/')[1]
-
-            post_view_item = self.view_dynamo.get_view(item_id, user_id)
-            royalty_paid += post_view_item.get('royaltyFee', Decimal('0'))
-            posts_viewed_count += post_view_item.get('viewCount', 0)
-
-        return [royalty_paid, posts_viewed_count]
+    def get_royalty_paid_and_posts_viewed_past_30_days(self, user_id, now=None):
+        totals = self.user_manager.daily_totals_dynamo.get_past_days_totals(user_id, days=30, now=now)
+        return [totals['royaltyPaid'], totals['postViewCount']]
+
+    def on_post_view_change_update_daily_totals(self, post_id, new_item=None, old_item=None):
+        # views and royalties are bucketed by the day of the first view, matching the GSI the
+        # rolling 30-day window was previously read from
+        item = new_item or old_item
+        user_id = item['sortKey'].split('/')[1]
+        new_item, old_item = new_item or {}, old_item or {}
+        first_viewed_at = pendulum.parse(item['firstViewedAt'])
+        self.user_manager.daily_totals_dynamo.add(
+            user_id,
+            first_viewed_at.date(),
+            postViewCount=new_item.get('viewCount', 0) - old_item.get('viewCount', 0),
+            royaltyPaid=new_item.get('royaltyFee', Decimal('0')) - old_item.get('royaltyFee', Decimal('0')),
+        )
 
     def on_post_view_calculate_royalty_fee(self, post_id, new_item):
         # only COMPLETED posts should run royalty payout alg
@@ -545,7 +643,7 @@ class PostManager(FlagManagerMixin, TrendingManagerMixin, ViewManagerMixin, Mana
         ) = self.get_royalty_paid_and_posts_viewed_past_30_days(user_id)
         paid_real_past_30_days = self.appstore_manager.get_paid_real_past_30_days(user_id)
 
-        if royalty_paid_past_30_days < paid_real_past_30_days:
+        if posts_viewed_past_30_days and royalty_paid_past_30_days < paid_real_past_30_days:
             fees = self.app_store_fee_percent + self.real_fee_percent
             amount_to_pay = paid_real_past_30_days / posts_viewed_past_30_days * (Decimal('1.00') - fees)
             # set amount_to_pay to this post view
@@ -10,7 +10,6 @@ from app.mixins.flag.model import FlagModelMixin
 from app.mixins.trending.model import TrendingModelMixin
 from app.mixins.view.enums import ViewType
 from app.mixins.view.model import ViewModelMixin
-from app.models.follower.enums import FollowStatus
 from app.models.user.enums import UserPrivacyStatus, UserSubscriptionLevel
 from app.models.user.exceptions import UserException
 from app.utils import image_size
@@ -27,6 +26,12 @@ VIDEO_ORIGINAL_FILENAME = 'video-original.mov'
 VIDEO_HLS_PREFIX = 'video-hls/video'
 VIDEO_POSTER_PREFIX = 'video-poster/poster'
 IMAGE_DIR = 'image'
+IMAGE_BLOB_DIR = 'image-blob'
+
+
+def get_image_blob_path(checksum, size):
+    "Path to the rendition of the content-addressed image with `checksum`, shared by all its references"
+    return f'{IMAGE_BLOB_DIR}/{checksum}/{size.filename}'
 
 
 class ColorThiefFromImage(colorthief.ColorThief):
@@ -43,6 +48,7 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         item,
         post_dynamo=None,
         post_image_dynamo=None,
+        post_image_blob_dynamo=None,
         post_original_metadata_dynamo=None,
         cloudfront_client=None,
         mediaconvert_client=None,
@@ -63,6 +69,8 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
             self.dynamo = post_dynamo
         if post_image_dynamo is not None:
             self.image_dynamo = post_image_dynamo
+        if post_image_blob_dynamo is not None:
+            self.image_blob_dynamo = post_image_blob_dynamo
         if post_original_metadata_dynamo is not None:
             self.original_metadata_dynamo = post_original_metadata_dynamo
 
@@ -204,7 +212,10 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         return f'{self.s3_prefix}/{VIDEO_POSTER_PREFIX}.0000000.jpg'
 
     def get_image_path(self, size):
-        return f'{self.s3_prefix}/{IMAGE_DIR}/{size.filename}'
+        checksum = self.item.get('imageBlobChecksum')
+        if checksum and size in image_size.JPEGS:
+            return get_image_blob_path(checksum, size)
+        return self.get_s3_image_path(size)
 
     def get_hls_video_path_prefix(self):
         return f'{self.s3_prefix}/{VIDEO_HLS_PREFIX}'
@@ -238,7 +249,7 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
     def get_image_writeonly_url(self):
         assert self.type == PostType.IMAGE
         size = image_size.NATIVE_HEIC if self.image_item.get('imageFormat') == 'HEIC' else image_size.NATIVE
-        path = self.get_image_path(size)
+        path = self.get_s3_image_path(size)
         return self.cloudfront_client.generate_presigned_url(path, ['PUT'])
 
     def serialize(self, caller_user_id):
@@ -268,6 +279,10 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         # mark ourselves as processing
         self.item = self.dynamo.set_post_status(self.item, PostStatus.PROCESSING)
 
+        # a retry starts over from the uploaded image, so let go of any blob from a previous attempt
+        if self.item.get('imageBlobChecksum'):
+            self.set_image_blob(None)
+
         # set up a cached image with the raw data (four different ways to receive the data now)
         source_cached_image = (
             self.native_heic_cache if self.image_item.get('imageFormat') == 'HEIC' else self.native_jpeg_cache
@@ -292,13 +307,26 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
             self.native_heic_cache.clear()
             self.native_heic_cache.flush(include_deletes=True)
 
-        self.build_image_thumbnails()
-        self.set_height_and_width()
-        self.set_colors()
-        self.set_is_verified()
+        # load the native image before anything else, so an upload we can't read fails early
+        self.native_jpeg_cache.readonly_image
         self.set_checksum()
+        blob_item = self.acquire_image_blob()
+        if blob_item and 'height' in blob_item:
+            # this exact image has been processed before, reuse its renditions
+            self.set_image_attributes_from_blob(blob_item)
+        else:
+            self.build_image_thumbnails()
+            self.set_height_and_width()
+            self.set_colors()
+            if blob_item is not None:
+                self.save_image_blob()
+        self.set_is_verified()
         self.complete(now=now)
 
+        # the blob now holds the native image, no need for the post to keep its own copy
+        if blob_item is not None:
+            self.s3_uploads_client.delete_object(self.get_s3_image_path(image_size.NATIVE))
+
     def start_processing_video_upload(self):
         assert self.type == PostType.VIDEO, 'Can only process_video_upload() for VIDEO posts'
         assert self.status in (PostStatus.PENDING, PostStatus.ERROR), 'Can only call for PENDING & ERROR posts'
@@ -449,6 +477,8 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
 
         # do the deletes for real
         self.s3_uploads_client.delete_objects_with_prefix(self.s3_prefix)
+        if checksum := self.item.get('imageBlobChecksum'):
+            self.post_manager.release_image_blob(checksum)
         if self.image_item:
             self.image_dynamo.delete(self.id)
         self.original_metadata_dynamo.delete(self.id)
@@ -500,11 +530,61 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
         return self
 
     def set_checksum(self):
-        path = self.get_image_path(image_size.NATIVE)
+        path = self.get_s3_image_path(image_size.NATIVE)
         checksum = self.s3_uploads_client.get_object_checksum(path)
         self.item = self.dynamo.set_checksum(self.id, self.item['postedAt'], checksum)
         return self
 
+    def acquire_image_blob(self):
+        """
+        Take a reference on the content-addressed image blob matching our checksum and point our
+        renditions at it. Returns the blob item as it was before, or None if the blob can't be
+        referenced right now, in which case the post keeps its own renditions.
+        """
+        checksum = self.item['checksum']
+        blob_item = self.image_blob_dynamo.acquire(checksum)
+        if blob_item is not None:
+            self.set_image_blob(checksum)
+        return blob_item
+
+    def set_image_blob(self, checksum):
+        "Set to None to point our renditions back under the post's own prefix"
+        old_checksum = self.item.get('imageBlobChecksum')
+        self.item = self.dynamo.set_image_blob_checksum(self.id, checksum)
+        for cache in (
+            self.native_jpeg_cache,
+            self.k4_jpeg_cache,
+            self.p1080_jpeg_cache,
+            self.p480_jpeg_cache,
+            self.p64_jpeg_cache,
+        ):
+            cache.s3_path = self.get_image_path(cache.image_size)
+        if old_checksum and old_checksum != checksum:
+            self.post_manager.release_image_blob(old_checksum)
+        return self
+
+    def save_image_blob(self):
+        "Copy our native image into our blob and record its renditions as complete"
+        self.s3_uploads_client.copy_object(
+            self.get_s3_image_path(image_size.NATIVE), self.get_image_path(image_size.NATIVE)
+        )
+        self.image_blob_dynamo.set_renditions(
+            self.item['imageBlobChecksum'],
+            self.image_item['height'],
+            self.image_item['width'],
+            colors=self.image_item.get('colors'),
+        )
+        return self
+
+    def set_image_attributes_from_blob(self, blob_item):
+        self._image_item = self.image_dynamo.set_height_and_width(
+            self.id, blob_item['height'], blob_item['width']
+        )
+        if colors := blob_item.get('colors'):
+            color_tuples = [(c['r'], c['g'], c['b']) for c in colors]
+            self._image_item = self.image_dynamo.set_colors(self.id, color_tuples)
+        return self
+
     def set_is_verified(self):
         path = self.get_image_path(image_size.NATIVE)
         image_url = self.cloudfront_client.generate_presigned_url(path, ['GET', 'HEAD'])
@@ -603,12 +683,15 @@ class Post(FlagModelMixin, TrendingModelMixin, ViewModelMixin):
     def flag(self, user):
         # if the post is from a private user then we must be a follower to flag the post
         posted_by_user = self.user_manager.get_user(self.user_id)
+        relationship_memo = {}
         if posted_by_user.item['privacyStatus'] != UserPrivacyStatus.PUBLIC:
-            follow = self.follower_manager.get_follow(user.id, self.user_id)
-            if not follow or follow.status != FollowStatus.FOLLOWING:
+            relationship = self.relationship_manager.get_relationship(
+                user.id, self.user_id, memo=relationship_memo, use_cache=False
+            )
+            if not relationship.following:
                 raise PostException(f'User does not have access to post `{self.id}`')
 
-        return super().flag(user)
+        return super().flag(user, relationship_memo=relationship_memo)
 
     def record_view_count(self, user_id, view_count, viewed_at=None, view_type=None):
         if self.status != PostStatus.COMPLETED:
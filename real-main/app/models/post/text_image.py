@@ -1,5 +1,10 @@
+import bisect
+import functools
+import io
+import itertools
 import logging
 import os.path
+import string
 
 import PIL.Image
 import PIL.ImageDraw
@@ -8,90 +13,118 @@ import PIL.ImageFont
 font_path = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'fonts', 'OpenSans-Regular.ttf')
 logger = logging.getLogger()
 
+# glyph metrics are measured once at this size and scaled linearly to the size being rendered
+REFERENCE_FONT_SIZE = 1000
 
-def generate_text_image(text, dimensions, font_size=None):
-    "Generate an image with text nicely wrapped and centered"
-    assert text, 'Must be called with some text to render'
+# images are rendered at 4k, smaller images of the same aspect ratio are downscaled from that
+K4_DIMENSIONS = (3840, 2160)
 
-    image_width, image_height = dimensions
-    image_aspect_ratio = image_width / image_height
-    img = PIL.Image.new('RGB', dimensions)
+# a 4k RGB image is ~25MB, so keep this small
+RENDERED_IMAGE_CACHE_SIZE = 4
 
-    font_size = font_size or image_height // 10
 
+@functools.lru_cache(maxsize=1)
+def get_font_data():
     with open(font_path, 'rb') as fh:
-        font = PIL.ImageFont.truetype(fh, size=font_size)
+        return fh.read()
 
-    # we want our text to match, more or less, the aspect ratio of the overall image
-    draw = PIL.ImageDraw.Draw(img)
 
-    # determine how big horizontal and vertical spaces are
-    size_1 = draw.textsize('Z Z', font=font)
-    size_2 = draw.textsize('Z\nZ', font=font)
-    token_spacing = size_1[0] - 2 * size_2[0]
-    line_height = size_1[1]
-    line_spacing = size_2[1] - 2 * size_1[1]
+@functools.lru_cache(maxsize=32)
+def get_font(font_size):
+    return PIL.ImageFont.truetype(io.BytesIO(get_font_data()), size=font_size)
 
-    # tokenize then wrap the text so it looks good
-    raw_tokens = text.split()
-    token_widths = [draw.textsize(raw_token, font=font)[0] for raw_token in raw_tokens]
-    text, text_width, text_height = rectangle_wrap(
-        raw_tokens, token_widths, token_spacing, line_spacing, line_height, image_aspect_ratio
-    )
 
-    logger.debug(f'Computed text size: ({text_width}, {text_height})')
-    logger.debug(f'Actual text size:   {draw.textsize(text, font=font)}')
+class GlyphAdvances(dict):
+    "Advance widths of glyphs at REFERENCE_FONT_SIZE. Printable ascii is precomputed, others filled lazily."
 
-    # if it's too big to fit in the image, shrink the font size and re-run the algo
-    max_text_width = image_width * 0.9
-    if text_width > max_text_width:
-        font_size = int(font_size * max_text_width / text_width)
-        return generate_text_image(text, dimensions, font_size=font_size)
+    def __init__(self):
+        super().__init__((char, self.measure(char)) for char in string.printable)
 
-    # write out the text in center of the image
-    xy = ((image_width - text_width) / 2, (image_height - text_height) / 2 - line_spacing / 2)
-    draw.text(xy, text, align='center', fill=(255, 255, 255), font=font)
-    return img
+    def __missing__(self, char):
+        self[char] = self.measure(char)
+        return self[char]
+
+    @staticmethod
+    def measure(char):
+        font = get_font(REFERENCE_FONT_SIZE)
+        # difference between a doubled glyph and a single one is the advance, free of side bearings
+        return font.getsize(char * 2)[0] - font.getsize(char)[0]
+
+
+@functools.lru_cache(maxsize=1)
+def get_glyph_advances():
+    return GlyphAdvances()
 
 
-class Token:
-    "A word in a variable-width font"
+@functools.lru_cache(maxsize=1)
+def get_reference_spacing():
+    "Return (token_spacing, line_spacing, line_height) at REFERENCE_FONT_SIZE"
+    font = get_font(REFERENCE_FONT_SIZE)
+    draw = PIL.ImageDraw.Draw(PIL.Image.new('RGB', (1, 1)))
+    size_1 = draw.textsize('Z Z', font=font)
+    size_2 = draw.textsize('Z\nZ', font=font)
+    token_spacing = size_1[0] - 2 * size_2[0]
+    line_height = size_1[1]
+    line_spacing = size_2[1] - 2 * size_1[1]
+    return token_spacing, line_spacing, line_height
 
-    def __init__(self, token, token_width):
-        self._token = token
-        self._token_width = token_width
 
-    def __str__(self):
-        return self._token
+def measure_text_width(text):
+    "Width of a single line of text at REFERENCE_FONT_SIZE"
+    glyph_advances = get_glyph_advances()
+    return sum(glyph_advances[char] for char in text)
 
-    def __len__(self):
-        return self._token_width
 
+def generate_text_image(text, dimensions):
+    "Generate an image with text nicely wrapped and centered"
+    assert text, 'Must be called with some text to render'
+    # rendered images are shared via the cache, so hand out a copy
+    return render_text_image(text, tuple(dimensions)).copy()
 
-class Line:
-    "A line of text in a variable-width font"
 
-    def __init__(self, tokens, token_spacing):
-        self._tokens = tokens
-        self._token_spacing = token_spacing
+@functools.lru_cache(maxsize=RENDERED_IMAGE_CACHE_SIZE)
+def render_text_image(text, dimensions):
+    "Memoized on the text and dimensions. Callers must not mutate the returned image."
+    image_width, image_height = dimensions
+    k4_width, k4_height = K4_DIMENSIONS
+    if (
+        dimensions != K4_DIMENSIONS
+        and image_width <= k4_width
+        and abs(image_width / image_height - k4_width / k4_height) < 0.01
+    ):
+        return render_text_image(text, K4_DIMENSIONS).resize(dimensions, resample=PIL.Image.LANCZOS)
+    return draw_text_image(text, dimensions)
 
-    @property
-    def first_token(self):
-        return self._tokens[0] if self._tokens else None
 
-    def pop_first_token(self):
-        return self._tokens.pop(0)
+def draw_text_image(text, dimensions):
+    image_width, image_height = dimensions
+    image_aspect_ratio = image_width / image_height
 
-    def append_token(self, token):
-        self._tokens.append(token)
+    # tokenize then wrap the text so it looks good. We want our text to match, more or less,
+    # the aspect ratio of the overall image. All metrics scale linearly with font size, so the
+    # wrapping doesn't depend on font size and can be done with the reference metrics.
+    raw_tokens = text.split()
+    token_widths = [measure_text_width(raw_token) for raw_token in raw_tokens]
+    token_spacing, line_spacing, line_height = get_reference_spacing()
+    text, text_width, text_height = rectangle_wrap(
+        raw_tokens, token_widths, token_spacing, line_spacing, line_height, image_aspect_ratio
+    )
 
-    def __str__(self):
-        return ' '.join(str(t) for t in self._tokens)
+    # use the default font size, unless the text is too big to fit in the image
+    max_text_width = image_width * 0.9
+    font_size = max(1, min(image_height // 10, int(REFERENCE_FONT_SIZE * max_text_width / text_width)))
+    scale = font_size / REFERENCE_FONT_SIZE
+    text_width, text_height, line_spacing = text_width * scale, text_height * scale, line_spacing * scale
+    font = get_font(font_size)
 
-    def __len__(self):
-        if not self._tokens:
-            return 0
-        return sum(len(t) for t in self._tokens) + (len(self._tokens) - 1) * self._token_spacing
+    logger.debug(f'Computed text size: ({text_width}, {text_height}) at font size {font_size}')
+
+    # write out the text in center of the image
+    img = PIL.Image.new('RGB', dimensions)
+    draw = PIL.ImageDraw.Draw(img)
+    xy = ((image_width - text_width) / 2, (image_height - text_height) / 2 - line_spacing / 2)
+    draw.text(xy, text, align='center', fill=(255, 255, 255), font=font)
+    return img
 
 
 def rectangle_wrap(raw_tokens, token_widths, token_spacing, line_spacing, line_height, desired_aspect_ratio):
@@ -99,49 +132,50 @@ def rectangle_wrap(raw_tokens, token_widths, token_spacing, line_spacing, line_h
     Given a series of tokens, their widths, information about spacing and a desired aspect ratio,
     return a block of text that closely matches the desired aspect ratio.
 
+    The text is greedily wrapped at the narrowest line width that gives a block at least as wide
+    as the desired aspect ratio. Narrowing the line width only ever adds lines, so that width is
+    found by binary search.
+
     Note that python standard library textwrap module assumes a monospace font, where as this
     utility is designed to work with variable width font.
     """
-    tokens = [Token(*args) for args in zip(raw_tokens, token_widths)]
-
-    # start all tokens in separate lines, we will iteratively move tokens up lines
-    lines = [Line([token], token_spacing) for token in tokens]
-    text_width = max(len(line) for line in lines)
-    text_height = len(lines) * line_height + (len(lines) - 1) * line_spacing
-
-    # iteratively flow tokens up the paragraph until we have just passed our desired aspect ratio
-    while (line_cnt := len(lines)) > 1 and text_width / text_height < desired_aspect_ratio:
-
-        # operate until we have shrunk our line cnt
-        while len(lines) == line_cnt:
-
-            # determine what our next text_width needs to be to change the token distribution
-            this_line, next_line = lines[0], lines[1]
-            min_new_text_width = len(this_line) + token_spacing + len(next_line.first_token)
-            line_num_to_grow = 0
-            for i, this_line in enumerate(lines[1:-1]):
-                next_line = lines[i + 2]
-                this_new_text_width = len(this_line) + token_spacing + len(next_line.first_token)
-                if this_new_text_width < min_new_text_width:
-                    min_new_text_width = this_new_text_width
-                    line_num_to_grow = i
-
-            # flow tokens up for subsequent lines
-            line_num = line_num_to_grow
-            while line_num < len(lines) - 1:
-                this_line, next_line = lines[line_num], lines[line_num + 1]
-                if len(next_line) == 0:
-                    lines.pop(line_num + 1)
-                    break
-                new_line_width = len(this_line) + token_spacing + len(next_line.first_token)
-                if new_line_width <= min_new_text_width:
-                    this_line.append_token(next_line.pop_first_token())
-                    continue
-                line_num += 1
-
-        # re-compute our overall size
-        text_width = max(len(line) for line in lines)
+    # offsets[i] is the width of tokens[:i], with each token carrying a trailing space, so the width
+    # of the line of tokens[i:j] is offsets[j] - offsets[i] - token_spacing
+    offsets = list(itertools.accumulate((width + token_spacing for width in token_widths), initial=0))
+
+    def wrap(max_line_width):
+        "Greedily fill lines up to max_line_width. Returns list of (start, end) token indexes per line."
+        lines, start = [], 0
+        while start < len(token_widths):
+            # a line always gets at least one token, even if that token alone is too wide
+            end = bisect.bisect_right(offsets, offsets[start] + max_line_width + token_spacing, lo=start + 2)
+            end = max(end - 1, start + 1)
+            lines.append((start, end))
+            start = end
+        return lines
+
+    def measure(lines):
+        text_width = max(offsets[end] - offsets[start] - token_spacing for start, end in lines)
         text_height = len(lines) * line_height + (len(lines) - 1) * line_spacing
+        return text_width, text_height
+
+    def is_wide_enough(max_line_width):
+        text_width, text_height = measure(wrap(max_line_width))
+        return text_width / text_height >= desired_aspect_ratio
+
+    # anything narrower than the widest token puts every token on its own line, and anything
+    # wider than the whole text puts it all on a single line
+    low, high = max(token_widths), offsets[-1] - token_spacing
+    if not is_wide_enough(low):
+        while high - low > 1:
+            mid = (low + high) // 2
+            if is_wide_enough(mid):
+                high = mid
+            else:
+                low = mid
+        low = high
 
     # serialize to our rectangle of text
-    return ('\n'.join(str(line) for line in lines), text_width, text_height)
+    lines = wrap(low)
+    text_width, text_height = measure(lines)
+    return ('\n'.join(' '.join(raw_tokens[start:end]) for start, end in lines), text_width, text_height)
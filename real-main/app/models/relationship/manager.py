@@ -0,0 +1,114 @@
+import logging
+
+from app.models.block.dynamo import BlockDynamo
+from app.models.follower.dynamo.base import FollowerDynamo
+from app.models.follower.enums import FollowStatus
+from app.utils import TTLCache
+
+from .model import Relationship
+
+logger = logging.getLogger()
+
+
+class RelationshipManager:
+    """
+    Answers how a viewer relates to other users: follow statuses in both directions, and block
+    statuses in both directions. Relationships with many users are looked up with batch gets.
+
+    Relationships are cached for a short time across invocations of a warm lambda. Changes made in
+    this process drop the cached relationship right away, as do the follow & block stream handlers in
+    theirs. Changes made in other processes can take up to `cache_ttl` seconds to be seen here.
+    """
+
+    cache_ttl = 15
+
+    def __init__(self, clients, managers=None):
+        managers = managers or {}
+        managers['relationship'] = self
+
+        self.clients = clients
+        if 'dynamo' in clients:
+            self.block_dynamo = BlockDynamo(clients['dynamo'])
+            self.follower_dynamo = FollowerDynamo(clients['dynamo'])
+        # (viewer user id, target user id) -> relationship
+        self.relationships = TTLCache(ttl=self.cache_ttl, maxsize=100000)
+
+    def get_relationship(self, viewer_user_id, target_user_id, memo=None, use_cache=True):
+        relationships = self.get_relationships(viewer_user_id, [target_user_id], memo=memo, use_cache=use_cache)
+        return relationships[target_user_id]
+
+    def get_relationships(self, viewer_user_id, target_user_ids, memo=None, use_cache=True):
+        """
+        Return a dict of target user id to their Relationship with the viewer. Pass the same `memo`
+        dict across calls that make up one request to have each relationship looked up at most once.
+        Access checks should pass `use_cache=False` so they never act on a relationship that may be
+        stale, the fresh result still refreshes the cache. The memo only holds relationships fetched
+        fresh, so access checks can share it.
+        """
+        memo = {} if memo is None else memo
+        relationships, missed_user_ids = {}, []
+        for target_user_id in dict.fromkeys(target_user_ids):
+            pair = (viewer_user_id, target_user_id)
+            if target_user_id == viewer_user_id:
+                relationships[target_user_id] = Relationship(FollowStatus.SELF, FollowStatus.SELF, False, False)
+            elif pair in memo:
+                relationships[target_user_id] = memo[pair]
+            else:
+                relationship = self.relationships.get(pair) if use_cache else None
+                if relationship:
+                    relationships[target_user_id] = relationship
+                else:
+                    missed_user_ids.append(target_user_id)
+
+        for target_user_id, relationship in self.fetch_relationships(viewer_user_id, missed_user_ids).items():
+            pair = (viewer_user_id, target_user_id)
+            relationships[target_user_id] = memo[pair] = relationship
+            self.relationships.set(pair, relationship)
+        return relationships
+
+    def fetch_relationships(self, viewer_user_id, target_user_ids):
+        "Look up relationships from dynamo, with all the items needed fetched in as few batch gets as possible"
+        keys = []
+        for target_user_id in target_user_ids:
+            keys.extend(
+                [
+                    self.follower_dynamo.pk(viewer_user_id, target_user_id),
+                    self.follower_dynamo.pk(target_user_id, viewer_user_id),
+                    self.block_dynamo.pk(viewer_user_id, target_user_id),
+                    self.block_dynamo.pk(target_user_id, viewer_user_id),
+                ]
+            )
+        items = {
+            (item['partitionKey'], item['sortKey']): item
+            for item in self.follower_dynamo.client.generate_batch_get_items(
+                keys, projection_expression='partitionKey, sortKey, followStatus'
+            )
+        }
+
+        def get_item(key):
+            return items.get((key['partitionKey'], key['sortKey']))
+
+        def get_follow_status(key):
+            item = get_item(key)
+            return item['followStatus'] if item else FollowStatus.NOT_FOLLOWING
+
+        return {
+            target_user_id: Relationship(
+                get_follow_status(self.follower_dynamo.pk(viewer_user_id, target_user_id)),
+                get_follow_status(self.follower_dynamo.pk(target_user_id, viewer_user_id)),
+                get_item(self.block_dynamo.pk(viewer_user_id, target_user_id)) is not None,
+                get_item(self.block_dynamo.pk(target_user_id, viewer_user_id)) is not None,
+            )
+            for target_user_id in target_user_ids
+        }
+
+    def invalidate(self, user_id_1, user_id_2):
+        "Drop any cached relationship between the two users, in both directions"
+        self.relationships.delete((user_id_1, user_id_2))
+        self.relationships.delete((user_id_2, user_id_1))
+
+    def on_user_relationship_change_invalidate(self, user_id, new_item=None, old_item=None):
+        # follower and blocker subitems both live in the partition of the followed or blocked user,
+        # with the follower or blocker's user id in their sort key
+        other_user_id = (new_item or old_item)['sortKey'].split('/')[1]
+        self.invalidate(user_id, other_user_id)
@@ -0,0 +1,29 @@
+from app.models.follower.enums import FollowStatus
+
+
+class Relationship:
+    "How a viewer relates to a target user"
+
+    def __init__(self, followed_status, follower_status, blocking, blocked):
+        self.followed_status = followed_status  # is the viewer following the target?
+        self.follower_status = follower_status  # is the target following the viewer?
+        self.blocking = blocking  # has the viewer blocked the target?
+        self.blocked = blocked  # has the target blocked the viewer?
+
+    def __eq__(self, other):
+        return isinstance(other, Relationship) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return f'Relationship({", ".join(f"{k}={v!r}" for k, v in vars(self).items())})'
+
+    @property
+    def following(self):
+        return self.followed_status == FollowStatus.FOLLOWING
+
+    @property
+    def followed_by(self):
+        return self.follower_status == FollowStatus.FOLLOWING
+
+    @property
+    def either_blocking(self):
+        return self.blocking or self.blocked
@@ -27,8 +27,7 @@ class ScreenManager(ViewManagerMixin, ManagerBase):
         return Screen(screen_name, view_dynamo=view_dynamo)
 
     def record_views(self, screens, user_id, viewed_at=None):
-        for screen_name, view_count in dict(collections.Counter(screens)).items():
-            self.init_screen(screen_name).record_view_count(user_id, view_count, viewed_at=viewed_at)
+        self.record_view_counts(collections.Counter(screens), user_id, viewed_at=viewed_at)
 
     def on_view_log_amplitude_event(self, screen_name, new_item, old_item=None):
         user_id = new_item['gsiA2PartitionKey'].split('/')[1]
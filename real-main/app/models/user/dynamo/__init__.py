@@ -1,7 +1,9 @@
 __all__ = [
     'UserDynamo',
     'UserContactAttributeDynamo',
+    'UserDailyTotalsDynamo',
 ]
 
 from .base import UserDynamo
 from .contact_attribute import UserContactAttributeDynamo
+from .daily_totals import UserDailyTotalsDynamo
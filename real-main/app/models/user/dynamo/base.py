@@ -27,6 +27,10 @@ class UserDynamo:
     def get_user(self, user_id, strongly_consistent=False):
         return self.client.get_item(self.pk(user_id), ConsistentRead=strongly_consistent)
 
+    def generate_users(self, user_ids):
+        "Batch get the users, yielding in no particular order. Users that don't exist are skipped"
+        return self.client.generate_batch_get_items([self.pk(user_id) for user_id in user_ids])
+
     def get_user_by_username(self, username):
         query_kwargs = {
             'KeyConditionExpression': Key('gsiA1PartitionKey').eq(f'username/{username}'),
@@ -101,7 +105,8 @@ class UserDynamo:
         }
         return self.client.update_item(query_kwargs)
 
-    def set_user_photo_post_id(self, user_id, photo_id):
+    def set_user_photo_post_id(self, user_id, photo_id, blob_checksum=None):
+        "`blob_checksum` is the image blob the photo is served from, if it isn't copied under the user"
         query_kwargs = {
             'Key': self.pk(user_id),
         }
@@ -109,8 +114,13 @@ class UserDynamo:
         if photo_id:
             query_kwargs['UpdateExpression'] = 'SET photoPostId = :ppid'
             query_kwargs['ExpressionAttributeValues'] = {':ppid': photo_id}
+            if blob_checksum:
+                query_kwargs['UpdateExpression'] += ', photoBlobChecksum = :pbc'
+                query_kwargs['ExpressionAttributeValues'][':pbc'] = blob_checksum
+            else:
+                query_kwargs['UpdateExpression'] += ' REMOVE photoBlobChecksum'
         else:
-            query_kwargs['UpdateExpression'] = 'REMOVE photoPostId'
+            query_kwargs['UpdateExpression'] = 'REMOVE photoPostId, photoBlobChecksum'
 
         return self.client.update_item(query_kwargs)
 
@@ -516,6 +526,19 @@ class UserDynamo:
     def decrement_followers_requested_count(self, user_id):
         return self.client.decrement_count(self.pk(user_id), 'followersRequestedCount')
 
+    def move_followers_requested_to_follower_count(self, user_id, count):
+        "Best-effort attempt to count `count` accepted follow requests as followers. Logs a WARNING upon failure."
+        query_kwargs = {
+            'Key': self.pk(user_id),
+            'UpdateExpression': 'ADD followerCount :count, followersRequestedCount :neg_count',
+            'ExpressionAttributeValues': {':count': count, ':neg_count': -count},
+            'ConditionExpression': 'attribute_exists(partitionKey)',
+        }
+        failure_warning = (
+            f'Failed to move {count} followersRequestedCount to followerCount for key `{self.pk(user_id)}`'
+        )
+        return self.client.update_item(query_kwargs, failure_warning=failure_warning)
+
     def increment_post_count(self, user_id):
         return self.client.increment_count(self.pk(user_id), 'postCount')
 
@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pendulum
+
+
+class UserDailyTotalsDynamo:
+    """
+    Per-user running totals bucketed by day, so totals over a rolling window of days
+    can be read with a single batch get rather than by walking the underlying items.
+    """
+
+    schema_version = 0
+    attribute_names = ('postViewCount', 'royaltyPaid', 'paidReal')
+
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def key(self, user_id, date):
+        return {'partitionKey': f'user/{user_id}', 'sortKey': f'dailyTotals/{date.to_date_string()}'}
+
+    def get(self, user_id, date, strongly_consistent=False):
+        return self.client.get_item(self.key(user_id, date), ConsistentRead=strongly_consistent)
+
+    def add(self, user_id, date, **deltas):
+        "Add to the day's totals, creating the bucket if needed. Zero deltas are skipped"
+        deltas = {name: value for name, value in deltas.items() if value}
+        assert all(name in self.attribute_names for name in deltas), f'Unexpected totals: {list(deltas)}'
+        if not deltas:
+            return
+        query_kwargs = {
+            'Key': self.key(user_id, date),
+            'UpdateExpression': 'ADD '
+            + ', '.join(f'{name} :{name}' for name in deltas)
+            + ' SET schemaVersion = if_not_exists(schemaVersion, :sv)',
+            'ExpressionAttributeValues': {
+                **{f':{name}': value for name, value in deltas.items()},
+                ':sv': self.schema_version,
+            },
+        }
+        self.client.upsert_item(query_kwargs)
+
+    def get_past_days_totals(self, user_id, days=30, now=None):
+        """
+        Sum the totals over the past `days` days. The window is widened to whole days,
+        so it covers from the start of the day `days` days ago to the end of today.
+        """
+        today = (now or pendulum.now('utc')).date()
+        keys = [self.key(user_id, today.subtract(days=i)) for i in range(days + 1)]
+        totals = {name: Decimal('0') for name in self.attribute_names}
+        for item in self.client.generate_batch_get_items(keys):
+            for name in self.attribute_names:
+                totals[name] += item.get(name, 0)
+        totals['postViewCount'] = int(totals['postViewCount'])
+        return totals
+
+    def generate_keys(self, user_id):
+        query_kwargs = {
+            'KeyConditionExpression': 'partitionKey = :pk AND begins_with(sortKey, :sk_prefix)',
+            'ExpressionAttributeValues': {':pk': f'user/{user_id}', ':sk_prefix': 'dailyTotals/'},
+            'ProjectionExpression': 'partitionKey, sortKey',
+        }
+        return self.client.generate_all_query(query_kwargs)
@@ -12,6 +12,7 @@ from app import models
 from app.clients import SesClient
 from app.mixins.base import ManagerBase
 from app.mixins.trending.manager import TrendingManagerMixin
+from app.mixins.view.sketch_dynamo import ViewerSketchDynamo
 from app.models.appstore.enums import AppStoreSubscriptionStatus
 from app.models.card.templates import (
     ContactJoinedCardTemplate,
@@ -22,7 +23,7 @@ from app.models.follower.enums import FollowStatus
 from app.models.post.enums import PostStatus
 from app.utils import GqlNotificationType
 
-from .dynamo import UserContactAttributeDynamo, UserDynamo
+from .dynamo import UserContactAttributeDynamo, UserDailyTotalsDynamo, UserDynamo
 from .enums import IdVerificationStatus, UserDatingStatus, UserPrivacyStatus, UserStatus, UserSubscriptionLevel
 from .exceptions import UserAlreadyExists, UserException, UserValidationException
 from .model import User
@@ -67,6 +68,9 @@ class UserManager(TrendingManagerMixin, ManagerBase):
         self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
         self.like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
         self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+        self.relationship_manager = managers.get('relationship') or models.RelationshipManager(
+            clients, managers=managers
+        )
 
         self.clients = clients
         for client_name in self.client_names:
@@ -76,6 +80,10 @@ class UserManager(TrendingManagerMixin, ManagerBase):
             self.dynamo = UserDynamo(clients['dynamo'])
             self.email_dynamo = UserContactAttributeDynamo(clients['dynamo'], 'userEmail')
             self.phone_number_dynamo = UserContactAttributeDynamo(clients['dynamo'], 'userPhoneNumber')
+            self.daily_totals_dynamo = UserDailyTotalsDynamo(clients['dynamo'])
+            self.post_viewer_sketch_dynamo = ViewerSketchDynamo(
+                self.item_type, clients['dynamo'], sort_key_prefix='postViewerSketch'
+            )
         self.placeholder_photos_directory = placeholder_photos_directory
         self.ses_client = SesClient()
 
@@ -91,6 +99,10 @@ class UserManager(TrendingManagerMixin, ManagerBase):
         user_item = self.dynamo.get_user(user_id, strongly_consistent=strongly_consistent)
         return self.init_user(user_item) if user_item else None
 
+    def get_users(self, user_ids):
+        "Batch get the users, returning a dict of user_id to user for those that exist"
+        return {item['userId']: self.init_user(item) for item in self.dynamo.generate_users(set(user_ids))}
+
     def get_user_by_username(self, username):
         user_item = self.dynamo.get_user_by_username(username)
         return self.init_user(user_item) if user_item else None
@@ -358,6 +370,18 @@ class UserManager(TrendingManagerMixin, ManagerBase):
         user.clear_photo_s3_objects()
         user.trending_delete()
 
+    def on_user_delete_delete_daily_totals(self, user_id, old_item):
+        key_gen = self.daily_totals_dynamo.generate_keys(user_id)
+        self.daily_totals_dynamo.client.batch_delete_items(key_gen)
+
+    def on_user_delete_delete_post_viewer_sketches(self, user_id, old_item):
+        key_gen = self.post_viewer_sketch_dynamo.generate_keys(user_id)
+        self.post_viewer_sketch_dynamo.client.batch_delete_items(key_gen)
+
+    def get_post_viewed_by_count_approx(self, user_id, days=None, now=None):
+        "Approximate count of distinct viewers of the user's posts, over all time or the last `days` days"
+        return self.post_viewer_sketch_dynamo.get_sketch(user_id, days=days, now=now).count()
+
     def on_criteria_sync_user_status(self, check_method_name, forced_by, user_id, new_item, old_item=None):
         user = self.init_user(new_item)
         if getattr(user, check_method_name)():
@@ -407,6 +431,8 @@ class UserManager(TrendingManagerMixin, ManagerBase):
             self.dynamo.decrement_chats_with_unviewed_messages_count(user_id)
 
     def sync_follow_counts_due_to_follow_status(self, followed_user_id, new_item=None, old_item=None):
+        if (new_item or {}).get('bulkSynced'):
+            return  # taken care of by FollowerManager.accept_all_requested_follow_requests & on_followers_accepted
         follower_user_id = (new_item or old_item)['sortKey'].split('/')[1]
         old_status = (old_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
         new_status = (new_item or {}).get('followStatus', FollowStatus.NOT_FOLLOWING)
@@ -425,6 +451,10 @@ class UserManager(TrendingManagerMixin, ManagerBase):
         if old_status == FollowStatus.REQUESTED and new_status != FollowStatus.REQUESTED:
             self.dynamo.decrement_followers_requested_count(followed_user_id)
 
+    def on_followers_accepted_sync_followed_counts(self, followed_user_id, new_item):
+        for follower_user_id in new_item['followerUserIds']:
+            self.dynamo.increment_followed_count(follower_user_id)
+
     def sync_chat_message_creation_count(self, message_id, new_item):
         if user_id := new_item.get('userId'):
             self.dynamo.increment_chat_messages_creation_count(user_id)
@@ -560,9 +590,11 @@ class UserManager(TrendingManagerMixin, ManagerBase):
             contact_id = contact_attr_to_contact_id[attr]
             contact_id_to_user_id[contact_id] = user_id
 
-        for user_id in contact_id_to_user_id.values():
-            follow_status = self.follower_manager.get_follow_status(user_id, caller_user.id)
-            if follow_status == FollowStatus.NOT_FOLLOWING:
+        relationships = self.relationship_manager.get_relationships(
+            caller_user.id, contact_id_to_user_id.values()
+        )
+        for user_id, relationship in relationships.items():
+            if relationship.follower_status == FollowStatus.NOT_FOLLOWING:
                 card_template = ContactJoinedCardTemplate(user_id, caller_user.id, caller_user.username)
                 self.card_manager.add_or_update_card(card_template)
 
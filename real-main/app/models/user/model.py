@@ -148,6 +148,9 @@ class User(TrendingModelMixin):
         photo_post_id = photo_post_id or self.item.get('photoPostId')
         if not photo_post_id:
             return None
+        checksum = self.item.get('photoBlobChecksum')
+        if checksum and photo_post_id == self.item.get('photoPostId'):
+            return self.post_manager.get_image_blob_path(checksum, size)
         return '/'.join([self.id, 'profile-photo', photo_post_id, size.filename])
 
     def get_placeholder_photo_path(self, size):
@@ -315,6 +318,8 @@ class User(TrendingModelMixin):
         if post_id == old_post_id:
             return self
 
+        old_blob_checksum = self.item.get('photoBlobChecksum')
+        blob_checksum = None
         if post_id:
             post = self.post_manager.get_post(post_id)
             if not post:
@@ -328,22 +333,28 @@ class User(TrendingModelMixin):
             if post.item.get('isVerified') is not True:
                 raise UserException(f'Post `{post_id}` is not verified')
 
-            # add the new s3 objects
-            self.add_photo_s3_objects(post)
+            # share the post's image blob if it has one, otherwise add the new s3 objects
+            blob_checksum = post.item.get('imageBlobChecksum')
+            if not (blob_checksum and self.post_manager.acquire_image_blob(blob_checksum)):
+                blob_checksum = None
+                self.add_photo_s3_objects(post)
 
         # then dynamo
-        self.item = self.dynamo.set_user_photo_post_id(self.id, post_id)
+        self.item = self.dynamo.set_user_photo_post_id(self.id, post_id, blob_checksum=blob_checksum)
 
-        # Leave the old images around as their may be existing urls out there that point to them
-        # Could schedule a job to delete them a hour from now
+        # Leave the old copied images around as their may be existing urls out there that point to them
+        # Could schedule a job to delete them a hour from now. An old blob lives on as long as its post does.
+        if old_blob_checksum:
+            self.post_manager.release_image_blob(old_blob_checksum)
         return self
 
     def add_photo_s3_objects(self, post):
         assert post.type == PostType.IMAGE
-        for size in image_size.JPEGS:
-            source_path = post.get_s3_image_path(size)
-            dest_path = self.get_photo_path(size, photo_post_id=post.id)
-            self.s3_uploads_client.copy_object(source_path, dest_path)
+        path_pairs = [
+            (post.get_image_path(size), self.get_photo_path(size, photo_post_id=post.id))
+            for size in image_size.JPEGS
+        ]
+        self.s3_uploads_client.copy_objects(path_pairs)
 
     def update_details(
         self,
@@ -400,6 +411,8 @@ class User(TrendingModelMixin):
     def clear_photo_s3_objects(self):
         photo_dir_prefix = '/'.join([self.id, 'profile-photo', ''])
         self.s3_uploads_client.delete_objects_with_prefix(photo_dir_prefix)
+        if checksum := self.item.get('photoBlobChecksum'):
+            self.post_manager.release_image_blob(checksum)
 
     def start_change_contact_attribute(self, attribute_name, attribute_value):
         assert attribute_name in CONTACT_ATTRIBUTE_NAMES
@@ -0,0 +1,89 @@
+import logging
+
+import pendulum
+
+logger = logging.getLogger()
+
+
+class UserDeletionDynamo:
+    "Progress of the cascade of deletes that follows the deletion of a user's profile"
+
+    def __init__(self, dynamo_client):
+        self.client = dynamo_client
+
+    def pk(self, user_id):
+        return {'partitionKey': f'user/{user_id}', 'sortKey': 'deletion'}
+
+    def get(self, user_id, strongly_consistent=False):
+        return self.client.get_item(self.pk(user_id), ConsistentRead=strongly_consistent)
+
+    def add(self, user_id, user_item, steps, now=None):
+        """
+        Add the deletion, with all of `steps` left to do. Overwrites any deletion of the same user
+        still in progress, as starting the cascade over from the beginning is always safe.
+        """
+        now = now or pendulum.now('utc')
+        now_str = now.to_iso8601_string()
+        item = {
+            **self.pk(user_id),
+            'schemaVersion': 0,
+            'userId': user_id,
+            'userItem': user_item,
+            'steps': list(steps),
+            'chunkCount': 0,
+            'startedAt': now_str,
+            'updatedAt': now_str,
+            'gsiK1PartitionKey': 'userDeletion',
+            'gsiK1SortKey': now_str,
+        }
+        self.client.table.put_item(Item=item)
+        return item
+
+    def set_progress(self, user_id, chunk_count, steps, now=None):
+        """
+        Record that the chunk numbered `chunk_count` is done and that `steps` are left to do, clearing
+        the retry count. Returns the updated item, or None if another chunk was recorded since.
+        """
+        now = now or pendulum.now('utc')
+        now_str = now.to_iso8601_string()
+        query_kwargs = {
+            'Key': self.pk(user_id),
+            'UpdateExpression': (
+                'SET steps = :steps, chunkCount = :next, updatedAt = :now, gsiK1SortKey = :now REMOVE retryCount'
+            ),
+            'ConditionExpression': 'chunkCount = :count',
+            'ExpressionAttributeValues': {
+                ':steps': list(steps),
+                ':count': chunk_count,
+                ':next': chunk_count + 1,
+                ':now': now_str,
+            },
+        }
+        failure_warning = f'Failed to record chunk `{chunk_count}` of deletion of user `{user_id}`: out of date'
+        return self.client.update_item(query_kwargs, failure_warning=failure_warning)
+
+    def touch(self, user_id, now=None):
+        """
+        Bump the deletion's `updatedAt`, so the stream handler picks it back up, and count that the
+        current chunk is being retried. Returns the updated item.
+        """
+        now = now or pendulum.now('utc')
+        now_str = now.to_iso8601_string()
+        query_kwargs = {
+            'Key': self.pk(user_id),
+            'UpdateExpression': 'SET updatedAt = :now, gsiK1SortKey = :now ADD retryCount :one',
+            'ExpressionAttributeValues': {':now': now_str, ':one': 1},
+        }
+        failure_warning = f'Failed to touch deletion of user `{user_id}`: does not exist'
+        return self.client.update_item(query_kwargs, failure_warning=failure_warning)
+
+    def delete(self, user_id):
+        return self.client.delete_item(self.pk(user_id))
+
+    def generate_user_ids_not_updated_since(self, cutoff_at):
+        query_kwargs = {
+            'KeyConditionExpression': 'gsiK1PartitionKey = :pk AND gsiK1SortKey < :sk_max',
+            'IndexName': 'GSI-K1',
+            'ExpressionAttributeValues': {':pk': 'userDeletion', ':sk_max': cutoff_at.to_iso8601_string()},
+        }
+        return (item['partitionKey'].split('/')[1] for item in self.client.generate_all_query(query_kwargs))
@@ -0,0 +1,195 @@
+import logging
+from itertools import chain, islice
+
+import pendulum
+
+from app import models
+
+from .dynamo import UserDeletionDynamo
+
+logger = logging.getLogger()
+
+
+class UserDeletionManager:
+    """
+    Deletes everything a user leaves behind once their profile is gone, as a cascade of steps.
+
+    Progress is recorded on a `deletion` subitem of the user. Each write to it is picked up by the
+    stream handler, which runs one chunk of the current step and records the progress, triggering
+    the next chunk. A chunk that fails or times out leaves the subitem as it was, so the deletion
+    picks back up from there when the cron job finds it stalled. A step whose chunk is still failing
+    after `max_retries` retries is given up on, so it can't hold up the steps after it.
+
+    Items without side effects to speak of are batch deleted by keys, concurrently. Items that
+    need their model to clean up after them (posts, comments, albums) are deleted one by one, in
+    chunks small enough to keep well within the stream handler's timeout. Each chunk queries the
+    user's items from the start, as the chunks before it deleted what they found. The indexes
+    queried may lag behind those deletes, so items that fail to delete because they are already
+    gone count as deleted.
+    """
+
+    batch_chunk_size = 1000
+    model_chunk_size = 50
+    max_workers = 5
+    max_retries = 3
+    stalled_after = pendulum.duration(minutes=15)
+
+    def __init__(self, clients, managers=None):
+        managers = managers or {}
+        managers['user_deletion'] = self
+        self.album_manager = managers.get('album') or models.AlbumManager(clients, managers=managers)
+        self.appstore_manager = managers.get('appstore') or models.AppStoreManager(clients, managers=managers)
+        self.block_manager = managers.get('block') or models.BlockManager(clients, managers=managers)
+        self.card_manager = managers.get('card') or models.CardManager(clients, managers=managers)
+        self.chat_manager = managers.get('chat') or models.ChatManager(clients, managers=managers)
+        self.chat_message_manager = managers.get('chat_message') or models.ChatMessageManager(
+            clients, managers=managers
+        )
+        self.comment_manager = managers.get('comment') or models.CommentManager(clients, managers=managers)
+        self.follower_manager = managers.get('follower') or models.FollowerManager(clients, managers=managers)
+        self.like_manager = managers.get('like') or models.LikeManager(clients, managers=managers)
+        self.post_manager = managers.get('post') or models.PostManager(clients, managers=managers)
+        self.screen_manager = managers.get('screen') or models.ScreenManager(clients, managers=managers)
+        self.user_manager = managers.get('user') or models.UserManager(clients, managers=managers)
+
+        self.clients = clients
+        if 'dynamo' in clients:
+            self.dynamo = UserDeletionDynamo(clients['dynamo'])
+
+        # the cascade, in the order it is run. Each step deletes a chunk of what's left of the user
+        # and returns True once there is nothing left for it to delete
+        self.steps = {
+            'user': self.once(self.user_manager.on_user_delete),
+            'cognito': self.once(self.user_manager.on_user_delete_delete_cognito),
+            'chats': self.once(self.chat_manager.on_user_delete_leave_all_chats),
+            'blocks': self.batch_delete(
+                lambda user_id: self.block_manager.dynamo.generate_blocks_by_blocker(user_id),
+                lambda user_id: self.block_manager.dynamo.generate_blocks_by_blocked(user_id),
+            ),
+            'follows': self.batch_delete(
+                lambda user_id: self.follower_manager.dynamo.generate_follower_items(user_id, keys_only=True),
+                lambda user_id: self.follower_manager.dynamo.generate_followed_items(user_id, keys_only=True),
+            ),
+            'likes': self.dislike_likes,
+            'posts': self.delete_each(
+                lambda user_id: self.post_manager.dynamo.generate_posts_by_user(user_id),
+                lambda item: self.post_manager.init_post(item).delete(),
+            ),
+            'comments': self.delete_each(
+                lambda user_id: self.comment_manager.dynamo.generate_by_user(user_id),
+                lambda item: self.comment_manager.init_comment(item).delete(),
+            ),
+            'albums': self.delete_each(
+                lambda user_id: self.album_manager.dynamo.generate_by_user(user_id),
+                lambda item: self.album_manager.init_album(item).delete(),
+            ),
+            'flags': self.batch_delete(
+                *(
+                    lambda user_id, manager=manager: manager.flag_dynamo.generate_keys_by_user(user_id)
+                    for manager in (
+                        self.chat_manager,
+                        self.chat_message_manager,
+                        self.comment_manager,
+                        self.post_manager,
+                    )
+                )
+            ),
+            'views': self.batch_delete(
+                *(
+                    lambda user_id, manager=manager: manager.view_dynamo.generate_keys_by_user(user_id)
+                    for manager in (self.chat_manager, self.post_manager, self.screen_manager)
+                )
+            ),
+            'cards': self.batch_delete(
+                lambda user_id: self.card_manager.dynamo.generate_cards_by_user(user_id, pks_only=True)
+            ),
+            'appStoreSubs': self.batch_delete(
+                lambda user_id: self.appstore_manager.sub_dynamo.generate_keys_by_user(user_id)
+            ),
+            'dailyTotals': self.batch_delete(
+                lambda user_id: self.user_manager.daily_totals_dynamo.generate_keys(user_id)
+            ),
+            'postViewerSketches': self.batch_delete(
+                lambda user_id: self.user_manager.post_viewer_sketch_dynamo.generate_keys(user_id)
+            ),
+        }
+
+    def once(self, handler):
+        "A step that runs one of the managers' user-delete handlers, all in one go"
+
+        def step(user_id, user_item):
+            handler(user_id, old_item=user_item)
+            return True
+
+        return step
+
+    def batch_delete(self, *item_generator_funcs):
+        "A step that batch deletes chunks of the items generated, concurrently"
+
+        def step(user_id, user_item):
+            items = chain.from_iterable(func(user_id) for func in item_generator_funcs)
+            keys = [
+                {'partitionKey': item['partitionKey'], 'sortKey': item['sortKey']}
+                for item in islice(items, self.batch_chunk_size)
+            ]
+            self.dynamo.client.batch_delete_concurrently(keys, max_workers=self.max_workers)
+            return len(keys) < self.batch_chunk_size
+
+        return step
+
+    def delete_each(self, item_generator_func, delete):
+        "A step that deletes chunks of the items generated one at a time, through their models"
+
+        def step(user_id, user_item):
+            items = list(islice(item_generator_func(user_id), self.model_chunk_size))
+            failed_count = 0
+            for item in items:
+                try:
+                    delete(item)
+                except Exception as err:
+                    key = {'partitionKey': item['partitionKey'], 'sortKey': item['sortKey']}
+                    if self.dynamo.client.get_item(key, ConsistentRead=True) is None:
+                        continue
+                    logger.error(f'Failed to delete `{key["partitionKey"]}` of deleted user `{user_id}`: {err}')
+                    failed_count += 1
+            # done once there is nothing left, or nothing left that can be deleted
+            return len(items) < self.model_chunk_size or failed_count == len(items)
+
+        return step
+
+    def dislike_likes(self, user_id, user_item):
+        like_items = islice(self.like_manager.dynamo.generate_by_liked_by(user_id), self.batch_chunk_size)
+        return self.like_manager.dislike_all(like_items) < self.batch_chunk_size
+
+    def on_user_delete_start_deletion(self, user_id, old_item):
+        self.dynamo.add(user_id, old_item, self.steps)
+
+    def on_deletion_change_run_chunk(self, user_id, new_item, old_item=None):
+        "Run the next chunk of the deletion, then record the progress made or that the deletion is done"
+        steps = new_item['steps']
+        done = True
+        if steps:
+            step = steps[0]
+            if step in self.steps and new_item.get('retryCount', 0) > self.max_retries:
+                logger.error(
+                    f'Giving up on step `{step}` of deletion of user `{user_id}` after {self.max_retries} retries'
+                )
+            elif step in self.steps:
+                done = self.steps[step](user_id, new_item['userItem'])
+            else:
+                logger.warning(f'Skipping unknown step `{step}` of deletion of user `{user_id}`')
+
+        steps = steps[1:] if done else steps
+        if steps:
+            self.dynamo.set_progress(user_id, new_item['chunkCount'], steps)
+        else:
+            self.dynamo.delete(user_id)
+
+    def resume_stalled(self, now=None):
+        "Pick back up deletions that have made no progress in a while. Returns count of deletions resumed."
+        now = now or pendulum.now('utc')
+        user_ids = list(self.dynamo.generate_user_ids_not_updated_since(now - self.stalled_after))
+        for user_id in user_ids:
+            logger.warning(f'Resuming stalled deletion of user `{user_id}`')
+            self.dynamo.touch(user_id, now=now)
+        return len(user_ids)
@@ -1,6 +1,13 @@
 __all__ = [
     'DecimalJsonEncoder',
     'GqlNotificationType',
+    'HyperLogLog',
+    'RateLimiter',
+    'TTLCache',
+    'map_concurrently',
 ]
+from .concurrency import RateLimiter, map_concurrently
 from .decimal_json_encoder import DecimalJsonEncoder
 from .gql_notification_type import GqlNotificationType
+from .hyperloglog import HyperLogLog
+from .ttl_cache import TTLCache
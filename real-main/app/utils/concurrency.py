@@ -0,0 +1,33 @@
+import concurrent.futures
+import threading
+import time
+
+
+def map_concurrently(func, iterable, max_workers=10):
+    """
+    Call func on each element of iterable using a thread pool, returning the results in order.
+    Meant for fanning out network calls, so func should only use thread safe clients (boto3
+    clients are, boto3 resources are not). The first exception is re-raised once all calls are done.
+    """
+    items = list(iterable)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(items), max_workers)) as executor:
+        return list(executor.map(func, items))
+
+
+class RateLimiter:
+    "Spaces out calls, across threads, to at most `rate` per second. Call `wait()` before each call."
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_at = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            at = max(self.next_at, time.monotonic())
+            self.next_at = at + self.interval
+        delay = at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
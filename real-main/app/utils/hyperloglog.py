@@ -0,0 +1,53 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """
+    Approximate distinct counter. Registers are kept sparse, as a dict of register index
+    to rank, as that's how they are stored in dynamo. With the default precision of 10
+    a full sketch has 1024 registers and a standard error of about 3%.
+    """
+
+    hash_bits = 64
+
+    def __init__(self, registers=None, precision=10):
+        self.precision = precision
+        self.register_count = 1 << precision
+        self.registers = dict(registers or {})
+
+    def hash(self, value):
+        "Return the (register index, rank) pair that `value` maps to"
+        digest = hashlib.sha1(str(value).encode()).digest()
+        x = int.from_bytes(digest[: self.hash_bits // 8], 'big')
+        rest_bits = self.hash_bits - self.precision
+        index = x >> rest_bits
+        rank = rest_bits - (x & ((1 << rest_bits) - 1)).bit_length() + 1
+        return index, rank
+
+    def add(self, value):
+        "Add a value to the sketch, returns True if the sketch changed"
+        index, rank = self.hash(value)
+        if self.registers.get(index, 0) >= rank:
+            return False
+        self.registers[index] = rank
+        return True
+
+    def merge(self, other):
+        "Merge another sketch of the same precision into this one"
+        assert other.precision == self.precision, 'Can only merge sketches of the same precision'
+        for index, rank in other.registers.items():
+            if self.registers.get(index, 0) < rank:
+                self.registers[index] = rank
+        return self
+
+    def count(self):
+        "Estimate the number of distinct values added"
+        m = self.register_count
+        alpha = 0.7213 / (1 + 1.079 / m)
+        zeros = m - len(self.registers)
+        estimate = alpha * m * m / (zeros + sum(2.0 ** -rank for rank in self.registers.values()))
+        if estimate <= 2.5 * m and zeros:
+            # small range correction: linear counting
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    In-memory cache whose entries expire `ttl` seconds after they are set. Meant to live as long
+    as the lambda container, to skip repeated lookups of data that changes rarely. Thread safe.
+    When full, the oldest entry is evicted.
+    """
+
+    missing = object()
+
+    def __init__(self, ttl, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = {}  # key -> (value, expires_at)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self.lock:
+            value, expires_at = self.entries.get(key, (self.missing, None))
+            if value is self.missing:
+                return default
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            if len(self.entries) >= self.maxsize:
+                del self.entries[next(iter(self.entries))]
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+
+    def get_or_load(self, key, load):
+        "Get the cached value, or call `load(key)` and cache the result. None results are cached too"
+        value = self.get(key, self.missing)
+        if value is self.missing:
+            value = load(key)
+            self.set(key, value)
+        return value
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
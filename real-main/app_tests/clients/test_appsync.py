@@ -0,0 +1,121 @@
+import threading
+from unittest import mock
+
+import gql
+import pytest
+import requests_mock
+
+from app.clients import AppSyncClient
+
+url = 'https://real.appsync-api.us-east-1.amazonaws.com/graphql'
+
+
+@pytest.fixture
+def appsync_client(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'foo')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'bar')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    yield AppSyncClient(appsync_graphql_url=url)
+
+
+def test_fire_notification(appsync_client):
+    with requests_mock.mock() as m:
+        m.post(url, json={'data': {'triggerNotification': {}}})
+        appsync_client.fire_notification('uid', 'POST_COMPLETED', postId='pid')
+
+    assert len(m.request_history) == 1
+    req = m.request_history[0]
+    assert req.headers['Content-Type'] == 'application/json'
+    assert req.headers['Authorization'].startswith('AWS4-HMAC-SHA256 Credential=foo/')
+    assert 'triggerNotification' in req.json()['query']
+    assert 'postId' in req.json()['query']
+    assert req.json()['variables'] == {'input': {'userId': 'uid', 'type': 'POST_COMPLETED', 'postId': 'pid'}}
+
+
+def test_fire_notification_caches_documents(appsync_client):
+    with requests_mock.mock() as m:
+        m.post(url, json={'data': {}})
+        with mock.patch('app.clients.appsync.gql.gql', wraps=gql.gql) as gql_mock:
+            appsync_client.fire_notification('uid1', 'POST_COMPLETED', postId='pid1')
+            appsync_client.fire_notification('uid2', 'POST_COMPLETED', postId='pid2')
+            appsync_client.fire_notification('uid1', 'USER_FEED_CHANGED')
+    assert gql_mock.call_count == 2
+    assert len(appsync_client.documents) == 2
+    assert len(appsync_client.query_strs) == 2
+    assert len(m.request_history) == 3
+    assert 'postId' not in m.request_history[2].json()['query']
+
+
+def test_send_reuses_session_and_auth(appsync_client):
+    with requests_mock.mock() as m:
+        m.post(url, json={'data': {}})
+        appsync_client.fire_notification('uid1', 'USER_FEED_CHANGED')
+        session, auth = appsync_client.session, appsync_client.auth
+        appsync_client.fire_notification('uid2', 'USER_FEED_CHANGED')
+    assert appsync_client.session is session
+    assert appsync_client.auth is auth
+    assert len(m.request_history) == 2
+
+
+def test_auth_rebuilt_when_credentials_refreshed(appsync_client, monkeypatch):
+    auth = appsync_client.auth
+    assert appsync_client.auth is auth
+
+    # simulate the credentials rotating under a long-lived process
+    creds = appsync_client._aws_session.get_credentials()
+    monkeypatch.setattr(creds, 'access_key', 'foo2')
+    new_auth = appsync_client.auth
+    assert new_auth is not auth
+    assert new_auth.access_id == 'foo2'
+
+
+def test_send_raises_on_errors(appsync_client):
+    with requests_mock.mock() as m:
+        m.post(url, json={'data': None, 'errors': [{'message': 'Nope'}]})
+        with pytest.raises(Exception, match='Appsync resp error: .*Nope'):
+            appsync_client.fire_notification('uid', 'USER_FEED_CHANGED')
+
+    with requests_mock.mock() as m:
+        m.post(url, status_code=403, json={'message': 'Forbidden'})
+        with pytest.raises(Exception, match='403'):
+            appsync_client.fire_notification('uid', 'USER_FEED_CHANGED')
+
+
+def test_fire_notifications(appsync_client):
+    thread_ids = set()
+
+    def callback(request, context):
+        thread_ids.add(threading.get_ident())
+        return {'data': {}}
+
+    user_ids = [f'uid{i}' for i in range(25)]
+    with requests_mock.mock() as m:
+        m.post(url, json=callback)
+        appsync_client.fire_notifications(user_ids, 'POST_COMPLETED', postId='pid')
+
+    assert len(m.request_history) == 25
+    inputs = [req.json()['variables']['input'] for req in m.request_history]
+    assert sorted(input_obj['userId'] for input_obj in inputs) == sorted(user_ids)
+    assert all(input_obj['type'] == 'POST_COMPLETED' for input_obj in inputs)
+    assert all(input_obj['postId'] == 'pid' for input_obj in inputs)
+    assert len(appsync_client.documents) == 1
+    assert len(thread_ids) > 1
+
+
+def test_fire_notifications_sends_all_before_raising(appsync_client):
+    def callback(request, context):
+        if request.json()['variables']['input']['userId'] == 'uid1':
+            return {'errors': [{'message': 'Nope'}]}
+        return {'data': {}}
+
+    with requests_mock.mock() as m:
+        m.post(url, json=callback)
+        with pytest.raises(Exception, match='Nope'):
+            appsync_client.fire_notifications(['uid0', 'uid1', 'uid2'], 'USER_FEED_CHANGED')
+    assert len(m.request_history) == 3
+
+
+def test_fire_notifications_none(appsync_client):
+    with requests_mock.mock() as m:
+        appsync_client.fire_notifications([], 'USER_FEED_CHANGED')
+    assert len(m.request_history) == 0
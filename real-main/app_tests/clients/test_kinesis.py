@@ -0,0 +1,98 @@
+import base64
+import json
+
+import boto3
+import moto
+import pytest
+from mock import patch
+
+from app.clients import KinesisClient, LocalKinesisClient
+from app.clients.kinesis import PutRecordsFailed
+
+stream_name = 'views-stream'
+
+
+@pytest.fixture
+def kinesis_client():
+    with moto.mock_kinesis():
+        client = KinesisClient(stream_name=stream_name)
+        client.client.create_stream(StreamName=stream_name, ShardCount=1)
+        yield client
+
+
+def decode(event):
+    return [json.loads(base64.b64decode(record['kinesis']['data'])) for record in event['Records']]
+
+
+def test_put_records(kinesis_client):
+    kinesis_client.max_records_per_put = 2  # force chunking
+    kinesis_client.put_records([('pk1', {'a': 1}), ('pk2', {'b': 2}), ('pk1', {'c': 3})])
+
+    client = boto3.client('kinesis')
+    shard_id = client.describe_stream(StreamName=stream_name)['StreamDescription']['Shards'][0]['ShardId']
+    iterator = client.get_shard_iterator(
+        StreamName=stream_name, ShardId=shard_id, ShardIteratorType='TRIM_HORIZON'
+    )
+    records = client.get_records(ShardIterator=iterator['ShardIterator'])['Records']
+    assert [r['PartitionKey'] for r in records] == ['pk1', 'pk2', 'pk1']
+    assert [json.loads(r['Data']) for r in records] == [{'a': 1}, {'b': 2}, {'c': 3}]
+
+
+def test_put_records_retries_failed_records_then_raises(kinesis_client):
+    ok, throttled = {'SequenceNumber': '1', 'ShardId': 's'}, {
+        'ErrorCode': 'ProvisionedThroughputExceededException'
+    }
+    resps = [
+        {'FailedRecordCount': 1, 'Records': [ok, throttled]},
+        {'FailedRecordCount': 1, 'Records': [throttled]},
+        {'FailedRecordCount': 1, 'Records': [throttled]},
+    ]
+    with patch.object(kinesis_client.client, 'put_records', side_effect=resps) as put_mock:
+        with patch('app.clients.kinesis.time.sleep') as sleep_mock:
+            with pytest.raises(PutRecordsFailed) as error_info:
+                kinesis_client.put_records([('pk1', {'a': 1}), ('pk2', {'b': 2})])
+    assert error_info.value.records == [('pk2', {'b': 2})]
+    assert [len(c.kwargs['Records']) for c in put_mock.call_args_list] == [2, 1, 1]
+    assert [c.kwargs['Records'][0]['PartitionKey'] for c in put_mock.call_args_list] == ['pk1', 'pk2', 'pk2']
+
+    # backs off, with jitter, between attempts
+    assert sleep_mock.call_count == 2
+    first_sleep, second_sleep = (c.args[0] for c in sleep_mock.call_args_list)
+    assert 0 <= first_sleep <= kinesis_client.put_backoff_base * 2
+    assert 0 <= second_sleep <= kinesis_client.put_backoff_base * 4
+
+    # records that go through on a retry are not reported
+    resps = [{'FailedRecordCount': 1, 'Records': [ok, throttled]}, {'FailedRecordCount': 0, 'Records': [ok]}]
+    with patch.object(kinesis_client.client, 'put_records', side_effect=resps) as put_mock:
+        with patch('app.clients.kinesis.time.sleep'):
+            kinesis_client.put_records([('pk1', {'a': 1}), ('pk2', {'b': 2})])
+    assert put_mock.call_count == 2
+
+
+def test_local_in_memory():
+    client = LocalKinesisClient()
+    assert client.get_records_event() == {'Records': []}
+
+    client.put_records([('pk1', {'a': 1}), ('pk2', {'b': 2})])
+    client.put_records([('pk1', {'c': 3})])
+
+    event = client.get_records_event(max_records=2)
+    assert [r['kinesis']['partitionKey'] for r in event['Records']] == ['pk1', 'pk2']
+    assert decode(event) == [{'a': 1}, {'b': 2}]
+    assert decode(client.get_records_event()) == [{'c': 3}]
+    assert client.get_records_event() == {'Records': []}
+
+
+def test_local_file(tmp_path):
+    path = tmp_path / 'stream.jsonl'
+    client = LocalKinesisClient(path=path)
+    assert client.get_records_event() == {'Records': []}
+
+    client.put_records([('pk1', {'a': 1})])
+    # another client, for example in another process, appending to the same file
+    LocalKinesisClient(path=path).put_records([('pk2', {'b': 2})])
+    assert len(path.read_text().splitlines()) == 2
+
+    assert decode(client.get_records_event()) == [{'a': 1}, {'b': 2}]
+    assert path.read_text() == ''
+    assert client.get_records_event() == {'Records': []}
@@ -102,6 +102,39 @@ def test_send_user_apns(mocked_pinpoint_client):
     ]
 
 
+def test_send_users_apns(mocked_pinpoint_client):
+    user_id1, user_id2 = str(uuid.uuid4()), str(uuid.uuid4())
+
+    def result(status):
+        return {str(uuid.uuid4()): {'Address': 'addr', 'DeliveryStatus': status, 'StatusCode': 200}}
+
+    resp = {
+        'ResponseMetadata': {},
+        'SendUsersMessageResponse': {
+            'ApplicationId': '',
+            'RequestId': '',
+            'Result': {user_id1: result('SUCCESSFUL'), user_id2: result('PERMANENT_FAILURE')},
+        },
+    }
+    mocked_pinpoint_client.client.configure_mock(**{'send_users_messages.return_value': resp})
+    sent = mocked_pinpoint_client.send_users_apns('the-url', {user_id1: 'title-1', user_id2: 'title-2'})
+    assert sent == {user_id1}
+    assert mocked_pinpoint_client.client.mock_calls == [
+        call.send_users_messages(
+            ApplicationId='testing-pinpoint-app-id',
+            SendUsersMessageRequest={
+                'MessageConfiguration': {'APNSMessage': {'Action': 'URL', 'Title': 'title-1', 'Url': 'the-url'}},
+                'Users': {user_id1: {'TitleOverride': 'title-1'}, user_id2: {'TitleOverride': 'title-2'}},
+            },
+        )
+    ]
+
+    # too many users for one request
+    user_titles = {str(i): 't' for i in range(PinpointClient.max_users_per_request + 1)}
+    with pytest.raises(AssertionError, match='Too many users'):
+        mocked_pinpoint_client.send_users_apns('the-url', user_titles)
+
+
 @pytest.mark.skip(reason='Requires live Pinpoint Application')
 @pytest.mark.parametrize(
     'channel_type, address1, address2',
@@ -0,0 +1,84 @@
+import logging
+from unittest import mock
+
+import pytest
+
+
+@pytest.fixture
+def s3_client(s3_uploads_client):
+    yield s3_uploads_client
+
+
+def test_put_objects(s3_client):
+    objects = [(f'prefix/{i}', f'data{i}'.encode(), 'text/plain') for i in range(12)]
+    assert not any(s3_client.exists(path) for path, _, _ in objects)
+
+    s3_client.put_objects(objects)
+    for path, body, _ in objects:
+        assert s3_client.get_object_data_stream(path).read() == body
+        assert s3_client.bucket.Object(path).content_type == 'text/plain'
+
+    # no-op
+    s3_client.put_objects([])
+
+
+def test_copy_objects(s3_client):
+    for i in range(5):
+        s3_client.put_object(f'src/{i}', f'data{i}'.encode(), 'text/plain')
+
+    s3_client.copy_objects([(f'src/{i}', f'dest/{i}') for i in range(5)])
+    for i in range(5):
+        assert s3_client.get_object_data_stream(f'src/{i}').read() == f'data{i}'.encode()
+        assert s3_client.get_object_data_stream(f'dest/{i}').read() == f'data{i}'.encode()
+
+
+def test_copy_objects_source_does_not_exist(s3_client):
+    s3_client.put_object('src/0', b'data', 'text/plain')
+    with pytest.raises(s3_client.exceptions.ClientError):
+        s3_client.copy_objects([('src/0', 'dest/0'), ('src/dne', 'dest/dne')])
+    # the other copy still happened
+    assert s3_client.exists('dest/0')
+    assert not s3_client.exists('dest/dne')
+
+
+def test_delete_objects_chunked(s3_client):
+    paths = [f'prefix/{i}' for i in range(7)]
+    s3_client.put_objects([(path, b'data', 'text/plain') for path in paths])
+    s3_client.put_object('other', b'data', 'text/plain')
+
+    s3_client.delete_objects_max_keys = 3
+    with mock.patch.object(
+        s3_client.boto_client, 'delete_objects', wraps=s3_client.boto_client.delete_objects
+    ) as delete_mock:
+        s3_client.delete_objects(iter(paths + ['prefix/dne']))
+    assert sorted(len(c.kwargs['Delete']['Objects']) for c in delete_mock.mock_calls) == [2, 3, 3]
+    assert not any(s3_client.exists(path) for path in paths)
+    assert s3_client.exists('other')
+
+    # no-op
+    with mock.patch.object(s3_client.boto_client, 'delete_objects') as delete_mock:
+        s3_client.delete_objects([])
+    assert delete_mock.call_count == 0
+
+
+def test_delete_objects_logs_errors(s3_client, caplog):
+    resp = {'Errors': [{'Key': 'prefix/0', 'Code': 'AccessDenied', 'Message': 'Access Denied'}]}
+    with mock.patch.object(s3_client.boto_client, 'delete_objects', return_value=resp):
+        with caplog.at_level(logging.WARNING):
+            s3_client.delete_objects(['prefix/0', 'prefix/1'])
+    assert len(caplog.records) == 1
+    assert 'prefix/0' in caplog.records[0].msg
+    assert 'AccessDenied' in caplog.records[0].msg
+
+
+def test_delete_objects_with_prefix(s3_client):
+    paths = [f'prefix/{i}' for i in range(5)]
+    s3_client.put_objects([(path, b'data', 'text/plain') for path in paths + ['prefixnot/0', 'other/0']])
+
+    s3_client.delete_objects_with_prefix('prefix/')
+    assert not any(s3_client.exists(path) for path in paths)
+    assert s3_client.exists('prefixnot/0')
+    assert s3_client.exists('other/0')
+
+    # no-op
+    s3_client.delete_objects_with_prefix('prefix/')
@@ -298,11 +298,30 @@ def post_manager(
     )
 
 
+@pytest.fixture
+def relationship_manager(dynamo_client):
+    yield models.RelationshipManager({'dynamo': dynamo_client})
+
+
 @pytest.fixture
 def screen_manager(dynamo_client):
     yield models.ScreenManager({'dynamo': dynamo_client})
 
 
+@pytest.fixture
+def user_deletion_manager(
+    dynamo_client, album_manager, chat_manager, comment_manager, post_manager, user_manager
+):
+    managers = {
+        'album': album_manager,
+        'chat': chat_manager,
+        'comment': comment_manager,
+        'post': post_manager,
+        'user': user_manager,
+    }
+    yield models.UserDeletionManager({'dynamo': dynamo_client}, managers=managers)
+
+
 @pytest.fixture
 def user_manager(
     amplitude_client,
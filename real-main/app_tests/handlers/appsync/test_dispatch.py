@@ -5,6 +5,7 @@ import pytest
 # turning off route autodiscovery
 os.environ['APPSYNC_ROUTE_AUTODISCOVERY_PATH'] = ''
 from app.handlers.appsync import dispatch, routes  # noqa: E402 isort:skip
+from app.handlers.appsync.exceptions import ClientException  # noqa: E402 isort:skip
 
 
 @pytest.fixture
@@ -109,3 +110,49 @@ def test_context_passed(setup_one_route, api_key_authed_event):
             },
         },
     }
+
+
+@pytest.fixture
+def setup_one_batch_route():
+    routes.clear()
+
+    @routes.register_batch('Type.field')
+    def mocked_batch_handler(
+        caller_user_id, arguments_list, sources=None, **kwargs
+    ):  # pylint: disable=unused-variable
+        if caller_user_id == 'bad-caller':
+            raise ClientException('Bad caller')
+        return [
+            {'caller_user_id': caller_user_id, 'arguments': arguments, 'source': source}
+            for arguments, source in zip(arguments_list, sources)
+        ]
+
+
+def test_batch_unknown_field_raises_exception(setup_one_route, cognito_authed_event):
+    # a single handler is not used for batches
+    with pytest.raises(Exception, match='No batch handler for field `Type.field` found'):
+        dispatch([cognito_authed_event], {})
+
+
+def test_batch_empty(setup_one_batch_route):
+    assert dispatch([], {}) == []
+
+
+def test_batch_success(setup_one_batch_route, cognito_authed_event, api_key_authed_event):
+    event1 = {**cognito_authed_event, 'source': {'id': 1}}
+    event2 = {**api_key_authed_event, 'source': {'id': 2}}
+    event3 = {**cognito_authed_event, 'source': {'id': 3}}
+    assert dispatch([event1, event2, event3], {}) == [
+        {'data': {'caller_user_id': '42-42', 'arguments': ['arg1', 'arg2'], 'source': {'id': 1}}},
+        {'data': {'caller_user_id': None, 'arguments': ['arg1', 'arg2'], 'source': {'id': 2}}},
+        {'data': {'caller_user_id': '42-42', 'arguments': ['arg1', 'arg2'], 'source': {'id': 3}}},
+    ]
+
+
+def test_batch_client_error(setup_one_batch_route, cognito_authed_event):
+    event1 = {**cognito_authed_event, 'source': {'id': 1}}
+    event2 = {**cognito_authed_event, 'source': {'id': 2}, 'identity': {'cognitoIdentityId': 'bad-caller'}}
+    assert dispatch([event1, event2], {}) == [
+        {'data': {'caller_user_id': '42-42', 'arguments': ['arg1', 'arg2'], 'source': {'id': 1}}},
+        {'error': ClientException('Bad caller').serialize()},
+    ]
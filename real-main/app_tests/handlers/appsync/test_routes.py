@@ -16,14 +16,31 @@ def test_graphql_adds_to_it():
     assert routes.cache == {'Mytype.myfield': myfunc}
 
 
+def test_register_batch():
+    @routes.register_batch('Mytype.myfield')
+    def myfunc():
+        pass
+
+    assert routes.cache == {}
+    assert routes.batch_cache == {'Mytype.myfield': myfunc}
+    assert routes.get_handler('Mytype.myfield') is None
+    assert routes.get_batch_handler('Mytype.myfield') is myfunc
+
+
 def test_clear_works():
     @routes.register('Mytype.myfield')
     def myfunc():
         pass
 
+    @routes.register_batch('Mytype.myfield')
+    def myfunc_batch():
+        pass
+
     assert routes.cache == {'Mytype.myfield': myfunc}
+    assert routes.batch_cache == {'Mytype.myfield': myfunc_batch}
     routes.clear()
     assert routes.cache == {}
+    assert routes.batch_cache == {}
 
 
 def test_discover():
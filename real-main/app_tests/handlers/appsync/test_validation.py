@@ -9,6 +9,7 @@ from app.handlers.appsync.validation import (
     validate_location,
     validate_match_genders,
     validate_match_location_radius,
+    validate_view_count_days,
 )
 from app.models.user.enums import UserSubscriptionLevel
 
@@ -159,3 +160,14 @@ def test_validate_height_range():
 
     with pytest.raises(ClientException, match='matchHeightRange'):
         validate_height_range(invalid_match_height_range_4)
+
+
+def test_validate_view_count_days():
+    assert validate_view_count_days(1) is True
+    assert validate_view_count_days(30) is True
+
+    with pytest.raises(ClientException, match='days'):
+        validate_view_count_days(0)
+
+    with pytest.raises(ClientException, match='days'):
+        validate_view_count_days(31)
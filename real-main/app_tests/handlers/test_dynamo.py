@@ -94,3 +94,20 @@ def test_dynamo_dispatch_attributes():
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {}, {'k3': 'd'}) == []
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {'k3': ''}, {}) == [f3]
     assert dispatch.search('pkpre', 'skpre', 'INSERT', {'k3': 42}, {}) == [f3]
+
+
+def test_dynamo_dispatch_batch():
+    dispatch = DynamoDispatch()
+
+    f1 = Mock()
+    dispatch.register_batch('pkpre', 'skpre', ['REMOVE'], f1)
+    assert dispatch.search_batch('pkpre', 'skpre', 'REMOVE') == [f1]
+    assert dispatch.search_batch('pkpre', 'skpre', 'INSERT') == []
+    assert dispatch.search_batch('pkpre2', 'skpre', 'REMOVE') == []
+
+    # batch listeners aren't found by per-record searches, and vice versa
+    assert dispatch.search('pkpre', 'skpre', 'REMOVE', {}, {}) == []
+    f2 = Mock()
+    dispatch.register('pkpre', 'skpre', ['REMOVE'], f2)
+    assert dispatch.search('pkpre', 'skpre', 'REMOVE', {}, {}) == [f2]
+    assert dispatch.search_batch('pkpre', 'skpre', 'REMOVE') == [f1]
@@ -5,6 +5,7 @@ import pendulum
 import pytest
 
 from app.mixins.view.dynamo import ViewDynamo
+from app.mixins.view.enums import ViewType
 from app.mixins.view.exceptions import ViewAlreadyExists, ViewDoesNotExist
 
 
@@ -69,6 +70,55 @@ def test_add_and_increment_view(view_dynamo):
     assert view_dynamo.get_view(item_id, user_id) == view
 
 
+def test_upsert_view(view_dynamo):
+    item_id = 'iid'
+    user_id = 'uid'
+    viewed_at = pendulum.now('utc')
+    viewed_at_str = viewed_at.to_iso8601_string()
+
+    # first upsert creates the view with the same form as add_view() would, and reports a first view
+    assert view_dynamo.upsert_view(item_id, user_id, 5, viewed_at) is None
+    assert view_dynamo.get_view(item_id, user_id) == {
+        'partitionKey': 'itype/iid',
+        'sortKey': 'view/uid',
+        'schemaVersion': 0,
+        'gsiA1PartitionKey': 'itypeView/iid',
+        'gsiA1SortKey': viewed_at_str,
+        'gsiA2PartitionKey': 'itypeView/uid',
+        'gsiA2SortKey': viewed_at_str,
+        'viewCount': 5,
+        'firstViewedAt': viewed_at_str,
+        'lastViewedAt': viewed_at_str,
+    }
+
+    # second upsert adds to the counts, leaving first view timestamps alone, and reports the last view
+    new_viewed_at = pendulum.now('utc')
+    assert view_dynamo.upsert_view(item_id, user_id, 2, new_viewed_at, view_type=ViewType.FOCUS) == viewed_at_str
+    assert view_dynamo.get_view(item_id, user_id) == {
+        'partitionKey': 'itype/iid',
+        'sortKey': 'view/uid',
+        'schemaVersion': 0,
+        'gsiA1PartitionKey': 'itypeView/iid',
+        'gsiA1SortKey': viewed_at_str,
+        'gsiA2PartitionKey': 'itypeView/uid',
+        'gsiA2SortKey': viewed_at_str,
+        'viewCount': 7,
+        'focusViewCount': 2,
+        'firstViewedAt': viewed_at_str,
+        'lastViewedAt': new_viewed_at.to_iso8601_string(),
+    }
+
+    # works on top of views created by add_view() too
+    view_dynamo.add_view(item_id, 'uid2', 1, viewed_at, view_type=ViewType.THUMBNAIL)
+    assert (
+        view_dynamo.upsert_view(item_id, 'uid2', 1, new_viewed_at, view_type=ViewType.THUMBNAIL) == viewed_at_str
+    )
+    view = view_dynamo.get_view(item_id, 'uid2')
+    assert view['viewCount'] == 2
+    assert view['thumbnailViewCount'] == 2
+    assert view['firstViewedAt'] == viewed_at_str
+
+
 def test_generate_keys_by_item_and_generate_keys_by_user(view_dynamo):
     item_id_1, item_id_2 = str(uuid4()), str(uuid4())
     user_id_1, user_id_2 = str(uuid4()), str(uuid4())
@@ -92,6 +142,25 @@ def test_generate_keys_by_item_and_generate_keys_by_user(view_dynamo):
     assert list(view_dynamo.generate_keys_by_user(user_id_2)) == [vk22]
 
 
+def test_get_views(view_dynamo):
+    user_id, other_user_id = str(uuid4()), str(uuid4())
+    item_ids = [str(uuid4()) for _ in range(150)]
+    assert view_dynamo.get_views([], user_id) == {}
+    assert view_dynamo.get_views(item_ids, user_id) == {}
+
+    # view every other item, more than fit in a single batch get
+    for item_id in item_ids[::2]:
+        view_dynamo.add_view(item_id, user_id, 1, pendulum.now('utc'))
+    view_dynamo.add_view(item_ids[1], other_user_id, 1, pendulum.now('utc'))
+
+    views = view_dynamo.get_views(item_ids, user_id)
+    assert sorted(views) == sorted(item_ids[::2])
+    assert views[item_ids[0]] == view_dynamo.get_view(item_ids[0], user_id)
+    assert view_dynamo.get_views(item_ids[:3], other_user_id) == {
+        item_ids[1]: view_dynamo.get_view(item_ids[1], other_user_id)
+    }
+
+
 def test_delete_view(view_dynamo):
     # add two views, verify
     item_id1, user_id1 = [str(uuid4()), str(uuid4())]
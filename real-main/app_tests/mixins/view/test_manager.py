@@ -1,8 +1,15 @@
+import base64
+import json
 from uuid import uuid4
 
+import pendulum
 import pytest
 from mock import patch
 
+from app.clients import LocalKinesisClient
+from app.clients.kinesis import PutRecordsFailed
+from app.mixins.view.enums import ViewedStatus, ViewType
+from app.mixins.view.exceptions import ViewEventsNotRecorded
 from app.models.post.enums import PostType
 
 
@@ -107,3 +114,132 @@ def test_on_user_delete_delete_views(manager, model1, model2, user, user2):
     assert manager.view_dynamo.get_view(model2.id, user.id) is None
     assert manager.view_dynamo.get_view(model1.id, user2.id) is None
     assert manager.view_dynamo.get_view(model2.id, user2.id) is None
+
+
+@pytest.mark.parametrize(
+    'manager, model1, model2',
+    [
+        pytest.lazy_fixture(['post_manager', 'post', 'post2']),
+        pytest.lazy_fixture(['chat_manager', 'chat', 'chat2']),
+    ],
+)
+def test_get_views_and_get_viewed_statuses(manager, model1, model2):
+    user_id = str(uuid4())
+    ids = [model1.id, model2.id, 'iid-dne']
+    assert manager.get_views(ids, user_id) == {}
+    assert manager.get_viewed_statuses(ids, user_id) == {
+        model1.id: ViewedStatus.NOT_VIEWED,
+        model2.id: ViewedStatus.NOT_VIEWED,
+        'iid-dne': ViewedStatus.NOT_VIEWED,
+    }
+
+    model2.record_view_count(user_id, 2)
+    views = manager.get_views(ids, user_id)
+    assert list(views) == [model2.id]
+    assert views[model2.id]['viewCount'] == 2
+    assert manager.get_viewed_statuses(ids, user_id) == {
+        model1.id: ViewedStatus.NOT_VIEWED,
+        model2.id: ViewedStatus.VIEWED,
+        'iid-dne': ViewedStatus.NOT_VIEWED,
+    }
+
+
+def test_report_views_without_stream_records_immediately(screen_manager, user):
+    assert screen_manager.views_stream is None
+    screen_manager.report_views(['s1', 's1'], user.id)
+    assert screen_manager.view_dynamo.get_view('s1', user.id)['viewCount'] == 2
+
+
+def test_report_views_falls_back_to_recording_immediately(screen_manager, user, caplog):
+    screen_manager.views_stream = LocalKinesisClient()
+    error = PutRecordsFailed('views-stream', [('pk', {})])
+    with patch.object(screen_manager.views_stream, 'put_records', side_effect=error):
+        screen_manager.report_views(['s1', 's1'], user.id)
+    assert screen_manager.view_dynamo.get_view('s1', user.id)['viewCount'] == 2
+    assert len(caplog.records) == 1
+    assert caplog.records[0].levelname == 'WARNING'
+    assert 'failed to put `1` records' in caplog.records[0].msg
+    assert screen_manager.views_stream.get_records_event() == {'Records': []}
+
+
+def test_report_views_buffered_then_record_view_events(post_manager, post, post2, user, user2):
+    post_manager.views_stream = LocalKinesisClient()
+    viewed_at1 = pendulum.now('utc')
+    viewed_at2 = viewed_at1 + pendulum.duration(seconds=5)
+
+    # reporting just appends to the stream
+    post_manager.report_views([post.id, post.id], user.id, viewed_at=viewed_at2, view_type=ViewType.FOCUS)
+    post_manager.report_views([post.id, post2.id], user.id, viewed_at=viewed_at1, view_type=ViewType.FOCUS)
+    post_manager.report_views([post2.id], user.id, viewed_at=viewed_at2, view_type=ViewType.THUMBNAIL)
+    post_manager.report_views([post.id], user2.id, viewed_at=viewed_at2)
+    assert post_manager.view_dynamo.get_view(post.id, user.id) is None
+    assert post_manager.view_dynamo.get_view(post.id, user2.id) is None
+
+    # the consumer aggregates per (item, user) and writes each once
+    event = post_manager.views_stream.get_records_event()
+    assert len(event['Records']) == 4
+    events = [json.loads(base64.b64decode(r['kinesis']['data'])) for r in event['Records']]
+    with patch.object(post_manager.view_dynamo, 'upsert_view', wraps=post_manager.view_dynamo.upsert_view) as m:
+        post_manager.record_view_events(events)
+    assert m.call_count == 4
+    view = post_manager.view_dynamo.get_view(post.id, user.id)
+    assert view['viewCount'] == 3
+    assert view['focusViewCount'] == 3
+    assert view['firstViewedAt'] == viewed_at1.to_iso8601_string()
+    view = post_manager.view_dynamo.get_view(post2.id, user.id)
+    assert view['viewCount'] == 2
+    assert view['focusViewCount'] == 1
+    assert view['thumbnailViewCount'] == 1
+    assert post_manager.view_dynamo.get_view(post.id, user2.id)['viewCount'] == 1
+
+
+def test_record_view_events_isolates_failures(screen_manager, user, user2, caplog):
+    viewed_at = pendulum.now('utc').to_iso8601_string()
+    events = [
+        {'itemType': 'screen', 'itemIds': ['s1'], 'userId': user.id, 'viewedAt': viewed_at},
+        {'itemType': 'screen', 'itemIds': ['s1'], 'userId': user2.id, 'viewedAt': viewed_at},
+    ]
+    with patch.object(screen_manager, 'record_views', side_effect=[Exception('nope'), None]) as m:
+        with pytest.raises(ViewEventsNotRecorded, match='for `1` users'):
+            screen_manager.record_view_events(events)
+    assert m.call_count == 2
+    assert len(caplog.records) == 1
+    assert 'nope' in caplog.records[0].msg
+
+    screen_manager.record_view_events(events[1:])
+    assert screen_manager.view_dynamo.get_view('s1', user2.id)['viewCount'] == 1
+
+
+def test_record_view_events_retried_window_does_not_double_count(screen_manager, user, user2):
+    viewed_at = pendulum.now('utc').to_iso8601_string()
+    events = [
+        {'itemType': 'screen', 'itemIds': ['s1'], 'userId': user.id, 'viewedAt': viewed_at, 'eventId': 'e1'},
+        {'itemType': 'screen', 'itemIds': ['s1'], 'userId': user2.id, 'viewedAt': viewed_at, 'eventId': 'e2'},
+        {'itemType': 'screen', 'itemIds': ['s1'], 'userId': user2.id, 'viewedAt': viewed_at, 'eventId': 'e3'},
+    ]
+    record_views = screen_manager.record_views
+
+    def fail_first_user(*args, **kwargs):
+        if m.call_count == 1:
+            raise Exception('nope')
+        return record_views(*args, **kwargs)
+
+    with patch.object(screen_manager, 'record_views', side_effect=fail_first_user) as m:
+        with pytest.raises(ViewEventsNotRecorded, match='for `1` users'):
+            screen_manager.record_view_events(events)
+    assert screen_manager.view_dynamo.get_view('s1', user.id) is None
+    assert screen_manager.view_dynamo.get_view('s1', user2.id)['viewCount'] == 2
+    assert screen_manager.view_dynamo.get_recorded_event_ids(['e1', 'e2', 'e3']) == {'e2', 'e3'}
+
+    # the stream retries the whole window, only the failed user's views are recorded
+    with patch.object(screen_manager, 'record_views', wraps=record_views) as m:
+        screen_manager.record_view_events(events)
+    assert m.call_count == 1
+    assert screen_manager.view_dynamo.get_view('s1', user.id)['viewCount'] == 1
+    assert screen_manager.view_dynamo.get_view('s1', user2.id)['viewCount'] == 2
+
+    # and any further retry records nothing
+    with patch.object(screen_manager, 'record_views', wraps=record_views) as m:
+        screen_manager.record_view_events(events)
+    assert m.call_count == 0
+    assert screen_manager.view_dynamo.get_view('s1', user.id)['viewCount'] == 1
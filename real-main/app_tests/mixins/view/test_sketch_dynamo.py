@@ -0,0 +1,84 @@
+import pendulum
+import pytest
+
+from app.mixins.view.sketch_dynamo import ViewerSketchDynamo
+from app.utils import HyperLogLog
+
+
+@pytest.fixture
+def sketch_dynamo(dynamo_client):
+    yield ViewerSketchDynamo('post', dynamo_client)
+
+
+def test_key(sketch_dynamo):
+    assert sketch_dynamo.key('pid') == {'partitionKey': 'post/pid', 'sortKey': 'viewerSketch'}
+    assert sketch_dynamo.key('pid', date=pendulum.date(2020, 6, 7)) == {
+        'partitionKey': 'post/pid',
+        'sortKey': 'viewerSketch/2020-06-07',
+    }
+    user_sketch_dynamo = ViewerSketchDynamo('user', sketch_dynamo.client, sort_key_prefix='postViewerSketch')
+    assert user_sketch_dynamo.key('uid')['sortKey'] == 'postViewerSketch'
+
+
+def test_add_register_only_raises(sketch_dynamo):
+    assert sketch_dynamo.get_sketch('pid').registers == {}
+    assert sketch_dynamo.add_register('pid', 4, 2) is True
+    assert sketch_dynamo.add_register('pid', 4, 1) is False
+    assert sketch_dynamo.add_register('pid', 4, 2) is False
+    assert sketch_dynamo.add_register('pid', 7, 1) is True
+    assert sketch_dynamo.get_sketch('pid').registers == {4: 2, 7: 1}
+    assert sketch_dynamo.add_register('pid', 4, 3) is True
+    assert sketch_dynamo.get_sketch('pid').registers == {4: 3, 7: 1}
+
+
+def test_daily_sketches_expire(sketch_dynamo):
+    date = pendulum.date(2020, 6, 7)
+    sketch_dynamo.add_register('pid', 4, 2, date=date)
+    sketch_dynamo.add_register('pid', 4, 2)
+    expires_at = pendulum.parse('2020-07-08T00:00:00Z')
+    assert sketch_dynamo.client.get_item(sketch_dynamo.key('pid', date=date)) == {
+        **sketch_dynamo.key('pid', date=date),
+        'r4': 2,
+        'expiresAtEpoch': int(expires_at.timestamp()),
+    }
+    # the all-time sketch is kept
+    assert 'expiresAtEpoch' not in sketch_dynamo.client.get_item(sketch_dynamo.key('pid'))
+
+
+def test_get_sketch_over_days(sketch_dynamo):
+    now = pendulum.parse('2020-06-07T12:00:00Z')
+    sketch_dynamo.add_register('pid', 1, 1, date=now.date())
+    sketch_dynamo.add_register('pid', 2, 2, date=now.date().subtract(days=1))
+    sketch_dynamo.add_register('pid', 1, 3, date=now.date().subtract(days=6))
+    sketch_dynamo.add_register('pid', 3, 4, date=now.date().subtract(days=7))
+    sketch_dynamo.add_register('pid', 3, 1)
+
+    # all-time sketch is independent of the daily ones
+    assert sketch_dynamo.get_sketch('pid').registers == {3: 1}
+    assert sketch_dynamo.get_sketch('pid', days=1, now=now).registers == {1: 1}
+    assert sketch_dynamo.get_sketch('pid', days=2, now=now).registers == {1: 1, 2: 2}
+    assert sketch_dynamo.get_sketch('pid', days=7, now=now).registers == {1: 3, 2: 2}
+    assert sketch_dynamo.get_sketch('pid', days=30, now=now).registers == {1: 3, 2: 2, 3: 4}
+    assert sketch_dynamo.get_sketch('pid-other', days=30, now=now).registers == {}
+
+
+def test_get_sketch_counts(sketch_dynamo):
+    sketch = HyperLogLog()
+    for i in range(50):
+        index, rank = sketch.hash(f'uid{i}')
+        sketch_dynamo.add_register('pid', index, rank)
+        sketch.add(f'uid{i}')
+    assert sketch_dynamo.get_sketch('pid').registers == sketch.registers
+    assert sketch_dynamo.get_sketch('pid').count() == sketch.count()
+
+
+def test_generate_keys(sketch_dynamo):
+    now = pendulum.now('utc')
+    assert list(sketch_dynamo.generate_keys('pid')) == []
+    sketch_dynamo.add_register('pid', 1, 1)
+    sketch_dynamo.add_register('pid', 1, 1, date=now.date())
+    sketch_dynamo.add_register('pid-other', 1, 1)
+    assert sorted(k['sortKey'] for k in sketch_dynamo.generate_keys('pid')) == [
+        'viewerSketch',
+        f'viewerSketch/{now.date().to_date_string()}',
+    ]
@@ -49,3 +49,36 @@ def test_generate_zoomed_grid_failures(cnt):
 def test_generate_zoomed_grid_success(cnt, size):
     assert (image := art.generate_zoomed_grid(get_images(cnt)))
     assert image.size == size
+
+
+@pytest.mark.parametrize('cnt', [4, 9, 16])
+def test_update_zoomed_grid_repaints_only_changed_cells(cnt):
+    images = get_images(cnt)
+    native_image = art.generate_zoomed_grid(images)
+    stride = {4: 2, 9: 3, 16: 4}[cnt]
+
+    # swap in a different image for the last cell
+    new_image = PIL.Image.open(big_blank_path)
+    assert (updated_image := art.update_zoomed_grid(native_image, {cnt - 1: new_image}, cnt))
+    assert updated_image.size == native_image.size
+    assert updated_image is not native_image
+
+    # should match a from-scratch generation
+    expected_image = art.generate_zoomed_grid(images[:-1] + [new_image])
+    assert updated_image.tobytes() == expected_image.tobytes()
+
+    # all other cells should be untouched, and the input grid not modified
+    for index in range(cnt - 1):
+        box = art.get_cell_box(index, stride)
+        assert updated_image.crop(box).tobytes() == native_image.crop(box).tobytes()
+    assert native_image.tobytes() == art.generate_zoomed_grid(images).tobytes()
+
+
+def test_update_zoomed_grid_failures():
+    native_image = art.generate_zoomed_grid(get_images(4))
+    with pytest.raises(AssertionError):
+        art.update_zoomed_grid(native_image, {}, 5)
+    with pytest.raises(AssertionError):
+        art.update_zoomed_grid(native_image, {4: PIL.Image.open(grant_path)}, 4)
+    with pytest.raises(AssertionError):
+        art.update_zoomed_grid(PIL.Image.open(grant_path), {}, 4)
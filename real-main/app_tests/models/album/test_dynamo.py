@@ -264,7 +264,21 @@ def test_set_album_hash(album_dynamo, album_item):
     assert album_dynamo.set_album_art_hash(album_id, art_hash) == album_item
     assert album_dynamo.get_album(album_id) == album_item
 
+    # test setting it with the post ids that make up the art
+    album_item['artPostIds'] = ['pid1', 'pid2', 'pid3', 'pid4']
+    assert (
+        album_dynamo.set_album_art_hash(album_id, art_hash, art_post_ids=['pid1', 'pid2', 'pid3', 'pid4'])
+        == album_item
+    )
+    assert album_dynamo.get_album(album_id) == album_item
+
+    # test changing the hash without post ids clears them
+    del album_item['artPostIds']
+    assert album_dynamo.set_album_art_hash(album_id, art_hash) == album_item
+    assert album_dynamo.get_album(album_id) == album_item
+
     # test deleting the hash
+    album_dynamo.set_album_art_hash(album_id, art_hash, art_post_ids=['pid1'])
     del album_item['artHash']
     assert album_dynamo.set_album_art_hash(album_id, None) == album_item
     assert album_dynamo.get_album(album_id) == album_item
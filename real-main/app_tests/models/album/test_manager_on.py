@@ -42,10 +42,17 @@ def test_on_album_delete_delete_album_art(album_manager, post, user, album, imag
     for path in art_paths:
         assert album.s3_uploads_client.exists(path) is True
 
-    # fire for delete of that ablum with art, verify art is deleted from S3
+    # single post art shares the post's image blob
+    checksum = album.item['artBlobChecksum']
+    assert checksum == post.refresh_item().item['imageBlobChecksum']
+    assert album_manager.post_manager.image_blob_dynamo.get(checksum)['refCount'] == 2
+
+    # fire for delete of that ablum with art, verify art is deleted from S3 and the blob reference dropped
+    album_art_path = album.get_art_image_path(image_size.NATIVE, art_hash=album.item['artHash'][::-1])
+    album.s3_uploads_client.put_object(album_art_path, b'anything', 'image/jpeg')
     album_manager.on_album_delete_delete_album_art(album.id, old_item=album.item)
-    for path in art_paths:
-        assert album.s3_uploads_client.exists(path) is False
+    assert album.s3_uploads_client.exists(album_art_path) is False
+    assert album_manager.post_manager.image_blob_dynamo.get(checksum)['refCount'] == 1
 
 
 def test_on_album_add_edit_sync_delete_at(album_manager, user, album):
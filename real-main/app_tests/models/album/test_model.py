@@ -4,6 +4,7 @@ import uuid
 from os import path
 from unittest.mock import Mock, patch
 
+import PIL.Image
 import pytest
 
 from app.models.album.exceptions import AlbumException
@@ -118,12 +119,12 @@ def test_get_art_image_url(album):
 def test_delete_art_images(album):
     # set an art hash and put imagery in mocked s3
     art_hash = 'hashing'
-    for size in image_size.JPEGS:
+    for size in image_size.JPEGS + (image_size.NATIVE_PNG,):
         media1_path = album.get_art_image_path(size, art_hash)
         album.s3_uploads_client.put_object(media1_path, b'anything', 'application/octet-stream')
 
     # verify we can see that album art
-    for size in image_size.JPEGS:
+    for size in image_size.JPEGS + (image_size.NATIVE_PNG,):
         path = album.get_art_image_path(size, art_hash)
         assert album.s3_uploads_client.exists(path)
 
@@ -131,7 +132,7 @@ def test_delete_art_images(album):
     album.delete_art_images(art_hash)
 
     # verify we cannot see that album art anymore
-    for size in image_size.JPEGS:
+    for size in image_size.JPEGS + (image_size.NATIVE_PNG,):
         path = album.get_art_image_path(size, art_hash)
         assert not album.s3_uploads_client.exists(path)
 
@@ -172,6 +173,15 @@ def test_save_art_images(album):
     # check the value of the native image
     native_path = album.get_art_image_path(image_size.NATIVE, art_hash)
     assert album.s3_uploads_client.get_object_data_stream(native_path).read() == image_data
+    assert not album.s3_uploads_client.exists(album.get_art_image_path(image_size.NATIVE_PNG, art_hash))
+
+    # save a grid as the art, which is also kept losslessly
+    grid_image = PIL.Image.open(io.BytesIO(image_data))
+    album.save_art_images(art_hash, io.BytesIO(image_data), grid_image=grid_image)
+    png_path = album.get_art_image_path(image_size.NATIVE_PNG, art_hash)
+    png_image = PIL.Image.open(album.s3_uploads_client.get_object_data_stream(png_path))
+    assert png_image.format == 'PNG'
+    assert png_image.tobytes() == grid_image.tobytes()
 
 
 def test_increment_rank_count(album, caplog):
@@ -1,10 +1,14 @@
 import base64
+import io
 import uuid
 from decimal import Decimal
 from os import path
+from unittest import mock
 
+import PIL.Image
 import pytest
 
+from app.models.album import art
 from app.models.post.enums import PostType
 from app.utils import image_size
 
@@ -241,3 +245,64 @@ def test_1_4_9_16_posts_in_album(
     assert native_path_16 != native_path_9
     assert (native_data_16 := album.s3_uploads_client.get_object_data_stream(native_path_16).read())
     assert native_data_16 != native_data_9
+
+
+def test_update_art_if_needed_repaints_only_changed_cells(album, post1, post2, post3, post4, post_manager):
+    post5 = post_manager.add_post(
+        album.user_manager.get_user(album.user_id), str(uuid.uuid4()), PostType.TEXT_ONLY, text='t'
+    )
+    post_dynamo = post1.dynamo
+    for rank, post in enumerate([post1, post2, post3, post4]):
+        post_dynamo.set_album_id(post.item, album.id, album_rank=Decimal(rank) / 10)
+
+    # first art is generated from scratch
+    album.update_art_if_needed()
+    art_hash_1 = album.item['artHash']
+    assert album.item['artPostIds'] == [post1.id, post2.id, post3.id, post4.id]
+
+    # swap the order of two posts, no post images should need to be read
+    post_dynamo.set_album_rank(post1.id, Decimal('0.25'))
+    with mock.patch.object(album.post_manager, 'get_post', wraps=album.post_manager.get_post) as get_post_mock:
+        album.update_art_if_needed()
+    assert get_post_mock.call_count == 0
+    art_hash_2 = album.item['artHash']
+    assert art_hash_2 != art_hash_1
+    assert album.item['artPostIds'] == [post2.id, post3.id, post1.id, post4.id]
+
+    # replace one post, only that post's image should need to be read
+    post_dynamo.set_album_id(post4.item, None)
+    post_dynamo.set_album_id(post5.item, album.id, album_rank=Decimal('0.9'))
+    with mock.patch.object(album.post_manager, 'get_post', wraps=album.post_manager.get_post) as get_post_mock:
+        album.update_art_if_needed()
+    assert get_post_mock.mock_calls == [mock.call(post5.id)]
+    assert album.item['artHash'] not in (art_hash_1, art_hash_2)
+    assert album.item['artPostIds'] == [post2.id, post3.id, post1.id, post5.id]
+
+    # check all art sizes are in S3, and the old art is gone
+    for size in image_size.JPEGS + (image_size.NATIVE_PNG,):
+        assert album.s3_uploads_client.exists(album.get_art_image_path(size))
+        assert not album.s3_uploads_client.exists(album.get_art_image_path(size, art_hash=art_hash_2))
+
+    # the repainted art is exactly what generating it from scratch gives, unchanged cells have not degraded
+    post_ids = [post2.id, post3.id, post1.id, post5.id]
+    images = [post_manager.get_post(post_id).p1080_jpeg_cache.readonly_image for post_id in post_ids]
+    data = album.s3_uploads_client.get_object_data_stream(album.get_art_image_path(image_size.NATIVE_PNG)).read()
+    assert PIL.Image.open(io.BytesIO(data)).tobytes() == art.generate_zoomed_grid(images).tobytes()
+
+
+def test_update_art_if_needed_regenerates_if_existing_art_missing(album, post1, post2, post3, post4):
+    post_dynamo = post1.dynamo
+    for rank, post in enumerate([post1, post2, post3, post4]):
+        post_dynamo.set_album_id(post.item, album.id, album_rank=Decimal(rank) / 10)
+    album.update_art_if_needed()
+    assert album.item['artHash']
+
+    # remove the existing art from S3 behind the album's back
+    album.s3_uploads_client.delete_object(album.get_art_image_path(image_size.NATIVE_PNG))
+
+    # swap the order of two posts, art should be regenerated from scratch
+    post_dynamo.set_album_rank(post1.id, Decimal('0.25'))
+    with mock.patch.object(album.post_manager, 'get_post', wraps=album.post_manager.get_post) as get_post_mock:
+        album.update_art_if_needed()
+    assert get_post_mock.call_count == 4
+    assert album.s3_uploads_client.exists(album.get_art_image_path(image_size.NATIVE))
@@ -192,23 +192,41 @@ def test_update_subscription_change_status(appstore_manager, user):
 
 
 def test_get_paid_real_past_30_days(appstore_manager, user1, user2):
-    # add subscriptions for the two users directly to dynamo
+    # add transactions for the two users, running the stream handler that keeps the daily totals
     now, ten_days = pendulum.now('utc'), pendulum.duration(days=10)
     otid1, otid2, otid3 = str(uuid4()), str(uuid4()), str(uuid4())
     price = Decimal('0.99')
-    appstore_manager.sub_dynamo.add_transaction(otid1, user2.id, '-', 'or1', '-', '-', price, now - ten_days)
-    appstore_manager.sub_dynamo.add_transaction(otid2, user1.id, '-', 'or2', '-', '-', price, now)
-    appstore_manager.sub_dynamo.add_transaction(otid3, user2.id, '-', 'or3', '-', '-', price, now + ten_days)
-
-    # get paid real past 30 days
+    for args in [
+        (otid1, user2.id, '-', 'or1', '-', '-', price, now - ten_days),
+        (otid2, user1.id, '-', 'or2', '-', '-', price, now),
+        (otid3, user2.id, '-', 'or3', '-', '-', price, now + ten_days),
+    ]:
+        item = appstore_manager.sub_dynamo.add_transaction(*args)
+        appstore_manager.on_transaction_add_update_daily_totals(args[0], new_item=item)
+
+    # get paid real past 30 days, transactions dated after `now` are not included
     assert appstore_manager.get_paid_real_past_30_days(user1.id) == price
     assert appstore_manager.get_paid_real_past_30_days(user1.id, now + 4 * ten_days) == Decimal('0')
     assert appstore_manager.get_paid_real_past_30_days(user1.id, now + 3 * ten_days) == price
-    assert appstore_manager.get_paid_real_past_30_days(user2.id, now) == 2 * price
-    assert appstore_manager.get_paid_real_past_30_days(user2.id, now - ten_days) == 2 * price
+    assert appstore_manager.get_paid_real_past_30_days(user2.id, now) == price
+    assert appstore_manager.get_paid_real_past_30_days(user2.id, now + ten_days) == 2 * price
+    assert appstore_manager.get_paid_real_past_30_days(user2.id, now - ten_days) == price
     assert appstore_manager.get_paid_real_past_30_days(user2.id, now + 3 * ten_days) == price
 
 
+def test_on_transaction_add_update_daily_totals(appstore_manager, user1):
+    now = pendulum.now('utc')
+    item = appstore_manager.sub_dynamo.add_transaction(
+        'tid1', user1.id, '-', 'or1', '-', '-', Decimal('0.99'), now
+    )
+    appstore_manager.on_transaction_add_update_daily_totals('tid1', new_item=item)
+    item = appstore_manager.sub_dynamo.add_transaction('tid2', user1.id, '-', 'or2', '-', '-', Decimal('2'), now)
+    appstore_manager.on_transaction_add_update_daily_totals('tid2', new_item=item)
+    totals = appstore_manager.user_daily_totals_dynamo.get(user1.id, now.date())
+    assert totals['paidReal'] == Decimal('2.99')
+    assert 'postViewCount' not in totals
+
+
 def test_add_transaction(appstore_manager, user):
     original_transaction_id, transaction_id = str(uuid4()), str(uuid4())
     unified_receipt = {
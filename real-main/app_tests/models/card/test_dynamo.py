@@ -1,3 +1,4 @@
+from unittest.mock import patch
 from uuid import uuid4
 
 import pendulum
@@ -83,11 +84,66 @@ def test_add_card_maximal(card_dynamo):
         'gsiA2SortKey': user_id,
         'gsiA3PartitionKey': f'card/{comment_id}',
         'gsiA3SortKey': '-',
-        'gsiK1PartitionKey': 'card',
+        'gsiK1PartitionKey': f'card/{notify_user_at.format("YYYY-MM-DDTHH")}/{card_dynamo.notify_shard(card_id)}',
         'gsiK1SortKey': notify_user_at.to_iso8601_string() + '/' + user_id,
+        'gsiK2PartitionKey': f'card/{user_id}',
+        'gsiK2SortKey': notify_user_at.to_iso8601_string(),
     }
 
 
+def test_upsert_card(card_dynamo):
+    card_id, user_id = str(uuid4()), str(uuid4())
+    now = pendulum.now('utc')
+
+    # adds the card, with all the fields add_card would set
+    card_item = card_dynamo.upsert_card(card_id, user_id, 't1', 'a', sub_title='s', created_at=now, post_id='pid')
+    assert card_item == card_dynamo.new_card_item(
+        card_id, user_id, 't1', 'a', sub_title='s', created_at=now, post_id='pid'
+    )
+    assert card_dynamo.get_card(card_id) == card_item
+
+    # same title, no write. Creation fields are not changed on update
+    with patch.object(
+        card_dynamo.client.table, 'update_item', wraps=card_dynamo.client.table.update_item
+    ) as update:
+        assert card_dynamo.upsert_card(card_id, user_id, 't1', 'a2', created_at=now.add(days=1)) is None
+    assert update.call_count == 1
+    assert card_dynamo.get_card(card_id) == card_item
+
+    card_item = card_dynamo.upsert_card(card_id, user_id, 't2', 'a2', created_at=now.add(days=1))
+    assert card_item['title'] == 't2'
+    assert card_item['action'] == 'a'
+    assert card_item['gsiA1SortKey'] == f'card/{now.to_iso8601_string()}'
+
+
+def test_upsert_card_with_notify_user_at(card_dynamo):
+    card_id, user_id = str(uuid4()), str(uuid4())
+    now = pendulum.now('utc')
+    card_item = card_dynamo.upsert_card(card_id, user_id, 't1', 'a', notify_user_at=now)
+    assert card_item == card_dynamo.new_card_item(
+        card_id, user_id, 't1', 'a', created_at=pendulum.parse(card_item['gsiA1SortKey'][5:]), notify_user_at=now
+    )
+
+    # update the title of the card still due, one request, still due at the same time
+    with patch.object(
+        card_dynamo.client.table, 'update_item', wraps=card_dynamo.client.table.update_item
+    ) as update:
+        new_item = card_dynamo.upsert_card(card_id, user_id, 't2', 'a', notify_user_at=now.add(hours=1))
+    assert update.call_count == 1
+    assert new_item == {**card_item, 'title': 't2'}
+
+    # same title, no write
+    assert card_dynamo.upsert_card(card_id, user_id, 't2', 'a', notify_user_at=now.add(hours=1)) is None
+    assert card_dynamo.get_card(card_id) == new_item
+
+    # once notified, updating the title doesn't make the card due again
+    card_item = card_dynamo.clear_notify_user_at(card_id)
+    new_item = card_dynamo.upsert_card(card_id, user_id, 't3', 'a', notify_user_at=now.add(hours=1))
+    assert new_item == {**card_item, 'title': 't3'}
+    assert card_dynamo.upsert_card(card_id, user_id, 't3', 'a', notify_user_at=now.add(hours=1)) is None
+    assert card_dynamo.get_card(card_id) == new_item
+
+
 def test_update_title(card_dynamo):
     # add a card, check title
     card_id = str(uuid4())
@@ -109,13 +165,14 @@ def test_clear_notify_user_at(card_dynamo):
     org_card_item = card_dynamo.add_card(card_id, 'uid', 't', 'a', notify_user_at=pendulum.now('utc'))
     assert 'gsiK1PartitionKey' in org_card_item
     assert 'gsiK1SortKey' in org_card_item
+    assert 'gsiK2PartitionKey' in org_card_item
+    assert 'gsiK2SortKey' in org_card_item
 
     # clear notify user at, verify
     card_item = card_dynamo.clear_notify_user_at(card_id)
-    assert 'gsiK1PartitionKey' not in card_item
-    assert 'gsiK1SortKey' not in card_item
-    assert org_card_item.pop('gsiK1PartitionKey')
-    assert org_card_item.pop('gsiK1SortKey')
+    for key in ('gsiK1PartitionKey', 'gsiK1SortKey', 'gsiK2PartitionKey', 'gsiK2SortKey'):
+        assert key not in card_item
+        assert org_card_item.pop(key)
     assert card_item == org_card_item
     assert card_dynamo.get_card(card_id) == card_item
 
@@ -124,6 +181,63 @@ def test_clear_notify_user_at(card_dynamo):
     assert card_dynamo.get_card(card_id) == card_item
 
 
+def test_clear_notify_user_ats(card_dynamo):
+    now = pendulum.now('utc')
+    card_items = [
+        card_dynamo.add_card(str(uuid4()), str(uuid4()), 't', 'a', notify_user_at=now) for _ in range(30)
+    ]
+    card_ids = [item['partitionKey'][len('card/') :] for item in card_items]
+
+    # clear them all, spanning more than one transaction. Serially, as moto's transactions aren't thread safe
+    with patch('app.models.card.dynamo.map_concurrently', lambda func, chunks: [func(c) for c in chunks]):
+        card_dynamo.clear_notify_user_ats(card_items)
+    for card_id in card_ids:
+        card_item = card_dynamo.get_card(card_id)
+        assert 'gsiK1PartitionKey' not in card_item
+        assert 'gsiK1SortKey' not in card_item
+        assert 'gsiK2PartitionKey' not in card_item
+        assert 'gsiK2SortKey' not in card_item
+
+    # no-op
+    card_dynamo.clear_notify_user_ats([])
+
+
+def test_clear_notify_user_ats_skips_changed_cards(card_dynamo):
+    now = pendulum.now('utc')
+    card_items = [
+        card_dynamo.add_card(str(uuid4()), str(uuid4()), 't', 'a', notify_user_at=now) for _ in range(4)
+    ]
+    card_ids = [item['partitionKey'][len('card/') :] for item in card_items]
+
+    # one card is deleted and re-added with a new notify_user_at, another is just deleted
+    card_dynamo.delete_card(card_ids[0])
+    rescheduled_item = card_dynamo.add_card(card_ids[0], 'uid', 't', 'a', notify_user_at=now.add(minutes=1))
+    card_dynamo.delete_card(card_ids[1])
+
+    # clear them all, verify the others are still cleared
+    card_dynamo.clear_notify_user_ats(card_items)
+    assert card_dynamo.get_card(card_ids[0]) == rescheduled_item
+    assert card_dynamo.get_card(card_ids[1]) is None
+    for card_id in card_ids[2:]:
+        assert 'gsiK1SortKey' not in card_dynamo.get_card(card_id)
+
+
+def test_generate_cards_by_notify_user_at(card_dynamo):
+    user_id_1, user_id_2 = str(uuid4()), str(uuid4())
+    now = pendulum.now('utc')
+    card_item_1 = card_dynamo.add_card(str(uuid4()), user_id_1, 't1', 'a', notify_user_at=now)
+    card_item_2 = card_dynamo.add_card(str(uuid4()), user_id_2, 't2', 'a', notify_user_at=now)
+    card_dynamo.add_card(str(uuid4()), user_id_2, 't3', 'a', notify_user_at=now.add(days=1))
+    card_dynamo.add_card(str(uuid4()), user_id_2, 't4', 'a')
+
+    # the full items are returned
+    assert list(card_dynamo.generate_cards_by_notify_user_at(now.subtract(days=1))) == []
+    items = list(card_dynamo.generate_cards_by_notify_user_at(now))
+    assert sorted(items, key=lambda item: item['title']) == [card_item_1, card_item_2]
+    items = list(card_dynamo.generate_cards_by_notify_user_at(now, only_user_ids=[user_id_2]))
+    assert items == [card_item_2]
+
+
 def test_delete_card(card_dynamo):
     # delelte a card that DNE
     card_id = str(uuid4())
@@ -274,11 +388,11 @@ def test_generate_card_ids_by_notify_user_at(card_dynamo):
     )
     assert card_ids == [card_id_1]
 
-    # generate both cards, check order
+    # generate both cards, in no particular order as they may be in different shards
     card_ids = list(
         card_dynamo.generate_card_ids_by_notify_user_at(notify_user_at_1 + pendulum.duration(minutes=2))
     )
-    assert card_ids == [card_id_1, card_id_2]
+    assert sorted(card_ids) == sorted([card_id_1, card_id_2])
 
 
 def test_generate_card_ids_by_notify_user_at_only_user_ids(card_dynamo):
@@ -327,3 +441,101 @@ def test_generate_card_ids_by_notify_user_at_only_user_ids(card_dynamo):
             card_dynamo.generate_card_ids_by_notify_user_at(now, only_user_ids=[user_id_1, user_id_2, user_id_3])
         )
     ) == sorted([card_id_10, card_id_20, card_id_21, card_id_30, card_id_31, card_id_32])
+
+
+def test_notify_keys_bucketed_and_sharded(card_dynamo):
+    user_id = str(uuid4())
+    notify_user_at = pendulum.parse('2020-06-01T13:45:12.123456Z')
+    card_ids = [str(uuid4()) for _ in range(20)]
+    partition_keys = {
+        card_dynamo.notify_keys(card_id, user_id, notify_user_at)['gsiK1PartitionKey'] for card_id in card_ids
+    }
+    assert len(partition_keys) > 1
+    assert partition_keys <= {f'card/2020-06-01T13/{shard}' for shard in range(card_dynamo.notify_shard_count)}
+
+    # shards are stable across calls, buckets are by the hour in utc
+    assert card_dynamo.notify_shard(card_ids[0]) == card_dynamo.notify_shard(card_ids[0])
+    assert card_dynamo.notify_bucket(notify_user_at.in_tz('America/New_York')) == '2020-06-01T13'
+    assert card_dynamo.notify_bucket(notify_user_at.add(minutes=15)) == '2020-06-01T14'
+
+
+def test_generate_card_ids_by_notify_user_at_across_buckets(card_dynamo):
+    now = pendulum.parse('2020-06-01T13:45:00Z')
+    card_ids = {}
+    for delta in (
+        pendulum.duration(hours=-30),  # before the lookback
+        pendulum.duration(hours=-23),
+        pendulum.duration(hours=-1),
+        pendulum.duration(minutes=-1),
+        pendulum.duration(),
+        pendulum.duration(minutes=1),  # same bucket, but not yet due
+        pendulum.duration(hours=1),
+    ):
+        card_id = str(uuid4())
+        card_dynamo.add_card(card_id, str(uuid4()), 't', 'a', notify_user_at=now + delta)
+        card_ids[delta] = card_id
+
+    due_card_ids = list(card_dynamo.generate_card_ids_by_notify_user_at(now))
+    assert sorted(due_card_ids) == sorted(
+        [
+            card_ids[pendulum.duration(hours=-23)],
+            card_ids[pendulum.duration(hours=-1)],
+            card_ids[pendulum.duration(minutes=-1)],
+            card_ids[pendulum.duration()],
+        ]
+    )
+
+    # reading only some users goes through their own index partition, without the lookback limit
+    user_card_id = card_ids[pendulum.duration(hours=-30)]
+    user_id = str(uuid4())
+    card_dynamo.delete_card(user_card_id)
+    card_dynamo.add_card(user_card_id, user_id, 't', 'a', notify_user_at=now.subtract(hours=30))
+    assert list(card_dynamo.generate_card_ids_by_notify_user_at(now, only_user_ids=[user_id])) == [user_card_id]
+
+
+def test_notify_watermark(card_dynamo):
+    assert card_dynamo.get_notify_watermark() is None
+
+    # set only if still at the expected value
+    assert card_dynamo.set_notify_watermark('2020-06-01T13', expected_bucket='2020-06-01T12') is False
+    assert card_dynamo.set_notify_watermark('2020-06-01T13') is True
+    assert card_dynamo.get_notify_watermark() == '2020-06-01T13'
+    assert card_dynamo.set_notify_watermark('2020-06-01T15') is False
+    assert card_dynamo.set_notify_watermark('2020-06-01T15', expected_bucket='2020-06-01T13') is True
+    assert card_dynamo.get_notify_watermark() == '2020-06-01T15'
+
+    # lowering only ever moves it back
+    assert card_dynamo.lower_notify_watermark('2020-06-01T16') is False
+    assert card_dynamo.lower_notify_watermark('2020-06-01T11') is True
+    assert card_dynamo.get_notify_watermark() == '2020-06-01T11'
+
+
+def test_generate_card_ids_by_notify_user_at_advances_watermark(card_dynamo):
+    now = pendulum.parse('2020-06-01T13:45:00Z')
+    old_card_id, recent_card_id = str(uuid4()), str(uuid4())
+    card_dynamo.add_card(old_card_id, str(uuid4()), 't', 'a', notify_user_at=now.subtract(hours=50))
+    card_dynamo.add_card(recent_card_id, str(uuid4()), 't', 'a', notify_user_at=now.subtract(hours=2))
+
+    def read(cutoff_at):
+        with patch.object(card_dynamo.client, 'query_all', wraps=card_dynamo.client.query_all) as query_mock:
+            card_ids = list(card_dynamo.generate_card_ids_by_notify_user_at(cutoff_at))
+        return card_ids, query_mock.call_count // card_dynamo.notify_shard_count
+
+    # without a watermark, the lookback is read, and the watermark moves to the cutoff's bucket
+    assert read(now) == ([recent_card_id], 25)
+    assert card_dynamo.get_notify_watermark() == '2020-06-01T13'
+
+    # the buckets before are not read again, even though a card in them is still due
+    assert read(now.add(minutes=5)) == ([], 1)
+    assert read(now.add(hours=2)) == ([], 3)
+    assert card_dynamo.get_notify_watermark() == '2020-06-01T15'
+
+    # lowering the watermark has them read again, but never from before the lookback
+    card_dynamo.lower_notify_watermark('2020-05-30T11')
+    assert read(now.add(hours=2)) == ([recent_card_id], 25)
+    assert card_dynamo.get_notify_watermark() == '2020-06-01T15'
+
+    # reading only some users leaves the watermark alone
+    card_dynamo.lower_notify_watermark('2020-05-30T11')
+    list(card_dynamo.generate_card_ids_by_notify_user_at(now, only_user_ids=[str(uuid4())]))
+    assert card_dynamo.get_notify_watermark() == '2020-05-30T11'
@@ -1,3 +1,4 @@
+import logging
 from unittest.mock import call, patch
 from uuid import uuid4
 
@@ -20,6 +21,11 @@ user2 = user
 user3 = user
 
 
+def send_all(url, user_titles, body=None):
+    "Side effect for a mocked PinpointClient.send_users_apns where all sends succeed"
+    return set(user_titles)
+
+
 @pytest.fixture
 def chat_card_template(user):
     yield templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=2)
@@ -82,21 +88,78 @@ def test_add_or_update_card(user, template, card_manager):
         assert card.notify_user_at is None
 
     # try to add the card again with same title, verify no-op
-    card_manager.add_or_update_card(template)
+    assert card_manager.add_or_update_card(template) is None
     new_card = card_manager.get_card(template.card_id)
     assert new_card.id == template.card_id
     assert new_card.item == card.item
 
-    # update the card with a new title
+    # update the card with a new title, after any debounce window is over
+    later = card.created_at + (template.debounce_window or pendulum.duration()) + pendulum.duration(seconds=1)
     with patch.object(template, 'title', 'My new title'):
-        card_manager.add_or_update_card(template)
+        card_manager.add_or_update_card(template, now=later)
     new_card = card_manager.get_card(template.card_id)
     assert new_card.id == template.card_id
     assert new_card.item.pop('title') == 'My new title'
+    if template.debounce_window:
+        assert new_card.item.pop('renderedAt') == later.to_iso8601_string()
+        assert card.item.pop('renderedAt') == card.created_at.to_iso8601_string()
     new_card.item['title'] = card.item['title']
     assert new_card.item == card.item
 
 
+def test_add_or_update_card_debounced(user, card_manager):
+    now = pendulum.now('utc')
+    template = templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=1)
+    assert card_manager.add_or_update_card(template, now=now)
+
+    # a storm of changes within the window, none of them are visible
+    for cnt in range(2, 10):
+        template = templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=cnt)
+        assert card_manager.add_or_update_card(template, now=now.add(seconds=cnt)) is None
+    card = card_manager.get_card(template.card_id)
+    assert card.title == 'You have 1 chat with new messages'
+    assert card.item['pendingTitle'] == 'You have 9 chats with new messages'
+
+    # nothing is flushed before the window is over
+    assert card_manager.flush_pending_titles(now=now.add(seconds=30)) == (0, 0)
+    assert card_manager.flush_pending_titles(now=now.add(seconds=70)) == (1, 1)
+    card = card_manager.get_card(template.card_id)
+    assert card.title == 'You have 9 chats with new messages'
+    assert 'pendingTitle' not in card.item
+    assert 'gsiK3PartitionKey' not in card.item
+    assert card_manager.flush_pending_titles(now=now.add(seconds=70)) == (0, 0)
+
+    # a change back to the rendered title within the new window replaces the pending title
+    template = templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=10)
+    assert card_manager.add_or_update_card(template, now=now.add(seconds=80)) is None
+    template = templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=9)
+    assert card_manager.add_or_update_card(template, now=now.add(seconds=90)) is None
+    assert card_manager.get_card(template.card_id).item['pendingTitle'] == 'You have 9 chats with new messages'
+
+    # once the window is over, a change is written directly, dropping the pending title
+    template = templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=11)
+    card = card_manager.add_or_update_card(template, now=now.add(minutes=5))
+    assert card.title == 'You have 11 chats with new messages'
+    assert 'pendingTitle' not in card.item
+    assert 'gsiK3PartitionKey' not in card.item
+
+
+def test_flush_pending_titles_changed_since_read(user, card_manager):
+    now = pendulum.now('utc')
+    template = templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=1)
+    card_manager.add_or_update_card(template, now=now)
+    template = templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=2)
+    card_manager.add_or_update_card(template, now=now.add(seconds=1))
+    card_item = card_manager.get_card(template.card_id).item
+
+    # the pending title changes after the card is read for flushing, flush is skipped for the next run
+    template = templates.ChatCardTemplate(user.id, chats_with_unviewed_messages_count=3)
+    card_manager.add_or_update_card(template, now=now.add(seconds=2))
+    assert card_manager.dynamo.flush_pending_title(card_item, now=now.add(minutes=2)) is False
+    assert card_manager.flush_pending_titles(now=now.add(minutes=2)) == (1, 1)
+    assert card_manager.get_card(template.card_id).title == 'You have 3 chats with new messages'
+
+
 @pytest.mark.skip(reason="No cards with only_usernames set exist at the moment")
 def test_add_or_update_card_with_only_usernames(user, template, card_manager):
     # verify starting state
@@ -123,7 +186,7 @@ def test_add_or_update_card_with_only_usernames(user, template, card_manager):
 
     # add the card again, verify no-op
     with patch.object(template, 'only_usernames', (user.username,)):
-        assert card_manager.add_or_update_card(template)
+        assert card_manager.add_or_update_card(template) is None
     new_card = card_manager.get_card(template.card_id)
     assert new_card.id == template.card_id
     assert new_card.item['title'] == template.title
@@ -140,6 +203,23 @@ def test_add_or_update_card_with_only_usernames(user, template, card_manager):
     assert card_manager.get_card(template.card_id)
 
 
+def test_add_or_update_card_allow_list_cached(user, user2, card_manager, TestCardTemplate):
+    template = TestCardTemplate(user.id, title='t', action='a', only_usernames=(user.username,))
+    template2 = TestCardTemplate(user2.id, title='t', action='a', only_usernames=(user.username,))
+
+    with patch.object(
+        card_manager.user_manager, 'get_user', wraps=card_manager.user_manager.get_user
+    ) as get_user:
+        assert card_manager.add_or_update_card(template)
+        assert card_manager.add_or_update_card(template2) is None
+        with patch.object(template, 'title', 't2'):
+            assert card_manager.add_or_update_card(template)
+        assert card_manager.add_or_update_card(template2) is None
+    assert get_user.call_count == 2
+    assert card_manager.get_card(template.card_id).title == 't2'
+    assert card_manager.get_card(template2.card_id) is None
+
+
 def test_comment_cards_are_per_post(user, card_manager, post1, post2):
     template1 = templates.CommentCardTemplate(user.id, post1.id, unviewed_comments_count=4)
     template2 = templates.CommentCardTemplate(user.id, post2.id, unviewed_comments_count=3)
@@ -233,7 +313,7 @@ def test_delete_by_comment(card_manager, user1, user2, TestCardTemplate):
 
 def test_notify_users(card_manager, pinpoint_client, user, user2, TestCardTemplate):
     # configure mock to claim all apns-sending attempts succeeded
-    pinpoint_client.configure_mock(**{'send_user_apns.return_value': True})
+    pinpoint_client.configure_mock(**{'send_users_apns.side_effect': send_all})
     now = pendulum.now('utc')
 
     # add a card with a notification in the far future
@@ -273,7 +353,7 @@ def test_notify_users(card_manager, pinpoint_client, user, user2, TestCardTempla
     cnts = card_manager.notify_users()
     assert cnts == (1, 1)
     assert pinpoint_client.mock_calls == [
-        call.send_user_apns(user.id, 'a3', 't3', body=None),
+        call.send_users_apns('a3', {user.id: 't3'}, body=None),
     ]
     assert card1.item == card1.refresh_item().item
     assert card2.item == card2.refresh_item().item
@@ -297,16 +377,36 @@ def test_notify_users(card_manager, pinpoint_client, user, user2, TestCardTempla
     pinpoint_client.reset_mock()
     cnts = card_manager.notify_users()
     assert cnts == (2, 2)
-    assert pinpoint_client.mock_calls == [
-        call.send_user_apns(user.id, 'a5', 't5', body='s'),
-        call.send_user_apns(user2.id, 'a4', 't4', body=None),
-    ]
+    assert sorted(pinpoint_client.mock_calls, key=str) == sorted(
+        [
+            call.send_users_apns('a5', {user.id: 't5'}, body='s'),
+            call.send_users_apns('a4', {user2.id: 't4'}, body=None),
+        ],
+        key=str,
+    )
     assert card1.item == card1.refresh_item().item
     assert card2.item == card2.refresh_item().item
     assert card4.refresh_item().notify_user_at is None
     assert card5.refresh_item().notify_user_at is None
 
 
+def test_add_overdue_card_lowers_notify_watermark(card_manager, user, TestCardTemplate):
+    now = pendulum.now('utc')
+    card_manager.dynamo.set_notify_watermark(card_manager.dynamo.notify_bucket(now))
+
+    # a card due later in the hour, or after, leaves the watermark alone
+    card_manager.add_or_update_card(
+        TestCardTemplate(user.id, title='t', action='a', notify_user_after=pendulum.duration())
+    )
+    assert card_manager.dynamo.get_notify_watermark() == card_manager.dynamo.notify_bucket(now)
+
+    # a card due in an hour the dispatcher may be done with moves it back, so the card is still found
+    card = card_manager.add_or_update_card(
+        TestCardTemplate(user.id, title='t', action='a', notify_user_after=pendulum.duration(hours=-2))
+    )
+    assert card_manager.dynamo.get_notify_watermark() == card_manager.dynamo.notify_bucket(card.notify_user_at)
+
+
 def test_notify_users_failed_notification(card_manager, pinpoint_client, user, TestCardTemplate):
     # add card with a notification in the immediate past
     now = pendulum.now('utc')
@@ -317,24 +417,23 @@ def test_notify_users_failed_notification(card_manager, pinpoint_client, user, T
     assert card.notify_user_at == now
 
     # configure our mock to report a failed message send
-    pinpoint_client.configure_mock(**{'send_user_apns.return_value': False})
+    pinpoint_client.configure_mock(**{'send_users_apns.return_value': set()})
 
     # run notificiations, verify attempted send and correct DB changes upon failure
     cnts = card_manager.notify_users()
     assert cnts == (1, 0)
-    assert pinpoint_client.mock_calls == [call.send_user_apns(user.id, 'a', 't', body=None)]
+    assert pinpoint_client.mock_calls == [call.send_users_apns('a', {user.id: 't'}, body=None)]
     org_item = card.item
     card.refresh_item()
-    assert 'gsiK1PartitionKey' not in card.item
-    assert 'gsiK1SortKey' not in card.item
-    assert org_item.pop('gsiK1PartitionKey')
-    assert org_item.pop('gsiK1SortKey')
+    for key in ('gsiK1PartitionKey', 'gsiK1SortKey', 'gsiK2PartitionKey', 'gsiK2SortKey'):
+        assert key not in card.item
+        assert org_item.pop(key)
     assert card.item == org_item
 
 
 def test_notify_users_only_usernames(card_manager, pinpoint_client, user, user2, user3, TestCardTemplate):
     # configure mock to claim all apns-sending attempts succeeded
-    pinpoint_client.configure_mock(**{'send_user_apns.return_value': True})
+    pinpoint_client.configure_mock(**{'send_users_apns.side_effect': send_all})
 
     # add one notification for each user in immediate past, verify they're there
     card1 = card_manager.add_or_update_card(
@@ -354,10 +453,13 @@ def test_notify_users_only_usernames(card_manager, pinpoint_client, user, user2,
     pinpoint_client.reset_mock()
     cnts = card_manager.notify_users(only_usernames=[user.username, user3.username])
     assert cnts == (2, 2)
-    assert pinpoint_client.mock_calls == [
-        call.send_user_apns(user.id, 'a1', 't1', body=None),
-        call.send_user_apns(user3.id, 'a3', 't3', body=None),
-    ]
+    assert sorted(pinpoint_client.mock_calls, key=str) == sorted(
+        [
+            call.send_users_apns('a1', {user.id: 't1'}, body=None),
+            call.send_users_apns('a3', {user3.id: 't3'}, body=None),
+        ],
+        key=str,
+    )
     assert card1.refresh_item().notify_user_at is None
     assert card2.refresh_item().notify_user_at
     assert card3.refresh_item().notify_user_at is None
@@ -379,7 +481,7 @@ def test_notify_users_only_usernames(card_manager, pinpoint_client, user, user2,
     cnts = card_manager.notify_users(only_usernames=[user2.username])
     assert cnts == (1, 1)
     assert pinpoint_client.mock_calls == [
-        call.send_user_apns(user2.id, 'a2', 't2', body=None),
+        call.send_users_apns('a2', {user2.id: 't2'}, body=None),
     ]
     assert card1.refresh_item().notify_user_at
     assert card2.refresh_item().notify_user_at is None
@@ -405,11 +507,93 @@ def test_notify_users_only_usernames(card_manager, pinpoint_client, user, user2,
     pinpoint_client.reset_mock()
     cnts = card_manager.notify_users()
     assert cnts == (3, 3)
-    assert pinpoint_client.mock_calls == [
-        call.send_user_apns(user.id, 'a1', 't1', body=None),
-        call.send_user_apns(user2.id, 'a2', 't2', body=None),
-        call.send_user_apns(user3.id, 'a3', 't3', body=None),
-    ]
+    assert sorted(pinpoint_client.mock_calls, key=str) == sorted(
+        [
+            call.send_users_apns('a1', {user.id: 't1'}, body=None),
+            call.send_users_apns('a2', {user2.id: 't2'}, body=None),
+            call.send_users_apns('a3', {user3.id: 't3'}, body=None),
+        ],
+        key=str,
+    )
     assert card1.refresh_item().notify_user_at is None
     assert card2.refresh_item().notify_user_at is None
     assert card3.refresh_item().notify_user_at is None
+
+
+def test_notify_users_grouped(card_manager, pinpoint_client, user, user2, user3, TestCardTemplate):
+    pinpoint_client.configure_mock(
+        **{'send_users_apns.side_effect': lambda url, ut, body=None: set(ut) & {user2.id}}
+    )
+    past = pendulum.duration(seconds=-1)
+
+    # cards with the same action & sub title go out in one request, with a title per user
+    cards = [
+        card_manager.add_or_update_card(
+            TestCardTemplate(user.id, title='t1', action='a', notify_user_after=past)
+        ),
+        card_manager.add_or_update_card(
+            TestCardTemplate(user2.id, title='t2', action='a', notify_user_after=past)
+        ),
+        card_manager.add_or_update_card(
+            TestCardTemplate(user3.id, title='t3', action='a', notify_user_after=past, sub_title='s')
+        ),
+    ]
+    cnts = card_manager.notify_users()
+    assert cnts == (3, 1)
+    assert sorted(pinpoint_client.mock_calls, key=str) == sorted(
+        [
+            call.send_users_apns('a', {user.id: 't1', user2.id: 't2'}, body=None),
+            call.send_users_apns('a', {user3.id: 't3'}, body='s'),
+        ],
+        key=str,
+    )
+    assert all(card.refresh_item().notify_user_at is None for card in cards)
+
+
+def test_group_notifications(card_manager, user, user2, TestCardTemplate):
+    cards = [
+        card_manager.init_card({**card.item, 'partitionKey': f'card/{card.id}-{i}'})
+        for i, card in enumerate(
+            [
+                card_manager.add_or_update_card(TestCardTemplate(user.id, title='t1', action='a')),
+                card_manager.add_or_update_card(TestCardTemplate(user2.id, title='t2', action='a')),
+            ]
+            * 2
+        )
+    ]
+    # a user can only appear once per request
+    batches = card_manager.group_notifications(cards)
+    assert [{user_id: card.title for user_id, card in batch.items()} for batch in batches] == [
+        {user.id: 't1', user2.id: 't2'},
+        {user.id: 't1', user2.id: 't2'},
+    ]
+
+    # requests are capped in size
+    with patch('app.models.card.manager.PinpointClient.max_users_per_request', 1):
+        batches = card_manager.group_notifications(cards)
+    assert [list(batch) for batch in batches] == [[user.id], [user2.id], [user.id], [user2.id]]
+
+
+def test_notify_users_send_error(card_manager, pinpoint_client, user, user2, TestCardTemplate, caplog):
+    def send(url, user_titles, body=None):
+        if url == 'a1':
+            raise Exception('Throttled')
+        return set(user_titles)
+
+    pinpoint_client.configure_mock(**{'send_users_apns.side_effect': send})
+    past = pendulum.duration(seconds=-1)
+    card1 = card_manager.add_or_update_card(
+        TestCardTemplate(user.id, title='t', action='a1', notify_user_after=past)
+    )
+    card2 = card_manager.add_or_update_card(
+        TestCardTemplate(user2.id, title='t', action='a2', notify_user_after=past)
+    )
+
+    # cards from failed requests are left due, to be retried
+    with caplog.at_level(logging.ERROR):
+        cnts = card_manager.notify_users()
+    assert cnts == (2, 1)
+    assert len(caplog.records) == 1
+    assert 'Failed to send notifications for 1 cards: Throttled' in caplog.records[0].msg
+    assert card1.refresh_item().notify_user_at
+    assert card2.refresh_item().notify_user_at is None
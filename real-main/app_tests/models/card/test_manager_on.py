@@ -3,6 +3,7 @@ import re
 from unittest.mock import call, patch
 from uuid import uuid4
 
+import pendulum
 import pytest
 
 from app.models.card import templates
@@ -262,12 +263,16 @@ def test_on_post_comments_unviewed_count_change_update_card(card_manager, post):
     )
     assert ' 1 ' in card_manager.get_card(card_id).title
 
-    # add another unviewed comment, check state
+    # add another unviewed comment, check the new title is held back until the debounce window is over
     old_item = post.item.copy()
     post.item['commentsUnviewedCount'] = 2
     card_manager.on_post_comments_unviewed_count_change_update_card(
         post.id, new_item=post.item, old_item=old_item
     )
+    card = card_manager.get_card(card_id)
+    assert ' 1 ' in card.title
+    assert ' 2 ' in card.item['pendingTitle']
+    assert card_manager.flush_pending_titles(now=pendulum.now('utc').add(minutes=2)) == (1, 1)
     assert ' 2 ' in card_manager.get_card(card_id).title
 
     # jump down to no unviewed comments, check calls
@@ -176,6 +176,27 @@ def test_increment_decrement_user_count(chat_dynamo):
         chat_dynamo.client.transact_write_items(transacts)
 
 
+def test_transact_update_user_count(chat_dynamo):
+    chat_id = str(uuid4())
+    chat_dynamo.client.transact_write_items([chat_dynamo.transact_add(chat_id, 'ctype', 'uid')])
+    assert chat_dynamo.get(chat_id)['userCount'] == 1
+
+    chat_dynamo.client.transact_write_items([chat_dynamo.transact_update_user_count(chat_id, 4)])
+    assert chat_dynamo.get(chat_id)['userCount'] == 5
+
+    chat_dynamo.client.transact_write_items([chat_dynamo.transact_update_user_count(chat_id, -3)])
+    assert chat_dynamo.get(chat_id)['userCount'] == 2
+
+    # verify can't go below zero
+    with pytest.raises(chat_dynamo.client.exceptions.TransactionCanceledException):
+        chat_dynamo.client.transact_write_items([chat_dynamo.transact_update_user_count(chat_id, -3)])
+    assert chat_dynamo.get(chat_id)['userCount'] == 2
+
+    # verify can't update a chat that doesn't exist
+    with pytest.raises(chat_dynamo.client.exceptions.TransactionCanceledException):
+        chat_dynamo.client.transact_write_items([chat_dynamo.transact_update_user_count('cid-dne', 1)])
+
+
 def test_update_last_message_activity_at(chat_dynamo, caplog):
     # add the chat to the DB, verify it is in DB
     chat_id = str(uuid4())
@@ -269,3 +290,19 @@ def test_increment_decrement_count(chat_dynamo, caplog, incrementor_name, decrem
     assert caplog.records[0].levelname == 'WARNING'
     assert all(x in caplog.records[0].msg for x in ['Failed to decrement', attribute_name, chat_id])
     assert chat_dynamo.get(chat_id)[attribute_name] == 0
+
+
+def test_messages_count_advances_message_sequence(chat_dynamo):
+    chat_id = str(uuid4())
+    chat_dynamo.client.transact_write_items([chat_dynamo.transact_add(chat_id, 'chat-type', str(uuid4()))])
+    assert 'messageSequence' not in chat_dynamo.get(chat_id)
+
+    # the sequence goes up with the count, but never back down
+    item = chat_dynamo.increment_messages_count(chat_id)
+    assert (item['messagesCount'], item['messageSequence']) == (1, 1)
+    item = chat_dynamo.increment_messages_count(chat_id)
+    assert (item['messagesCount'], item['messageSequence']) == (2, 2)
+    item = chat_dynamo.decrement_messages_count(chat_id)
+    assert (item['messagesCount'], item['messageSequence']) == (1, 2)
+    item = chat_dynamo.increment_messages_count(chat_id)
+    assert (item['messagesCount'], item['messageSequence']) == (2, 3)
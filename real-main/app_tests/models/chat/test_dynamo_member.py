@@ -1,10 +1,11 @@
 import logging
+from unittest import mock
 from uuid import uuid4
 
 import pendulum
 import pytest
 
-from app.models.chat.dynamo import ChatMemberDynamo
+from app.models.chat.dynamo import ChatDynamo, ChatMemberDynamo
 
 
 @pytest.fixture
@@ -12,6 +13,11 @@ def cm_dynamo(dynamo_client):
     yield ChatMemberDynamo(dynamo_client)
 
 
+@pytest.fixture
+def chat_dynamo(dynamo_client):
+    yield ChatDynamo(dynamo_client)
+
+
 def test_transact_add(cm_dynamo):
     chat_id = 'cid2'
     user_id = 'uid'
@@ -49,6 +55,84 @@ def test_delete(cm_dynamo):
     assert cm_dynamo.get(chat_id, user_id) is None
 
 
+def test_delete_all_by_chat(cm_dynamo):
+    for user_id in ('uid1', 'uid2', 'uid3'):
+        cm_dynamo.client.transact_write_items([cm_dynamo.transact_add('cid1', user_id)])
+    cm_dynamo.client.transact_write_items([cm_dynamo.transact_add('cid2', 'uid1')])
+
+    assert cm_dynamo.delete_all_by_chat('cid1') == 3
+    assert list(cm_dynamo.generate_user_ids_by_chat('cid1')) == []
+    assert list(cm_dynamo.generate_user_ids_by_chat('cid2')) == ['uid1']
+    assert cm_dynamo.delete_all_by_chat('cid1') == 0
+
+
+def test_add_delete_memberships(cm_dynamo, chat_dynamo):
+    for chat_id in ('cid1', 'cid2'):
+        chat_dynamo.client.transact_write_items([chat_dynamo.transact_add(chat_id, 'GROUP', 'uid1')])
+        cm_dynamo.client.transact_write_items([cm_dynamo.transact_add(chat_id, 'uid1')])
+    now = pendulum.now('utc')
+
+    # add, in chunks smaller than the number of users. Existing memberships and dupes are skipped
+    memberships = [('cid1', f'uid{i}') for i in range(1, 6)] + [
+        ('cid2', 'uid1'),
+        ('cid2', 'uid2'),
+        ('cid1', 'uid2'),
+    ]
+    with mock.patch.object(cm_dynamo, 'transact_chunk_size', 2):
+        with mock.patch.object(
+            cm_dynamo.client, 'transact_write_items', wraps=cm_dynamo.client.transact_write_items
+        ) as transact_mock:
+            added = cm_dynamo.add_memberships(memberships, chat_dynamo.transact_update_user_count, now=now)
+    assert sorted(added) == [
+        ('cid1', 'uid2'),
+        ('cid1', 'uid3'),
+        ('cid1', 'uid4'),
+        ('cid1', 'uid5'),
+        ('cid2', 'uid2'),
+    ]
+    assert transact_mock.call_count == 3
+    assert chat_dynamo.get('cid1')['userCount'] == 5
+    assert chat_dynamo.get('cid2')['userCount'] == 2
+    assert sorted(cm_dynamo.generate_user_ids_by_chat('cid1')) == [f'uid{i}' for i in range(1, 6)]
+    assert cm_dynamo.get('cid1', 'uid3')['gsiK1SortKey'] == f'member/{now.to_iso8601_string()}'
+
+    # delete, non-memberships are skipped
+    memberships = [('cid1', 'uid2'), ('cid1', 'uid3'), ('cid1', 'uid-dne'), ('cid2', 'uid1'), ('cid-dne', 'uid1')]
+    deleted = cm_dynamo.delete_memberships(memberships, chat_dynamo.transact_update_user_count)
+    assert sorted(deleted) == [('cid1', 'uid2'), ('cid1', 'uid3'), ('cid2', 'uid1')]
+    assert chat_dynamo.get('cid1')['userCount'] == 3
+    assert chat_dynamo.get('cid2')['userCount'] == 1
+    assert sorted(cm_dynamo.generate_user_ids_by_chat('cid1')) == ['uid1', 'uid4', 'uid5']
+    assert list(cm_dynamo.generate_user_ids_by_chat('cid2')) == ['uid2']
+
+    # nothing to do
+    assert cm_dynamo.add_memberships([], chat_dynamo.transact_update_user_count) == []
+    assert cm_dynamo.delete_memberships([('cid1', 'uid2')], chat_dynamo.transact_update_user_count) == []
+
+
+def test_add_memberships_race(cm_dynamo, chat_dynamo, caplog):
+    chat_dynamo.client.transact_write_items([chat_dynamo.transact_add('cid', 'GROUP', 'uid1')])
+    cm_dynamo.client.transact_write_items([cm_dynamo.transact_add('cid', 'uid1')])
+
+    # uid3 joins between the existence check and the write, so the chunk's transaction is cancelled
+    def get_memberships(memberships):
+        cm_dynamo.client.transact_write_items(
+            [cm_dynamo.transact_add('cid', 'uid3'), chat_dynamo.transact_increment_user_count('cid')]
+        )
+        return set()
+
+    memberships = [('cid', 'uid1'), ('cid', 'uid2'), ('cid', 'uid3'), ('cid', 'uid4')]
+    with mock.patch.object(cm_dynamo, 'get_memberships', get_memberships):
+        with caplog.at_level(logging.WARNING):
+            added = cm_dynamo.add_memberships(memberships, chat_dynamo.transact_update_user_count)
+    assert sorted(added) == [('cid', 'uid2'), ('cid', 'uid4')]
+    assert chat_dynamo.get('cid')['userCount'] == 4
+    assert sorted(cm_dynamo.generate_user_ids_by_chat('cid')) == ['uid1', 'uid2', 'uid3', 'uid4']
+    assert len(caplog.records) == 2
+    assert all('Unable to write chat membership' in rec.msg for rec in caplog.records)
+    assert sorted(caplog.records[i].msg.split('`')[1] for i in range(2)) == ['uid1', 'uid3']
+
+
 def test_update_last_message_activity_at(cm_dynamo, caplog):
     chat_id = 'cid'
 
@@ -87,6 +171,45 @@ def test_update_last_message_activity_at(cm_dynamo, caplog):
     assert cm_dynamo.get(chat_id, user_id) == item
 
 
+def test_add_message_activity(cm_dynamo, caplog):
+    chat_id = 'cid'
+    user_id = 'uid1'
+    now = pendulum.now('utc')
+    cm_dynamo.client.transact_write_items([cm_dynamo.transact_add(chat_id, user_id, now)])
+
+    # author's own message just updates the activity timestamp
+    at1 = pendulum.now('utc')
+    cm_dynamo.add_message_activity(chat_id, user_id, at1, increment_messages_unviewed_count=False)
+    item = cm_dynamo.get(chat_id, user_id)
+    assert item['gsiK2SortKey'] == 'chat/' + at1.to_iso8601_string()
+    assert 'messagesUnviewedCount' not in item
+
+    # someone else's message also counts as unviewed
+    at2 = pendulum.now('utc')
+    cm_dynamo.add_message_activity(chat_id, user_id, at2)
+    item = cm_dynamo.get(chat_id, user_id)
+    assert item['gsiK2SortKey'] == 'chat/' + at2.to_iso8601_string()
+    assert item['messagesUnviewedCount'] == 1
+
+    # a message processed out of order still counts as unviewed, but doesn't move activity back
+    with caplog.at_level(logging.WARNING):
+        cm_dynamo.add_message_activity(chat_id, user_id, at1)
+    assert len(caplog.records) == 1
+    assert all(x in caplog.records[0].msg for x in ['Failed', 'last message activity', chat_id, user_id])
+    item = cm_dynamo.get(chat_id, user_id)
+    assert item['gsiK2SortKey'] == 'chat/' + at2.to_iso8601_string()
+    assert item['messagesUnviewedCount'] == 2
+
+    # member that doesn't exist fails softly, and doesn't create the member
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        cm_dynamo.add_message_activity(chat_id, 'uid-dne', at2)
+    assert len(caplog.records) == 2
+    assert all(x in caplog.records[0].msg for x in ['Failed', 'last message activity', chat_id, 'uid-dne'])
+    assert all(x in caplog.records[1].msg for x in ['Failed', 'messagesUnviewedCount', chat_id, 'uid-dne'])
+    assert cm_dynamo.get(chat_id, 'uid-dne') is None
+
+
 def test_generate_user_ids_by_chat(cm_dynamo):
     chat_id = 'cid'
 
@@ -133,6 +256,26 @@ def test_generate_chat_ids_by_chat(cm_dynamo):
     assert list(cm_dynamo.generate_chat_ids_by_user(user_id)) == [chat_id_1, chat_id_2]
 
 
+def test_set_read_sequence(cm_dynamo):
+    chat_id, user_id = 'cid', 'uid'
+
+    # can't set for a member that doesn't exist, and doesn't create them
+    assert cm_dynamo.set_read_sequence(chat_id, user_id, 2) is False
+    assert cm_dynamo.get(chat_id, user_id) is None
+
+    cm_dynamo.client.transact_write_items([cm_dynamo.transact_add(chat_id, user_id)])
+    assert 'readSequence' not in cm_dynamo.get(chat_id, user_id)
+
+    # set it, move it forward, can't move it back
+    assert cm_dynamo.set_read_sequence(chat_id, user_id, 2) is True
+    assert cm_dynamo.get(chat_id, user_id)['readSequence'] == 2
+    assert cm_dynamo.set_read_sequence(chat_id, user_id, 5) is True
+    assert cm_dynamo.get(chat_id, user_id)['readSequence'] == 5
+    assert cm_dynamo.set_read_sequence(chat_id, user_id, 5) is False
+    assert cm_dynamo.set_read_sequence(chat_id, user_id, 3) is False
+    assert cm_dynamo.get(chat_id, user_id)['readSequence'] == 5
+
+
 def test_increment_clear_messages_unviewed_count(cm_dynamo, caplog):
     # add the chat to the DB, verify it is in DB
     chat_id, user_id = str(uuid4()), str(uuid4())
@@ -5,6 +5,8 @@ from uuid import uuid4
 import pendulum
 import pytest
 
+from app.models.chat.enums import ChatUnreadMode
+
 
 @pytest.fixture
 def user1(user_manager, cognito_client):
@@ -87,8 +89,9 @@ def test_on_message_added(chat_manager, chat, user1, user2, caplog, user1_messag
     assert all('Failed' in rec.msg for rec in caplog.records)
     assert all('last message activity' in rec.msg for rec in caplog.records)
     assert all(chat.id in rec.msg for rec in caplog.records)
-    assert user1.id in caplog.records[1].msg
-    assert user2.id in caplog.records[2].msg
+    # members are updated concurrently, so in no particular order
+    assert sum(user1.id in rec.msg for rec in caplog.records[1:]) == 1
+    assert sum(user2.id in rec.msg for rec in caplog.records[1:]) == 1
 
     # verify final state
     chat.refresh_item()
@@ -203,6 +206,113 @@ def test_on_message_delete_handles_chat_views_correctly(chat, user1, user2, chat
     assert chat.member_dynamo.get(chat.id, user2.id)['messagesUnviewedCount'] == 0
 
 
+def test_unviewed_counts_with_watermarks(chat_manager, chat_message_manager, chat, user1, user2):
+    chat_manager.unread_mode = ChatUnreadMode.WATERMARK
+
+    def get_unviewed_counts():
+        chat_item = chat_manager.dynamo.get(chat.id)
+        return [
+            chat_manager.get_messages_unviewed_count(chat_item, chat_manager.member_dynamo.get(chat.id, user_id))
+            for user_id in (user1.id, user2.id)
+        ]
+
+    assert get_unviewed_counts() == [0, 0]
+
+    # user1 adds three messages, no unviewed counters are kept on members
+    messages = [chat_message_manager.add_chat_message(str(uuid4()), 'lore', chat.id, user1.id) for _ in range(3)]
+    for message in messages:
+        chat_manager.on_chat_message_add(message.id, new_item=message.item)
+    assert 'messagesUnviewedCount' not in chat_manager.member_dynamo.get(chat.id, user2.id)
+    assert chat_manager.member_dynamo.get(chat.id, user1.id)['readSequence'] == 3
+    assert get_unviewed_counts() == [0, 3]
+    assert chat_manager.get_chats_with_unviewed_messages_count(user1.id) == 0
+    assert chat_manager.get_chats_with_unviewed_messages_count(user2.id) == 1
+
+    # deleting a message writes to no members, and counts stay bounded by the messages left
+    message = messages.pop()
+    message.delete()
+    chat_manager.on_chat_message_delete(message.id, old_item=message.item)
+    assert chat_manager.dynamo.get(chat.id)['messagesCount'] == 2
+    assert get_unviewed_counts() == [0, 2]
+
+    # user2 views the chat, moving their watermark
+    chat_manager.record_views([chat.id], user2.id)
+    view_item = chat_manager.view_dynamo.get_view(chat.id, user2.id)
+    chat_manager.sync_member_messages_unviewed_count(chat.id, new_item=view_item)
+    assert chat_manager.member_dynamo.get(chat.id, user2.id)['readSequence'] == 3
+    assert get_unviewed_counts() == [0, 0]
+    assert chat_manager.get_chats_with_unviewed_messages_count(user2.id) == 0
+
+    # user2 replies, user1 has one unviewed
+    message = chat_message_manager.add_chat_message(str(uuid4()), 'lore', chat.id, user2.id)
+    chat_manager.on_chat_message_add(message.id, new_item=message.item)
+    assert get_unviewed_counts() == [1, 0]
+    assert chat_manager.get_chats_with_unviewed_messages_count(user1.id) == 1
+
+
+def test_watermark_cleared_on_view_without_message_sequence(chat_manager, chat, user2):
+    # a chat with no messages since messageSequence was introduced, and a migrated member
+    chat_manager.unread_mode = ChatUnreadMode.WATERMARK
+    chat_manager.dynamo.client.update_item(
+        {
+            'Key': chat_manager.dynamo.pk(chat.id),
+            'UpdateExpression': 'REMOVE messageSequence',
+        }
+    )
+    chat_manager.member_dynamo.client.update_item(
+        {
+            'Key': chat_manager.member_dynamo.pk(chat.id, user2.id),
+            'UpdateExpression': 'SET readSequence = :rs',
+            'ExpressionAttributeValues': {':rs': 0},
+        }
+    )
+    chat_item = chat_manager.dynamo.get(chat.id)
+    assert 'messageSequence' not in chat_item
+    assert (
+        chat_manager.get_messages_unviewed_count(chat_item, chat_manager.member_dynamo.get(chat.id, user2.id))
+        == 0
+    )
+
+    # viewing the chat still writes the watermark
+    chat_manager.record_views([chat.id], user2.id)
+    view_item = chat_manager.view_dynamo.get_view(chat.id, user2.id)
+    chat_manager.sync_member_messages_unviewed_count(chat.id, new_item=view_item)
+    assert chat_manager.member_dynamo.get(chat.id, user2.id)['readSequence'] == 0
+    assert chat_manager.get_chats_with_unviewed_messages_count(user2.id) == 0
+
+
+def test_watermarks_maintained_with_counters(chat_manager, chat, user1, user2, user1_message):
+    assert chat_manager.unread_mode == ChatUnreadMode.COUNTER
+    chat_manager.on_chat_message_add(user1_message.id, new_item=user1_message.item)
+    chat_item = chat_manager.dynamo.get(chat.id)
+    member1_item = chat_manager.member_dynamo.get(chat.id, user1.id)
+    member2_item = chat_manager.member_dynamo.get(chat.id, user2.id)
+    assert member1_item['readSequence'] == 1
+    assert 'readSequence' not in member2_item
+    assert member2_item['messagesUnviewedCount'] == 1
+
+    # counts come from the counters, which agree with the watermarks
+    assert chat_manager.get_messages_unviewed_count(chat_item, member1_item) == 0
+    assert chat_manager.get_messages_unviewed_count(chat_item, member2_item) == 1
+    assert chat_manager.get_chats_with_unviewed_messages_count(user2.id) == 1
+    chat_manager.unread_mode = ChatUnreadMode.WATERMARK
+    assert chat_manager.get_messages_unviewed_count(chat_item, member1_item) == 0
+    assert chat_manager.get_messages_unviewed_count(chat_item, member2_item) == 1
+
+
+def test_on_chat_member_add_init_read_sequence(chat_manager, chat, user1, user2):
+    # no messages yet, watermark starts at the beginning
+    member_item = chat_manager.member_dynamo.get(chat.id, user2.id)
+    chat_manager.on_chat_member_add_init_read_sequence(chat.id, new_item=member_item)
+    assert chat_manager.member_dynamo.get(chat.id, user2.id)['readSequence'] == 0
+
+    # new members have viewed everything already in the chat
+    chat_manager.dynamo.increment_messages_count(chat.id)
+    chat_manager.dynamo.increment_messages_count(chat.id)
+    chat_manager.on_chat_member_add_init_read_sequence(chat.id, new_item=member_item)
+    assert chat_manager.member_dynamo.get(chat.id, user2.id)['readSequence'] == 2
+
+
 def test_on_flag_add_deletes_chat_if_crowdsourced_criteria_met(chat_manager, chat, user2):
     # react to a flagging without meeting the criteria, verify doesn't delete
     with patch.object(chat, 'is_crowdsourced_forced_removal_criteria_met', return_value=False):
@@ -69,6 +69,23 @@ def test_trigger_notification(chat_message_appsync, message, chat, user1, user2,
     assert variables['input']['lastEditedAt'] is None
 
 
+def test_trigger_notifications(chat_message_appsync, message, chat, user1, user2, appsync_client):
+    appsync_client.reset_mock()
+    chat_message_appsync.trigger_notifications('ntype', [user1.id, user2.id], message)
+    assert len(appsync_client.send.mock_calls) == 2
+    mutations = [call.args[0] for call in appsync_client.send.call_args_list]
+    assert mutations[0] is mutations[1]  # parsed once
+    inputs = sorted((call.args[1]['input'] for call in appsync_client.send.call_args_list), key=str)
+    assert sorted(input_obj['userId'] for input_obj in inputs) == sorted([user1.id, user2.id])
+    assert all(input_obj['messageId'] == 'mid' for input_obj in inputs)
+    assert all(input_obj['type'] == 'ntype' for input_obj in inputs)
+
+    # no users, nothing sent
+    appsync_client.reset_mock()
+    chat_message_appsync.trigger_notifications('ntype', [], message)
+    assert appsync_client.mock_calls == []
+
+
 def test_trigger_notification_blocking_relationship(
     chat_message_appsync, chat_message_manager, chat, user1, user2, appsync_client, block_manager
 ):
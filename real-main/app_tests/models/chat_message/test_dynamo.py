@@ -147,6 +147,28 @@ def test_generate_chat_messages_by_chat(chat_message_dynamo):
     assert pks[1] == {'partitionKey': 'chatMessage/mid2', 'sortKey': '-'}
 
 
+def test_query_chat_messages_by_chat(chat_message_dynamo):
+    chat_id = 'cid'
+    assert chat_message_dynamo.query_chat_messages_by_chat(chat_id) == {'items': [], 'nextToken': None}
+
+    now = pendulum.now('utc')
+    for i in range(3):
+        chat_message_dynamo.add_chat_message(f'mid{i}', chat_id, 'uid', 'lore', [], now.add(seconds=i))
+    chat_message_dynamo.add_chat_message('mid-other', 'cid-other', 'uid', 'lore', [], now)
+
+    # page forwards
+    page = chat_message_dynamo.query_chat_messages_by_chat(chat_id, limit=2)
+    assert [item['messageId'] for item in page['items']] == ['mid0', 'mid1']
+    assert page['nextToken']
+    page = chat_message_dynamo.query_chat_messages_by_chat(chat_id, limit=2, next_token=page['nextToken'])
+    assert [item['messageId'] for item in page['items']] == ['mid2']
+    assert page['nextToken'] is None
+
+    # page backwards
+    page = chat_message_dynamo.query_chat_messages_by_chat(chat_id, limit=2, reverse=True)
+    assert [item['messageId'] for item in page['items']] == ['mid2', 'mid1']
+
+
 def test_generate_all_chat_messages_by_scan(chat_message_dynamo):
     message_id_1 = 'mid_1'
     message_id_2 = 'mid_2'
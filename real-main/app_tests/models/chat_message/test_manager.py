@@ -39,6 +39,91 @@ def test_add_chat_message(chat_message_manager, chat, user, user2, user3):
     assert message.item['textTags'] == [{'tag': f'@{username}', 'userId': user.id}]
 
 
+def test_get_chat_messages_page(chat_message_manager, chat, user, user2, user3, block_manager):
+    # no messages
+    assert chat_message_manager.get_chat_messages_page(chat.id, user2.id) == {'items': [], 'nextToken': None}
+
+    # some messages from each member of the chat, a system message and one from a user not in the chat
+    now = pendulum.now('utc')
+    chat_message_manager.add_chat_message('mid1', 'lore', chat.id, user2.id, now=now)
+    chat_message_manager.add_chat_message('mid2', 'ipsum', chat.id, user3.id, now=now.add(seconds=1))
+    chat_message_manager.add_chat_message('mid3', 'dolor', chat.id, user2.id, now=now.add(seconds=2))
+    chat_message_manager.add_chat_message('mid4', 'sit', chat.id, None, now=now.add(seconds=3))
+    chat_message_manager.add_chat_message('mid5', 'amet', chat.id, user.id, now=now.add(seconds=4))
+    block_manager.block(user, user2)
+
+    # authors, and their relationships with the caller, are prefetched in one lookup each
+    relationship_manager = chat_message_manager.relationship_manager
+    with patch.object(
+        chat_message_manager.user_manager.dynamo,
+        'get_user',
+        wraps=chat_message_manager.user_manager.dynamo.get_user,
+    ) as get_user_mock:
+        with patch.object(
+            chat_message_manager.user_manager.dynamo,
+            'generate_users',
+            wraps=chat_message_manager.user_manager.dynamo.generate_users,
+        ) as generate_users_mock:
+            with patch.object(
+                relationship_manager, 'fetch_relationships', wraps=relationship_manager.fetch_relationships
+            ) as fetch_relationships_mock:
+                page = chat_message_manager.get_chat_messages_page(chat.id, user2.id)
+    assert get_user_mock.call_count == 0
+    assert generate_users_mock.call_count == 1
+    assert sorted(generate_users_mock.call_args.args[0]) == sorted([user.id, user2.id, user3.id])
+    fetched = [c.args[1] for c in fetch_relationships_mock.call_args_list if c.args[1]]
+    assert len(fetched) == 1
+    assert sorted(fetched[0]) == sorted([user.id, user3.id])
+
+    assert page['nextToken'] is None
+    items = page['items']
+    assert [item['messageId'] for item in items] == ['mid1', 'mid2', 'mid3', 'mid4', 'mid5']
+    assert items[0]['author']['userId'] == user2.id
+    assert items[0]['author']['blockerStatus'] == 'SELF'
+    assert items[1]['author']['userId'] == user3.id
+    assert items[1]['author']['blockerStatus'] == 'NOT_BLOCKING'
+    assert items[2]['author'] is items[0]['author']  # serialized once per page
+    assert items[3]['author'] is None  # system message
+    assert items[4]['author'] is None  # blocked
+    assert 'partitionKey' not in items[0]
+    assert 'gsiA1PartitionKey' not in items[0]
+
+    # paginate, in reverse
+    page = chat_message_manager.get_chat_messages_page(chat.id, user3.id, limit=3, reverse=True)
+    assert [item['messageId'] for item in page['items']] == ['mid5', 'mid4', 'mid3']
+    assert page['items'][0]['author']['userId'] == user.id
+    page = chat_message_manager.get_chat_messages_page(
+        chat.id, user3.id, limit=3, reverse=True, next_token=page['nextToken']
+    )
+    assert [item['messageId'] for item in page['items']] == ['mid2', 'mid1']
+    assert page['nextToken'] is None
+
+
+def test_get_chat_messages_page_hides_blocked_and_blocking_authors(
+    chat_message_manager, chat, user, user2, user3, block_manager
+):
+    now = pendulum.now('utc')
+    chat_message_manager.add_chat_message('mid1', 'lore', chat.id, user.id, now=now)
+    chat_message_manager.add_chat_message('mid2', 'ipsum', chat.id, user3.id, now=now.add(seconds=1))
+    chat_message_manager.add_chat_message('mid3', 'dolor', chat.id, user.id, now=now.add(seconds=2))
+    chat_message_manager.add_chat_message('mid4', 'sit', chat.id, user3.id, now=now.add(seconds=3))
+
+    def authors(caller_user_id):
+        page = chat_message_manager.get_chat_messages_page(chat.id, caller_user_id)
+        return [(item['author'] or {}).get('userId') for item in page['items']]
+
+    # a page is read before the blocks, which are then never served stale
+    assert authors(user2.id) == [user.id, user3.id, user.id, user3.id]
+
+    # the caller blocks one author, and is blocked by the other
+    block_manager.block(user2, user)
+    block_manager.block(user3, user2)
+    assert authors(user2.id) == [None, None, None, None]
+
+    # the authors' other relationships are unaffected
+    assert authors(user3.id) == [user.id, user3.id, user.id, user3.id]
+
+
 def test_add_system_message(chat_message_manager, chat, appsync_client, user2, user3):
     text = 'sample sample'
 
@@ -9,6 +9,7 @@ from mock import patch
 from app.models.block.enums import BlockStatus
 from app.models.chat_message.exceptions import ChatMessageException
 from app.models.post.enums import PostType
+from app.utils import DecimalJsonEncoder
 
 
 @pytest.fixture
@@ -90,7 +91,7 @@ def test_chat_message_delete(message, user1, user2, card_manager):
     assert message.refresh_item().item is None
 
 
-def test_get_author_encoded(chat_message_manager, user1, user2, user3, chat, block_manager):
+def test_get_author_encoded(chat_message_manager, user1, user2, user3, chat):
     # regular message
     message = chat_message_manager.add_chat_message('mid', 'lore', chat.id, user1.id)
     author_encoded = message.get_author_encoded(user3.id)
@@ -102,8 +103,8 @@ def test_get_author_encoded(chat_message_manager, user1, user2, user3, chat, blo
     assert author_serialized['blockerStatus'] == 'NOT_BLOCKING'
     assert author_serialized['blockedStatus'] == 'NOT_BLOCKING'
 
-    # add a blocking relationship
-    block_manager.block(user1, user3)
+    # add a blocking relationship, through the managers that share the message's relationship cache
+    chat_message_manager.block_manager.block(user1, user3)
     assert message.get_author_encoded(user3.id) is None
 
     # test the blocking relationship in the other direction
@@ -117,10 +118,60 @@ def test_get_author_encoded(chat_message_manager, user1, user2, user3, chat, blo
     assert message.get_author_encoded(user1.id) is None
 
 
+def test_get_author_encoded_cache(chat_message_manager, user1, user2, user3, chat):
+    message = chat_message_manager.add_chat_message('mid', 'lore', chat.id, user1.id)
+    author_cache = {}
+
+    # users with the same relationship to the author share the encoding
+    relationship_mock = patch.object(
+        message.relationship_manager, 'get_relationship', wraps=message.relationship_manager.get_relationship
+    )
+    with relationship_mock as get_relationship_mock:
+        encoded2 = message.get_author_encoded(user2.id, author_cache=author_cache)
+        encoded3 = message.get_author_encoded(user3.id, author_cache=author_cache)
+        assert encoded2 is encoded3
+        assert get_relationship_mock.call_count == 2
+
+        # the relationship of a user to the author is only looked up once per cache
+        assert message.get_author_encoded(user2.id, author_cache=author_cache) is encoded2
+        assert get_relationship_mock.call_count == 2
+
+    # a different relationship gets a different encoding
+    encoded1 = message.get_author_encoded(user1.id, author_cache=author_cache)
+    assert json.loads(encoded1)['blockerStatus'] == BlockStatus.SELF
+    assert json.loads(encoded2)['blockerStatus'] == BlockStatus.NOT_BLOCKING
+
+    # serialized & encoded forms agree
+    assert encoded2 == json.dumps(
+        message.get_author_serialized(user2.id, author_cache=author_cache), cls=DecimalJsonEncoder
+    )
+
+    # without a cache, nothing is carried over between calls
+    chat_message_manager.block_manager.block(user1, user3)
+    assert message.get_author_encoded(user3.id) is None
+    assert message.get_author_encoded(user3.id, author_cache=author_cache) is encoded3
+
+
+def test_serialize_compact(chat_message_manager, user1, user2, chat, system_message):
+    message = chat_message_manager.add_chat_message('mid', 'lore', chat.id, user1.id)
+    resp = message.serialize_compact(user2.id)
+    assert resp.pop('author')['userId'] == user1.id
+    assert resp == {
+        'messageId': 'mid',
+        'chatId': chat.id,
+        'userId': user1.id,
+        'text': 'lore',
+        'textTags': [],
+        'createdAt': message.item['createdAt'],
+    }
+    assert system_message.serialize_compact(user2.id)['author'] is None
+    assert 'userId' not in system_message.serialize_compact(user2.id)
+
+
 def test_trigger_notifications_direct(message, chat, user1, user2, appsync_client):
     message.appsync = mock.Mock()
     message.trigger_notifications('ntype')
-    assert message.appsync.mock_calls == [mock.call.trigger_notification('ntype', user2.id, message)]
+    assert message.appsync.mock_calls == [mock.call.trigger_notifications('ntype', [user2.id], message)]
 
 
 def test_trigger_notifications_user_ids(message, chat, user1, user2, user3, appsync_client):
@@ -129,8 +180,7 @@ def test_trigger_notifications_user_ids(message, chat, user1, user2, user3, apps
     message.appsync = mock.Mock()
     message.trigger_notifications('ntype', user_ids=[user2.id, user3.id])
     assert message.appsync.mock_calls == [
-        mock.call.trigger_notification('ntype', user2.id, message),
-        mock.call.trigger_notification('ntype', user3.id, message),
+        mock.call.trigger_notifications('ntype', [user2.id, user3.id], message),
     ]
 
 
@@ -146,8 +196,7 @@ def test_trigger_notifications_group(chat_manager, chat_message_manager, user1,
     message.appsync = mock.Mock()
     message.trigger_notifications('ntype')
     assert message.appsync.mock_calls == [
-        mock.call.trigger_notification('ntype', user1.id, message),
-        mock.call.trigger_notification('ntype', user3.id, message),
+        mock.call.trigger_notifications('ntype', [user1.id, user3.id], message),
     ]
 
     # add system message, notifications are triggered automatically
@@ -68,6 +68,26 @@ def test_add_posts_to_feed(feed_dynamo):
     assert sorted([i['postId'] for i in items]) == sorted([post_id_1, post_id_2, post_id_3])
 
 
+def test_add_posts_to_feeds(feed_dynamo):
+    user_id_1, user_id_2 = str(uuid4()), str(uuid4())
+    posted_at = pendulum.now('utc').to_iso8601_string()
+    post_id_1, post_id_2 = str(uuid4()), str(uuid4())
+    post_items = [
+        {'postId': post_id_1, 'postedByUserId': str(uuid4()), 'postedAt': posted_at},
+        {'postId': post_id_2, 'postedByUserId': str(uuid4()), 'postedAt': posted_at},
+    ]
+
+    # add nothing to the feeds
+    feed_dynamo.add_posts_to_feeds([user_id_1, user_id_2], [])
+    assert list(feed_dynamo.generate_items(user_id_1)) == []
+
+    # add the posts to the feeds, check
+    feed_dynamo.add_posts_to_feeds([user_id_1, user_id_2], post_items)
+    for user_id in (user_id_1, user_id_2):
+        items = list(feed_dynamo.generate_items(user_id))
+        assert sorted([i['postId'] for i in items]) == sorted([post_id_1, post_id_2])
+
+
 def test_delete_by_post_owner(feed_dynamo):
     user_id = str(uuid4())
     assert list(feed_dynamo.generate_items(user_id)) == []
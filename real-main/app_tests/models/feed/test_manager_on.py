@@ -43,11 +43,14 @@ def test_on_user_follow_status_change_sync_feed_starts_following(feed_manager, f
 
 @pytest.mark.parametrize('status', [None, FollowStatus.REQUESTED, FollowStatus.DENIED])
 def test_on_user_follow_status_change_sync_feed_stops_following(feed_manager, follower, user1, user2, status):
+    old_item = follower.item.copy()
     follower.item['followStatus'] = status
     with patch.object(feed_manager, 'add_users_posts_to_feed') as add_users_posts_to_feed_mock:
         with patch.object(feed_manager, 'dynamo') as dynamo_mock:
             with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
-                feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=follower.item)
+                feed_manager.on_user_follow_status_change_sync_feed(
+                    user2.id, new_item=follower.item, old_item=old_item
+                )
     assert add_users_posts_to_feed_mock.mock_calls == []
     assert dynamo_mock.mock_calls == [call.delete_by_post_owner(user1.id, user2.id)]
     assert appsync_client_mock.mock_calls == [
@@ -55,6 +58,52 @@ def test_on_user_follow_status_change_sync_feed_stops_following(feed_manager, fo
     ]
 
 
+@pytest.mark.parametrize(
+    'old_status, new_status',
+    [
+        (None, FollowStatus.REQUESTED),
+        (FollowStatus.REQUESTED, FollowStatus.DENIED),
+        (FollowStatus.REQUESTED, None),
+        (FollowStatus.DENIED, None),
+    ],
+)
+def test_on_user_follow_status_change_sync_feed_never_following(
+    feed_manager, follower, user2, old_status, new_status
+):
+    old_item = {**follower.item, 'followStatus': old_status} if old_status else None
+    new_item = {**follower.item, 'followStatus': new_status} if new_status else None
+    with patch.object(feed_manager, 'add_users_posts_to_feed') as add_users_posts_to_feed_mock:
+        with patch.object(feed_manager, 'dynamo') as dynamo_mock:
+            with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+                feed_manager.on_user_follow_status_change_sync_feed(
+                    user2.id, new_item=new_item, old_item=old_item
+                )
+    assert add_users_posts_to_feed_mock.mock_calls == []
+    assert dynamo_mock.mock_calls == []
+    assert appsync_client_mock.mock_calls == []
+
+
+def test_on_user_follow_status_change_sync_feed_skips_bulk_synced(feed_manager, follower, user2):
+    old_item = {**follower.item, 'followStatus': FollowStatus.REQUESTED}
+    new_item = {**follower.item, 'bulkSynced': True}
+    with patch.object(feed_manager, 'add_users_posts_to_feed') as add_users_posts_to_feed_mock:
+        with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+            feed_manager.on_user_follow_status_change_sync_feed(user2.id, new_item=new_item, old_item=old_item)
+    assert add_users_posts_to_feed_mock.mock_calls == []
+    assert appsync_client_mock.mock_calls == []
+
+
+def test_on_followers_accepted_sync_feeds(feed_manager, post, user1):
+    follower_user_ids = [str(uuid4()), str(uuid4())]
+    with patch.object(feed_manager, 'appsync_client') as appsync_client_mock:
+        feed_manager.on_followers_accepted_sync_feeds(user1.id, new_item={'followerUserIds': follower_user_ids})
+    for follower_user_id in follower_user_ids:
+        assert [item['postId'] for item in feed_manager.dynamo.generate_items(follower_user_id)] == [post.id]
+    assert appsync_client_mock.mock_calls == [
+        call.fire_notifications(follower_user_ids, GqlNotificationType.USER_FEED_CHANGED),
+    ]
+
+
 def test_on_post_status_change_sync_feed_post_completed(feed_manager, post):
     assert post.item['postStatus'] == PostStatus.COMPLETED
     user_ids = [str(uuid4()), str(uuid4())]
@@ -65,8 +114,7 @@ def test_on_post_status_change_sync_feed_post_completed(feed_manager, post):
     assert add_post_mock.mock_calls == [call(post.user_id, post.item)]
     assert dynamo_mock.mock_calls == []
     assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user_ids[0], GqlNotificationType.USER_FEED_CHANGED),
-        call.fire_notification(user_ids[1], GqlNotificationType.USER_FEED_CHANGED),
+        call.fire_notifications(user_ids, GqlNotificationType.USER_FEED_CHANGED),
     ]
 
 
@@ -85,6 +133,5 @@ def test_on_post_status_change_sync_feed_post_uncompleted(feed_manager, post, st
     assert add_post_mock.mock_calls == []
     assert dynamo_mock.mock_calls == [call.delete_by_post(post.id)]
     assert appsync_client_mock.mock_calls == [
-        call.fire_notification(user_ids[0], GqlNotificationType.USER_FEED_CHANGED),
-        call.fire_notification(user_ids[1], GqlNotificationType.USER_FEED_CHANGED),
+        call.fire_notifications(user_ids, GqlNotificationType.USER_FEED_CHANGED),
     ]
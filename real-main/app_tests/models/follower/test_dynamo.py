@@ -103,6 +103,37 @@ def test_update_following_status_doesnt_exist(follower_dynamo, user1, user2):
         follower_dynamo.update_following_status(dummy_follow_item, 'status')
 
 
+def test_update_following_statuses(follower_dynamo, user1, user2, user3):
+    follower_dynamo.transact_chunk_size = 1  # exercise the chunking
+    item1 = follower_dynamo.add_following(user1.id, user3.id, FollowStatus.REQUESTED)
+    item2 = follower_dynamo.add_following(user2.id, user3.id, FollowStatus.REQUESTED)
+    assert follower_dynamo.update_following_statuses([], FollowStatus.FOLLOWING) == []
+
+    # someone else gets to one of them first
+    follower_dynamo.update_following_status(item2, FollowStatus.DENIED)
+
+    # update them in bulk, verify only the unchanged one is updated and is marked as such
+    updated_items = follower_dynamo.update_following_statuses([item1, item2], FollowStatus.FOLLOWING)
+    assert updated_items == [follower_dynamo.get_following(user1.id, user3.id)]
+    assert updated_items[0]['followStatus'] == FollowStatus.FOLLOWING
+    assert updated_items[0]['gsiA1SortKey'] == f'{FollowStatus.FOLLOWING}/{item1["followedAt"]}'
+    assert updated_items[0]['gsiA2SortKey'] == f'{FollowStatus.FOLLOWING}/{item1["followedAt"]}'
+    assert updated_items[0]['bulkSynced'] is True
+    assert follower_dynamo.get_following(user2.id, user3.id)['followStatus'] == FollowStatus.DENIED
+
+    # a later change of status clears the mark
+    item = follower_dynamo.update_following_status(updated_items[0], FollowStatus.DENIED)
+    assert 'bulkSynced' not in item
+
+
+def test_delete_followings(follower_dynamo, user1, user2, user3):
+    item1 = follower_dynamo.add_following(user1.id, user3.id, 'status')
+    item2 = follower_dynamo.add_following(user2.id, user3.id, 'status')
+    assert follower_dynamo.delete_followings([item1, item2]) == 2
+    assert follower_dynamo.get_following(user1.id, user3.id) is None
+    assert follower_dynamo.get_following(user2.id, user3.id) is None
+
+
 def test_delete_following(follower_dynamo, user1, user2):
     # add it, verify
     follow_item = follower_dynamo.add_following(user1.id, user2.id, 'status')
@@ -0,0 +1,62 @@
+import uuid
+
+import pendulum
+import pytest
+
+from app.models.follower.dynamo.accepted_followers import AcceptedFollowersDynamo
+
+
+@pytest.fixture
+def accepted_followers_dynamo(dynamo_client):
+    yield AcceptedFollowersDynamo(dynamo_client)
+
+
+def test_add_all_and_delete(accepted_followers_dynamo):
+    accepted_followers_dynamo.chunk_size = 2
+    followed_user_id = str(uuid.uuid4())
+    follower_user_ids = [str(uuid.uuid4()) for _ in range(5)]
+    now = pendulum.now('utc')
+    accepted_at_str = now.to_iso8601_string()
+
+    # adding none adds nothing
+    assert accepted_followers_dynamo.add_all(followed_user_id, [], now=now) == 0
+    assert (
+        accepted_followers_dynamo.client.get_item(
+            accepted_followers_dynamo.key(followed_user_id, accepted_at_str, 0)
+        )
+        is None
+    )
+
+    # add some, verify they're split into chunks
+    assert accepted_followers_dynamo.add_all(followed_user_id, iter(follower_user_ids), now=now) == 3
+    items = [
+        accepted_followers_dynamo.client.get_item(
+            accepted_followers_dynamo.key(followed_user_id, accepted_at_str, i)
+        )
+        for i in range(3)
+    ]
+    assert [item['followerUserIds'] for item in items] == [
+        follower_user_ids[:2],
+        follower_user_ids[2:4],
+        follower_user_ids[4:],
+    ]
+    assert items[0] == {
+        'partitionKey': f'user/{followed_user_id}',
+        'sortKey': f'acceptedFollowers/{accepted_at_str}/0',
+        'schemaVersion': 0,
+        'followedUserId': followed_user_id,
+        'followerUserIds': follower_user_ids[:2],
+        'acceptedAt': accepted_at_str,
+    }
+
+    # delete one, verify
+    accepted_followers_dynamo.delete(items[1])
+    assert (
+        accepted_followers_dynamo.client.get_item(
+            accepted_followers_dynamo.key(followed_user_id, accepted_at_str, 1)
+        )
+        is None
+    )
+    assert accepted_followers_dynamo.client.get_item(
+        accepted_followers_dynamo.key(followed_user_id, accepted_at_str, 0)
+    )
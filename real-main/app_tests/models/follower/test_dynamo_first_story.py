@@ -97,3 +97,40 @@ def test_set_all_and_delete_all(fs_dynamo, story):
     fs_dynamo.delete_all((uid for uid in ['f-uid-2']), story['postedByUserId'])
     resp = fs_dynamo.client.table.scan()
     assert resp['Count'] == 0
+
+
+def test_set_get_delete_next_story(fs_dynamo, story):
+    user_id = story['postedByUserId']
+    assert list(fs_dynamo.generate_next_story_items([user_id])) == []
+
+    # set it, check it
+    item = fs_dynamo.set_next_story(story)
+    assert item == {
+        'partitionKey': f'user/{user_id}',
+        'sortKey': 'nextStory',
+        'schemaVersion': 0,
+        'postId': 'pid',
+        'expiresAt': 'e-at',
+    }
+    assert fs_dynamo.client.get_item(fs_dynamo.next_story_key(user_id)) == item
+
+    # overwrite it
+    item = fs_dynamo.set_next_story({**story, 'postId': 'pid2', 'expiresAt': 'e-at2'})
+    assert fs_dynamo.client.get_item(fs_dynamo.next_story_key(user_id)) == item
+
+    # delete it, delete it again
+    assert fs_dynamo.delete_next_story(user_id) == item
+    assert fs_dynamo.client.get_item(fs_dynamo.next_story_key(user_id)) is None
+    assert fs_dynamo.delete_next_story(user_id) is None
+
+
+def test_generate_next_story_items(fs_dynamo, story):
+    assert list(fs_dynamo.generate_next_story_items([])) == []
+    fs_dynamo.set_next_story({**story, 'postedByUserId': 'uid1', 'postId': 'pid1'})
+    fs_dynamo.set_next_story({**story, 'postedByUserId': 'uid2', 'postId': 'pid2'})
+
+    items = list(fs_dynamo.generate_next_story_items(['uid1', 'uid2', 'uid3']))
+    assert sorted(items, key=lambda item: item['postId']) == [
+        {'partitionKey': 'user/uid1', 'postId': 'pid1', 'expiresAt': 'e-at'},
+        {'partitionKey': 'user/uid2', 'postId': 'pid2', 'expiresAt': 'e-at'},
+    ]
@@ -1,4 +1,4 @@
-from unittest.mock import call, patch
+from unittest.mock import ANY, call, patch
 from uuid import uuid4
 
 import pendulum
@@ -196,6 +196,36 @@ def test_accept_all_requested_follow_requests(follower_manager, users_private):
     assert follower_manager.get_follow(our_user.id, their_user.id).status == FollowStatus.DENIED
 
 
+def test_accept_all_requested_follow_requests_in_bulk(follower_manager, users_private, other_users):
+    our_user, their_user = users_private
+    follower_manager.dynamo.transact_chunk_size = 2
+    follower_manager.accepted_followers_dynamo.chunk_size = 2
+    followers = [our_user, *other_users]
+    for follower in followers:
+        follower_manager.request_to_follow(follower, their_user)
+    follower_manager.request_to_follow(followers[2], our_user)  # not affected
+
+    # accept them all, verify follows updated and marked as synced in bulk
+    with patch.object(follower_manager, 'accepted_followers_dynamo') as accepted_followers_dynamo_mock:
+        follower_manager.accept_all_requested_follow_requests(their_user.id)
+    for follower in followers:
+        follow = follower_manager.get_follow(follower.id, their_user.id)
+        assert follow.status == FollowStatus.FOLLOWING
+        assert follow.item['bulkSynced'] is True
+    assert follower_manager.get_follow(followers[2].id, our_user.id).status == FollowStatus.FOLLOWING
+
+    # verify counts updated once, and the rest queued up
+    assert their_user.refresh_item().item['followerCount'] == 3
+    assert accepted_followers_dynamo_mock.mock_calls == [call.add_all(their_user.id, ANY)]
+    assert sorted(accepted_followers_dynamo_mock.mock_calls[0].args[1]) == sorted(f.id for f in followers)
+
+    # nothing to do if we do it again
+    with patch.object(follower_manager, 'accepted_followers_dynamo') as accepted_followers_dynamo_mock:
+        follower_manager.accept_all_requested_follow_requests(their_user.id)
+    assert accepted_followers_dynamo_mock.mock_calls == []
+    assert their_user.refresh_item().item['followerCount'] == 3
+
+
 def test_delete_all_denied_follow_requests(follower_manager, users_private):
     our_user, their_user = users_private
 
@@ -364,6 +394,42 @@ def test_on_user_follow_status_change_sync_first_story(follower_manager, users,
     assert follower_manager.first_story_dynamo.client.get_item(fs_key) is None
 
 
+def test_on_followers_accepted_sync_first_story(follower_manager, users, their_post):
+    us, them = users
+    fs_key = follower_manager.first_story_dynamo.key(them.id, us.id)
+    new_item = {'followerUserIds': [us.id]}
+
+    # they don't fan out, verify nothing happens
+    with patch.object(follower_manager, 'fans_out_first_story', return_value=False):
+        follower_manager.on_followers_accepted_sync_first_story(them.id, new_item=new_item)
+    assert follower_manager.first_story_dynamo.client.get_item(fs_key) is None
+
+    # they do, verify creates first story
+    follower_manager.on_followers_accepted_sync_first_story(them.id, new_item=new_item)
+    assert follower_manager.first_story_dynamo.client.get_item(fs_key)['postId'] == their_post.id
+
+    # they have no stories, verify nothing happens
+    follower_manager.on_followers_accepted_sync_first_story(us.id, new_item={'followerUserIds': [them.id]})
+    assert (
+        follower_manager.first_story_dynamo.client.get_item(
+            follower_manager.first_story_dynamo.key(us.id, them.id)
+        )
+        is None
+    )
+
+
+def test_on_followers_accepted_delete(follower_manager, users):
+    us, them = users
+    now = pendulum.now('utc')
+    follower_manager.accepted_followers_dynamo.add_all(them.id, [us.id], now=now)
+    key = follower_manager.accepted_followers_dynamo.key(them.id, now.to_iso8601_string(), 0)
+    new_item = follower_manager.dynamo.client.get_item(key)
+    assert new_item
+
+    follower_manager.on_followers_accepted_delete(them.id, new_item=new_item)
+    assert follower_manager.dynamo.client.get_item(key) is None
+
+
 def test_on_user_delete_delete_follower_items(follower_manager, users_private):
     our_user, their_user = users_private
 
@@ -0,0 +1,160 @@
+import uuid
+from unittest import mock
+
+import pendulum
+import pytest
+
+from app.models.follower.enums import FollowedStoriesMode, FollowStatus
+from app.models.post.enums import PostType
+
+
+@pytest.fixture
+def user(user_manager, cognito_client):
+    user_id, username = str(uuid.uuid4()), str(uuid.uuid4())[:8]
+    cognito_client.create_user_pool_entry(user_id, username, verified_email=f'{username}@real.app')
+    yield user_manager.create_cognito_only_user(user_id, username)
+
+
+user2 = user
+user3 = user
+user4 = user
+
+
+@pytest.fixture
+def pull_mode(follower_manager):
+    with mock.patch.object(follower_manager, 'followed_stories_mode', FollowedStoriesMode.PULL):
+        yield
+
+
+def add_story(post_manager, follower_manager, user, expires_at):
+    post = post_manager.add_post(user, str(uuid.uuid4()), PostType.TEXT_ONLY, text='lore ipsum')
+    post_item = post_manager.dynamo.set_expires_at(post.item, expires_at)
+    follower_manager.refresh_first_story(story_now=post_item)
+    return post_item
+
+
+def first_story_key(followed_user_id, follower_user_id):
+    return {'partitionKey': f'user/{followed_user_id}', 'sortKey': f'follower/{follower_user_id}/firstStory'}
+
+
+def test_refresh_first_story_maintains_next_story(follower_manager, post_manager, user):
+    next_story_key = follower_manager.first_story_dynamo.next_story_key(user.id)
+    now = pendulum.now('utc')
+
+    # add a story, check it's the next story
+    post2 = add_story(post_manager, follower_manager, user, now + pendulum.duration(hours=2))
+    item = follower_manager.dynamo.client.get_item(next_story_key)
+    assert item['postId'] == post2['postId']
+    assert item['expiresAt'] == post2['expiresAt']
+
+    # add one that expires sooner, it takes over
+    post1 = add_story(post_manager, follower_manager, user, now + pendulum.duration(hours=1))
+    assert follower_manager.dynamo.client.get_item(next_story_key)['postId'] == post1['postId']
+
+    # remove it, back to the first
+    post_manager.dynamo.remove_expires_at(post1['postId'])
+    follower_manager.refresh_first_story(story_prev=post1)
+    assert follower_manager.dynamo.client.get_item(next_story_key)['postId'] == post2['postId']
+
+    # remove the last one, next story is gone
+    post_manager.dynamo.remove_expires_at(post2['postId'])
+    follower_manager.refresh_first_story(story_prev=post2)
+    assert follower_manager.dynamo.client.get_item(next_story_key) is None
+
+
+def test_fans_out_first_story(follower_manager, user):
+    # push mode, always fans out
+    assert follower_manager.followed_stories_mode == FollowedStoriesMode.PUSH
+    assert follower_manager.fans_out_first_story(user.id) is True
+    assert follower_manager.fans_out_first_story('uid-dne') is True
+
+    # pull mode, depends on follower count
+    with mock.patch.object(follower_manager, 'followed_stories_mode', FollowedStoriesMode.PULL):
+        assert follower_manager.fans_out_first_story(user.id) is True
+        assert follower_manager.fans_out_first_story('uid-dne') is False
+        with mock.patch.object(follower_manager, 'fan_out_max_follower_count', 1):
+            follower_manager.user_manager.dynamo.increment_follower_count(user.id)
+            assert follower_manager.fans_out_first_story(user.id) is True
+            follower_manager.user_manager.dynamo.increment_follower_count(user.id)
+            assert follower_manager.fans_out_first_story(user.id) is False
+
+
+def test_pull_mode_large_author_does_not_fan_out(follower_manager, post_manager, user, user2, user3, pull_mode):
+    follower_manager.dynamo.add_following(user2.id, user.id, FollowStatus.FOLLOWING)
+    follower_manager.user_manager.dynamo.increment_follower_count(user.id)
+    now = pendulum.now('utc')
+
+    # under the threshold, fans out
+    post = add_story(post_manager, follower_manager, user, now + pendulum.duration(hours=2))
+    assert follower_manager.dynamo.client.get_item(first_story_key(user.id, user2.id))['postId'] == post['postId']
+
+    # over the threshold, doesn't fan out but still tracks the next story
+    with mock.patch.object(follower_manager, 'fan_out_max_follower_count', 0):
+        post1 = add_story(post_manager, follower_manager, user, now + pendulum.duration(hours=1))
+    assert follower_manager.dynamo.client.get_item(first_story_key(user.id, user2.id))['postId'] == post['postId']
+    assert follower_manager.get_followed_users_with_stories(user2.id)['items'] == [user.id]
+    next_story_key = follower_manager.first_story_dynamo.next_story_key(user.id)
+    assert follower_manager.dynamo.client.get_item(next_story_key)['postId'] == post1['postId']
+
+    # a new follower of a large author doesn't get a firstStory item, but does see the story
+    with mock.patch.object(follower_manager, 'fan_out_max_follower_count', 0):
+        follow_item = follower_manager.dynamo.add_following(user3.id, user.id, FollowStatus.FOLLOWING)
+        follower_manager.on_user_follow_status_change_sync_first_story(user.id, new_item=follow_item)
+    assert follower_manager.dynamo.client.get_item(first_story_key(user.id, user3.id)) is None
+    assert follower_manager.get_followed_users_with_stories(user3.id)['items'] == [user.id]
+
+
+def test_get_followed_users_with_stories(follower_manager, post_manager, user, user2, user3, user4):
+    now = pendulum.now('utc')
+    for followed_user in (user2, user3, user4):
+        follower_manager.dynamo.add_following(user.id, followed_user.id, FollowStatus.FOLLOWING)
+    assert follower_manager.get_followed_users_with_stories(user.id) == {'items': [], 'nextToken': None}
+
+    # user3's story expires before user2's, user4's story more than a day out
+    add_story(post_manager, follower_manager, user2, now + pendulum.duration(hours=3))
+    add_story(post_manager, follower_manager, user3, now + pendulum.duration(hours=1))
+    add_story(post_manager, follower_manager, user4, now + pendulum.duration(hours=25))
+    follower_manager.next_story_expires_ats.clear()
+    assert follower_manager.get_followed_users_with_stories(user.id) == {
+        'items': [user3.id, user2.id],
+        'nextToken': None,
+    }
+
+    # pagination
+    page = follower_manager.get_followed_users_with_stories(user.id, limit=1)
+    assert page == {'items': [user3.id], 'nextToken': '1'}
+    page = follower_manager.get_followed_users_with_stories(user.id, limit=1, next_token=page['nextToken'])
+    assert page == {'items': [user2.id], 'nextToken': None}
+
+    # later on, user3's story has expired and user4's is within the window
+    later = now + pendulum.duration(hours=2)
+    assert follower_manager.get_followed_users_with_stories(user.id, now=later)['items'] == [user2.id, user4.id]
+
+    # only users we follow count
+    follower_manager.dynamo.add_following(user2.id, user.id, FollowStatus.FOLLOWING)
+    assert follower_manager.get_followed_users_with_stories(user2.id)['items'] == []
+
+
+def test_get_next_story_expires_ats_cached(follower_manager, post_manager, user, user2):
+    post = add_story(post_manager, follower_manager, user, pendulum.now('utc') + pendulum.duration(hours=1))
+    follower_manager.next_story_expires_ats.clear()
+
+    generate = follower_manager.first_story_dynamo.generate_next_story_items
+    with mock.patch.object(
+        follower_manager.first_story_dynamo, 'generate_next_story_items', wraps=generate
+    ) as generate_mock:
+        expected = {user.id: post['expiresAt']}
+        assert follower_manager.get_next_story_expires_ats([user.id, user2.id]) == expected
+        assert generate_mock.call_args_list == [mock.call([user.id, user2.id])]
+
+        # both hits, including the user with no story
+        assert follower_manager.get_next_story_expires_ats([user.id, user2.id]) == expected
+        assert generate_mock.call_args_list[1] == mock.call([])
+
+        # a refresh of the story is only seen once the cached values expire
+        post_manager.dynamo.remove_expires_at(post['postId'])
+        follower_manager.refresh_first_story(story_prev=post)
+        assert follower_manager.get_next_story_expires_ats([user.id, user2.id]) == expected
+        follower_manager.next_story_expires_ats.clear()
+        assert follower_manager.get_next_story_expires_ats([user.id, user2.id]) == {}
+        assert generate_mock.call_args_list[3] == mock.call([user.id, user2.id])
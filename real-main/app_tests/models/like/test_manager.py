@@ -1,4 +1,5 @@
 import uuid
+from unittest.mock import patch
 
 import pytest
 
@@ -162,6 +163,29 @@ def test_like_post_failure_post_already_liked(like_manager, user1, user2_posts):
         like_manager.like_post(user1, post, LikeStatus.ONYMOUSLY_LIKED)
 
 
+def test_dislike_all(like_manager, user1, user2, user1_posts):
+    post1, post2 = user1_posts
+    like_manager.like_post(user1, post1, LikeStatus.ANONYMOUSLY_LIKED)
+    like_manager.like_post(user2, post1, LikeStatus.ONYMOUSLY_LIKED)
+    like_manager.like_post(user2, post2, LikeStatus.ONYMOUSLY_LIKED)
+    like_items = list(like_manager.dynamo.generate_by_liked_by(user2.id))
+
+    # nothing to dislike
+    assert like_manager.dislike_all([]) == 0
+
+    # dislike all user2's likes, verify likes gone. Counts are left to the stream handler
+    post_dynamo = like_manager.post_manager.dynamo
+    with patch.object(post_dynamo, 'decrement_onymous_like_count') as mock:
+        assert like_manager.dislike_all(iter(like_items)) == 2
+    assert mock.mock_calls == []
+    assert list(like_manager.dynamo.generate_by_liked_by(user2.id)) == []
+    assert like_manager.get_like(user1.id, post1.id)
+
+    # disliking likes already gone is harmless
+    assert like_manager.dislike_all(like_items) == 2
+    assert like_manager.get_like(user1.id, post1.id)
+
+
 def test_dislike_all_of_post(like_manager, user1, user2, user1_posts):
     post1, post2 = user1_posts
 
@@ -331,3 +355,12 @@ def test_on_user_follow_status_change_sync_likes(like_manager, follower_manager,
     old_item = new_item
     like_manager.on_user_follow_status_change_sync_likes(user1.id, old_item=old_item)
     assert like_manager.get_like(user2.id, post1.id) is None
+
+
+def test_on_user_follow_status_change_sync_likes_denied_deleted(like_manager, follower_manager, user1, user2):
+    # a denied follow request is deleted, verify nothing to do as likes were deleted on denial
+    user1.set_privacy_status(UserPrivacyStatus.PRIVATE)
+    follow = follower_manager.request_to_follow(user2, user1).deny()
+    with patch.object(like_manager, 'dislike_all_by_user_from_user') as dislike_mock:
+        like_manager.on_user_follow_status_change_sync_likes(user1.id, old_item=follow.item)
+    assert dislike_mock.call_count == 0
@@ -36,6 +36,21 @@ def test_post_add_and_delete(post_dynamo):
     assert post_dynamo.get_post(post_id) is None
 
 
+def test_batch_get_posts(post_dynamo):
+    post_ids = [str(uuid4()) for _ in range(120)]
+    for post_id in post_ids:
+        post_dynamo.add_pending_post('uid', post_id, 'ptype')
+
+    # nothing requested, nothing found
+    assert post_dynamo.batch_get_posts([]) == []
+    assert post_dynamo.batch_get_posts(['pid-dne']) == []
+
+    # more than fit in one batch, with duplicates and some that don't exist
+    items = post_dynamo.batch_get_posts(post_ids + post_ids[:5] + ['pid-dne'])
+    assert sorted(item['postId'] for item in items) == sorted(post_ids)
+    assert items[0] == post_dynamo.get_post(items[0]['postId'])
+
+
 def test_add_pending_post_sans_options(post_dynamo):
     user_id = 'pbuid'
     post_id = 'pid'
@@ -0,0 +1,91 @@
+import logging
+from uuid import uuid4
+
+import pytest
+
+from app.models.post.dynamo import PostImageBlobDynamo
+
+
+@pytest.fixture
+def post_image_blob_dynamo(dynamo_client):
+    yield PostImageBlobDynamo(dynamo_client)
+
+
+@pytest.fixture
+def checksum():
+    yield str(uuid4())
+
+
+def test_acquire_and_release(post_image_blob_dynamo, checksum):
+    assert post_image_blob_dynamo.get(checksum) is None
+
+    # first reference creates the blob
+    assert post_image_blob_dynamo.acquire(checksum) == {}
+    item = post_image_blob_dynamo.get(checksum)
+    assert item == {
+        'partitionKey': f'imageBlob/{checksum}',
+        'sortKey': '-',
+        'schemaVersion': 0,
+        'refCount': 1,
+    }
+
+    # second reference returns the blob as it was
+    assert post_image_blob_dynamo.acquire(checksum) == item
+    assert post_image_blob_dynamo.get(checksum)['refCount'] == 2
+
+    # release both
+    assert post_image_blob_dynamo.release(checksum)['refCount'] == 1
+    assert post_image_blob_dynamo.release(checksum)['refCount'] == 0
+
+
+def test_release_fails_softly(post_image_blob_dynamo, checksum, caplog):
+    with caplog.at_level(logging.WARNING):
+        assert post_image_blob_dynamo.release(checksum) is None
+    assert len(caplog.records) == 1
+    assert 'Failed to decrement' in caplog.records[0].msg
+
+    post_image_blob_dynamo.acquire(checksum)
+    post_image_blob_dynamo.release(checksum)
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        assert post_image_blob_dynamo.release(checksum) is None
+    assert len(caplog.records) == 1
+    assert post_image_blob_dynamo.get(checksum)['refCount'] == 0
+
+
+def test_set_renditions(post_image_blob_dynamo, checksum):
+    post_image_blob_dynamo.acquire(checksum)
+    colors = [{'r': 1, 'g': 2, 'b': 3}]
+    item = post_image_blob_dynamo.set_renditions(checksum, 40, 30, colors=colors)
+    assert item['height'] == 40
+    assert item['width'] == 30
+    assert item['colors'] == colors
+    assert post_image_blob_dynamo.get(checksum) == item
+
+    # later references see the renditions
+    assert post_image_blob_dynamo.acquire(checksum) == item
+
+
+def test_set_deleting(post_image_blob_dynamo, checksum, caplog):
+    # can't delete what doesn't exist, or what is still referenced
+    with caplog.at_level(logging.WARNING):
+        assert post_image_blob_dynamo.set_deleting(checksum) is None
+    post_image_blob_dynamo.acquire(checksum)
+    with caplog.at_level(logging.WARNING):
+        assert post_image_blob_dynamo.set_deleting(checksum) is None
+    assert len(caplog.records) == 2
+    assert all('not deletable' in rec.msg for rec in caplog.records)
+
+    # once unreferenced, can be claimed for deletion only once
+    post_image_blob_dynamo.release(checksum)
+    assert post_image_blob_dynamo.set_deleting(checksum)['deleting'] is True
+    assert post_image_blob_dynamo.set_deleting(checksum) is None
+
+    # a blob being deleted can't be referenced
+    with caplog.at_level(logging.WARNING):
+        assert post_image_blob_dynamo.acquire(checksum) is None
+    assert post_image_blob_dynamo.get(checksum)['refCount'] == 0
+
+    # once deleted, the blob can be created anew
+    assert post_image_blob_dynamo.delete(checksum)
+    assert post_image_blob_dynamo.acquire(checksum) == {}
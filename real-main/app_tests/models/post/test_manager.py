@@ -9,7 +9,7 @@ import stringcase
 from app.mixins.view.enums import ViewType
 from app.models.post.enums import PostStatus, PostType
 from app.models.post.exceptions import PostException
-from app.utils import image_size
+from app.utils import HyperLogLog, image_size
 
 
 @pytest.fixture
@@ -20,6 +20,7 @@ def user(user_manager, cognito_client):
 
 
 user2 = user
+user3 = user
 
 
 @pytest.fixture
@@ -580,6 +581,80 @@ def test_record_views(post_manager, user, user2, posts, caplog):
     assert user2.refresh_item().item['lastPostFocusViewAt']
 
 
+def test_record_views_batches_reads_and_counts_original_posts(post_manager, user, user2, posts, caplog):
+    post1, post2 = posts
+    post3 = post_manager.add_post(user, 'pid3', PostType.TEXT_ONLY, text='t')
+    post4 = post_manager.add_post(user, 'pid4', PostType.TEXT_ONLY, text='t')
+    post_manager.dynamo.set_post_status(post2.item, PostStatus.COMPLETED, original_post_id=post1.id)
+    post_manager.dynamo.set_post_status(post4.item, PostStatus.COMPLETED, original_post_id=post3.id)
+    post3.archive()
+
+    # posts are read in batches rather than one by one
+    with patch.object(post_manager, 'get_post') as get_post_mock:
+        with caplog.at_level(logging.WARNING):
+            post_manager.record_views([post2.id, post2.id, post4.id, 'pid-dne'], user2.id)
+    assert get_post_mock.mock_calls == []
+    assert len(caplog.records) == 2
+    assert f'on non-COMPLETED post `{post3.id}`' in caplog.records[0].msg
+    assert 'on DNE post `pid-dne`' in caplog.records[1].msg
+
+    # views of a non-original post count for the original as well, if it's completed
+    assert post_manager.view_dynamo.get_view(post2.id, user2.id)['viewCount'] == 2
+    assert post_manager.view_dynamo.get_view(post1.id, user2.id)['viewCount'] == 2
+    assert post_manager.view_dynamo.get_view(post4.id, user2.id)['viewCount'] == 1
+    assert post_manager.view_dynamo.get_view(post3.id, user2.id) is None
+    assert user2.refresh_item().item['lastPostViewAt']
+
+    # viewing a post and its original in the same batch merges into one write per post
+    post_manager.record_views([post1.id, post2.id], user2.id)
+    assert post_manager.view_dynamo.get_view(post2.id, user2.id)['viewCount'] == 3
+    assert post_manager.view_dynamo.get_view(post1.id, user2.id)['viewCount'] == 4
+
+
+def test_record_views_updates_viewer_sketches(post_manager, user_manager, user, user2, user3, posts):
+    post1, post2 = posts
+    now = pendulum.now('utc')
+    yesterday = now - pendulum.duration(days=1)
+    assert post_manager.get_viewed_by_count_approx(post1.id) == 0
+    assert user_manager.get_post_viewed_by_count_approx(user.id) == 0
+
+    # views of one's own posts don't count
+    post_manager.record_views([post1.id], user.id, viewed_at=yesterday)
+    assert post_manager.get_viewed_by_count_approx(post1.id) == 0
+    assert user_manager.get_post_viewed_by_count_approx(user.id, days=7, now=now) == 0
+
+    post_manager.record_views([post1.id, post2.id], user2.id, viewed_at=yesterday)
+    post_manager.record_views([post1.id], user3.id, viewed_at=now)
+    assert post_manager.get_viewed_by_count_approx(post1.id) == 2
+    assert post_manager.get_viewed_by_count_approx(post1.id, days=1, now=now) == 1
+    assert post_manager.get_viewed_by_count_approx(post1.id, days=2, now=now) == 2
+    assert post_manager.get_viewed_by_count_approx(post2.id) == 1
+    assert user_manager.get_post_viewed_by_count_approx(user.id) == 2
+    assert user_manager.get_post_viewed_by_count_approx(user.id, days=1, now=now) == 1
+
+    # the first repeat view of the day updates today's sketches only
+    sketch_dynamo = post_manager.viewer_sketch_dynamo
+    with patch.object(sketch_dynamo, 'add_register', wraps=sketch_dynamo.add_register) as add_register_mock:
+        post_manager.record_views([post2.id], user2.id, viewed_at=now)
+    assert add_register_mock.mock_calls == [call(post2.id, *HyperLogLog().hash(user2.id), date=now.date())]
+
+    # later repeat views that day don't touch the sketches at all
+    with patch.object(post_manager.viewer_sketch_dynamo, 'add_register') as add_register_mock:
+        with patch.object(user_manager.post_viewer_sketch_dynamo, 'add_register') as user_add_register_mock:
+            post_manager.record_views([post2.id], user2.id, viewed_at=now)
+    assert add_register_mock.mock_calls == []
+    assert user_add_register_mock.mock_calls == []
+    assert post_manager.get_viewed_by_count_approx(post2.id) == 1
+    assert post_manager.get_viewed_by_count_approx(post2.id, days=1, now=now) == 1
+    assert user_manager.get_post_viewed_by_count_approx(user.id, days=1, now=now) == 2
+
+    # deleting the post deletes its sketches
+    post_manager.on_post_delete_delete_viewer_sketches(post1.id, old_item=post1.item)
+    assert post_manager.get_viewed_by_count_approx(post1.id) == 0
+    assert post_manager.get_viewed_by_count_approx(post1.id, days=2, now=now) == 0
+    assert post_manager.get_viewed_by_count_approx(post2.id) == 1
+
+
 def test_add_post_with_keywords_attribute(post_manager, user):
     # create a post behind the scenes
     post_id = 'pid'
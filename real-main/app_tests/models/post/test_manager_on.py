@@ -115,7 +115,7 @@ def test_on_like_add(post_manager, post, like_onymous, like_anonymous):
     assert post.item.get('anonymousLikeCount', 0) == 2
 
 
-def test_on_like_delete(post_manager, post, like_onymous, like_anonymous, caplog):
+def test_on_likes_delete(post_manager, post, like_onymous, like_anonymous, caplog):
     # configure and check starting state
     post_manager.dynamo.increment_onymous_like_count(post.id)
     post_manager.dynamo.increment_anonymous_like_count(post.id)
@@ -124,20 +124,20 @@ def test_on_like_delete(post_manager, post, like_onymous, like_anonymous, caplog
     assert post.item.get('anonymousLikeCount', 0) == 1
 
     # trigger, check state
-    post_manager.on_like_delete(post.id, like_onymous.item)
+    post_manager.on_likes_delete([(post.id, {'old_item': like_onymous.item})])
     post.refresh_item()
     assert post.item.get('onymousLikeCount', 0) == 0
     assert post.item.get('anonymousLikeCount', 0) == 1
 
     # trigger, check state
-    post_manager.on_like_delete(post.id, like_anonymous.item)
+    post_manager.on_likes_delete([(post.id, {'old_item': like_anonymous.item})])
     post.refresh_item()
     assert post.item.get('onymousLikeCount', 0) == 0
     assert post.item.get('anonymousLikeCount', 0) == 0
 
     # trigger, check fails softly
     with caplog.at_level(logging.WARNING):
-        post_manager.on_like_delete(post.id, like_onymous.item)
+        post_manager.on_likes_delete([(post.id, {'old_item': like_onymous.item})])
     assert len(caplog.records) == 1
     assert 'Failed to decrement' in caplog.records[0].msg
     assert 'onymousLikeCount' in caplog.records[0].msg
@@ -145,15 +145,52 @@ def test_on_like_delete(post_manager, post, like_onymous, like_anonymous, caplog
     post.refresh_item()
     assert post.item.get('onymousLikeCount', 0) == 0
     assert post.item.get('anonymousLikeCount', 0) == 0
+    caplog.clear()
 
     # checking junk like status
-    with pytest.raises(Exception, match='junkjunk'):
-        post_manager.on_like_delete(post.id, {**like_onymous.item, 'likeStatus': 'junkjunk'})
+    with caplog.at_level(logging.WARNING):
+        post_manager.on_likes_delete([(post.id, {'old_item': {**like_onymous.item, 'likeStatus': 'junkjunk'}})])
+    assert len(caplog.records) == 1
+    assert 'junkjunk' in caplog.records[0].msg
     post.refresh_item()
     assert post.item.get('onymousLikeCount', 0) == 0
     assert post.item.get('anonymousLikeCount', 0) == 0
 
 
+def test_on_likes_delete_one_write_per_post(post_manager, user):
+    post1 = post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='go go')
+    post2 = post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='go go')
+    for _ in range(3):
+        post_manager.dynamo.increment_onymous_like_count(post1.id)
+        post_manager.dynamo.increment_anonymous_like_count(post1.id)
+    post_manager.dynamo.increment_onymous_like_count(post2.id)
+    onymous_item = {'likeStatus': LikeStatus.ONYMOUSLY_LIKED}
+    anonymous_item = {'likeStatus': LikeStatus.ANONYMOUSLY_LIKED}
+
+    # a batch with many deleted likes per post updates each post once
+    calls = [
+        (post1.id, {'old_item': onymous_item}),
+        (post1.id, {'old_item': anonymous_item}),
+        (post2.id, {'old_item': onymous_item}),
+        (post1.id, {'old_item': onymous_item}),
+        (post1.id, {'old_item': anonymous_item}),
+        (post1.id, {'old_item': onymous_item}),
+    ]
+    client = post_manager.dynamo.client
+    with patch.object(client, 'update_item', wraps=client.update_item) as update_item_mock:
+        post_manager.on_likes_delete(calls)
+    assert update_item_mock.call_count == 2
+    assert sorted(c.args[0]['Key']['partitionKey'] for c in update_item_mock.call_args_list) == sorted(
+        [f'post/{post1.id}', f'post/{post2.id}']
+    )
+    post1.refresh_item()
+    assert post1.item.get('onymousLikeCount', 0) == 0
+    assert post1.item.get('anonymousLikeCount', 0) == 1
+    post2.refresh_item()
+    assert post2.item.get('onymousLikeCount', 0) == 0
+    assert 'anonymousLikeCount' not in post2.item
+
+
 def test_on_post_view_count_change_update_counts_view_by_post_owner_clears_unviewed_comments(post_manager, post):
     # add some state to clear, verify
     post_manager.dynamo.set_last_unviewed_comment_at(post.item, pendulum.now('utc'))
@@ -519,28 +556,80 @@ def test_sync_elasticsearch(post_manager, post):
     ]
 
 
+def add_view(post_manager, item_id, user_id, view_count, viewed_at):
+    "Add a view, running the stream handler that keeps the daily totals"
+    item = post_manager.view_dynamo.add_view(item_id, user_id, view_count, viewed_at)
+    post_manager.on_post_view_change_update_daily_totals(item_id, new_item=item)
+
+
+def set_royalty_fee(post_manager, item_id, user_id, royalty_fee):
+    "Set a royalty fee, running the stream handler that keeps the daily totals"
+    old_item = post_manager.view_dynamo.get_view(item_id, user_id)
+    new_item = post_manager.view_dynamo.set_royalty_fee(item_id, user_id, royalty_fee)
+    post_manager.on_post_view_change_update_daily_totals(item_id, new_item=new_item, old_item=old_item)
+
+
 def test_get_royalty_paid_and_posts_viewed_past_30_days(post_manager, user):
     item_id1, item_id2, item_id3 = [str(uuid4()), str(uuid4()), str(uuid4())]
-    post_manager.view_dynamo.add_view(item_id1, user.id, 1, pendulum.now('utc'))
-    post_manager.view_dynamo.add_view(item_id2, user.id, 1, pendulum.now('utc'))
-    post_manager.view_dynamo.add_view(item_id3, user.id, 1, pendulum.now('utc') - pendulum.duration(days=31))
+    add_view(post_manager, item_id1, user.id, 1, pendulum.now('utc'))
+    add_view(post_manager, item_id2, user.id, 1, pendulum.now('utc'))
+    add_view(post_manager, item_id3, user.id, 1, pendulum.now('utc') - pendulum.duration(days=31))
     assert post_manager.get_royalty_paid_and_posts_viewed_past_30_days(user.id) == [Decimal('0'), 2]
 
-    post_manager.view_dynamo.set_royalty_fee(item_id1, user.id, Decimal('0.99'))
+    set_royalty_fee(post_manager, item_id1, user.id, Decimal('0.99'))
     assert post_manager.get_royalty_paid_and_posts_viewed_past_30_days(user.id) == [Decimal('0.99'), 2]
-    post_manager.view_dynamo.set_royalty_fee(item_id2, user.id, Decimal('0.99'))
+    set_royalty_fee(post_manager, item_id2, user.id, Decimal('0.99'))
     assert post_manager.get_royalty_paid_and_posts_viewed_past_30_days(user.id) == [2 * Decimal('0.99'), 2]
 
-    post_manager.view_dynamo.set_royalty_fee(item_id3, user.id, Decimal('0.99'))
+    set_royalty_fee(post_manager, item_id3, user.id, Decimal('0.99'))
     assert post_manager.get_royalty_paid_and_posts_viewed_past_30_days(user.id) == [2 * Decimal('0.99'), 2]
 
+    # the window can be moved
+    later = pendulum.now('utc') + pendulum.duration(days=32)
+    assert post_manager.get_royalty_paid_and_posts_viewed_past_30_days(user.id, now=later) == [0, 0]
+
+
+def test_on_post_view_change_update_daily_totals(post_manager, user, user_manager):
+    now = pendulum.now('utc')
+    earlier = now - pendulum.duration(days=3)
+    view_item = {
+        'partitionKey': 'post/pid',
+        'sortKey': f'view/{user.id}',
+        'firstViewedAt': earlier.to_iso8601_string(),
+    }
+
+    # totals go to the bucket of the first view
+    post_manager.on_post_view_change_update_daily_totals('pid', new_item={**view_item, 'viewCount': 2})
+    totals = user_manager.daily_totals_dynamo.get(user.id, earlier.date())
+    assert totals['postViewCount'] == 2
+    assert 'royaltyPaid' not in totals
+    assert user_manager.daily_totals_dynamo.get(user.id, now.date()) is None
+
+    # changes are applied as deltas
+    post_manager.on_post_view_change_update_daily_totals(
+        'pid',
+        new_item={**view_item, 'viewCount': 5, 'royaltyFee': Decimal('0.2')},
+        old_item={**view_item, 'viewCount': 2},
+    )
+    totals = user_manager.daily_totals_dynamo.get(user.id, earlier.date())
+    assert totals['postViewCount'] == 5
+    assert totals['royaltyPaid'] == Decimal('0.2')
+
+    # removal takes them out again
+    post_manager.on_post_view_change_update_daily_totals(
+        'pid', old_item={**view_item, 'viewCount': 5, 'royaltyFee': Decimal('0.2')}
+    )
+    totals = user_manager.daily_totals_dynamo.get(user.id, earlier.date())
+    assert totals['postViewCount'] == 0
+    assert totals['royaltyPaid'] == 0
+
 
 def test_on_post_view_calculate_royalty_fee(post_manager, post, user, user2):
     item_id1, item_id2, item_id3 = [str(uuid4()), str(uuid4()), str(uuid4())]
-    post_manager.view_dynamo.add_view(item_id1, user2.id, 1, pendulum.now('utc'))
-    post_manager.view_dynamo.add_view(item_id2, user2.id, 2, pendulum.now('utc'))
-    post_manager.view_dynamo.add_view(post.id, user2.id, 1, pendulum.now('utc'))
-    post_manager.view_dynamo.add_view(item_id3, user2.id, 1, pendulum.now('utc') - pendulum.duration(days=31))
+    add_view(post_manager, item_id1, user2.id, 1, pendulum.now('utc'))
+    add_view(post_manager, item_id2, user2.id, 2, pendulum.now('utc'))
+    add_view(post_manager, post.id, user2.id, 1, pendulum.now('utc'))
+    add_view(post_manager, item_id3, user2.id, 1, pendulum.now('utc') - pendulum.duration(days=31))
 
     item_other_user = {'partitionKey': f'post/{post.id}', 'sortKey': f'view/{user2.id}', 'viewCount': 1}
     user.grant_subscription_bonus()
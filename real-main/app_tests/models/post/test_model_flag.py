@@ -1,4 +1,5 @@
 import uuid
+from unittest.mock import patch
 
 import pytest
 
@@ -43,9 +44,14 @@ def test_cant_flag_post_of_private_user_we_are_not_following(post, user, user2,
     assert post.refresh_item().item.get('flagCount', 0) == 0
     assert list(post.flag_dynamo.generate_keys_by_item(post.id)) == []
 
-    # accept the follow request - now can flag
+    # accept the follow request - now can flag, the relationship looked up once
     following.accept()
-    post.flag(user2)
+    relationship_manager = post.relationship_manager
+    with patch.object(
+        relationship_manager, 'fetch_relationships', wraps=relationship_manager.fetch_relationships
+    ) as fetch_relationships_mock:
+        post.flag(user2)
+    assert [c.args[1] for c in fetch_relationships_mock.call_args_list if c.args[1]] == [[user.id]]
 
     # check the flag exists
     assert post.item.get('flagCount', 0) == 1  # count incremented in mem only at this point
@@ -274,3 +274,84 @@ def test_process_image_upload_success_heic_with_crop_rotate(pending_post, s3_upl
 
     assert post.item['postStatus'] == PostStatus.COMPLETED
     assert post.refresh_item().item['postStatus'] == PostStatus.COMPLETED
+
+
+def test_process_image_upload_stores_renditions_in_image_blob(pending_post, s3_uploads_client, grant_data):
+    post = pending_post
+    s3_uploads_client.put_object(post.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    upload_path = post.get_s3_image_path(image_size.NATIVE)
+
+    post.process_image_upload()
+    assert post.item['postStatus'] == PostStatus.COMPLETED
+    checksum = post.item['imageBlobChecksum']
+    assert checksum == post.item['checksum']
+
+    # all renditions are in the blob, the uploaded image is gone from under the post
+    for size in image_size.JPEGS:
+        path = post.get_image_path(size)
+        assert path == f'image-blob/{checksum}/{size.filename}'
+        assert s3_uploads_client.exists(path)
+    assert not s3_uploads_client.exists(upload_path)
+
+    # the blob records what later uploads of the same image need
+    blob_item = post.image_blob_dynamo.get(checksum)
+    assert blob_item['refCount'] == 1
+    assert blob_item['height'] == post.image_item['height']
+    assert blob_item['width'] == post.image_item['width']
+    assert blob_item['colors'] == post.image_item['colors']
+
+
+def test_process_image_upload_duplicate_reuses_image_blob(post_manager, user, pending_post, grant_data):
+    post1 = pending_post
+    s3_uploads_client = post1.s3_uploads_client
+    s3_uploads_client.put_object(post1.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    post1.process_image_upload()
+    checksum = post1.item['imageBlobChecksum']
+
+    # upload the same image to another post
+    post2 = post_manager.add_post(user, 'pid4', PostType.IMAGE)
+    s3_uploads_client.put_object(post2.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+    post2.build_image_thumbnails = mock.Mock(wraps=post2.build_image_thumbnails)
+    post2.set_colors = mock.Mock(wraps=post2.set_colors)
+    post2.process_image_upload()
+
+    # no thumbnailing happened, the renditions of the first post are shared
+    assert post2.build_image_thumbnails.mock_calls == []
+    assert post2.set_colors.mock_calls == []
+    assert post2.item['postStatus'] == PostStatus.COMPLETED
+    assert post2.item['originalPostId'] == post1.id
+    assert post2.item['imageBlobChecksum'] == checksum
+    for size in image_size.JPEGS:
+        assert post2.get_image_path(size) == post1.get_image_path(size)
+    assert not s3_uploads_client.exists(post2.get_s3_image_path(image_size.NATIVE))
+    assert post2.image_item['height'] == post1.image_item['height']
+    assert post2.image_item['width'] == post1.image_item['width']
+    assert post2.image_item['colors'] == post1.image_item['colors']
+    assert post_manager.image_blob_dynamo.get(checksum)['refCount'] == 2
+
+    # deleting one post leaves the renditions for the other
+    post1.delete()
+    assert post_manager.image_blob_dynamo.get(checksum)['refCount'] == 1
+    for size in image_size.JPEGS:
+        assert s3_uploads_client.exists(post2.get_image_path(size))
+
+    # deleting the last reference deletes the blob
+    post2.delete()
+    assert post_manager.image_blob_dynamo.get(checksum) is None
+    for size in image_size.JPEGS:
+        assert not s3_uploads_client.exists(post2.get_image_path(size))
+
+
+def test_process_image_upload_falls_back_to_own_renditions(pending_post, s3_uploads_client, grant_data):
+    post = pending_post
+    s3_uploads_client.put_object(post.get_image_path(image_size.NATIVE), grant_data, 'image/jpeg')
+
+    # blob is in the middle of being deleted
+    with mock.patch.object(post.image_blob_dynamo, 'acquire', return_value=None):
+        post.process_image_upload()
+    assert post.item['postStatus'] == PostStatus.COMPLETED
+    assert 'imageBlobChecksum' not in post.item
+    for size in image_size.JPEGS:
+        path = post.get_image_path(size)
+        assert path == post.get_s3_image_path(size)
+        assert s3_uploads_client.exists(path)
@@ -4,12 +4,19 @@ Tests for generating images from text.
 These tests aren't intended to ensure the output looks correct,
 they're more just intended to ensure the alogirthm doesn't crash.
 """
+from unittest import mock
+
+import PIL.Image
+import PIL.ImageDraw
 import pytest
 
+from app.models.post import text_image
 from app.models.post.text_image import generate_text_image, rectangle_wrap
 
 dims_4k = (3840, 2160)
+dims_1080p = (1920, 1080)
 dims_64p = (114, 64)
+dims_square = (1000, 1000)
 
 
 def test_genearate_text_image():
@@ -46,3 +53,75 @@ def test_rectangle_wrap():
     assert text == 'a b c\nd e'
     assert text_height == 22
     assert text_width == 48
+
+
+def test_rectangle_wrap_extremes():
+    raw_tokens = ['a', 'b', 'c', 'd', 'e']
+    token_widths = [15, 13, 16, 14, 17]
+
+    # single token
+    assert rectangle_wrap(['a'], [15], 2, 2, 10, 16 / 9) == ('a', 15, 10)
+
+    # wide aspect ratio that can't be reached puts everything on one line
+    assert rectangle_wrap(raw_tokens, token_widths, 2, 2, 10, 100) == ('a b c d e', 83, 10)
+
+    # tall aspect ratio that's already reached puts every token on its own line
+    assert rectangle_wrap(raw_tokens, token_widths, 2, 2, 10, 0.01) == ('a\nb\nc\nd\ne', 17, 58)
+
+
+@pytest.mark.parametrize('desired_aspect_ratio', [0.5, 1, 16 / 9, 4])
+def test_rectangle_wrap_long_caption(desired_aspect_ratio):
+    raw_tokens = [f'word{i}' for i in range(2000)]
+    token_widths = [40 + (i * 7919) % 60 for i in range(2000)]
+    text, text_width, text_height = rectangle_wrap(raw_tokens, token_widths, 10, 5, 30, desired_aspect_ratio)
+
+    lines = text.split('\n')
+    assert text.split() == raw_tokens
+    assert text_height == len(lines) * 30 + (len(lines) - 1) * 5
+    assert text_width / text_height >= desired_aspect_ratio
+
+
+def test_get_font_cached_per_size():
+    assert text_image.get_font(100) is text_image.get_font(100)
+    assert text_image.get_font(100) is not text_image.get_font(101)
+
+
+@pytest.mark.parametrize('text', ['supercalifragilisticexpialidocious', 'Hello, world!', 'Ünïcode ✓'])
+def test_measure_text_width_matches_font(text):
+    font = text_image.get_font(text_image.REFERENCE_FONT_SIZE)
+    draw = PIL.ImageDraw.Draw(PIL.Image.new('RGB', (1, 1)))
+    actual_width = draw.textsize(text, font=font)[0]
+    assert text_image.measure_text_width(text) == pytest.approx(actual_width, rel=0.01)
+
+
+def test_generate_text_image_dimensions():
+    for dims in (dims_4k, dims_1080p, dims_64p, dims_square):
+        assert generate_text_image('Fly high', dims).size == dims
+
+
+def test_generate_text_image_memoized_and_downscaled_from_4k():
+    text_image.render_text_image.cache_clear()
+    text = 'Today for lunch I had a burger'
+
+    with mock.patch.object(text_image, 'draw_text_image', wraps=text_image.draw_text_image) as draw_mock:
+        image_4k = generate_text_image(text, dims_4k)
+        image_1080p = generate_text_image(text, dims_1080p)
+        image_4k_again = generate_text_image(text, dims_4k)
+    assert draw_mock.mock_calls == [mock.call(text, dims_4k)]
+
+    # cached images are handed out as copies
+    assert image_4k is not image_4k_again
+    assert image_4k.tobytes() == image_4k_again.tobytes()
+
+    # non-16:9 images are drawn directly
+    with mock.patch.object(text_image, 'draw_text_image', wraps=text_image.draw_text_image) as draw_mock:
+        assert generate_text_image(text, dims_square)
+    assert draw_mock.mock_calls == [mock.call(text, dims_square)]
+    assert image_1080p.size == dims_1080p
+
+
+def test_generate_text_image_shrinks_font_for_long_words():
+    with mock.patch.object(text_image, 'get_font', wraps=text_image.get_font) as get_font_mock:
+        assert text_image.draw_text_image('supercalifragilisticexpialidocious' * 2, dims_4k)
+    font_size = get_font_mock.call_args.args[0]
+    assert 0 < font_size < dims_4k[1] // 10
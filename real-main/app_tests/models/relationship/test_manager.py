@@ -0,0 +1,133 @@
+import uuid
+from unittest import mock
+
+import pytest
+
+from app.models.follower.enums import FollowStatus
+from app.models.relationship.model import Relationship
+
+
+@pytest.fixture
+def block_dynamo(relationship_manager):
+    yield relationship_manager.block_dynamo
+
+
+@pytest.fixture
+def follower_dynamo(relationship_manager):
+    yield relationship_manager.follower_dynamo
+
+
+def none_relationship():
+    return Relationship(FollowStatus.NOT_FOLLOWING, FollowStatus.NOT_FOLLOWING, False, False)
+
+
+def test_get_relationship_self(relationship_manager):
+    with mock.patch.object(relationship_manager, 'fetch_relationships', return_value={}) as fetch_mock:
+        relationship = relationship_manager.get_relationship('uid', 'uid')
+    assert relationship == Relationship(FollowStatus.SELF, FollowStatus.SELF, False, False)
+    assert fetch_mock.call_args_list == [mock.call('uid', [])]
+
+
+def test_get_relationship(relationship_manager, block_dynamo, follower_dynamo):
+    assert relationship_manager.get_relationship('uid1', 'uid2') == none_relationship()
+
+    follower_dynamo.add_following('uid1', 'uid2', FollowStatus.FOLLOWING)
+    follower_dynamo.add_following('uid2', 'uid1', FollowStatus.REQUESTED)
+    block_dynamo.add_block('uid1', 'uid3')
+    block_dynamo.add_block('uid4', 'uid1')
+    relationship_manager.relationships.clear()
+
+    relationship = relationship_manager.get_relationship('uid1', 'uid2')
+    assert relationship == Relationship(FollowStatus.FOLLOWING, FollowStatus.REQUESTED, False, False)
+    assert relationship.following is True
+    assert relationship.followed_by is False
+    assert relationship.either_blocking is False
+
+    relationship = relationship_manager.get_relationship('uid2', 'uid1')
+    assert relationship == Relationship(FollowStatus.REQUESTED, FollowStatus.FOLLOWING, False, False)
+    assert relationship.following is False
+    assert relationship.followed_by is True
+
+    relationship = relationship_manager.get_relationship('uid1', 'uid3')
+    assert relationship == Relationship(FollowStatus.NOT_FOLLOWING, FollowStatus.NOT_FOLLOWING, True, False)
+    assert relationship.either_blocking is True
+
+    relationship = relationship_manager.get_relationship('uid1', 'uid4')
+    assert relationship == Relationship(FollowStatus.NOT_FOLLOWING, FollowStatus.NOT_FOLLOWING, False, True)
+    assert relationship.either_blocking is True
+
+
+def test_get_relationships_batches(relationship_manager, follower_dynamo, block_dynamo):
+    # more targets than fit in one batch get
+    user_ids = [str(uuid.uuid4()) for _ in range(60)]
+    for user_id in user_ids[::2]:
+        follower_dynamo.add_following('uid', user_id, FollowStatus.FOLLOWING)
+    block_dynamo.add_block(user_ids[1], 'uid')
+
+    client = relationship_manager.follower_dynamo.client
+    with mock.patch.object(client, 'boto3_client', wraps=client.boto3_client) as boto3_client_mock:
+        relationships = relationship_manager.get_relationships('uid', ['uid'] + user_ids + user_ids[:5])
+    assert boto3_client_mock.batch_get_item.call_count == 3  # 4 keys per target, 100 keys per batch
+
+    assert list(relationships.keys()) == ['uid'] + user_ids
+    assert relationships['uid'].followed_status == FollowStatus.SELF
+    assert [relationships[user_id].following for user_id in user_ids] == [True, False] * 30
+    assert relationships[user_ids[1]].blocked is True
+    assert sum(relationship.either_blocking for relationship in relationships.values()) == 1
+
+
+def test_get_relationships_memo_and_cache(relationship_manager, follower_dynamo):
+    follower_dynamo.add_following('uid1', 'uid2', FollowStatus.FOLLOWING)
+
+    fetch = relationship_manager.fetch_relationships
+    with mock.patch.object(relationship_manager, 'fetch_relationships', wraps=fetch) as fetch_mock:
+        memo = {}
+        assert relationship_manager.get_relationship('uid1', 'uid2', memo=memo).following is True
+        assert fetch_mock.call_args_list == [mock.call('uid1', ['uid2'])]
+        assert list(memo.keys()) == [('uid1', 'uid2')]
+
+        # served from the memo, even once dropped from the cache
+        relationship_manager.relationships.clear()
+        relationship_manager.get_relationships('uid1', ['uid2', 'uid3'], memo=memo)
+        assert fetch_mock.call_args_list[1] == mock.call('uid1', ['uid3'])
+
+        # served from the cache across memos
+        relationship_manager.get_relationships('uid1', ['uid3'])
+        assert fetch_mock.call_args_list[2] == mock.call('uid1', [])
+
+        # changes are seen once invalidated, in either direction
+        follower_dynamo.add_following('uid3', 'uid1', FollowStatus.FOLLOWING)
+        assert relationship_manager.get_relationship('uid1', 'uid3').followed_by is False
+        relationship_manager.invalidate('uid3', 'uid1')
+        assert relationship_manager.get_relationship('uid1', 'uid3').followed_by is True
+
+        # cache hits aren't memoized, so access checks can share a memo
+        memo = {}
+        relationship_manager.get_relationship('uid1', 'uid3', memo=memo)
+        assert memo == {}
+
+        # access checks skip the cache, and refresh it
+        assert relationship_manager.get_relationship('uid1', 'uid2').followed_by is False
+        follower_dynamo.add_following('uid2', 'uid1', FollowStatus.FOLLOWING)
+        assert relationship_manager.get_relationship('uid1', 'uid2').followed_by is False
+        assert relationship_manager.get_relationship('uid1', 'uid2', use_cache=False).followed_by is True
+        assert relationship_manager.get_relationship('uid1', 'uid2').followed_by is True
+
+
+def test_on_user_relationship_change_invalidate(relationship_manager, follower_dynamo, block_dynamo):
+    assert relationship_manager.get_relationship('uid1', 'uid2') == none_relationship()
+    assert relationship_manager.get_relationship('uid2', 'uid1') == none_relationship()
+
+    # follow, check the handler drops both directions from the cache
+    follow_item = follower_dynamo.add_following('uid1', 'uid2', FollowStatus.FOLLOWING)
+    relationship_manager.on_user_relationship_change_invalidate('uid2', new_item=follow_item)
+    assert relationship_manager.get_relationship('uid1', 'uid2').following is True
+    assert relationship_manager.get_relationship('uid2', 'uid1').followed_by is True
+
+    # block then unblock, check the same
+    block_item = block_dynamo.add_block('uid2', 'uid1')
+    relationship_manager.on_user_relationship_change_invalidate('uid1', new_item=block_item)
+    assert relationship_manager.get_relationship('uid1', 'uid2').blocked is True
+    block_dynamo.delete_block('uid2', 'uid1')
+    relationship_manager.on_user_relationship_change_invalidate('uid1', old_item=block_item)
+    assert relationship_manager.get_relationship('uid2', 'uid1').blocking is False
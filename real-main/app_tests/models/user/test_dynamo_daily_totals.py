@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from app.models.user.dynamo import UserDailyTotalsDynamo
+
+
+@pytest.fixture
+def daily_totals_dynamo(dynamo_client):
+    yield UserDailyTotalsDynamo(dynamo_client)
+
+
+def test_add_and_get(daily_totals_dynamo):
+    date = pendulum.date(2020, 6, 7)
+    assert daily_totals_dynamo.get('uid', date) is None
+
+    # nothing to add
+    daily_totals_dynamo.add('uid', date, postViewCount=0)
+    assert daily_totals_dynamo.get('uid', date) is None
+
+    daily_totals_dynamo.add('uid', date, postViewCount=2, paidReal=Decimal('0.99'))
+    daily_totals_dynamo.add('uid', date, postViewCount=-1, royaltyPaid=Decimal('0.1'))
+    assert daily_totals_dynamo.get('uid', date) == {
+        'partitionKey': 'user/uid',
+        'sortKey': 'dailyTotals/2020-06-07',
+        'schemaVersion': 0,
+        'postViewCount': 1,
+        'paidReal': Decimal('0.99'),
+        'royaltyPaid': Decimal('0.1'),
+    }
+
+    with pytest.raises(AssertionError, match='Unexpected'):
+        daily_totals_dynamo.add('uid', date, otherCount=1)
+
+
+def test_get_past_days_totals(daily_totals_dynamo):
+    now = pendulum.parse('2020-06-30T12:00:00Z')
+    assert daily_totals_dynamo.get_past_days_totals('uid', now=now) == {
+        'postViewCount': 0,
+        'royaltyPaid': 0,
+        'paidReal': 0,
+    }
+
+    daily_totals_dynamo.add('uid', now.date(), postViewCount=1, paidReal=Decimal('1'))
+    daily_totals_dynamo.add('uid', pendulum.date(2020, 6, 15), postViewCount=2, royaltyPaid=Decimal('0.2'))
+    daily_totals_dynamo.add('uid', pendulum.date(2020, 5, 31), postViewCount=4)
+    daily_totals_dynamo.add('uid', pendulum.date(2020, 5, 30), postViewCount=8)
+    daily_totals_dynamo.add('uid', pendulum.date(2020, 7, 1), postViewCount=16)
+    daily_totals_dynamo.add('uid-other', now.date(), postViewCount=32)
+
+    # window is widened to the start of the day 30 days ago
+    assert daily_totals_dynamo.get_past_days_totals('uid', now=now) == {
+        'postViewCount': 7,
+        'royaltyPaid': Decimal('0.2'),
+        'paidReal': Decimal('1'),
+    }
+    assert daily_totals_dynamo.get_past_days_totals('uid', days=0, now=now)['postViewCount'] == 1
+    assert daily_totals_dynamo.get_past_days_totals('uid', days=15, now=now)['postViewCount'] == 3
+
+
+def test_generate_keys(daily_totals_dynamo):
+    assert list(daily_totals_dynamo.generate_keys('uid')) == []
+    daily_totals_dynamo.add('uid', pendulum.date(2020, 6, 7), postViewCount=1)
+    daily_totals_dynamo.add('uid', pendulum.date(2020, 6, 8), postViewCount=1)
+    daily_totals_dynamo.add('uid-other', pendulum.date(2020, 6, 8), postViewCount=1)
+    assert [key['sortKey'] for key in daily_totals_dynamo.generate_keys('uid')] == [
+        'dailyTotals/2020-06-07',
+        'dailyTotals/2020-06-08',
+    ]
@@ -54,6 +54,14 @@ def test_get_user_that_doesnt_exist(user_manager):
     assert resp is None
 
 
+def test_get_users(user_manager, user1, user2):
+    assert user_manager.get_users([]) == {}
+    users = user_manager.get_users([user1.id, 'nope-not-there', user2.id, user1.id])
+    assert sorted(users) == sorted([user1.id, user2.id])
+    assert users[user1.id].id == user1.id
+    assert users[user2.id].item == user2.item
+
+
 def test_get_user_by_username(user_manager, user1):
     # check a user that doesn't exist
     user = user_manager.get_user_by_username('nope_not_there')
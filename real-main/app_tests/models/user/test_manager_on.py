@@ -3,6 +3,7 @@ from decimal import Decimal
 from unittest.mock import Mock, call, patch
 from uuid import uuid4
 
+import pendulum
 import pytest
 
 from app.models.appstore.enums import AppStoreSubscriptionStatus
@@ -152,6 +153,29 @@ def test_on_user_delete_deletes_photo_s3_objects(user_manager, user):
         assert not user.s3_uploads_client.exists(path)
 
 
+def test_on_user_delete_delete_daily_totals(user_manager, user):
+    today = pendulum.now('utc').date()
+    user_manager.daily_totals_dynamo.add(user.id, today, postViewCount=1)
+    user_manager.daily_totals_dynamo.add(user.id, today.subtract(days=1), postViewCount=1)
+    assert len(list(user_manager.daily_totals_dynamo.generate_keys(user.id))) == 2
+
+    user_manager.on_user_delete_delete_daily_totals(user.id, old_item=user.item)
+    assert list(user_manager.daily_totals_dynamo.generate_keys(user.id)) == []
+    assert user.refresh_item().item
+
+
+def test_on_user_delete_delete_post_viewer_sketches(user_manager, user):
+    today = pendulum.now('utc').date()
+    user_manager.post_viewer_sketch_dynamo.add_register(user.id, 1, 1)
+    user_manager.post_viewer_sketch_dynamo.add_register(user.id, 1, 1, date=today)
+    assert user_manager.get_post_viewed_by_count_approx(user.id) == 1
+
+    user_manager.on_user_delete_delete_post_viewer_sketches(user.id, old_item=user.item)
+    assert list(user_manager.post_viewer_sketch_dynamo.generate_keys(user.id)) == []
+    assert user_manager.get_post_viewed_by_count_approx(user.id) == 0
+    assert user.refresh_item().item
+
+
 def test_on_card_add_increment_count(user_manager, user, card):
     assert user.refresh_item().item.get('cardCount', 0) == 0
 
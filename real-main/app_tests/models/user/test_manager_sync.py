@@ -223,6 +223,25 @@ def test_sync_follow_counts_due_to_follow_status_private_user_lifecycle(
     assert followed.refresh_item().item.get('followersRequestedCount', 0) == 0
 
 
+def test_sync_follow_counts_due_to_follow_status_skips_bulk_synced(user_manager, follower_manager, user, user2):
+    follower, followed = user, user2
+    followed.set_privacy_status(UserPrivacyStatus.PRIVATE)
+    old_item = follower_manager.request_to_follow(follower, followed).item
+    new_item = follower_manager.dynamo.update_following_statuses([old_item], FollowStatus.FOLLOWING)[0]
+
+    # sync the bulk acceptance, check nothing changed
+    user_manager.sync_follow_counts_due_to_follow_status(followed.id, new_item=new_item, old_item=old_item)
+    assert follower.refresh_item().item.get('followedCount', 0) == 0
+    assert followed.refresh_item().item.get('followerCount', 0) == 0
+
+
+def test_on_followers_accepted_sync_followed_counts(user_manager, user, user2):
+    new_item = {'followerUserIds': [user.id, user2.id]}
+    user_manager.on_followers_accepted_sync_followed_counts(str(uuid4()), new_item=new_item)
+    assert user.refresh_item().item.get('followedCount', 0) == 1
+    assert user2.refresh_item().item.get('followedCount', 0) == 1
+
+
 def test_sync_follow_counts_due_to_follow_status_fails_softly(
     user_manager, follower_manager, user, user2, caplog
 ):
@@ -52,12 +52,12 @@ def test_get_photo_path(user, uploaded_post):
     user.update_photo(uploaded_post.id)
     assert user.item['photoPostId'] == uploaded_post.id
 
-    # should now return the paths
+    # should now return the paths, shared with the post
     for size in image_size.JPEGS:
         path = user.get_photo_path(size)
         assert path is not None
         assert size.name in path
-        assert uploaded_post.id in path
+        assert path == uploaded_post.get_image_path(size)
 
 
 def test_get_placeholder_photo_path(user):
@@ -147,21 +147,65 @@ def test_set_photo_multiple_times(user, uploaded_post, another_uploaded_post):
         new_body = list(user.s3_uploads_client.get_object_data_stream(path))
         assert new_body != org_bodies[size]
 
-    # verify the old images are still there
-    # we don't delete them as there may still be un-expired signed urls pointing to the old images
+    # verify the old images are still there, the post still references them
     for size in image_size.JPEGS:
-        path = user.get_photo_path(size, photo_post_id=uploaded_post.id)
+        path = uploaded_post.get_image_path(size)
         assert user.s3_uploads_client.exists(path)
 
 
-def test_clear_photo_s3_objects(user, uploaded_post, another_uploaded_post):
-    # set it
+def test_set_photo_references_post_image_blob(user, uploaded_post, another_uploaded_post, post_manager):
+    blob_dynamo = post_manager.image_blob_dynamo
+    checksum1 = uploaded_post.item['imageBlobChecksum']
+    checksum2 = another_uploaded_post.item['imageBlobChecksum']
+    assert blob_dynamo.get(checksum1)['refCount'] == 1
+    assert blob_dynamo.get(checksum2)['refCount'] == 1
+
+    # set it, verify it references the post's image blob rather than copying the images
+    with mock.patch.object(user, 'add_photo_s3_objects') as add_photo_s3_objects_mock:
+        user.update_photo(uploaded_post.id)
+    assert add_photo_s3_objects_mock.mock_calls == []
+    assert user.item['photoBlobChecksum'] == checksum1
+    assert blob_dynamo.get(checksum1)['refCount'] == 2
+
+    # change it, verify the reference moves
+    user.update_photo(another_uploaded_post.id)
+    assert user.item['photoBlobChecksum'] == checksum2
+    assert blob_dynamo.get(checksum1)['refCount'] == 1
+    assert blob_dynamo.get(checksum2)['refCount'] == 2
+
+    # clear it, verify both blobs are still around for their posts
+    user.update_photo(None)
+    assert 'photoBlobChecksum' not in user.item
+    assert blob_dynamo.get(checksum2)['refCount'] == 1
+    for size in image_size.JPEGS:
+        assert user.s3_uploads_client.exists(another_uploaded_post.get_image_path(size))
+
+
+def test_set_photo_copies_images_of_post_without_image_blob(user, uploaded_post, post_manager):
+    # put the post back on its own images, as posts processed before image blobs existed are
+    checksum = uploaded_post.item['imageBlobChecksum']
+    uploaded_post.s3_uploads_client.copy_objects(
+        [(uploaded_post.get_image_path(size), uploaded_post.get_s3_image_path(size)) for size in image_size.JPEGS]
+    )
+    uploaded_post.set_image_blob(None)
+
     user.update_photo(uploaded_post.id)
-    assert user.item['photoPostId'] == uploaded_post.id
+    assert 'photoBlobChecksum' not in user.item
+    assert post_manager.image_blob_dynamo.get(checksum) is None
+    for size in image_size.JPEGS:
+        path = user.get_photo_path(size)
+        assert path == user.get_photo_path(size, photo_post_id=uploaded_post.id)
+        assert user.s3_uploads_client.exists(path)
 
-    # change it
+
+def test_clear_photo_s3_objects(user, uploaded_post, another_uploaded_post, post_manager):
+    # set it, with copied images
+    user.add_photo_s3_objects(uploaded_post)
+
+    # change it, sharing the post's image blob
     user.update_photo(another_uploaded_post.id)
-    assert user.item['photoPostId'] == another_uploaded_post.id
+    checksum = user.item['photoBlobChecksum']
+    assert post_manager.image_blob_dynamo.get(checksum)['refCount'] == 2
 
     # verify a bunch of stuff is in S3 now, old and new
     for size in image_size.JPEGS:
@@ -173,12 +217,11 @@ def test_clear_photo_s3_objects(user, uploaded_post, another_uploaded_post):
     # clear it all away
     user.clear_photo_s3_objects()
 
-    # verify all profile photos, old and new, were deleted from s3
+    # verify the copied photos were deleted from s3, and the reference to the blob dropped
     for size in image_size.JPEGS:
         old_path = user.get_photo_path(size, photo_post_id=uploaded_post.id)
-        new_path = user.get_photo_path(size, photo_post_id=another_uploaded_post.id)
         assert not user.s3_uploads_client.exists(old_path)
-        assert not user.s3_uploads_client.exists(new_path)
+    assert post_manager.image_blob_dynamo.get(checksum)['refCount'] == 1
 
 
 def test_update_photo_errors(user, pending_post, text_post, another_users_post, uploaded_post):
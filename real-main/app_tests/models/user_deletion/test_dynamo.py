@@ -0,0 +1,107 @@
+import logging
+import uuid
+
+import pendulum
+import pytest
+
+from app.models.user_deletion.dynamo import UserDeletionDynamo
+
+
+@pytest.fixture
+def user_deletion_dynamo(dynamo_client):
+    yield UserDeletionDynamo(dynamo_client)
+
+
+def test_add_get_delete(user_deletion_dynamo):
+    user_id = str(uuid.uuid4())
+    user_item = {'userId': user_id, 'username': 'gone'}
+    assert user_deletion_dynamo.get(user_id) is None
+
+    # add it, verify format
+    now = pendulum.now('utc')
+    item = user_deletion_dynamo.add(user_id, user_item, iter(['s1', 's2']), now=now)
+    assert user_deletion_dynamo.get(user_id, strongly_consistent=True) == item
+    assert item == {
+        'partitionKey': f'user/{user_id}',
+        'sortKey': 'deletion',
+        'schemaVersion': 0,
+        'userId': user_id,
+        'userItem': user_item,
+        'steps': ['s1', 's2'],
+        'chunkCount': 0,
+        'startedAt': now.to_iso8601_string(),
+        'updatedAt': now.to_iso8601_string(),
+        'gsiK1PartitionKey': 'userDeletion',
+        'gsiK1SortKey': now.to_iso8601_string(),
+    }
+
+    # adding again starts it over
+    user_deletion_dynamo.set_progress(user_id, 0, ['s2'])
+    item = user_deletion_dynamo.add(user_id, user_item, ['s1', 's2'], now=now)
+    assert user_deletion_dynamo.get(user_id) == item
+
+    # delete it, verify gone, delete again is a no-op
+    assert user_deletion_dynamo.delete(user_id) == item
+    assert user_deletion_dynamo.get(user_id) is None
+    assert user_deletion_dynamo.delete(user_id) is None
+
+
+def test_set_progress(user_deletion_dynamo, caplog):
+    user_id = str(uuid.uuid4())
+    started_at = pendulum.now('utc')
+    org_item = user_deletion_dynamo.add(user_id, {}, ['s1', 's2'], now=started_at)
+
+    # record a chunk
+    now = pendulum.now('utc')
+    item = user_deletion_dynamo.set_progress(user_id, 0, ['s2'], now=now)
+    assert user_deletion_dynamo.get(user_id) == item
+    assert item == {
+        **org_item,
+        'steps': ['s2'],
+        'chunkCount': 1,
+        'updatedAt': now.to_iso8601_string(),
+        'gsiK1SortKey': now.to_iso8601_string(),
+    }
+
+    # recording the same chunk again fails softly, as another chunk was recorded since
+    with caplog.at_level(logging.WARNING):
+        assert user_deletion_dynamo.set_progress(user_id, 0, []) is None
+    assert len(caplog.records) == 1
+    assert 'out of date' in caplog.records[0].msg
+    assert user_deletion_dynamo.get(user_id) == item
+
+    # can't record progress on a deletion that doesn't exist
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        assert user_deletion_dynamo.set_progress(str(uuid.uuid4()), 0, []) is None
+    assert len(caplog.records) == 1
+
+
+def test_touch_and_generate_user_ids_not_updated_since(user_deletion_dynamo, caplog):
+    user_id_1, user_id_2 = str(uuid.uuid4()), str(uuid.uuid4())
+    now = pendulum.now('utc')
+    user_deletion_dynamo.add(user_id_1, {}, ['s1'], now=now - pendulum.duration(hours=2))
+    user_deletion_dynamo.add(user_id_2, {}, ['s1'], now=now - pendulum.duration(hours=1))
+
+    generate = user_deletion_dynamo.generate_user_ids_not_updated_since
+    assert list(generate(now - pendulum.duration(hours=3))) == []
+    assert list(generate(now - pendulum.duration(minutes=90))) == [user_id_1]
+    assert list(generate(now)) == [user_id_1, user_id_2]
+
+    # touch one, verify it's no longer found and the retry is counted
+    item = user_deletion_dynamo.touch(user_id_1, now=now)
+    assert item['updatedAt'] == now.to_iso8601_string()
+    assert item['chunkCount'] == 0
+    assert item['retryCount'] == 1
+    assert list(generate(now)) == [user_id_2]
+    assert user_deletion_dynamo.touch(user_id_1, now=now)['retryCount'] == 2
+
+    # progress clears the retry count
+    item = user_deletion_dynamo.set_progress(user_id_1, 0, ['s1'], now=now)
+    assert 'retryCount' not in item
+
+    # touching a deletion that doesn't exist fails softly
+    with caplog.at_level(logging.WARNING):
+        assert user_deletion_dynamo.touch(str(uuid.uuid4()), now=now) is None
+    assert len(caplog.records) == 1
+    assert 'does not exist' in caplog.records[0].msg
@@ -0,0 +1,210 @@
+import logging
+from unittest.mock import Mock, patch
+from uuid import uuid4
+
+import pendulum
+import pytest
+
+from app.models.like.enums import LikeStatus
+from app.models.post.enums import PostType
+
+
+@pytest.fixture
+def user(user_manager, cognito_client):
+    user_id, username = str(uuid4()), str(uuid4())[:8]
+    cognito_client.create_user_pool_entry(user_id, username, verified_email=f'{username}@real.app')
+    yield user_manager.create_cognito_only_user(user_id, username)
+
+
+user2 = user
+user3 = user
+
+
+def run_deletion(user_deletion_manager, user_id):
+    "Run the chunks of the deletion as the stream handler would, return the step each chunk was of"
+    steps_run = []
+    while (item := user_deletion_manager.dynamo.get(user_id)) and len(steps_run) < 100:
+        steps_run.append(item['steps'][0])
+        user_deletion_manager.on_deletion_change_run_chunk(user_id, new_item=item)
+    return steps_run
+
+
+def test_on_user_delete_start_deletion(user_deletion_manager, user):
+    user.delete()
+    user_deletion_manager.on_user_delete_start_deletion(user.id, old_item=user.item)
+    item = user_deletion_manager.dynamo.get(user.id)
+    assert item['userItem'] == user.item
+    assert item['steps'] == list(user_deletion_manager.steps)
+    assert item['chunkCount'] == 0
+
+
+def test_deletion_deletes_everything_in_chunks(
+    user_deletion_manager,
+    user,
+    user2,
+    user3,
+    block_manager,
+    card_manager,
+    chat_manager,
+    follower_manager,
+    like_manager,
+    post_manager,
+    album_manager,
+    comment_manager,
+    cognito_client,
+    TestCardTemplate,
+):
+    # the user leaves behind a bit of everything
+    posts = [post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='t') for _ in range(3)]
+    other_posts = [post_manager.add_post(user2, str(uuid4()), PostType.TEXT_ONLY, text='t') for _ in range(3)]
+    comment_manager.add_comment(str(uuid4()), other_posts[0].id, user.id, 'lore')
+    album_manager.add_album(user.id, str(uuid4()), 'album name')
+    for post in other_posts:
+        like_manager.like_post(user, post, LikeStatus.ONYMOUSLY_LIKED)
+    other_posts[1].flag(user)
+    post_manager.record_views([other_posts[2].id], user.id)
+    follower_manager.request_to_follow(user, user2)
+    follower_manager.request_to_follow(user2, user)
+    block_manager.block(user, user3)
+    block_manager.block(user3, user)
+    chat = chat_manager.add_group_chat(str(uuid4()), user)
+    card_manager.add_or_update_card(TestCardTemplate(user.id, title='t', action='https://a/'))
+
+    # the user is deleted, run the deletion in small chunks
+    user_deletion_manager.batch_chunk_size = 2
+    user_deletion_manager.model_chunk_size = 2
+    user.delete()
+    user_deletion_manager.on_user_delete_start_deletion(user.id, old_item=user.item)
+    steps_run = run_deletion(user_deletion_manager, user.id)
+    assert steps_run[:3] == ['user', 'cognito', 'chats']
+    assert steps_run.count('likes') == 2
+    assert steps_run.count('posts') == 2
+    assert steps_run.count('blocks') == 2  # a full chunk can't tell it was the last one
+    assert steps_run.count('comments') == 1
+    assert user_deletion_manager.dynamo.get(user.id) is None
+
+    # verify everything is gone
+    assert user_deletion_manager.dynamo.client.get_item({'partitionKey': f'user/{user.id}', 'sortKey': 'deleted'})
+    with pytest.raises(cognito_client.user_pool_client.exceptions.UserNotFoundException):
+        cognito_client.get_user_attributes(user.id)
+    assert list(post_manager.dynamo.generate_posts_by_user(user.id)) == []
+    assert all(post_manager.get_post(post.id) is None for post in posts)
+    assert list(comment_manager.dynamo.generate_by_user(user.id)) == []
+    assert list(album_manager.dynamo.generate_by_user(user.id)) == []
+    assert list(like_manager.dynamo.generate_by_liked_by(user.id)) == []
+    assert list(post_manager.flag_dynamo.generate_keys_by_user(user.id)) == []
+    assert list(post_manager.view_dynamo.generate_keys_by_user(user.id)) == []
+    assert list(follower_manager.dynamo.generate_follower_items(user.id)) == []
+    assert list(follower_manager.dynamo.generate_followed_items(user.id)) == []
+    assert list(block_manager.dynamo.generate_blocks_by_blocker(user.id)) == []
+    assert list(block_manager.dynamo.generate_blocks_by_blocked(user.id)) == []
+    assert chat_manager.member_dynamo.get(chat.id, user.id) is None
+    assert list(card_manager.dynamo.generate_cards_by_user(user.id)) == []
+
+
+def test_deletion_of_user_that_left_nothing_behind(user_deletion_manager, user):
+    user.delete()
+    user_deletion_manager.on_user_delete_start_deletion(user.id, old_item=user.item)
+    assert run_deletion(user_deletion_manager, user.id) == list(user_deletion_manager.steps)
+
+
+def test_run_chunk_skips_unknown_step(user_deletion_manager, user, caplog):
+    user_deletion_manager.dynamo.add(user.id, user.item, ['unknown', 'cards'])
+    item = user_deletion_manager.dynamo.get(user.id)
+    with caplog.at_level(logging.WARNING):
+        user_deletion_manager.on_deletion_change_run_chunk(user.id, new_item=item)
+    assert len(caplog.records) == 1
+    assert 'unknown step `unknown`' in caplog.records[0].msg
+    item = user_deletion_manager.dynamo.get(user.id)
+    assert item['steps'] == ['cards']
+    assert item['chunkCount'] == 1
+
+
+def test_run_chunk_that_fails_leaves_progress_alone(user_deletion_manager, user):
+    user_deletion_manager.steps['cards'] = Mock(side_effect=Exception('nope'))
+    org_item = user_deletion_manager.dynamo.add(user.id, user.item, ['cards'])
+    with pytest.raises(Exception, match='nope'):
+        user_deletion_manager.on_deletion_change_run_chunk(user.id, new_item=org_item)
+    assert user_deletion_manager.dynamo.get(user.id) == org_item
+
+
+def test_run_chunk_gives_up_on_step_after_retries(user_deletion_manager, user, caplog):
+    user_deletion_manager.steps['cards'] = Mock(side_effect=Exception('nope'))
+    user_deletion_manager.dynamo.add(user.id, user.item, ['cards', 'dailyTotals'])
+
+    # the step keeps failing as the cron job retries it
+    for _ in range(user_deletion_manager.max_retries):
+        item = user_deletion_manager.dynamo.touch(user.id)
+        with pytest.raises(Exception, match='nope'):
+            user_deletion_manager.on_deletion_change_run_chunk(user.id, new_item=item)
+    assert user_deletion_manager.steps['cards'].call_count == user_deletion_manager.max_retries
+
+    # out of retries, the step is skipped and the next one gets a fresh start
+    item = user_deletion_manager.dynamo.touch(user.id)
+    with caplog.at_level(logging.ERROR):
+        user_deletion_manager.on_deletion_change_run_chunk(user.id, new_item=item)
+    assert len(caplog.records) == 1
+    assert 'Giving up on step `cards`' in caplog.records[0].msg
+    assert user_deletion_manager.steps['cards'].call_count == user_deletion_manager.max_retries
+    item = user_deletion_manager.dynamo.get(user.id)
+    assert item['steps'] == ['dailyTotals']
+    assert 'retryCount' not in item
+
+
+def test_delete_each_item_failures(user_deletion_manager, user, post_manager, caplog):
+    posts = [post_manager.add_post(user, str(uuid4()), PostType.TEXT_ONLY, text='t') for _ in range(3)]
+    post_items = [post.item for post in posts]
+    deleted = []
+
+    def delete(item):
+        if item['postId'] == posts[1].id or not post_manager.get_post(item['postId']):
+            raise Exception('nope')
+        post_manager.dynamo.client.delete_item({'partitionKey': item['partitionKey'], 'sortKey': '-'})
+        deleted.append(item['postId'])
+
+    # one post was already deleted, but a lagging index still returns it
+    post_manager.dynamo.client.delete_item({'partitionKey': post_items[0]['partitionKey'], 'sortKey': '-'})
+    user_deletion_manager.model_chunk_size = 3
+    step = user_deletion_manager.delete_each(lambda user_id: iter(post_items), delete)
+
+    # the post already gone counts as deleted, the one that fails is logged and more chunks follow
+    with caplog.at_level(logging.ERROR):
+        assert step(user.id, user.item) is False
+    assert deleted == [posts[2].id]
+    assert len(caplog.records) == 1
+    assert posts[1].id in caplog.records[0].msg
+
+    # a chunk of nothing but items that fail to delete ends the step
+    caplog.clear()
+    step = user_deletion_manager.delete_each(lambda user_id: iter([post_items[1]] * 3), delete)
+    with caplog.at_level(logging.ERROR):
+        assert step(user.id, user.item) is True
+    assert len(caplog.records) == 3
+
+
+def test_run_chunk_out_of_date(user_deletion_manager, user, caplog):
+    # another chunk was recorded since the one in this stream record
+    item = user_deletion_manager.dynamo.add(user.id, user.item, ['cards', 'dailyTotals'])
+    user_deletion_manager.dynamo.set_progress(user.id, 0, ['cards', 'dailyTotals'])
+    with caplog.at_level(logging.WARNING):
+        user_deletion_manager.on_deletion_change_run_chunk(user.id, new_item=item)
+    assert len(caplog.records) == 1
+    assert 'out of date' in caplog.records[0].msg
+    assert user_deletion_manager.dynamo.get(user.id)['steps'] == ['cards', 'dailyTotals']
+
+
+def test_resume_stalled(user_deletion_manager, user, user2, caplog):
+    now = pendulum.now('utc')
+    user_deletion_manager.dynamo.add(user.id, user.item, ['cards'], now=now - pendulum.duration(hours=1))
+    user_deletion_manager.dynamo.add(user2.id, user2.item, ['cards'], now=now - pendulum.duration(minutes=1))
+
+    with patch.object(user_deletion_manager.dynamo, 'touch', wraps=user_deletion_manager.dynamo.touch) as touch:
+        with caplog.at_level(logging.WARNING):
+            assert user_deletion_manager.resume_stalled(now=now) == 1
+    assert touch.call_count == 1
+    assert len(caplog.records) == 1
+    assert user.id in caplog.records[0].msg
+    assert user_deletion_manager.dynamo.get(user.id)['updatedAt'] == now.to_iso8601_string()
+
+    # nothing is stalled anymore
+    assert user_deletion_manager.resume_stalled(now=now) == 0
@@ -0,0 +1,25 @@
+import threading
+import time
+
+from app.utils import RateLimiter, map_concurrently
+
+
+def test_map_concurrently():
+    thread_ids = set()
+
+    def func(x):
+        thread_ids.add(threading.get_ident())
+        time.sleep(0.01)
+        return x * 2
+
+    assert map_concurrently(func, range(20)) == [x * 2 for x in range(20)]
+    assert len(thread_ids) > 1
+    assert map_concurrently(func, []) == []
+
+
+def test_rate_limiter():
+    rate_limiter = RateLimiter(100)
+    start = time.monotonic()
+    map_concurrently(lambda _: rate_limiter.wait(), range(21))
+    # the first call goes immediately, the other 20 are spaced out by 1/100th of a second
+    assert time.monotonic() - start >= 0.19
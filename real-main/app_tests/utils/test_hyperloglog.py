@@ -0,0 +1,48 @@
+import pytest
+
+from app.utils import HyperLogLog
+
+
+def test_empty():
+    assert HyperLogLog().count() == 0
+
+
+def test_add_reports_changes():
+    sketch = HyperLogLog()
+    assert sketch.add('uid1') is True
+    assert sketch.add('uid1') is False
+    assert sketch.count() == 1
+
+
+@pytest.mark.parametrize('cardinality', [10, 1000, 20000])
+def test_count_is_approximately_right(cardinality):
+    sketch = HyperLogLog()
+    for i in range(cardinality):
+        sketch.add(f'uid{i}')
+        sketch.add(f'uid{i}')  # duplicates don't count
+    # three times the standard error of about 3%
+    assert abs(sketch.count() - cardinality) <= 0.1 * cardinality
+
+
+def test_merge_is_union():
+    sketch1, sketch2, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(500):
+        sketch1.add(f'uid{i}')
+        union.add(f'uid{i}')
+    for i in range(300, 1000):
+        sketch2.add(f'uid{i}')
+        union.add(f'uid{i}')
+
+    assert sketch1.merge(sketch2).registers == union.registers
+    assert abs(sketch1.count() - 1000) <= 100
+
+
+def test_merge_precision_mismatch():
+    with pytest.raises(AssertionError):
+        HyperLogLog().merge(HyperLogLog(precision=4))
+
+
+def test_hash_is_stable():
+    # sketches are persisted, so a value must always map to the same register
+    assert HyperLogLog().hash('uid1') == (837, 2)
+    assert HyperLogLog().hash('uid2') == (906, 1)
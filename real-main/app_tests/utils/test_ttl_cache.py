@@ -0,0 +1,44 @@
+from unittest.mock import Mock, patch
+
+from app.utils import TTLCache
+
+
+def test_get_set_expire():
+    cache = TTLCache(ttl=10)
+    assert cache.get('k') is None
+    assert cache.get('k', 'default') == 'default'
+
+    with patch('app.utils.ttl_cache.time.monotonic', return_value=100):
+        cache.set('k', 'v')
+    with patch('app.utils.ttl_cache.time.monotonic', return_value=109):
+        assert cache.get('k') == 'v'
+    with patch('app.utils.ttl_cache.time.monotonic', return_value=110):
+        assert cache.get('k') is None
+    assert len(cache) == 0
+
+
+def test_get_or_load():
+    cache = TTLCache(ttl=10)
+    load = Mock(side_effect=lambda key: None if key == 'none' else key * 2)
+    assert cache.get_or_load('a', load) == 'aa'
+    assert cache.get_or_load('a', load) == 'aa'
+    assert cache.get_or_load('none', load) is None
+    assert cache.get_or_load('none', load) is None
+    assert load.call_count == 2
+
+    cache.delete('a')
+    assert cache.get_or_load('a', load) == 'aa'
+    assert load.call_count == 3
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_maxsize_evicts_oldest():
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 3)  # re-setting makes it the newest
+    cache.set('c', 4)
+    assert cache.get('b') is None
+    assert cache.get('a') == 3
+    assert cache.get('c') == 4
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Notifications/sec sent through the AppSyncClient, against a local http stand-in for appsync.
+Compares the old per-call path (parse the document and open a new signed transport on every
+send) with the cached client sending one at a time and sending in concurrent batches.
+Latency of the real service can be simulated per request.
+"""
+
+import argparse
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+
+import boto3
+import gql
+import gql.transport.requests
+import requests_aws4auth
+
+# https://stackoverflow.com/questions/16981921
+SCRIPT_PATH = os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(SCRIPT_PATH)))
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')  # requests are signed, but never verified
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+from app.clients import AppSyncClient  # noqa E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare ways of sending appsync notifications')
+    parser.add_argument('-n', dest='notifications', type=int, default=500, help='notifications per mode')
+    parser.add_argument('-l', dest='latency_ms', type=float, default=0, help='simulated latency per request')
+    return parser.parse_args()
+
+
+def start_server(latency_ms):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # allows keep-alive
+        disable_nagle_algorithm = True  # as real servers do, else keep-alive responses stall on delayed acks
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            time.sleep(latency_ms / 1000)
+            body = json.dumps({'data': {'triggerNotification': None}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/graphql'
+
+
+def fire_notification_per_call(url, user_id, notification_type, **extra):
+    "The path the client used to take for every notification"
+    mutation = gql.gql(
+        f'''
+        mutation TriggerNotification ($input: NotificationInput!) {{
+            triggerNotification (input: $input) {{
+                userId
+                type
+                {' '.join(extra.keys())}
+            }}
+        }}
+    '''
+    )
+    aws_session = boto3.session.Session()
+    creds = aws_session.get_credentials().get_frozen_credentials()
+    auth = requests_aws4auth.AWS4Auth(
+        creds.access_key,
+        creds.secret_key,
+        aws_session.region_name,
+        'appsync',
+        session_token=creds.token,
+    )
+    transport = gql.transport.requests.RequestsHTTPTransport(
+        url=url, use_json=True, headers=AppSyncClient.headers, auth=auth
+    )
+    transport.execute(mutation, {'input': {'userId': user_id, 'type': notification_type, **extra}})
+
+
+def main():
+    args = parse_args()
+    server, url = start_server(args.latency_ms)
+    user_ids = [f'user-{i}' for i in range(args.notifications)]
+    client = AppSyncClient(appsync_graphql_url=url)
+
+    modes = {
+        'per-call': lambda: [
+            fire_notification_per_call(url, uid, 'POST_COMPLETED', postId='p') for uid in user_ids
+        ],
+        'cached': lambda: [client.fire_notification(uid, 'POST_COMPLETED', postId='p') for uid in user_ids],
+        'batched': lambda: client.fire_notifications(user_ids, 'POST_COMPLETED', postId='p'),
+    }
+    results = {}
+    for mode, run in modes.items():
+        start = time.perf_counter()
+        run()
+        results[mode] = time.perf_counter() - start
+    server.shutdown()
+
+    print(f'{args.notifications} notifications, {args.latency_ms}ms simulated request latency')
+    print(f'{"mode":<10}{"total s":>10}{"ms/notification":>18}{"notifications/s":>18}')
+    for mode, elapsed in results.items():
+        print(
+            f'{mode:<10}{elapsed:>10.2f}{1000 * elapsed / args.notifications:>18.3f}'
+            f'{args.notifications / elapsed:>18.0f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
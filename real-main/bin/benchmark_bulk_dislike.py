@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Time to dislike all of a user's likes, one like at a time (a conditional delete per like) vs in bulk
+(concurrent batch deletes), run in-process against a moto-mocked dynamo table. Latency of the real
+service can be simulated per request. Like counters are decremented from the stream, one per like
+removed, the same either way, and so are not included.
+"""
+
+import argparse
+import collections
+import os
+import sys
+import time
+from unittest import mock
+
+import moto
+
+# https://stackoverflow.com/questions/16981921
+SCRIPT_PATH = os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(SCRIPT_PATH)))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+from app.clients import DynamoClient  # noqa E402
+from app.models import LikeManager  # noqa E402
+from app.models.like.enums import LikeStatus  # noqa E402
+from app_tests.dynamodb.table_schema import main_table_schema  # noqa E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare ways of disliking all of a user\'s likes')
+    parser.add_argument('-n', dest='likes', type=int, default=10000, help='likes by the user')
+    parser.add_argument('-p', dest='posts_per_poster', type=int, default=50, help='liked posts per poster')
+    parser.add_argument('-l', dest='latency_ms', type=float, default=0, help='simulated latency per request')
+    return parser.parse_args()
+
+
+def init_manager(args):
+    "A like manager over a fresh table holding the user's likes, and a counter of requests by operation"
+    dynamo_client = DynamoClient(table_name=f'bench-{time.time()}', create_table_schema=main_table_schema)
+    manager = LikeManager({'dynamo': dynamo_client})
+
+    # build the like items as the app would, then write them and their posts in bulk
+    like_items = []
+    with mock.patch.object(
+        dynamo_client, 'add_item', side_effect=lambda kwargs: like_items.append(kwargs['Item'])
+    ):
+        for i in range(args.likes):
+            post_item = {'postId': f'post-{i}', 'postedByUserId': f'poster-{i // args.posts_per_poster}'}
+            like_status = LikeStatus.ONYMOUSLY_LIKED if i % 3 else LikeStatus.ANONYMOUSLY_LIKED
+            manager.dynamo.add_like('liker', post_item, like_status)
+    post_items = (
+        {
+            'partitionKey': f'post/{item["postId"]}',
+            'sortKey': '-',
+            'postId': item['postId'],
+            'onymousLikeCount': 1 if item['likeStatus'] == LikeStatus.ONYMOUSLY_LIKED else 0,
+            'anonymousLikeCount': 1 if item['likeStatus'] == LikeStatus.ANONYMOUSLY_LIKED else 0,
+        }
+        for item in like_items
+    )
+    dynamo_client.batch_put_items(post_items)
+    dynamo_client.batch_put_items(like_items)
+
+    requests = collections.Counter()
+
+    def before_call(model, **kwargs):
+        requests[model.name] += 1
+        time.sleep(args.latency_ms / 1000)
+
+    for boto3_client in (dynamo_client.boto3_client, dynamo_client.table.meta.client):
+        boto3_client.meta.events.register('before-call.dynamodb.*', before_call)
+    return manager, requests
+
+
+def dislike_one_at_a_time(manager):
+    "The path each like used to take: a conditional delete"
+    for like_item in manager.dynamo.generate_by_liked_by('liker'):
+        manager.dynamo.delete_like(like_item['likedByUserId'], like_item['postId'], like_item['likeStatus'])
+
+
+def run(args, dislike):
+    manager, requests = init_manager(args)
+    start = time.perf_counter()
+    dislike(manager)
+    elapsed = time.perf_counter() - start
+    assert not list(manager.dynamo.generate_by_liked_by('liker'))
+    return elapsed, requests
+
+
+def main():
+    args = parse_args()
+    modes = {
+        'one-by-one': dislike_one_at_a_time,
+        'bulk': lambda manager: manager.on_user_delete_dislike_all_by_user('liker', {}),
+    }
+    with moto.mock_dynamodb2():
+        results = {mode: run(args, dislike) for mode, dislike in modes.items()}
+
+    print(
+        f'{args.likes} likes, {args.posts_per_poster} per poster, {args.latency_ms}ms simulated request latency'
+    )
+    print(f'{"mode":<12}{"total s":>10}{"likes/s":>10}{"requests":>10}  requests by operation')
+    for mode, (elapsed, requests) in results.items():
+        by_operation = ', '.join(f'{name} {count}' for name, count in sorted(requests.items()))
+        print(
+            f'{mode:<12}{elapsed:>10.2f}{args.likes / elapsed:>10.0f}{sum(requests.values()):>10}  {by_operation}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,517 @@
+#!/usr/bin/env python
+"""
+Load-generation harness: drives the lambda entry points (the appsync `dispatch`, the dynamo stream's
+`process_records` and the cron handlers) in-process, against moto-mocked AWS services and local http
+stand-ins for AppSync, Elasticsearch, Pinpoint and the real dating lambdas.
+
+A synthetic workload is run in phases: N users sign up, follow each other with a power-law
+distribution of followers, post, view & like the posts of who they follow, read, and chat. After
+each phase's api calls, the records they put on the dynamo stream are processed in batches as the
+stream lambda would, which runs the rest of the cascade. Then the cron jobs run once each.
+
+Reported by phase: throughput and latency percentiles of each handler, and count of calls to each
+backend operation. Latency of the real services can be simulated per request.
+
+The call counts are what carries over to production. The latencies include the stand-ins' own
+costs, which moto's grow with the size of the table (its queries scan & its transactions copy
+the table), so compare latencies only between runs of the same size.
+"""
+
+import argparse
+import collections
+import contextlib
+import datetime
+import http.server
+import importlib
+import ipaddress
+import json
+import logging
+import os
+import random
+import ssl
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import boto3
+import moto
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+# https://stackoverflow.com/questions/16981921
+SCRIPT_PATH = os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(SCRIPT_PATH)))
+
+# the app's modules read their config from the environment at import time, so they are only
+# imported once the stand-ins are up and the environment points at them
+ENVIRONMENT = {
+    'AWS_ACCESS_KEY_ID': 'benchmark',
+    'AWS_SECRET_ACCESS_KEY': 'benchmark',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_XRAY_SDK_ENABLED': 'false',
+    'DYNAMO_TABLE': 'benchmark-main',
+    'DYNAMO_FEED_TABLE': 'benchmark-feed',
+    'S3_UPLOADS_BUCKET': 'benchmark-uploads',
+    'S3_PLACEHOLDER_PHOTOS_BUCKET': 'benchmark-placeholder-photos',
+    'S3_BAD_WORDS_BUCKET': 'benchmark-bad-words',
+    'CLOUDFRONT_UPLOADS_DOMAIN': 'cloudfront.benchmark',
+    'PINPOINT_APPLICATION_ID': 'benchmark-app',
+    'SECRETSMANAGER_AMPLITUDE_API_KEY_NAME': 'benchmark-amplitude',
+    'REAL_DATING_PUT_USER_ARN': 'real-dating-put-user',
+    'REAL_DATING_REMOVE_USER_ARN': 'real-dating-remove-user',
+    'REAL_DATING_MATCH_STATUS_ARN': 'real-dating-match-status',
+    'REAL_DATING_SWIPED_RIGHT_USERS_ARN': 'real-dating-swiped-right-users',
+    'REAL_DATING_GET_USER_MATCHES_COUNT_ARN': 'real-dating-get-user-matches-count',
+}
+CRON_HANDLERS = [
+    'flush_pending_card_titles',
+    'send_user_notifications',
+    'deflate_trending_users',
+    'deflate_trending_posts',
+    'garbage_collect_albums',
+    'delete_recently_expired_posts',
+    'resume_stalled_user_deletions',
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run a synthetic workload through the lambda handlers')
+    parser.add_argument('-n', dest='users', type=int, default=25, help='users')
+    parser.add_argument('-f', dest='follows', type=int, default=20, help='users followed per user')
+    parser.add_argument('-a', dest='alpha', type=float, default=1.2, help='power-law exponent of followers')
+    parser.add_argument('-p', dest='posts', type=int, default=3, help='posts per user')
+    parser.add_argument('-v', dest='views', type=int, default=20, help='posts viewed per user')
+    parser.add_argument('-k', dest='like_ratio', type=float, default=0.3, help='ratio of viewed posts liked')
+    parser.add_argument('-c', dest='chats', type=int, default=1, help='direct chats opened per user')
+    parser.add_argument('-m', dest='messages', type=int, default=5, help='messages per chat')
+    parser.add_argument('-b', dest='batch_size', type=int, default=100, help='stream records per batch')
+    parser.add_argument('-l', dest='latency_ms', type=float, default=0, help='simulated latency per request')
+    parser.add_argument('-s', dest='seed', type=int, default=0, help='random seed')
+    parser.add_argument('--log', action='store_true', help='show warnings & errors logged by the handlers')
+    return parser.parse_args()
+
+
+class Recorder:
+    "Latencies of handler invocations and counts of calls to backend operations, by phase"
+
+    def __init__(self):
+        self.phase = None
+        self.phases = []
+        self.latencies = collections.defaultdict(lambda: collections.defaultdict(list))
+        self.errors = collections.defaultdict(collections.Counter)
+        self.first_errors = collections.defaultdict(dict)
+        self.backend_calls = collections.defaultdict(collections.Counter)
+        self.stream_records = collections.Counter()
+        self.logged_errors = collections.Counter()
+        self.lock = threading.Lock()
+
+    def start_phase(self, phase):
+        self.phase = phase
+        self.phases.append(phase)
+
+    def count_backend_call(self, operation):
+        if self.phase:
+            with self.lock:
+                self.backend_calls[self.phase][operation] += 1
+
+    def invoke(self, operation, handler, event):
+        "Call the handler, recording its latency & whether it errored. Returns its result or None"
+        start = time.perf_counter()
+        try:
+            result = handler(event, None)
+        except Exception as err:
+            result, error = None, repr(err)
+        else:
+            results = result if isinstance(result, list) else [result]
+            error = next((r['error'] for r in results if isinstance(r, dict) and 'error' in r), None)
+        self.latencies[self.phase][operation].append(time.perf_counter() - start)
+        if error:
+            self.errors[self.phase][operation] += 1
+            self.first_errors[self.phase].setdefault(operation, error)
+        return result
+
+
+class ErrorCountingHandler(logging.Handler):
+    def __init__(self, recorder):
+        super().__init__(level=logging.ERROR)
+        self.recorder = recorder
+
+    def emit(self, record):
+        if self.recorder.phase:
+            self.recorder.logged_errors[self.recorder.phase] += 1
+
+
+def generate_cert(directory):
+    "A self-signed cert for 127.0.0.1, as the elasticsearch client only talks https"
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, '127.0.0.1')])
+    now = datetime.datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]), False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    with open(cert_path, 'wb') as fh:
+        fh.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as fh:
+        fh.write(
+            key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            )
+        )
+    return cert_path, key_path
+
+
+def start_server(respond, latency_ms=0, cert=None):
+    "Start a stand-in http server, `respond(method, path, body)` returns the json response body"
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # allows keep-alive
+        disable_nagle_algorithm = True  # as real servers do, else keep-alive responses stall on delayed acks
+
+        def handle_request(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            request_body = self.rfile.read(length) if length else b''
+            time.sleep(latency_ms / 1000)
+            body = json.dumps(respond(self.command, self.path, request_body)).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_PUT = do_POST = do_DELETE = handle_request
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    if cert:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*cert)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'127.0.0.1:{server.server_address[1]}'
+
+
+def start_servers(args, recorder, cert):
+    "Start the stand-ins, return the environment and the boto3 endpoints that point the app at them"
+
+    def appsync(method, path, body):
+        variables = json.loads(body)['variables']
+        recorder.count_backend_call(f'appsync.{variables["input"]["type"]}')
+        return {'data': {'triggerNotification': None}}
+
+    def elasticsearch(method, path, body):
+        recorder.count_backend_call(f'es.{method} {path.split("/")[1]}')
+        return {'hits': {'hits': [], 'total': {'value': 0}}}
+
+    def pinpoint(method, path, body):
+        if path.endswith('/users-messages'):
+            users = json.loads(body)['Users']
+            result = {user_id: {'address': {'DeliveryStatus': 'SUCCESSFUL'}} for user_id in users}
+            return {'ApplicationId': ENVIRONMENT['PINPOINT_APPLICATION_ID'], 'Result': result}
+        return {'Item': []}
+
+    def real_dating(method, path, body):
+        return {'status': 'CONFIRMED', 'blockChatExpiredAt': None}
+
+    # pinpoint & lambda go through boto3, so their latency is simulated & calls counted with the rest of boto3's
+    servers = [
+        start_server(appsync, latency_ms=args.latency_ms),
+        start_server(elasticsearch, latency_ms=args.latency_ms, cert=cert),
+        start_server(pinpoint),
+        start_server(real_dating),
+    ]
+    (_, appsync_host), (_, es_host), (_, pinpoint_host), (_, lambda_host) = servers
+    environment = {
+        'APPSYNC_GRAPHQL_URL': f'http://{appsync_host}/graphql',
+        'ELASTICSEARCH_DOMAIN': es_host,
+        'REQUESTS_CA_BUNDLE': cert[0],
+    }
+    endpoint_urls = {'pinpoint': f'http://{pinpoint_host}', 'lambda': f'http://{lambda_host}'}
+    return [server for server, _ in servers], environment, endpoint_urls
+
+
+def override_endpoints(session, endpoint_urls):
+    "Point the session's clients of the given services at the given endpoints, as this botocore has no env for it"
+    create_client = session.client
+
+    def client(service_name, **kwargs):
+        if service_name in endpoint_urls:
+            kwargs.setdefault('endpoint_url', endpoint_urls[service_name])
+        return create_client(service_name, **kwargs)
+
+    session.client = client
+
+
+def setup_aws(recorder, latency_ms):
+    "Create the mocked tables, buckets, user pool & secrets. Count & delay all boto3 calls made from here on"
+    cognito_idp = boto3.client('cognito-idp')
+    user_pool_id = cognito_idp.create_user_pool(PoolName='benchmark', AliasAttributes=['preferred_username'])[
+        'UserPool'
+    ]['Id']
+    os.environ['COGNITO_USER_POOL_ID'] = user_pool_id
+    os.environ['COGNITO_USER_POOL_BACKEND_CLIENT_ID'] = cognito_idp.create_user_pool_client(
+        UserPoolId=user_pool_id, ClientName='benchmark'
+    )['UserPoolClient']['ClientId']
+    boto3.client('secretsmanager').create_secret(
+        Name=os.environ['SECRETSMANAGER_AMPLITUDE_API_KEY_NAME'], SecretString=json.dumps({'apiKey': 'DISABLED'})
+    )
+
+    # the app's clients read the user pool's ids on import
+    from app.clients import DynamoClient, S3Client
+    from app_tests.dynamodb.table_schema import feed_table_schema, main_table_schema
+
+    stream = {'StreamSpecification': {'StreamEnabled': True, 'StreamViewType': 'NEW_AND_OLD_IMAGES'}}
+    main_table = DynamoClient(
+        table_name=os.environ['DYNAMO_TABLE'], create_table_schema={**main_table_schema, **stream}
+    ).table
+    DynamoClient(table_name=os.environ['DYNAMO_FEED_TABLE'], create_table_schema=feed_table_schema)
+    S3Client(os.environ['S3_UPLOADS_BUCKET'], create_bucket=True)
+    S3Client(os.environ['S3_PLACEHOLDER_PHOTOS_BUCKET'], create_bucket=True)
+    bad_words = json.dumps({'badword': {}}).encode()
+    S3Client(os.environ['S3_BAD_WORDS_BUCKET'], create_bucket=True).put_object(
+        'bad_words.json', bad_words, 'application/json'
+    )
+
+    def before_call(model, **kwargs):
+        recorder.count_backend_call(f'{model.service_model.service_name}.{model.name}')
+        time.sleep(latency_ms / 1000)
+
+    # clients created by the app from here on inherit the default session's event handlers
+    boto3.DEFAULT_SESSION.events.register('before-call', before_call)
+    return main_table.latest_stream_arn
+
+
+class Stream:
+    "Reads the records off the main table's dynamo stream, through a session of its own so it goes uncounted"
+
+    def __init__(self, stream_arn):
+        self.client = boto3.session.Session().client('dynamodbstreams')
+        shard_id = self.client.describe_stream(StreamArn=stream_arn)['StreamDescription']['Shards'][0]['ShardId']
+        self.iterator = self.client.get_shard_iterator(
+            StreamArn=stream_arn, ShardId=shard_id, ShardIteratorType='TRIM_HORIZON'
+        )['ShardIterator']
+
+    def get_records(self, limit):
+        "Returns the next batch of records, or None once caught up"
+        resp = self.client.get_records(ShardIterator=self.iterator, Limit=limit)
+        self.iterator = resp['NextShardIterator']
+        if not resp['Records']:
+            return None
+        # moto streams an extra INSERT of just the key ahead of that of an item added by an update
+        return [
+            record
+            for record in resp['Records']
+            if record['eventName'] != 'INSERT'
+            or record['dynamodb']['NewImage'].keys() - record['dynamodb']['Keys'].keys()
+        ]
+
+
+def drain_stream(recorder, stream, process_records, batch_size):
+    "Process stream records in batches until the cascade of writes they trigger dies down"
+    while (records := stream.get_records(batch_size)) is not None:
+        if records:
+            recorder.stream_records[recorder.phase] += len(records)
+            recorder.invoke('process_records', process_records, {'Records': records})
+
+
+def appsync_event(caller_user_id, field, arguments=None, source=None):
+    parent_type_name, field_name = field.split('.')
+    return {
+        'arguments': arguments or {},
+        'identity': {'cognitoIdentityId': caller_user_id},
+        'info': {'parentTypeName': parent_type_name, 'fieldName': field_name},
+        'source': source or {},
+        'request': {'headers': {'x-real-version': 'benchmark'}},
+    }
+
+
+def power_law_follows(rng, user_ids, follows, alpha):
+    "For each user, the distinct users they follow, picked with a probability that drops off with rank"
+    weights = [1 / (rank + 1) ** alpha for rank in range(len(user_ids))]
+    follows = min(follows, len(user_ids) - 1)
+    followed = {}
+    for user_id in user_ids:
+        picked = set()
+        while len(picked) < follows:
+            picked.update(u for u in rng.choices(user_ids, weights=weights, k=follows) if u != user_id)
+        followed[user_id] = list(picked)[:follows]
+    return followed
+
+
+def run_workload(args, recorder, stream, handlers):
+    appsync, dynamo, cron = handlers['appsync'], handlers['dynamo'], handlers['cron']
+    rng = random.Random(args.seed)
+
+    def api(caller_user_id, field, **arguments):
+        return recorder.invoke(field, appsync.dispatch, appsync_event(caller_user_id, field, arguments))
+
+    def phase(name):
+        drain_stream(recorder, stream, dynamo.process_records, args.batch_size)
+        recorder.start_phase(name)
+
+    # user pool entries are made before the phase, as the app would find them on sign up
+    region = os.environ['AWS_DEFAULT_REGION']
+    user_ids = [f'{region}:{uuid.uuid4()}' for _ in range(args.users)]
+    for i, user_id in enumerate(user_ids):
+        dynamo.clients['cognito'].create_user_pool_entry(
+            user_id, f'loaduser{i}', verified_email=f'loaduser{i}@real.app'
+        )
+
+    phase('signup')
+    for i, user_id in enumerate(user_ids):
+        api(user_id, 'Mutation.createCognitoOnlyUser', username=f'loaduser{i}', fullName=f'User {i}')
+
+    phase('follow')
+    followed = power_law_follows(rng, user_ids, args.follows, args.alpha)
+    for user_id in user_ids:
+        for followed_user_id in followed[user_id]:
+            api(user_id, 'Mutation.followUser', userId=followed_user_id)
+
+    phase('post')
+    posts_by_user = collections.defaultdict(list)
+    for _ in range(args.posts):
+        for user_id in user_ids:
+            post_id = str(uuid.uuid4())
+            api(user_id, 'Mutation.addPost', postId=post_id, postType='TEXT_ONLY', text=f'load {post_id}')
+            posts_by_user[user_id].append(post_id)
+
+    phase('view')
+    viewed = {}
+    for user_id in user_ids:
+        candidates = [(u, p) for u in followed[user_id] for p in posts_by_user[u]]
+        viewed[user_id] = rng.sample(candidates, min(args.views, len(candidates)))
+        for i in range(0, len(viewed[user_id]), 10):
+            api(user_id, 'Mutation.reportPostViews', postIds=[p for _, p in viewed[user_id][i : i + 10]])
+
+    phase('like')
+    for user_id in user_ids:
+        for _, post_id in viewed[user_id][: int(len(viewed[user_id]) * args.like_ratio)]:
+            api(user_id, 'Mutation.onymouslyLikePost', postId=post_id)
+
+    phase('read')
+    for user_id in user_ids:
+        events = [
+            appsync_event(user_id, 'Post.viewedStatus', source={'postId': p, 'postedByUserId': u})
+            for u in followed[user_id]
+            for p in posts_by_user[u]
+        ][:20]
+        recorder.invoke('Post.viewedStatus (batch)', appsync.dispatch, events)
+        api(user_id, 'Query.findPosts', keywords='load')
+
+    phase('chat')
+    chatted = set()
+    for user_id in user_ids:
+        with_user_ids = [u for u in followed[user_id] if frozenset((user_id, u)) not in chatted][: args.chats]
+        for with_user_id in with_user_ids:
+            chatted.add(frozenset((user_id, with_user_id)))
+            chat_id = str(uuid.uuid4())
+            arguments = {'chatId': chat_id, 'userId': with_user_id, 'messageId': str(uuid.uuid4())}
+            api(user_id, 'Mutation.createDirectChat', messageText='hi', **arguments)
+            for i in range(args.messages - 1):
+                sender_user_id = with_user_id if i % 2 == 0 else user_id
+                api(
+                    sender_user_id,
+                    'Mutation.addChatMessage',
+                    chatId=chat_id,
+                    messageId=str(uuid.uuid4()),
+                    text='yo',
+                )
+
+    phase('cron')
+    for name in CRON_HANDLERS:
+        recorder.invoke(name, getattr(cron, name), {})
+    drain_stream(recorder, stream, dynamo.process_records, args.batch_size)
+    recorder.phase = None
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def print_report(args, recorder):
+    print(
+        f'{args.users} users, {args.follows} follows per user (alpha {args.alpha}), {args.posts} posts per user, '
+        f'{args.views} views per user, {args.chats} chats per user, {args.latency_ms}ms simulated request latency'
+    )
+    for phase in recorder.phases:
+        latencies = recorder.latencies[phase]
+        print(
+            f'\n== {phase}: {recorder.stream_records[phase]} stream records, '
+            f'{recorder.logged_errors[phase]} errors logged'
+        )
+        print(
+            f'{"handler":<36}{"calls":>8}{"errors":>8}{"total s":>10}{"calls/s":>10}'
+            f'{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}{"max ms":>10}'
+        )
+        for operation, values in latencies.items():
+            values = sorted(values)
+            pcts = ''.join(f'{1000 * percentile(values, pct):>10.1f}' for pct in (50, 90, 99, 100))
+            print(
+                f'{operation:<36}{len(values):>8}{recorder.errors[phase][operation]:>8}{sum(values):>10.2f}'
+                f'{len(values) / sum(values) if sum(values) else 0:>10.0f}{pcts}'
+            )
+        for operation, error in recorder.first_errors[phase].items():
+            print(f'first error of {operation}: {error}')
+        backend_calls = recorder.backend_calls[phase]
+        print(f'backend calls: {sum(backend_calls.values())}')
+        for operation, count in backend_calls.most_common():
+            print(f'  {operation:<60}{count:>8}')
+
+
+def main():
+    args = parse_args()
+    recorder = Recorder()
+    if args.log:
+        logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().addHandler(ErrorCountingHandler(recorder))
+    for name, value in ENVIRONMENT.items():
+        os.environ.setdefault(name, value)
+
+    mocks = [
+        moto.mock_dynamodb2(),
+        moto.mock_dynamodbstreams(),
+        moto.mock_s3(),
+        moto.mock_cognitoidp(),
+        moto.mock_cognitoidentity(),
+        moto.mock_secretsmanager(),
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.ExitStack() as stack:
+        for mock in mocks:
+            stack.enter_context(mock)
+        servers, environment, endpoint_urls = start_servers(args, recorder, generate_cert(tmp_dir))
+        os.environ.update(environment)
+        boto3.setup_default_session()
+        override_endpoints(boto3.DEFAULT_SESSION, endpoint_urls)
+        stream = Stream(setup_aws(recorder, args.latency_ms))
+        handlers = {
+            'appsync': importlib.import_module('app.handlers.appsync'),
+            'dynamo': importlib.import_module('app.handlers.dynamo.handlers'),
+            'cron': importlib.import_module('app.handlers.cron'),
+        }
+        try:
+            run_workload(args, recorder, stream, handlers)
+        finally:
+            for server in servers:
+                server.shutdown()
+
+    print_report(args, recorder)
+
+
+if __name__ == '__main__':
+    main()
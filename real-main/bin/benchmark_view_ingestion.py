@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+End-to-end throughput of synchronous vs buffered view ingestion, run in-process against
+a moto-mocked dynamo table. Latency of the real service can be simulated per write.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from unittest import mock
+
+import moto
+
+# https://stackoverflow.com/questions/16981921
+SCRIPT_PATH = os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(SCRIPT_PATH)))
+os.environ.setdefault('DYNAMO_TABLE', 'benchmark')  # the consumer handler's own clients go unused
+from app.clients import DynamoClient, LocalKinesisClient  # noqa E402
+from app.handlers.kinesis import process_view_records  # noqa E402
+from app.models import ScreenManager  # noqa E402
+from app_tests.dynamodb.table_schema import main_table_schema  # noqa E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare synchronous and buffered view ingestion')
+    parser.add_argument('-u', dest='users', type=int, default=20, help='number of viewing users')
+    parser.add_argument('-r', dest='reports', type=int, default=25, help='reports per user')
+    parser.add_argument('-n', dest='views', type=int, default=10, help='views per report')
+    parser.add_argument('-i', dest='items', type=int, default=30, help='number of distinct items viewed')
+    parser.add_argument('-w', dest='window', type=int, default=1000, help='consumer window, in records')
+    parser.add_argument('-l', dest='latency_ms', type=float, default=0, help='simulated latency per write')
+    return parser.parse_args()
+
+
+def generate_reports(args):
+    rand = random.Random(42)
+    items = [f'item-{i}' for i in range(args.items)]
+    for _ in range(args.reports):
+        for u in range(args.users):
+            yield f'user-{u}', [rand.choice(items) for _ in range(args.views)]
+
+
+def init_manager(views_stream, latency_ms):
+    dynamo_client = DynamoClient(table_name=f'bench-{time.time()}', create_table_schema=main_table_schema)
+    manager = ScreenManager({'dynamo': dynamo_client, 'views_stream': views_stream})
+    upsert_item = dynamo_client.upsert_item
+
+    def slow_upsert_item(*args, **kwargs):
+        time.sleep(latency_ms / 1000)
+        return upsert_item(*args, **kwargs)
+
+    writes = mock.Mock(side_effect=slow_upsert_item)
+    dynamo_client.upsert_item = writes
+    return manager, writes
+
+
+def run_sync(args, reports):
+    manager, writes = init_manager(None, args.latency_ms)
+    start = time.perf_counter()
+    for user_id, item_ids in reports:
+        manager.report_views(item_ids, user_id)
+    elapsed = time.perf_counter() - start
+    return {'request': elapsed, 'consumer': 0, 'total': elapsed, 'writes': writes.call_count}
+
+
+def run_buffered(args, reports):
+    stream = LocalKinesisClient()
+    manager, writes = init_manager(stream, args.latency_ms)
+    start = time.perf_counter()
+    for user_id, item_ids in reports:
+        manager.report_views(item_ids, user_id)
+    request_elapsed = time.perf_counter() - start
+
+    consumer_start = time.perf_counter()
+    with mock.patch.dict('app.handlers.kinesis.managers', {'screen': manager}):
+        while stream.queue:
+            process_view_records(stream.get_records_event(max_records=args.window), None)
+    consumer_elapsed = time.perf_counter() - consumer_start
+    return {
+        'request': request_elapsed,
+        'consumer': consumer_elapsed,
+        'total': request_elapsed + consumer_elapsed,
+        'writes': writes.call_count,
+    }
+
+
+def main():
+    args = parse_args()
+    reports = list(generate_reports(args))
+    view_count = len(reports) * args.views
+
+    with moto.mock_dynamodb2():
+        results = {'sync': run_sync(args, reports), 'buffered': run_buffered(args, reports)}
+
+    print(f'{len(reports)} reports, {view_count} views, {args.latency_ms}ms simulated write latency')
+    print(f'{"mode":<10}{"ms/request":>14}{"consumer s":>12}{"total s":>10}{"views/s":>10}{"writes":>8}')
+    for mode, res in results.items():
+        print(
+            f'{mode:<10}{1000 * res["request"] / len(reports):>14.3f}{res["consumer"]:>12.2f}'
+            f'{res["total"]:>10.2f}{view_count / res["total"]:>10.0f}{res["writes"]:>8}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import logging
+import os
+import zlib
+
+import boto3
+import pendulum
+
+DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+logger = logging.getLogger()
+
+
+class Migration:
+    """
+    Move cards due a notification out of the single 'card' GSI-K1 partition and into the hour-bucketed,
+    sharded partitions, and add the per-user GSI-K2 index. The dispatcher's watermark is moved back to
+    the oldest bucket cards are moved into, so cards that were already overdue are still sent.
+    """
+
+    shard_count = 4
+    watermark_key = {'partitionKey': 'cardNotifyWatermark', 'sortKey': '-'}
+
+    def __init__(self, dynamo_client, dynamo_table):
+        self.dynamo_client = dynamo_client
+        self.dynamo_table = dynamo_table
+        self.lowered_watermark = None
+
+    def run(self):
+        for item in self.generate_all_to_migrate():
+            self.migrate_item(item)
+
+    def generate_all_to_migrate(self):
+        "Return a generator of all items that need to be migrated"
+        scan_kwargs = {
+            'FilterExpression': 'begins_with(partitionKey, :pk_prefix) AND gsiK1PartitionKey = :gsik1pk',
+            'ExpressionAttributeValues': {':pk_prefix': 'card/', ':gsik1pk': 'card'},
+        }
+        while True:
+            paginated = self.dynamo_table.scan(**scan_kwargs)
+            for item in paginated['Items']:
+                yield item
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            scan_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def migrate_item(self, item):
+        card_id = item['partitionKey'].split('/')[1]
+        notify_user_at_str, user_id = item['gsiK1SortKey'].split('/', 1)
+        bucket = pendulum.parse(notify_user_at_str).in_tz('utc').format('YYYY-MM-DDTHH')
+        shard = zlib.crc32(card_id.encode()) % self.shard_count
+        kwargs = {
+            'Key': {k: item[k] for k in ('partitionKey', 'sortKey')},
+            'UpdateExpression': 'SET gsiK1PartitionKey = :gsik1pk, gsiK2PartitionKey = :gsik2pk, gsiK2SortKey = :gsik2sk',
+            'ConditionExpression': 'attribute_exists(partitionKey) AND gsiK1SortKey = :gsik1sk',
+            'ExpressionAttributeValues': {
+                ':gsik1pk': f'card/{bucket}/{shard}',
+                ':gsik1sk': item['gsiK1SortKey'],
+                ':gsik2pk': f'card/{user_id}',
+                ':gsik2sk': notify_user_at_str,
+            },
+        }
+        # before the card leaves the legacy partition, so the dispatcher never loses sight of it
+        self.lower_watermark(bucket)
+        logger.warning(f'Migrating card `{card_id}`')
+        try:
+            self.dynamo_table.update_item(**kwargs)
+        except self.dynamo_client.exceptions.ConditionalCheckFailedException:
+            logger.warning(f'Card `{card_id}`: changed or deleted since read, skipping')
+
+    def lower_watermark(self, bucket):
+        if self.lowered_watermark is not None and self.lowered_watermark <= bucket:
+            return
+        kwargs = {
+            'Key': self.watermark_key,
+            'UpdateExpression': 'SET notifyUserAtHour = :bucket',
+            'ConditionExpression': 'attribute_not_exists(notifyUserAtHour) OR notifyUserAtHour > :bucket',
+            'ExpressionAttributeValues': {':bucket': bucket},
+        }
+        try:
+            self.dynamo_table.update_item(**kwargs)
+        except self.dynamo_client.exceptions.ConditionalCheckFailedException:
+            pass
+        self.lowered_watermark = bucket
+
+
+if __name__ == '__main__':
+    assert DYNAMO_TABLE, 'Must set env variable DYNAMO_TABLE to dynamo table name'
+
+    dynamo_table = boto3.resource('dynamodb').Table(DYNAMO_TABLE)
+    dynamo_client = boto3.client('dynamodb')
+
+    migration = Migration(dynamo_client, dynamo_table)
+    migration.run()
@@ -0,0 +1,93 @@
+import logging
+import os
+
+import boto3
+
+logger = logging.getLogger()
+
+DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+
+class Migration:
+    """
+    Fill in ChatMember.readSequence from ChatMember.messagesUnviewedCount, placing the read watermark
+    that many messages behind the chat's messageSequence. Needed before switching to CHAT_UNREAD_MODE
+    'watermark'. Members that already have a readSequence are left alone.
+
+    Chats that have not had a message since messageSequence was introduced have their messageSequence
+    seeded from messagesCount first, so the watermark never starts out negative.
+    """
+
+    def __init__(self, dynamo_client, dynamo_table):
+        self.dynamo_client = dynamo_client
+        self.dynamo_table = dynamo_table
+
+    def run(self):
+        for item in self.generate_chat_member_items():
+            self.migrate_chat_member(item)
+
+    def generate_chat_member_items(self):
+        scan_kwargs = {
+            'FilterExpression': ' AND '.join(
+                [
+                    'begins_with(partitionKey, :pk_prefix)',
+                    'begins_with(sortKey, :sk_prefix)',
+                    'attribute_not_exists(readSequence)',
+                ]
+            ),
+            'ExpressionAttributeValues': {':pk_prefix': 'chat/', ':sk_prefix': 'member/'},
+        }
+        while True:
+            paginated = self.dynamo_table.scan(**scan_kwargs)
+            for item in paginated['Items']:
+                yield item
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            scan_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def migrate_chat_member(self, item):
+        chat_key = {'partitionKey': item['partitionKey'], 'sortKey': '-'}
+        chat_item = self.dynamo_table.get_item(Key=chat_key).get('Item') or {}
+        if chat_item and 'messageSequence' not in chat_item:
+            chat_item = self.seed_message_sequence(chat_item)
+        read_sequence = max(0, chat_item.get('messageSequence', 0) - item.get('messagesUnviewedCount', 0))
+        query_kwargs = {
+            'Key': {k: item[k] for k in ('partitionKey', 'sortKey')},
+            'UpdateExpression': 'SET readSequence = :rs',
+            'ConditionExpression': 'attribute_exists(partitionKey) AND attribute_not_exists(readSequence)',
+            'ExpressionAttributeValues': {':rs': read_sequence},
+        }
+        logger.warning(
+            f'Migrating chat member `{item["partitionKey"]}` / `{item["sortKey"]}` to readSequence of `{read_sequence}`'
+        )
+        try:
+            self.dynamo_table.update_item(**query_kwargs)
+        except self.dynamo_client.exceptions.ConditionalCheckFailedException:
+            logger.warning(f'Chat member `{item["partitionKey"]}` / `{item["sortKey"]}` changed, skipping')
+
+    def seed_message_sequence(self, chat_item):
+        chat_key = {k: chat_item[k] for k in ('partitionKey', 'sortKey')}
+        message_sequence = chat_item.get('messagesCount', 0)
+        query_kwargs = {
+            'Key': chat_key,
+            'UpdateExpression': 'SET messageSequence = :ms',
+            'ConditionExpression': 'attribute_exists(partitionKey) AND attribute_not_exists(messageSequence)',
+            'ExpressionAttributeValues': {':ms': message_sequence},
+            'ReturnValues': 'ALL_NEW',
+        }
+        logger.warning(f'Seeding chat `{chat_key["partitionKey"]}` with messageSequence of `{message_sequence}`')
+        try:
+            return self.dynamo_table.update_item(**query_kwargs)['Attributes']
+        except self.dynamo_client.exceptions.ConditionalCheckFailedException:
+            # a new message or another member's migration got there first
+            return self.dynamo_table.get_item(Key=chat_key).get('Item') or {}
+
+
+if __name__ == '__main__':
+    assert DYNAMO_TABLE, 'Must set env variable DYNAMO_TABLE to dynamo table name'
+
+    dynamo_client = boto3.client('dynamodb')
+    dynamo_table = boto3.resource('dynamodb').Table(DYNAMO_TABLE)
+
+    migration = Migration(dynamo_client, dynamo_table)
+    migration.run()
@@ -0,0 +1,92 @@
+import collections
+import logging
+import os
+from decimal import Decimal
+
+import boto3
+import pendulum
+
+logger = logging.getLogger()
+
+DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+
+class Migration:
+    """
+    Backfill the per-day totals of post views, royalties paid and real paid for the past 30 days,
+    from the post view and transaction items. Totals are set rather than added to, so re-running is
+    safe. Run after the stream handlers that maintain the totals are deployed.
+    """
+
+    days = 30
+
+    def __init__(self, dynamo_client, dynamo_table, now=None):
+        self.dynamo_client = dynamo_client
+        self.dynamo_table = dynamo_table
+        self.now = now or pendulum.now('utc')
+
+    def run(self):
+        since = self.now.start_of('day') - pendulum.duration(days=self.days)
+        totals = collections.defaultdict(
+            lambda: {'postViewCount': 0, 'royaltyPaid': Decimal('0'), 'paidReal': Decimal('0')}
+        )
+        for item in self.generate_all_to_sum(since):
+            if item['partitionKey'].startswith('post/'):
+                user_id = item['sortKey'].split('/')[1]
+                date = pendulum.parse(item['firstViewedAt']).date()
+                totals[(user_id, date)]['postViewCount'] += item.get('viewCount', 0)
+                totals[(user_id, date)]['royaltyPaid'] += item.get('royaltyFee', Decimal('0'))
+            else:
+                date = pendulum.parse(item['createdAt']).date()
+                totals[(item['userId'], date)]['paidReal'] += item.get('price', Decimal('0'))
+
+        for (user_id, date), day_totals in totals.items():
+            self.set_daily_totals(user_id, date, day_totals)
+
+    def generate_all_to_sum(self, since):
+        "Return a generator of all post views first viewed, and transactions created, since `since`"
+        scan_kwargs = {
+            'FilterExpression': ' OR '.join(
+                [
+                    '(begins_with(partitionKey, :post) AND begins_with(sortKey, :view) AND firstViewedAt >= :since)',
+                    '(begins_with(partitionKey, :transaction) AND createdAt >= :since)',
+                ]
+            ),
+            'ExpressionAttributeValues': {
+                ':post': 'post/',
+                ':view': 'view/',
+                ':transaction': 'transaction/',
+                ':since': since.to_iso8601_string(),
+            },
+        }
+        while True:
+            paginated = self.dynamo_table.scan(**scan_kwargs)
+            for item in paginated['Items']:
+                yield item
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            scan_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def set_daily_totals(self, user_id, date, day_totals):
+        kwargs = {
+            'Key': {'partitionKey': f'user/{user_id}', 'sortKey': f'dailyTotals/{date.to_date_string()}'},
+            'UpdateExpression': 'SET schemaVersion = :sv, postViewCount = :pvc, royaltyPaid = :rp, paidReal = :pr',
+            'ExpressionAttributeValues': {
+                ':sv': 0,
+                ':pvc': day_totals['postViewCount'],
+                ':rp': day_totals['royaltyPaid'],
+                ':pr': day_totals['paidReal'],
+            },
+        }
+        logger.warning(f'Migrating user `{user_id}`: setting daily totals for `{date}` to `{day_totals}`')
+        self.dynamo_table.update_item(**kwargs)
+
+
+if __name__ == '__main__':
+    assert DYNAMO_TABLE, 'Must set env variable DYNAMO_TABLE to dynamo table name'
+
+    dynamo_client = boto3.client('dynamodb')
+    dynamo_table = boto3.resource('dynamodb').Table(DYNAMO_TABLE)
+
+    migration = Migration(dynamo_client, dynamo_table)
+    migration.run()
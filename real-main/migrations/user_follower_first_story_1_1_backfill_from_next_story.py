@@ -0,0 +1,109 @@
+import logging
+import os
+
+import boto3
+
+DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+logger = logging.getLogger()
+
+
+class Migration:
+    """
+    Sync each follower's firstStory item with the nextStory item of the user they follow.
+    Needed when switching from FOLLOWED_STORIES_MODE=pull back to push, as in pull mode the
+    firstStory items of users with many followers are left as they were. Run after the
+    switch is deployed. Safe to re-run.
+    """
+
+    def __init__(self, dynamo_client, dynamo_table):
+        self.dynamo_client = dynamo_client
+        self.dynamo_table = dynamo_table
+
+    def run(self):
+        for user_id in self.generate_user_ids_to_sync():
+            self.sync_user(user_id)
+
+    def generate_user_ids_to_sync(self):
+        "Return a generator of the ids of users with a nextStory item or firstStory items, each once"
+        scan_kwargs = {
+            'FilterExpression': (
+                'begins_with(partitionKey, :pk_prefix) AND (sortKey = :next_story '
+                'OR (begins_with(sortKey, :sk_prefix) AND contains(sortKey, :sk_suffix)))'
+            ),
+            'ExpressionAttributeValues': {
+                ':pk_prefix': 'user/',
+                ':next_story': 'nextStory',
+                ':sk_prefix': 'follower/',
+                ':sk_suffix': '/firstStory',
+            },
+            'ProjectionExpression': 'partitionKey',
+        }
+        user_ids = set()
+        while True:
+            paginated = self.dynamo_table.scan(**scan_kwargs)
+            for item in paginated['Items']:
+                user_id = item['partitionKey'].split('/')[1]
+                if user_id not in user_ids:
+                    user_ids.add(user_id)
+                    yield user_id
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            scan_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def generate_follower_items(self, user_id):
+        "Return a generator of the user's follower items and firstStory items"
+        query_kwargs = {
+            'KeyConditionExpression': 'partitionKey = :pk AND begins_with(sortKey, :sk_prefix)',
+            'ExpressionAttributeValues': {':pk': f'user/{user_id}', ':sk_prefix': 'follower/'},
+        }
+        while True:
+            paginated = self.dynamo_table.query(**query_kwargs)
+            for item in paginated['Items']:
+                yield item
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            query_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def sync_user(self, user_id):
+        key = {'partitionKey': f'user/{user_id}', 'sortKey': 'nextStory'}
+        next_story = self.dynamo_table.get_item(Key=key).get('Item')
+        follower_user_ids, first_stories = set(), {}
+        for item in self.generate_follower_items(user_id):
+            parts = item['sortKey'].split('/')
+            if len(parts) == 3 and parts[2] == 'firstStory':
+                first_stories[parts[1]] = item
+            elif len(parts) == 2 and item.get('followStatus') == 'FOLLOWING':
+                follower_user_ids.add(parts[1])
+
+        for follower_user_id, item in first_stories.items():
+            if not next_story or follower_user_id not in follower_user_ids:
+                logger.warning(f'User `{user_id}`: deleting firstStory of follower `{follower_user_id}`')
+                self.dynamo_table.delete_item(Key={k: item[k] for k in ('partitionKey', 'sortKey')})
+
+        if not next_story:
+            return
+        for follower_user_id in follower_user_ids:
+            item = first_stories.get(follower_user_id)
+            if item and (item['postId'], item['gsiA2SortKey']) == (next_story['postId'], next_story['expiresAt']):
+                continue
+            logger.warning(f'User `{user_id}`: setting firstStory of follower `{follower_user_id}`')
+            first_story = {
+                'partitionKey': f'user/{user_id}',
+                'sortKey': f'follower/{follower_user_id}/firstStory',
+                'schemaVersion': 1,
+                'gsiA2PartitionKey': f'follower/{follower_user_id}/firstStory',
+                'gsiA2SortKey': next_story['expiresAt'],
+                'postId': next_story['postId'],
+            }
+            self.dynamo_table.put_item(Item=first_story)
+
+
+if __name__ == '__main__':
+    assert DYNAMO_TABLE, 'Must set env variable DYNAMO_TABLE to dynamo table name'
+
+    dynamo_table = boto3.resource('dynamodb').Table(DYNAMO_TABLE)
+    dynamo_client = boto3.client('dynamodb')
+
+    migration = Migration(dynamo_client, dynamo_table)
+    migration.run()
@@ -0,0 +1,66 @@
+import logging
+import os
+
+import boto3
+
+DYNAMO_TABLE = os.environ.get('DYNAMO_TABLE')
+
+logger = logging.getLogger()
+
+
+class Migration:
+    """
+    Backfill each user's nextStory item, pointing at their completed story that expires first.
+    Needed before switching to FOLLOWED_STORIES_MODE=pull. Run after the code that maintains
+    the nextStory items is deployed. Safe to re-run.
+    """
+
+    def __init__(self, dynamo_client, dynamo_table):
+        self.dynamo_client = dynamo_client
+        self.dynamo_table = dynamo_table
+
+    def run(self):
+        next_stories = {}
+        for item in self.generate_all_stories():
+            user_id = item['postedByUserId']
+            if user_id not in next_stories or item['expiresAt'] < next_stories[user_id]['expiresAt']:
+                next_stories[user_id] = item
+        for user_id, story in next_stories.items():
+            self.set_next_story(user_id, story)
+
+    def generate_all_stories(self):
+        "Return a generator of all completed stories"
+        scan_kwargs = {
+            'FilterExpression': (
+                'begins_with(partitionKey, :pk_prefix) AND sortKey = :sk '
+                'AND postStatus = :completed AND attribute_exists(expiresAt)'
+            ),
+            'ExpressionAttributeValues': {':pk_prefix': 'post/', ':sk': '-', ':completed': 'COMPLETED'},
+            'ProjectionExpression': 'postId, postedByUserId, expiresAt',
+        }
+        while True:
+            paginated = self.dynamo_table.scan(**scan_kwargs)
+            for item in paginated['Items']:
+                yield item
+            if 'LastEvaluatedKey' not in paginated:
+                break
+            scan_kwargs['ExclusiveStartKey'] = paginated['LastEvaluatedKey']
+
+    def set_next_story(self, user_id, story):
+        key = {'partitionKey': f'user/{user_id}', 'sortKey': 'nextStory'}
+        existing = self.dynamo_table.get_item(Key=key).get('Item')
+        if existing and (existing['postId'], existing['expiresAt']) == (story['postId'], story['expiresAt']):
+            return
+        logger.warning(f'User `{user_id}`: setting next story to post `{story["postId"]}`')
+        item = {**key, 'schemaVersion': 0, 'postId': story['postId'], 'expiresAt': story['expiresAt']}
+        self.dynamo_table.put_item(Item=item)
+
+
+if __name__ == '__main__':
+    assert DYNAMO_TABLE, 'Must set env variable DYNAMO_TABLE to dynamo table name'
+
+    dynamo_table = boto3.resource('dynamodb').Table(DYNAMO_TABLE)
+    dynamo_client = boto3.client('dynamodb')
+
+    migration = Migration(dynamo_client, dynamo_table)
+    migration.run()
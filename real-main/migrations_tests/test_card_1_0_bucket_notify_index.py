@@ -0,0 +1,102 @@
+import logging
+from uuid import uuid4
+
+import pendulum
+import pytest
+
+from migrations.card_1_0_bucket_notify_index import Migration
+
+
+def add_card(dynamo_table, notify_user_at=None):
+    user_id = f'us-east-1:{uuid4()}'
+    item = {
+        'partitionKey': f'card/{uuid4()}',
+        'sortKey': '-',
+        'schemaVersion': 1,
+        'gsiA1PartitionKey': f'user/{user_id}',
+        'gsiA1SortKey': f'card/{pendulum.now("utc").to_iso8601_string()}',
+        'title': 'card title',
+        'action': 'card action',
+    }
+    if notify_user_at:
+        item['gsiK1PartitionKey'] = 'card'
+        item['gsiK1SortKey'] = f'{notify_user_at.to_iso8601_string()}/{user_id}'
+    dynamo_table.put_item(Item=item)
+    return item
+
+
+def get_item(dynamo_table, item):
+    return dynamo_table.get_item(Key={k: item[k] for k in ('partitionKey', 'sortKey')})['Item']
+
+
+def test_migrate_nothing_to_migrate(dynamo_client, dynamo_table, caplog):
+    item = add_card(dynamo_table)
+    migrated = add_card(dynamo_table, notify_user_at=pendulum.now('utc'))
+    migrated['gsiK1PartitionKey'] = 'card/2020-01-01T00/0'
+    dynamo_table.put_item(Item=migrated)
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+    assert get_item(dynamo_table, item) == item
+    assert get_item(dynamo_table, migrated) == migrated
+
+
+def test_migrate(dynamo_client, dynamo_table, caplog):
+    notify_user_at = pendulum.parse('2020-06-01T13:45:12.123456Z')
+    items = [add_card(dynamo_table, notify_user_at=notify_user_at) for _ in range(8)]
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 8
+    assert all('Migrating card' in rec.msg for rec in caplog.records)
+
+    shards = set()
+    for item in items:
+        new_item = get_item(dynamo_table, item)
+        user_id = item['gsiA1PartitionKey'][len('user/') :]
+        bucket, shard = new_item.pop('gsiK1PartitionKey').split('/')[1:]
+        assert bucket == '2020-06-01T13'
+        assert shard in ('0', '1', '2', '3')
+        shards.add(shard)
+        assert new_item.pop('gsiK2PartitionKey') == f'card/{user_id}'
+        assert new_item.pop('gsiK2SortKey') == '2020-06-01T13:45:12.123456Z'
+        item.pop('gsiK1PartitionKey')
+        assert new_item == item
+    assert len(shards) > 1
+
+    # the dispatcher will read from the migrated cards' bucket
+    watermark_key = {'partitionKey': 'cardNotifyWatermark', 'sortKey': '-'}
+    assert dynamo_table.get_item(Key=watermark_key)['Item']['notifyUserAtHour'] == '2020-06-01T13'
+
+    # migration is idempotent
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+
+
+def test_migrate_card_changed_since_read(dynamo_client, dynamo_table, caplog):
+    item = add_card(dynamo_table, notify_user_at=pendulum.now('utc'))
+    migration = Migration(dynamo_client, dynamo_table)
+    dynamo_table.delete_item(Key={k: item[k] for k in ('partitionKey', 'sortKey')})
+
+    with caplog.at_level(logging.WARNING):
+        migration.migrate_item(item)
+    assert len(caplog.records) == 2
+    assert 'skipping' in caplog.records[1].msg
+    with pytest.raises(KeyError):
+        get_item(dynamo_table, item)
+
+
+def test_migrate_lowers_watermark_to_oldest_bucket(dynamo_client, dynamo_table):
+    watermark_key = {'partitionKey': 'cardNotifyWatermark', 'sortKey': '-'}
+    dynamo_table.put_item(Item={**watermark_key, 'notifyUserAtHour': '2020-06-03T00'})
+    add_card(dynamo_table, notify_user_at=pendulum.parse('2020-06-02T10:00:00Z'))
+    add_card(dynamo_table, notify_user_at=pendulum.parse('2020-06-01T13:45:00Z'))
+    add_card(dynamo_table, notify_user_at=pendulum.parse('2020-06-04T10:00:00Z'))
+
+    Migration(dynamo_client, dynamo_table).run()
+    assert dynamo_table.get_item(Key=watermark_key)['Item']['notifyUserAtHour'] == '2020-06-01T13'
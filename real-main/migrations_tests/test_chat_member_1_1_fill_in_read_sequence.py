@@ -0,0 +1,85 @@
+import logging
+from uuid import uuid4
+
+import pytest
+
+from migrations.chat_member_1_1_fill_in_read_sequence import Migration
+
+
+@pytest.fixture
+def chat_id(dynamo_table):
+    chat_id = str(uuid4())
+    item = {'partitionKey': f'chat/{chat_id}', 'sortKey': '-', 'messagesCount': 9, 'messageSequence': 5}
+    dynamo_table.put_item(Item=item)
+    yield chat_id
+
+
+def add_member(dynamo_table, chat_id, **attributes):
+    item = {'partitionKey': f'chat/{chat_id}', 'sortKey': f'member/{uuid4()}', **attributes}
+    dynamo_table.put_item(Item=item)
+    return item
+
+
+def get_item(dynamo_table, item):
+    return dynamo_table.get_item(Key={k: item[k] for k in ('partitionKey', 'sortKey')})['Item']
+
+
+def test_migrate_nothing_to_migrate(dynamo_client, dynamo_table, caplog, chat_id):
+    item = add_member(dynamo_table, chat_id, readSequence=3, messagesUnviewedCount=1)
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+    assert get_item(dynamo_table, item) == item
+
+
+def test_migrate(dynamo_client, dynamo_table, caplog, chat_id):
+    caught_up = add_member(dynamo_table, chat_id)
+    behind = add_member(dynamo_table, chat_id, messagesUnviewedCount=7)
+    very_behind = add_member(dynamo_table, chat_id, messagesUnviewedCount=12)
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 3
+    assert all('Migrating chat member' in rec.msg for rec in caplog.records)
+
+    assert get_item(dynamo_table, caught_up) == {**caught_up, 'readSequence': 5}
+    assert get_item(dynamo_table, behind) == {**behind, 'readSequence': 0}
+    assert get_item(dynamo_table, very_behind) == {**very_behind, 'readSequence': 0}
+
+    # running again does nothing
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+
+
+def test_migrate_seeds_message_sequence(dynamo_client, dynamo_table, caplog):
+    chat_id = str(uuid4())
+    chat_item = {'partitionKey': f'chat/{chat_id}', 'sortKey': '-', 'messagesCount': 9}
+    dynamo_table.put_item(Item=chat_item)
+    caught_up = add_member(dynamo_table, chat_id)
+    behind = add_member(dynamo_table, chat_id, messagesUnviewedCount=2)
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 3
+    assert sum('Seeding chat' in rec.msg for rec in caplog.records) == 1
+    assert sum('Migrating chat member' in rec.msg for rec in caplog.records) == 2
+
+    assert get_item(dynamo_table, chat_item) == {**chat_item, 'messageSequence': 9}
+    assert get_item(dynamo_table, caught_up) == {**caught_up, 'readSequence': 9}
+    assert get_item(dynamo_table, behind) == {**behind, 'readSequence': 7}
+
+
+def test_migrate_chat_gone(dynamo_client, dynamo_table, caplog):
+    item = add_member(dynamo_table, str(uuid4()), messagesUnviewedCount=2)
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 1
+    assert get_item(dynamo_table, item) == {**item, 'readSequence': 0}
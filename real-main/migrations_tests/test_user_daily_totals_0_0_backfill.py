@@ -0,0 +1,106 @@
+import logging
+import uuid
+from decimal import Decimal
+
+import pendulum
+import pytest
+
+from migrations.user_daily_totals_0_0_backfill import Migration
+
+now = pendulum.parse('2020-06-30T12:00:00Z')
+
+
+def totals_key(user_id, date_str):
+    return {'partitionKey': f'user/{user_id}', 'sortKey': f'dailyTotals/{date_str}'}
+
+
+@pytest.fixture
+def user_id():
+    yield str(uuid.uuid4())
+
+
+def add_view(dynamo_table, user_id, first_viewed_at, view_count, royalty_fee=None):
+    item = {
+        'partitionKey': f'post/{uuid.uuid4()}',
+        'sortKey': f'view/{user_id}',
+        'firstViewedAt': first_viewed_at.to_iso8601_string(),
+        'viewCount': view_count,
+    }
+    if royalty_fee is not None:
+        item['royaltyFee'] = royalty_fee
+    dynamo_table.put_item(Item=item)
+
+
+def add_transaction(dynamo_table, user_id, created_at, price):
+    item = {
+        'partitionKey': f'transaction/{uuid.uuid4()}',
+        'sortKey': '-',
+        'userId': user_id,
+        'createdAt': created_at.to_iso8601_string(),
+        'price': price,
+    }
+    dynamo_table.put_item(Item=item)
+
+
+def test_nothing_to_migrate(dynamo_client, dynamo_table, caplog, user_id):
+    add_view(dynamo_table, user_id, now - pendulum.duration(days=31), 2)
+    add_transaction(dynamo_table, user_id, now - pendulum.duration(days=31), Decimal('0.99'))
+
+    migration = Migration(dynamo_client, dynamo_table, now=now)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+
+
+def test_migrate(dynamo_client, dynamo_table, caplog, user_id):
+    user_id2 = str(uuid.uuid4())
+    add_view(dynamo_table, user_id, now, 2, royalty_fee=Decimal('0.1'))
+    add_view(dynamo_table, user_id, now - pendulum.duration(hours=1), 3)
+    add_view(dynamo_table, user_id, now - pendulum.duration(days=30, hours=12), 1, royalty_fee=Decimal('0.2'))
+    add_view(dynamo_table, user_id2, now - pendulum.duration(days=2), 5)
+    add_transaction(dynamo_table, user_id, now - pendulum.duration(days=2), Decimal('0.99'))
+    add_transaction(dynamo_table, user_id, now - pendulum.duration(days=2), Decimal('0.99'))
+    dynamo_table.put_item(Item={'partitionKey': f'user/{user_id}', 'sortKey': 'profile', 'userId': user_id})
+
+    # a total already there gets overwritten, not added to
+    dynamo_table.put_item(Item={**totals_key(user_id, '2020-06-30'), 'postViewCount': 100})
+
+    migration = Migration(dynamo_client, dynamo_table, now=now)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 4
+    assert all('Migrating user' in rec.msg for rec in caplog.records)
+
+    def get_totals(uid, date_str):
+        item = dynamo_table.get_item(Key=totals_key(uid, date_str))['Item']
+        return {k: item[k] for k in ('schemaVersion', 'postViewCount', 'royaltyPaid', 'paidReal')}
+
+    assert get_totals(user_id, '2020-06-30') == {
+        'schemaVersion': 0,
+        'postViewCount': 5,
+        'royaltyPaid': Decimal('0.1'),
+        'paidReal': 0,
+    }
+    assert get_totals(user_id, '2020-05-31') == {
+        'schemaVersion': 0,
+        'postViewCount': 1,
+        'royaltyPaid': Decimal('0.2'),
+        'paidReal': 0,
+    }
+    assert get_totals(user_id, '2020-06-28') == {
+        'schemaVersion': 0,
+        'postViewCount': 0,
+        'royaltyPaid': 0,
+        'paidReal': Decimal('1.98'),
+    }
+    assert get_totals(user_id2, '2020-06-28') == {
+        'schemaVersion': 0,
+        'postViewCount': 5,
+        'royaltyPaid': 0,
+        'paidReal': 0,
+    }
+
+    # re-running leaves the totals as they are
+    before = dynamo_table.scan()['Items']
+    migration.run()
+    assert sorted(dynamo_table.scan()['Items'], key=str) == sorted(before, key=str)
@@ -0,0 +1,106 @@
+import logging
+from uuid import uuid4
+
+import pendulum
+import pytest
+
+from migrations.user_follower_first_story_1_1_backfill_from_next_story import Migration
+
+
+@pytest.fixture
+def user_id():
+    yield f'us-east-1:{uuid4()}'
+
+
+user_id2 = user_id
+user_id3 = user_id
+user_id4 = user_id
+
+
+def add_follower(dynamo_table, followed_user_id, follower_user_id, follow_status='FOLLOWING'):
+    item = {
+        'partitionKey': f'user/{followed_user_id}',
+        'sortKey': f'follower/{follower_user_id}',
+        'schemaVersion': 1,
+        'followStatus': follow_status,
+        'followerUserId': follower_user_id,
+        'followedUserId': followed_user_id,
+    }
+    dynamo_table.put_item(Item=item)
+
+
+def add_next_story(dynamo_table, user_id, expires_at):
+    item = {
+        'partitionKey': f'user/{user_id}',
+        'sortKey': 'nextStory',
+        'schemaVersion': 0,
+        'postId': str(uuid4()),
+        'expiresAt': expires_at.to_iso8601_string(),
+    }
+    dynamo_table.put_item(Item=item)
+    return item
+
+
+def first_story_key(followed_user_id, follower_user_id):
+    return {'partitionKey': f'user/{followed_user_id}', 'sortKey': f'follower/{follower_user_id}/firstStory'}
+
+
+def add_first_story(dynamo_table, followed_user_id, follower_user_id, post_id, expires_at):
+    item = {
+        **first_story_key(followed_user_id, follower_user_id),
+        'schemaVersion': 1,
+        'gsiA2PartitionKey': f'follower/{follower_user_id}/firstStory',
+        'gsiA2SortKey': expires_at,
+        'postId': post_id,
+    }
+    dynamo_table.put_item(Item=item)
+    return item
+
+
+def get_first_story(dynamo_table, followed_user_id, follower_user_id):
+    return dynamo_table.get_item(Key=first_story_key(followed_user_id, follower_user_id)).get('Item')
+
+
+def test_migrate_nothing_to_migrate(dynamo_client, dynamo_table, user_id, user_id2, caplog):
+    add_follower(dynamo_table, user_id, user_id2)
+    story = add_next_story(dynamo_table, user_id, pendulum.now('utc'))
+    add_first_story(dynamo_table, user_id, user_id2, story['postId'], story['expiresAt'])
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+
+
+def test_migrate(dynamo_client, dynamo_table, user_id, user_id2, user_id3, user_id4, caplog):
+    now = pendulum.now('utc')
+    # user has a story, and three followers: one up to date, one stale, one missing its firstStory
+    story = add_next_story(dynamo_table, user_id, now)
+    for follower_user_id in (user_id2, user_id3, user_id4):
+        add_follower(dynamo_table, user_id, follower_user_id)
+    add_first_story(dynamo_table, user_id, user_id2, story['postId'], story['expiresAt'])
+    add_first_story(dynamo_table, user_id, user_id3, str(uuid4()), now.subtract(hours=1).to_iso8601_string())
+    # a firstStory left behind by someone no longer following, and a follow request
+    add_first_story(dynamo_table, user_id, 'unfollowed', story['postId'], story['expiresAt'])
+    add_follower(dynamo_table, user_id, 'requested', follow_status='REQUESTED')
+    # user2 has no story left, but a firstStory with their follower
+    add_follower(dynamo_table, user_id2, user_id)
+    add_first_story(dynamo_table, user_id2, user_id, str(uuid4()), now.to_iso8601_string())
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 4
+    expected = {'postId': story['postId'], 'gsiA2SortKey': story['expiresAt']}
+    for follower_user_id in (user_id2, user_id3, user_id4):
+        first_story = get_first_story(dynamo_table, user_id, follower_user_id)
+        assert {k: first_story[k] for k in expected} == expected
+    assert get_first_story(dynamo_table, user_id, 'unfollowed') is None
+    assert get_first_story(dynamo_table, user_id, 'requested') is None
+    assert get_first_story(dynamo_table, user_id2, user_id) is None
+
+    # migrate again, nothing changes
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
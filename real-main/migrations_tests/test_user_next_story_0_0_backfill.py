@@ -0,0 +1,71 @@
+import logging
+from uuid import uuid4
+
+import pendulum
+import pytest
+
+from migrations.user_next_story_0_0_backfill import Migration
+
+
+@pytest.fixture
+def user_id():
+    yield f'us-east-1:{uuid4()}'
+
+
+def add_post(dynamo_table, user_id, expires_at=None, post_status='COMPLETED'):
+    item = {
+        'partitionKey': f'post/{uuid4()}',
+        'sortKey': '-',
+        'schemaVersion': 3,
+        'postId': str(uuid4()),
+        'postedByUserId': user_id,
+        'postStatus': post_status,
+    }
+    if expires_at:
+        item['expiresAt'] = expires_at.to_iso8601_string()
+    dynamo_table.put_item(Item=item)
+    return item
+
+
+def get_next_story(dynamo_table, user_id):
+    return dynamo_table.get_item(Key={'partitionKey': f'user/{user_id}', 'sortKey': 'nextStory'}).get('Item')
+
+
+def test_migrate_nothing_to_migrate(dynamo_client, dynamo_table, user_id, caplog):
+    add_post(dynamo_table, user_id)
+    add_post(dynamo_table, user_id, expires_at=pendulum.now('utc'), post_status='ARCHIVED')
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0
+    assert get_next_story(dynamo_table, user_id) is None
+
+
+def test_migrate(dynamo_client, dynamo_table, user_id, caplog):
+    now = pendulum.now('utc')
+    add_post(dynamo_table, user_id, expires_at=now + pendulum.duration(hours=2))
+    first = add_post(dynamo_table, user_id, expires_at=now + pendulum.duration(hours=1))
+    add_post(dynamo_table, user_id, expires_at=now, post_status='ARCHIVED')
+    other_user_id = f'us-east-1:{uuid4()}'
+    other = add_post(dynamo_table, other_user_id, expires_at=now + pendulum.duration(hours=3))
+
+    migration = Migration(dynamo_client, dynamo_table)
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 2
+    assert all('setting next story' in rec.msg for rec in caplog.records)
+    assert get_next_story(dynamo_table, user_id) == {
+        'partitionKey': f'user/{user_id}',
+        'sortKey': 'nextStory',
+        'schemaVersion': 0,
+        'postId': first['postId'],
+        'expiresAt': first['expiresAt'],
+    }
+    assert get_next_story(dynamo_table, other_user_id)['postId'] == other['postId']
+
+    # migrate again, nothing changes
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        migration.run()
+    assert len(caplog.records) == 0